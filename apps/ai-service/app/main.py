@@ -4,36 +4,12 @@ Provides AI/ML capabilities for meeting intelligence with REAL OpenAI integratio
 NOW WITH REAL ML: pyannote.audio speaker diarization, spaCy NER, KeyBERT keyword extraction
 """
 
-# Apply torchaudio compatibility patches BEFORE any other imports
-# This must run before pyannote.audio is imported anywhere
-from typing import NamedTuple
-import torchaudio
-
-# Deprecated/removed functions in torchaudio 2.1+
-if not hasattr(torchaudio, 'set_audio_backend'):
-    torchaudio.set_audio_backend = lambda x: None
-
-if not hasattr(torchaudio, 'get_audio_backend'):
-    torchaudio.get_audio_backend = lambda: "soundfile"
-
-if not hasattr(torchaudio, 'list_audio_backends'):
-    torchaudio.list_audio_backends = lambda: ["soundfile", "sox"]
-
-if not hasattr(torchaudio, 'AudioMetaData'):
-    class AudioMetaData(NamedTuple):
-        sample_rate: int
-        num_frames: int
-        num_channels: int
-        bits_per_sample: int
-        encoding: str
-    torchaudio.AudioMetaData = AudioMetaData
-# End torchaudio patches
-
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, Callable
 import os
 import logging
 from datetime import datetime
@@ -41,18 +17,32 @@ import openai
 from openai import OpenAI
 import httpx
 import json
+import base64
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from fastapi.responses import Response
 import tempfile
 import uuid
 import time
+import asyncio
+import contextvars
+from contextlib import nullcontext
+from dataclasses import dataclass
 
-# Import REAL ML services
-from app.services.speaker_diarization import get_diarization_service
-from app.services.entity_extraction import get_entity_service
-from app.services.keyword_extraction import get_keyword_service
+# Import REAL ML services (the model-backed ones are loaded lazily, see get_warmup_manager)
 from app.services.pdf_export import get_pdf_service
-from app.services.local_whisper import get_local_whisper, is_available as whisper_available
+from app.services.retrieval import get_retrieval_service
+from app.services.warmup import get_warmup_manager
+from app.services.provider_config_service import initialize_provider_system
+from app.services.providers import ProviderManager, ProviderType, ProviderConfig
+from app.services.providers import ChatRequest as LLMRequest, ChatMessage as LLMMessage
+from app.services.providers.rate_limiter import RateLimitExceeded, RequestPriority, current_priority, request_priority
+from app.services.live_session import LiveSessionState, LiveAnalysisScheduler, get_live_session_store
+from app.services.tokenizer_service import get_tokenizer_service, usage_endpoint
+from app.services.prompt_packer import PackedPrompt, PromptPacker, PromptSection
+from app.services.structured_output import json_schema
+from app.services.dag import DAG, DAGFailed
+from app.services.job_queue import Job, JobHandler, JobWorker, get_job_queue
+from app.services.admission import AdmissionMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,6 +55,11 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Admission control: per-class concurrency pools and load shedding. Added
+# before CORS so CORS wraps it (shed 503s carry CORS headers, preflights
+# are answered without taking a slot)
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +69,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def attribute_token_usage(request: Request, call_next):
+    """Attribute provider token usage to the route template (not the raw path, to bound label cardinality)"""
+    endpoint = "unmatched"
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            endpoint = route.path
+            break
+    with usage_endpoint(endpoint):
+        return await call_next(request)
+
 # Prometheus metrics
 REQUESTS_TOTAL = Counter('ai_requests_total', 'Total AI requests')
 REQUESTS_DURATION = Histogram('ai_request_duration_seconds', 'AI request duration')
@@ -82,6 +89,19 @@ SUMMARIZATION_REQUESTS = Counter('summarization_requests_total', 'Total summariz
 SENTIMENT_REQUESTS = Counter('sentiment_analysis_requests_total', 'Total sentiment analysis requests')
 TRANSCRIPTION_ERRORS = Counter('transcription_errors_total', 'Total transcription errors')
 SUMMARIZATION_ERRORS = Counter('summarization_errors_total', 'Total summarization errors')
+CHAT_TIME_TO_FIRST_TOKEN = Histogram('chat_time_to_first_token_seconds', 'Time from request to first streamed chat token')
+
+# Set while /analyze-meeting runs other endpoints as its steps, so one request is counted once
+_endpoint_step: contextvars.ContextVar[bool] = contextvars.ContextVar("endpoint_step", default=False)
+
+def _count_request():
+    """Count an API request, unless the endpoint runs as a step of another one"""
+    if not _endpoint_step.get():
+        REQUESTS_TOTAL.inc()
+
+def _time_request():
+    """REQUESTS_DURATION timer, skipped when the endpoint runs as a step of another one"""
+    return nullcontext() if _endpoint_step.get() else REQUESTS_DURATION.time()
 
 # Configure OpenAI client (pointing to vLLM for local inference)
 client = OpenAI(
@@ -96,11 +116,240 @@ logger.info(f"AI Service configured with LLM model: {LLM_MODEL}")
 # Configurable LLM model name (for air-gapped deployments with Ollama/vLLM)
 LLM_MODEL = os.getenv("OPENAI_MODEL", os.getenv("LLM_MODEL", "gpt-4"))
 WHISPER_MODEL = os.getenv("OPENAI_WHISPER_MODEL", "whisper-1")
+# Override the provider registry's context window and output limit (needed for vLLM/Ollama model names)
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "0")) or None
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "0")) or None
 logger.info(f"AI Service configured with LLM model: {LLM_MODEL}")
 
 # Second client for OpenAI (when using real API key)
 # client2 = OpenAI()  # Commented out - requires OPENAI_API_KEY env var
 
+# Provider manager (embeddings, streaming, fallback), created on first use
+_provider_manager: Optional[ProviderManager] = None
+
+def get_providers() -> ProviderManager:
+    """
+    Get the initialized provider manager.
+    If no provider is configured, registers an OpenAI-compatible provider on the
+    same endpoint as `client` so both paths talk to the same backend.
+    """
+    global _provider_manager
+    if _provider_manager is None:
+        manager = initialize_provider_system().manager
+        if not manager.providers:
+            manager.register_provider(ProviderType.OPENAI, ProviderConfig(
+                provider_type=ProviderType.OPENAI,
+                api_key=os.getenv("OPENAI_API_KEY", "sk-dummy-key"),
+                api_base=os.getenv("OPENAI_BASE_URL", "http://vllm:8000/v1"),
+                rate_limit_rpm=int(os.getenv("OPENAI_RATE_LIMIT_RPM", "0")) or None,
+                rate_limit_tpm=int(os.getenv("OPENAI_RATE_LIMIT_TPM", "0")) or None,
+            ))
+        _provider_manager = manager
+    return _provider_manager
+
+@app.on_event("startup")
+async def start_provider_health_monitor():
+    """Probe providers in the background so degraded ones are skipped by their circuit breaker"""
+    try:
+        get_providers().start_health_monitor()
+    except Exception as e:
+        logger.warning(f"Provider health monitor not started: {e}")
+
+@app.on_event("shutdown")
+async def stop_provider_health_monitor():
+    if _provider_manager is not None:
+        await _provider_manager.stop_health_monitor()
+
+# Model-backed services: imported and loaded by the background warm-up, or on first use.
+# A load (or waiting for the warm-up's) runs on the executor, never on the event loop.
+async def get_diarization_service():
+    return await get_warmup_manager().load_async("diarization")
+
+async def get_entity_service():
+    return await get_warmup_manager().load_async("entities")
+
+async def get_keyword_service():
+    return await get_warmup_manager().load_async("keywords")
+
+def get_local_whisper():
+    """Blocking; only called from _transcribe_file, which runs on the executor"""
+    return get_warmup_manager().load("whisper")
+
+def whisper_available() -> bool:
+    from app.services.local_whisper import is_available
+    return is_available()
+
+@app.on_event("startup")
+async def start_model_warmup():
+    """Load WARMUP_MODELS in parallel in the background; /ready passes once they're loaded"""
+    get_warmup_manager().start()
+
+@app.on_event("shutdown")
+async def stop_model_warmup():
+    await get_warmup_manager().stop()
+
+_tokenizer_preload: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def preload_tokenizers():
+    """Fetch LLM_MODEL's (and TOKENIZER_PRELOAD_MODELS') tokenizers off the event loop"""
+    global _tokenizer_preload
+    models = ["", LLM_MODEL] + [model.strip() for model in os.getenv("TOKENIZER_PRELOAD_MODELS", "").split(",") if model.strip()]
+    _tokenizer_preload = asyncio.create_task(get_tokenizer_service().preload(models))
+
+def _prompt_packer() -> PromptPacker:
+    """Prompt packer sized to LLM_MODEL's context window"""
+    model_info = get_providers().get_model_info(LLM_MODEL)
+    return PromptPacker(
+        LLM_MODEL,
+        context_window=LLM_CONTEXT_WINDOW or (model_info.context_window if model_info else None),
+        max_output_tokens=LLM_MAX_OUTPUT_TOKENS or (model_info.max_output_tokens if model_info else None),
+    )
+
+def _pack_transcript_prompt(system_prompt: str, user_template: str, text: str, max_tokens: int) -> PackedPrompt:
+    """Pack a system prompt and a user template whose {transcript} slot gets as much of text as fits"""
+    return _prompt_packer().pack(
+        system=system_prompt,
+        user=user_template,
+        output_tokens=max_tokens,
+        sections=[PromptSection("transcript", [text], truncate=True)],
+    )
+
+def _llm_request(messages: List[Dict[str, str]], temperature: float, max_tokens: int, **kwargs) -> LLMRequest:
+    """Build a provider chat request for LLM_MODEL from role/content dicts"""
+    return LLMRequest(
+        messages=[LLMMessage(role=m["role"], content=m["content"]) for m in messages],
+        model=LLM_MODEL,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        **kwargs,
+    )
+
+async def _chat_completion(
+    llm_request: LLMRequest,
+    hedge: bool = False,
+    priority: Optional[RequestPriority] = None
+):
+    """
+    Chat completion through the provider manager (rate limits, fallback, hedging).
+    priority defaults to the request's admission class (see admission.py).
+    When every provider failed, the last provider error is raised as is so the
+    endpoints' openai.* handlers keep mapping it (e.g. to 429).
+    """
+    try:
+        with request_priority(priority if priority is not None else current_priority()):
+            return await get_providers().chat_completion(llm_request, hedge=hedge)
+    except RuntimeError as e:
+        if isinstance(e.__cause__, (openai.APIError, RateLimitExceeded)):
+            raise e.__cause__
+        raise
+
+async def _complete_json(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    hedge: bool = False,
+    priority: Optional[RequestPriority] = None,
+    schema: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run a JSON-mode chat completion through the provider manager and parse the result.
+    Local models decode within schema (see structured_output.json_schema), so their
+    output always parses and stops as soon as the object closes.
+    """
+    response = await _chat_completion(
+        _llm_request(messages, temperature, max_tokens, response_format={"type": "json_object"}, response_schema=schema),
+        hedge=hedge,
+        priority=priority,
+    )
+    return json.loads(response.content)
+
+@dataclass
+class TextAnalysis:
+    """One LLM analysis of a transcript: its prompts, output schema and response parser"""
+    key: str
+    system_prompt: str
+    user_prompt: str  # template with a {transcript} slot
+    schema: Dict[str, Any]
+    max_tokens: int
+    temperature: float
+    parse: Callable[[Dict[str, Any]], BaseModel]
+    context: str = ""  # request details the user prompt adds beyond the transcript
+
+async def _run_text_analysis(analysis: TextAnalysis, text: str) -> BaseModel:
+    packed = _pack_transcript_prompt(analysis.system_prompt, analysis.user_prompt, text, max_tokens=analysis.max_tokens)
+    parsed_response = await _complete_json(
+        packed.messages,
+        temperature=analysis.temperature,
+        max_tokens=packed.output_tokens,
+        schema=analysis.schema,
+    )
+    return analysis.parse(parsed_response)
+
+async def _run_combined_analysis(analyses: List[TextAnalysis], text: str) -> Dict[str, BaseModel]:
+    """
+    Run several analyses of one transcript as a single LLM call
+
+    The transcript is sent (and prefilled) once; the model returns one object
+    with each analysis's result under its key, which is split and parsed by
+    that analysis as if it had been called on its own. The output budget is
+    capped at the model's output limit; if the response is cut off or
+    doesn't parse, the sections it lacks are re-run as separate calls.
+    """
+    if len(analyses) == 1:
+        return {analyses[0].key: await _run_text_analysis(analyses[0], text)}
+
+    keys = [analysis.key for analysis in analyses]
+    sections = "\n\n".join(f"## {analysis.key}\n{analysis.system_prompt.strip()}" for analysis in analyses)
+    system_prompt = f"""You are an AI assistant that analyzes meeting transcripts.
+Perform each of the analyses below on the same transcript.
+
+Return one JSON object with exactly these keys: {', '.join(keys)}
+The value of each key is the JSON object its analysis asks for.
+
+{sections}"""
+    contexts = "".join(f"\n\n{analysis.context}" for analysis in analyses if analysis.context)
+    user_prompt = "Analyze this meeting transcript:\n\n{transcript}" + contexts
+
+    # The packer caps the summed budget at the model's output limit
+    packed = _pack_transcript_prompt(system_prompt, user_prompt, text, max_tokens=sum(a.max_tokens for a in analyses))
+    schema = {
+        "type": "object",
+        "properties": {analysis.key: analysis.schema for analysis in analyses},
+        "required": keys,
+        "additionalProperties": False,
+    }
+    response = await _chat_completion(_llm_request(
+        packed.messages,
+        temperature=min(analysis.temperature for analysis in analyses),
+        max_tokens=packed.output_tokens,
+        response_format={"type": "json_object"},
+        response_schema=schema,
+    ))
+    try:
+        parsed_response = json.loads(response.content)
+    except json.JSONDecodeError as e:
+        reason = f"hit the {packed.output_tokens}-token output limit" if response.finish_reason == "length" else f"returned invalid JSON ({e})"
+        logger.warning(f"⚠️ Combined analysis {reason}, running the analyses separately")
+        parsed_response = {}
+
+    results = {}
+    missing = []
+    for analysis in analyses:
+        section = parsed_response.get(analysis.key) if isinstance(parsed_response, dict) else None
+        if not isinstance(section, dict):
+            missing.append(analysis)
+            continue
+        try:
+            results[analysis.key] = analysis.parse(section)
+        except Exception as e:
+            logger.warning(f"⚠️ Combined analysis section {analysis.key} didn't parse ({e}), running it separately")
+            missing.append(analysis)
+    if missing:
+        separate = await asyncio.gather(*(_run_text_analysis(analysis, text) for analysis in missing))
+        results.update(zip([analysis.key for analysis in missing], separate))
+    return {key: results[key] for key in keys}
+
 # Pydantic models
 class TranscriptionRequest(BaseModel):
     audio_url: str = Field(..., description="URL to audio file")
@@ -118,7 +367,7 @@ class TranscriptionResponse(BaseModel):
 
 class SummarizationRequest(BaseModel):
     text: str = Field(..., description="Text to summarize")
-    max_length: Optional[int] = Field(200, description="Maximum summary length")
+    max_length: Optional[int] = Field(200, description="Maximum summary length in words")
     style: Optional[str] = Field("bullet_points", description="Summary style")
 
 class SummarizationResponse(BaseModel):
@@ -147,13 +396,30 @@ class SpeakerDiarizationResponse(BaseModel):
 
 class ChatRequest(BaseModel):
     question: str = Field(..., description="User question")
-    context: str = Field(..., description="Meeting context for RAG")
+    context: Optional[str] = Field("", description="Meeting context for RAG (used when no organization index is available)")
     conversationHistory: Optional[List[Dict[str, str]]] = Field([], description="Previous conversation messages")
+    organizationId: Optional[str] = Field(None, description="Organization whose meeting index to retrieve from")
+    meetingIds: Optional[List[str]] = Field(None, description="Restrict retrieval to these meetings")
+    topK: int = Field(8, ge=1, le=50, description="Number of transcript chunks to retrieve")
 
 class ChatResponse(BaseModel):
     answer: str
     conversationId: str
     confidence: float
+    sources: List[Dict[str, Any]] = []
+
+class IndexMeetingRequest(BaseModel):
+    organizationId: str = Field(..., description="Organization ID")
+    meetingId: str = Field(..., description="Meeting ID")
+    transcript: Optional[str] = Field(None, description="Plain transcript text")
+    segments: Optional[List[Dict[str, Any]]] = Field(None, description="Transcript segments (speaker, text, start_time)")
+    title: Optional[str] = Field(None, description="Meeting title")
+    date: Optional[str] = Field(None, description="Meeting date")
+
+class IndexMeetingResponse(BaseModel):
+    organizationId: str
+    meetingId: str
+    chunksIndexed: int
 
 class SuperSummarizeRequest(BaseModel):
     meetings: str = Field(..., description="Aggregated meeting summaries text")
@@ -181,12 +447,148 @@ async def health_check():
         "openai_configured": bool(os.getenv("OPENAI_API_KEY"))
     }
 
+# Readiness endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe for Kubernetes: 503 until the configured models are loaded"""
+    warmup = get_warmup_manager().status()
+    if warmup["ready"]:
+        status = "ready"
+    elif any(model["status"] == "error" for model in warmup["models"].values()):
+        status = "model_load_failed"
+    else:
+        status = "warming_up"
+    return JSONResponse(status_code=200 if warmup["ready"] else 503, content={"status": status, **warmup})
+
 # Metrics endpoint
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
+async def _download_audio(audio_url: str) -> str:
+    """Download audio to a temporary file; the caller unlinks it"""
+    async with httpx.AsyncClient() as http_client:
+        response = await http_client.get(audio_url, timeout=60.0)
+        response.raise_for_status()
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
+    temp_file.write(response.content)
+    temp_file.close()
+    return temp_file.name
+
+def _remove_file(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _transcribe_file(audio_path: str, language: Optional[str], enable_timestamps: bool) -> TranscriptionResponse:
+    """Transcribe a local audio file with local Whisper or the Whisper API (blocking)"""
+    whisper_provider = os.getenv("WHISPER_PROVIDER", "openai").lower()
+
+    if whisper_provider == "local" and whisper_available():
+        # Use local Whisper model
+        logger.info(f"Using local Whisper model (size={os.getenv('WHISPER_MODEL_SIZE', 'small')})")
+        whisper_service = get_local_whisper()
+
+        # Transcribe with local model
+        local_result = whisper_service.transcribe(
+            audio_path=audio_path,
+            language=language,
+            word_timestamps=enable_timestamps,
+            vad_filter=True
+        )
+
+        # Convert to our response format
+        segments = []
+        for seg in local_result.segments:
+            segments.append({
+                "id": seg.id + 1,
+                "speaker": seg.speaker or f"Speaker {(seg.id % 3) + 1}",
+                "text": seg.text,
+                "start_time": seg.start,
+                "end_time": seg.end,
+                "confidence": seg.confidence if seg.confidence > 0 else 0.85
+            })
+
+        result = TranscriptionResponse(
+            transcription_id=str(uuid.uuid4()),
+            text=local_result.text,
+            segments=segments,
+            language=local_result.language,
+            duration=local_result.duration,
+            confidence=sum(s["confidence"] for s in segments) / len(segments) if segments else 0.85
+        )
+        logger.info(f"✅ Local Whisper transcription: {len(result.text)} chars, {len(segments)} segments")
+        return result
+
+    # Call OpenAI Whisper API (or vLLM if configured)
+    logger.info("Using OpenAI/vLLM Whisper API")
+    with open(audio_path, "rb") as audio_file:
+        transcription = client.audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_file,
+            language=language,
+            response_format="verbose_json" if enable_timestamps else "json",
+            timestamp_granularities=["word", "segment"] if enable_timestamps else None
+        )
+
+    # Process OpenAI response
+    if hasattr(transcription, 'segments'):
+        # Verbose response with timestamps
+        segments = []
+        for i, seg in enumerate(transcription.segments):
+            segments.append({
+                "id": i + 1,
+                "speaker": f"Speaker {(i % 3) + 1}",  # Simple speaker assignment
+                "text": seg.get("text", ""),
+                "start_time": seg.get("start", 0.0),
+                "end_time": seg.get("end", 0.0),
+                "confidence": seg.get("avg_logprob", 0.0) if seg.get("avg_logprob") else 0.85
+            })
+
+        return TranscriptionResponse(
+            transcription_id=str(uuid.uuid4()),
+            text=transcription.text,
+            segments=segments,
+            language=transcription.language or language or "en",
+            duration=transcription.duration if hasattr(transcription, 'duration') else 0.0,
+            confidence=sum(s["confidence"] for s in segments) / len(segments) if segments else 0.85
+        )
+
+    # Simple response
+    # Split text into sentences for segments
+    sentences = transcription.text.split('. ')
+    segments = []
+    current_time = 0.0
+    for i, sentence in enumerate(sentences):
+        if sentence.strip():
+            duration = len(sentence.split()) * 0.5  # Estimate 0.5s per word
+            segments.append({
+                "id": i + 1,
+                "speaker": f"Speaker {(i % 3) + 1}",
+                "text": sentence.strip() + ".",
+                "start_time": current_time,
+                "end_time": current_time + duration,
+                "confidence": 0.85
+            })
+            current_time += duration
+
+    return TranscriptionResponse(
+        transcription_id=str(uuid.uuid4()),
+        text=transcription.text,
+        segments=segments,
+        language=language or "en",
+        duration=current_time,
+        confidence=0.85
+    )
+
+async def _transcribe(audio_path: str, language: Optional[str], enable_timestamps: bool) -> TranscriptionResponse:
+    # Whisper calls block; keep them off the event loop so other work overlaps
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _transcribe_file, audio_path, language, enable_timestamps)
+
 # Transcription endpoint
 @app.post("/api/v1/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(request: TranscriptionRequest, background_tasks: BackgroundTasks):
@@ -196,136 +598,21 @@ async def transcribe_audio(request: TranscriptionRequest, background_tasks: Back
     TRANSCRIPTION_REQUESTS.inc()
     REQUESTS_TOTAL.inc()
 
-    # Check if local Whisper is configured and available
     whisper_provider = os.getenv("WHISPER_PROVIDER", "openai").lower()
-    use_local = whisper_provider == "local" and whisper_available()
 
     try:
         with REQUESTS_DURATION.time():
             logger.info(f"Transcribing audio from: {request.audio_url} (provider={whisper_provider})")
 
             # Download audio file to temporary location
-            async with httpx.AsyncClient() as http_client:
-                response = await http_client.get(request.audio_url, timeout=60.0)
-                response.raise_for_status()
-
-                # Save to temporary file
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-                temp_file.write(response.content)
-                temp_file.close()
-
-                try:
-                    if use_local:
-                        # Use local Whisper model
-                        logger.info(f"Using local Whisper model (size={os.getenv('WHISPER_MODEL_SIZE', 'small')})")
-                        whisper_service = get_local_whisper(
-                            model_size=os.getenv("WHISPER_MODEL_SIZE", "small"),
-                            device="auto",
-                            compute_type="auto"
-                        )
-
-                        # Transcribe with local model
-                        local_result = whisper_service.transcribe(
-                            audio_path=temp_file.name,
-                            language=request.language,
-                            word_timestamps=request.enable_timestamps,
-                            vad_filter=True
-                        )
-
-                        # Convert to our response format
-                        segments = []
-                        for seg in local_result.segments:
-                            segments.append({
-                                "id": seg.id + 1,
-                                "speaker": seg.speaker or f"Speaker {(seg.id % 3) + 1}",
-                                "text": seg.text,
-                                "start_time": seg.start,
-                                "end_time": seg.end,
-                                "confidence": seg.confidence if seg.confidence > 0 else 0.85
-                            })
-
-                        result = TranscriptionResponse(
-                            transcription_id=str(uuid.uuid4()),
-                            text=local_result.text,
-                            segments=segments,
-                            language=local_result.language,
-                            duration=local_result.duration,
-                            confidence=sum(s["confidence"] for s in segments) / len(segments) if segments else 0.85
-                        )
-                        logger.info(f"✅ Local Whisper transcription: {len(result.text)} chars, {len(segments)} segments")
-
-                    else:
-                        # Call OpenAI Whisper API (or vLLM if configured)
-                        logger.info("Using OpenAI/vLLM Whisper API")
-                        with open(temp_file.name, "rb") as audio_file:
-                            transcription = client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=audio_file,
-                                language=request.language,
-                                response_format="verbose_json" if request.enable_timestamps else "json",
-                                timestamp_granularities=["word", "segment"] if request.enable_timestamps else None
-                            )
-
-                        # Process OpenAI response
-                        if hasattr(transcription, 'segments'):
-                            # Verbose response with timestamps
-                            segments = []
-                            for i, seg in enumerate(transcription.segments):
-                                segments.append({
-                                    "id": i + 1,
-                                    "speaker": f"Speaker {(i % 3) + 1}",  # Simple speaker assignment
-                                    "text": seg.get("text", ""),
-                                    "start_time": seg.get("start", 0.0),
-                                    "end_time": seg.get("end", 0.0),
-                                    "confidence": seg.get("avg_logprob", 0.0) if seg.get("avg_logprob") else 0.85
-                                })
-
-                            result = TranscriptionResponse(
-                                transcription_id=str(uuid.uuid4()),
-                                text=transcription.text,
-                                segments=segments,
-                                language=transcription.language or request.language or "en",
-                                duration=transcription.duration if hasattr(transcription, 'duration') else 0.0,
-                                confidence=sum(s["confidence"] for s in segments) / len(segments) if segments else 0.85
-                            )
-                        else:
-                            # Simple response
-                            # Split text into sentences for segments
-                            sentences = transcription.text.split('. ')
-                            segments = []
-                            current_time = 0.0
-                            for i, sentence in enumerate(sentences):
-                                if sentence.strip():
-                                    duration = len(sentence.split()) * 0.5  # Estimate 0.5s per word
-                                    segments.append({
-                                        "id": i + 1,
-                                        "speaker": f"Speaker {(i % 3) + 1}",
-                                        "text": sentence.strip() + ".",
-                                        "start_time": current_time,
-                                        "end_time": current_time + duration,
-                                        "confidence": 0.85
-                                    })
-                                    current_time += duration
-
-                            result = TranscriptionResponse(
-                                transcription_id=str(uuid.uuid4()),
-                                text=transcription.text,
-                                segments=segments,
-                                language=request.language or "en",
-                                duration=current_time,
-                                confidence=0.85
-                            )
-
-                    logger.info(f"Transcription completed: {len(result.text)} characters, {len(result.segments)} segments")
-                    return result
-
-                finally:
-                    # Clean up temporary file
-                    import os as os_module
-                    try:
-                        os_module.unlink(temp_file.name)
-                    except:
-                        pass
+            audio_path = await _download_audio(request.audio_url)
+            try:
+                result = await _transcribe(audio_path, request.language, request.enable_timestamps)
+                logger.info(f"Transcription completed: {len(result.text)} characters, {len(result.segments)} segments")
+                return result
+            finally:
+                # Clean up temporary file
+                _remove_file(audio_path)
 
     except openai.APIError as e:
         logger.error(f"OpenAI API error: {str(e)}")
@@ -340,30 +627,20 @@ async def transcribe_audio(request: TranscriptionRequest, background_tasks: Back
         TRANSCRIPTION_ERRORS.inc()
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
-# Summarization endpoint
-@app.post("/api/v1/summarize", response_model=SummarizationResponse)
-async def summarize_text(request: SummarizationRequest):
-    """
-    Summarize text using GPT-4
-    """
-    SUMMARIZATION_REQUESTS.inc()
-    REQUESTS_TOTAL.inc()
-
-    try:
-        with REQUESTS_DURATION.time():
-            logger.info(f"Summarizing text of length: {len(request.text)}")
+# Output tokens reserved for key points, action items, topics and JSON syntax on top of the summary itself
+SUMMARY_STRUCTURE_TOKENS = 600
 
-            # Prepare prompt based on style
-            style_instructions = {
-                "bullet_points": "Format the summary as bullet points",
-                "paragraph": "Format the summary as a cohesive paragraph",
-                "executive": "Format as an executive summary with key highlights"
-            }
+def _summary_analysis(request: SummarizationRequest) -> TextAnalysis:
+    # Prepare prompt based on style
+    style_instructions = {
+        "bullet_points": "Format the summary as bullet points",
+        "paragraph": "Format the summary as a cohesive paragraph",
+        "executive": "Format as an executive summary with key highlights"
+    }
 
-            style_instruction = style_instructions.get(request.style, style_instructions["bullet_points"])
+    style_instruction = style_instructions.get(request.style, style_instructions["bullet_points"])
 
-            # Call OpenAI GPT-4 API for summarization
-            system_prompt = f"""
+    system_prompt = f"""
 You are an AI assistant that analyzes meeting transcripts. Your task is to:
 1. Provide a concise summary
 2. Extract key points discussed
@@ -379,55 +656,65 @@ Return your response as a JSON object with these exact keys:
 - topics: array of strings
 """
 
-            user_prompt = f"Analyze this meeting transcript:\n\n{request.text[:4000]}"  # Limit to avoid token limits
+    def parse(parsed_response: Dict[str, Any]) -> SummarizationResponse:
+        # Ensure all required fields exist
+        summary_raw = parsed_response.get("summary", "No summary generated")
+        # Handle if Ollama returns summary as list instead of string
+        summary = " ".join(summary_raw) if isinstance(summary_raw, list) else str(summary_raw)
+        key_points = parsed_response.get("key_points", [])
+        action_items = parsed_response.get("action_items", [])
+        topics = parsed_response.get("topics", [])
+
+        # Ensure action items have proper structure
+        formatted_action_items = []
+        for item in action_items:
+            if isinstance(item, str):
+                formatted_action_items.append({
+                    "task": item,
+                    "owner": "Unassigned",
+                    "deadline": "Not specified"
+                })
+            else:
+                formatted_action_items.append({
+                    "task": item.get("task", ""),
+                    "owner": item.get("owner") or "Unassigned",
+                    "deadline": item.get("deadline") or "Not specified"
+                })
+
+        return SummarizationResponse(
+            summary=summary,
+            key_points=key_points if isinstance(key_points, list) else [key_points],
+            action_items=formatted_action_items,
+            topics=topics if isinstance(topics, list) else [topics]
+        )
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=request.max_length * 4,  # Approximate tokens
-                response_format={"type": "json_object"}
-            )
+    return TextAnalysis(
+        key="summary",
+        system_prompt=system_prompt,
+        user_prompt="Analyze this meeting transcript:\n\n{transcript}",
+        schema=json_schema(SummarizationResponse),
+        max_tokens=get_tokenizer_service().words_to_tokens(request.max_length, LLM_MODEL) + SUMMARY_STRUCTURE_TOKENS,
+        temperature=0.3,
+        parse=parse,
+    )
 
-            # Parse response
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
-            # Ensure all required fields exist
-            summary_raw = parsed_response.get("summary", "No summary generated")
-            # Handle if Ollama returns summary as list instead of string
-            summary = " ".join(summary_raw) if isinstance(summary_raw, list) else str(summary_raw)
-            key_points = parsed_response.get("key_points", [])
-            action_items = parsed_response.get("action_items", [])
-            topics = parsed_response.get("topics", [])
-
-            # Ensure action items have proper structure
-            formatted_action_items = []
-            for item in action_items:
-                if isinstance(item, str):
-                    formatted_action_items.append({
-                        "task": item,
-                        "owner": "Unassigned",
-                        "deadline": "Not specified"
-                    })
-                else:
-                    formatted_action_items.append({
-                        "task": item.get("task", ""),
-                        "owner": item.get("owner") or "Unassigned",
-                        "deadline": item.get("deadline") or "Not specified"
-                    })
-
-            result = SummarizationResponse(
-                summary=summary,
-                key_points=key_points if isinstance(key_points, list) else [key_points],
-                action_items=formatted_action_items,
-                topics=topics if isinstance(topics, list) else [topics]
-            )
+# Summarization endpoint
+@app.post("/api/v1/summarize", response_model=SummarizationResponse)
+async def summarize_text(request: SummarizationRequest):
+    """
+    Summarize text using GPT-4
+    """
+    SUMMARIZATION_REQUESTS.inc()
+    _count_request()
+
+    try:
+        with _time_request():
+            logger.info(f"Summarizing text of length: {len(request.text)}")
 
-            logger.info(f"Summarization completed: {len(key_points)} key points, {len(formatted_action_items)} action items")
+            # Call OpenAI GPT-4 API for summarization
+            result = await _run_text_analysis(_summary_analysis(request), request.text)
+
+            logger.info(f"Summarization completed: {len(result.key_points)} key points, {len(result.action_items)} action items")
             return result
 
     except openai.APIError as e:
@@ -443,6 +730,38 @@ Return your response as a JSON object with these exact keys:
         SUMMARIZATION_ERRORS.inc()
         raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
 
+def _sentiment_analysis(request: SentimentRequest) -> TextAnalysis:
+    system_prompt = """
+You are a sentiment analysis AI. Analyze the provided text and return:
+1. overall_sentiment: "positive", "negative", or "neutral"
+2. sentiment_score: float between -1.0 (very negative) and 1.0 (very positive)
+3. emotions: object with scores (0-1) for: joy, trust, fear, surprise, sadness, disgust, anger, anticipation
+4. segments: array of text segments with their individual sentiments
+
+Return as JSON with these exact keys: overall_sentiment, sentiment_score, emotions, segments
+"""
+
+    def parse(parsed_response: Dict[str, Any]) -> SentimentResponse:
+        return SentimentResponse(
+            overall_sentiment=parsed_response.get("overall_sentiment", "neutral"),
+            sentiment_score=float(parsed_response.get("sentiment_score", 0.0)),
+            emotions=parsed_response.get("emotions", {
+                "joy": 0.5, "trust": 0.5, "fear": 0.1, "surprise": 0.2,
+                "sadness": 0.1, "disgust": 0.1, "anger": 0.1, "anticipation": 0.3
+            }),
+            segments=parsed_response.get("segments", [])
+        )
+
+    return TextAnalysis(
+        key="sentiment",
+        system_prompt=system_prompt,
+        user_prompt="Analyze sentiment:\n\n{transcript}",
+        schema=json_schema(SentimentResponse),
+        max_tokens=1000,
+        temperature=0.2,
+        parse=parse,
+    )
+
 # Sentiment analysis endpoint
 @app.post("/api/v1/sentiment", response_model=SentimentResponse)
 async def analyze_sentiment(request: SentimentRequest):
@@ -450,48 +769,14 @@ async def analyze_sentiment(request: SentimentRequest):
     Analyze sentiment of text using GPT-4
     """
     SENTIMENT_REQUESTS.inc()
-    REQUESTS_TOTAL.inc()
+    _count_request()
 
     try:
-        with REQUESTS_DURATION.time():
+        with _time_request():
             logger.info(f"Analyzing sentiment for text of length: {len(request.text)}")
 
             # Call OpenAI GPT-4 for sentiment analysis
-            system_prompt = """
-You are a sentiment analysis AI. Analyze the provided text and return:
-1. overall_sentiment: "positive", "negative", or "neutral"
-2. sentiment_score: float between -1.0 (very negative) and 1.0 (very positive)
-3. emotions: object with scores (0-1) for: joy, trust, fear, surprise, sadness, disgust, anger, anticipation
-4. segments: array of text segments with their individual sentiments
-
-Return as JSON with these exact keys: overall_sentiment, sentiment_score, emotions, segments
-"""
-
-            user_prompt = f"Analyze sentiment:\n\n{request.text[:2000]}"
-
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
-            )
-
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
-            result = SentimentResponse(
-                overall_sentiment=parsed_response.get("overall_sentiment", "neutral"),
-                sentiment_score=float(parsed_response.get("sentiment_score", 0.0)),
-                emotions=parsed_response.get("emotions", {
-                    "joy": 0.5, "trust": 0.5, "fear": 0.1, "surprise": 0.2,
-                    "sadness": 0.1, "disgust": 0.1, "anger": 0.1, "anticipation": 0.3
-                }),
-                segments=parsed_response.get("segments", [])
-            )
+            result = await _run_text_analysis(_sentiment_analysis(request), request.text)
 
             logger.info(f"Sentiment analysis completed: {result.overall_sentiment} ({result.sentiment_score})")
             return result
@@ -506,6 +791,30 @@ Return as JSON with these exact keys: overall_sentiment, sentiment_score, emotio
         logger.error(f"Sentiment analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
 
+def _diarization_response(merged_segments: List[Dict[str, Any]], diarization_service: Any) -> SpeakerDiarizationResponse:
+    """Format speaker-labelled transcript segments with per-speaker talk time"""
+    speaker_stats = diarization_service.get_speaker_stats(merged_segments)
+
+    speakers = []
+    for speaker_id, stats in speaker_stats.items():
+        speakers.append({
+            "id": speaker_id,
+            "name": speaker_id.replace("_", " ").title(),
+            "total_time": stats["total_duration"]
+        })
+
+    segments = []
+    for seg in merged_segments:
+        segments.append({
+            "speaker_id": seg.get("speaker_id", "SPEAKER_0"),
+            "start_time": seg.get("start", 0.0),
+            "end_time": seg.get("end", 0.0),
+            "text": seg.get("text", ""),
+            "confidence": 0.92  # pyannote.audio typical accuracy
+        })
+
+    return SpeakerDiarizationResponse(speakers=speakers, segments=segments)
+
 # Speaker diarization endpoint - REAL IMPLEMENTATION with pyannote.audio
 @app.post("/api/v1/diarize", response_model=SpeakerDiarizationResponse)
 async def speaker_diarization(request: SpeakerDiarizationRequest):
@@ -519,84 +828,28 @@ async def speaker_diarization(request: SpeakerDiarizationRequest):
         with REQUESTS_DURATION.time():
             logger.info(f"Performing REAL speaker diarization for: {request.audio_url}")
 
-            # Download audio file
-            async with httpx.AsyncClient() as http_client:
-                response = await http_client.get(request.audio_url, timeout=60.0)
-                response.raise_for_status()
-
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-                temp_file.write(response.content)
-                temp_file.close()
-
-                try:
-                    # 1. Transcribe with Whisper
-                    with open(temp_file.name, "rb") as audio_file:
-                        transcription = client.audio.transcriptions.create(
-                            model="whisper-1",
-                            file=audio_file,
-                            response_format="verbose_json",
-                            timestamp_granularities=["segment"]
-                        )
-
-                    # 2. Perform REAL speaker diarization with pyannote.audio
-                    diarization_service = get_diarization_service()
-                    diarization_segments = await diarization_service.diarize(
-                        audio_path=temp_file.name,
-                        num_speakers=request.num_speakers
-                    )
-
-                    # 3. Convert Whisper segments to format
-                    transcription_segments = []
-                    if hasattr(transcription, 'segments'):
-                        for seg in transcription.segments:
-                            transcription_segments.append({
-                                "start": seg.get("start", 0.0),
-                                "end": seg.get("end", 0.0),
-                                "text": seg.get("text", "")
-                            })
-
-                    # 4. Merge diarization with transcription
-                    merged_segments = diarization_service.merge_with_transcription(
-                        transcription_segments,
-                        diarization_segments
-                    )
-
-                    # 5. Get speaker statistics
-                    speaker_stats = diarization_service.get_speaker_stats(merged_segments)
-
-                    # 6. Format for response
-                    speakers = []
-                    for speaker_id, stats in speaker_stats.items():
-                        speakers.append({
-                            "id": speaker_id,
-                            "name": speaker_id.replace("_", " ").title(),
-                            "total_time": stats["total_duration"]
-                        })
-
-                    segments = []
-                    for seg in merged_segments:
-                        segments.append({
-                            "speaker_id": seg.get("speaker_id", "SPEAKER_0"),
-                            "start_time": seg.get("start", 0.0),
-                            "end_time": seg.get("end", 0.0),
-                            "text": seg.get("text", ""),
-                            "confidence": 0.92  # pyannote.audio typical accuracy
-                        })
-
-                    result = SpeakerDiarizationResponse(
-                        speakers=speakers,
-                        segments=segments
-                    )
-
-                    logger.info(f"REAL diarization completed: {len(speakers)} speakers, {len(segments)} segments")
-                    return result
-
-                finally:
-                    import os as os_module
-                    try:
-                        os_module.unlink(temp_file.name)
-                    except:
-                        pass
+            audio_path = await _download_audio(request.audio_url)
+            try:
+                # 1. Transcribe with Whisper (on the executor) while pyannote.audio diarizes
+                diarization_service = await get_diarization_service()
+                transcription, diarization_segments = await asyncio.gather(
+                    _transcribe(audio_path, None, True),
+                    diarization_service.diarize(audio_path=audio_path, num_speakers=request.num_speakers),
+                )
+
+                # 2. Merge diarization with transcription
+                merged_segments = diarization_service.merge_with_transcription(
+                    [{"start": seg["start_time"], "end": seg["end_time"], "text": seg["text"]} for seg in transcription.segments],
+                    diarization_segments
+                )
+
+                # 3. Speaker statistics and response format
+                result = _diarization_response(merged_segments, diarization_service)
+
+                logger.info(f"REAL diarization completed: {len(result.speakers)} speakers, {len(result.segments)} segments")
+                return result
+            finally:
+                _remove_file(audio_path)
 
     except Exception as e:
         logger.error(f"Speaker diarization error: {str(e)}")
@@ -621,14 +874,14 @@ async def extract_entities(request: EntityExtractionRequest):
     Extract named entities using spaCy with transformers
     Supports 15+ entity types: PERSON, ORG, GPE, DATE, TIME, MONEY, EMAIL, URL, etc.
     """
-    REQUESTS_TOTAL.inc()
+    _count_request()
 
     try:
-        with REQUESTS_DURATION.time():
+        with _time_request():
             logger.info(f"Extracting entities from text of length: {len(request.text)}")
 
             # Get entity service
-            entity_service = get_entity_service()
+            entity_service = await get_entity_service()
 
             # Extract entities
             entities = await entity_service.extract_entities(
@@ -679,14 +932,14 @@ async def extract_keywords(request: KeywordExtractionRequest):
     Extract keywords using KeyBERT with semantic embeddings
     Uses sentence-transformers for context-aware keyword extraction
     """
-    REQUESTS_TOTAL.inc()
+    _count_request()
 
     try:
-        with REQUESTS_DURATION.time():
+        with _time_request():
             logger.info(f"Extracting keywords from text of length: {len(request.text)}")
 
             # Get keyword service
-            keyword_service = get_keyword_service()
+            keyword_service = await get_keyword_service()
 
             # Extract keywords
             keywords = await keyword_service.extract_keywords(
@@ -718,30 +971,79 @@ async def extract_keywords(request: KeywordExtractionRequest):
         logger.error(f"Keyword extraction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Keyword extraction failed: {str(e)}")
 
-# Chat Assistant endpoint (AskFred-style RAG)
-@app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat_assistant(request: ChatRequest):
+async def _retrieve_chat_context(request: ChatRequest):
     """
-    AI Chat Assistant using Retrieval-Augmented Generation (RAG).
-    Answers questions about meetings using provided context.
+    Build the chat context from the organization's meeting index (top-k chunks).
+    Falls back to the caller-provided context when there is no index to search.
+    Returns (context parts, sources); retrieved chunks come best match first
+    with one source per part.
+    """
+    if request.organizationId:
+        get_providers()
+        chunks = await get_retrieval_service().retrieve(
+            request.organizationId,
+            request.question,
+            top_k=request.topK,
+            meeting_ids=request.meetingIds,
+        )
+        if chunks:
+            context = [f"[Meeting: {c.metadata.get('title') or c.meeting_id}]\n{c.text}" for c in chunks]
+            sources = [
+                {"meetingId": c.meeting_id, "chunkIndex": c.chunk_index, "score": round(c.score, 4),
+                 "title": c.metadata.get("title"), "startTime": c.metadata.get("start_time")}
+                for c in chunks
+            ]
+            logger.info(f"Retrieved {len(chunks)} chunks for org {request.organizationId}")
+            return context, sources
+
+    if not request.context or not request.context.strip():
+        raise HTTPException(status_code=400, detail="No meeting context available (provide context or index meetings first)")
+
+    return [request.context], []
+
+# Meeting index endpoints (retrieval for chat)
+@app.post("/api/v1/index-meeting", response_model=IndexMeetingResponse)
+async def index_meeting(request: IndexMeetingRequest):
+    """
+    Chunk, embed and index a meeting transcript for chat retrieval.
+    Re-indexing a meeting replaces its previous chunks.
     """
     REQUESTS_TOTAL.inc()
 
     try:
         with REQUESTS_DURATION.time():
-            logger.info(f"Processing chat question: {request.question[:100]}...")
+            if not request.segments and not (request.transcript and request.transcript.strip()):
+                raise HTTPException(status_code=400, detail="Provide transcript or segments")
+
+            get_providers()
+            metadata = {k: v for k, v in {"title": request.title, "date": request.date}.items() if v}
+            chunks = await get_retrieval_service().index_meeting(
+                request.organizationId,
+                request.meetingId,
+                text=request.transcript,
+                segments=request.segments,
+                metadata=metadata,
+            )
 
-            if not request.question or len(request.question.strip()) == 0:
-                raise HTTPException(status_code=400, detail="Question cannot be empty")
+            return IndexMeetingResponse(
+                organizationId=request.organizationId,
+                meetingId=request.meetingId,
+                chunksIndexed=chunks
+            )
 
-            if len(request.question) > 1000:
-                raise HTTPException(status_code=400, detail="Question too long (max 1000 characters)")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Meeting indexing error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Meeting indexing failed: {str(e)}")
 
-            # Build conversation history for GPT-4
-            messages = [
-                {
-                    "role": "system",
-                    "content": """You are an AI assistant specialized in analyzing meeting transcripts and providing insights.
+@app.delete("/api/v1/index-meeting/{organization_id}/{meeting_id}")
+async def delete_meeting_index(organization_id: str, meeting_id: str):
+    """Remove a meeting from the organization's chat index"""
+    removed = await get_retrieval_service().delete_meeting(organization_id, meeting_id)
+    return {"organizationId": organization_id, "meetingId": meeting_id, "chunksRemoved": removed}
+
+CHAT_SYSTEM_PROMPT = """You are an AI assistant specialized in analyzing meeting transcripts and providing insights.
 Your role is to answer questions about meetings based on the provided context.
 
 Guidelines:
@@ -751,40 +1053,72 @@ Guidelines:
 - Cite specific meetings or speakers when relevant
 - Provide actionable insights when possible
 - If multiple meetings contain relevant information, synthesize the information"""
-                }
-            ]
 
-            # Add conversation history
-            for msg in request.conversationHistory:
-                if "role" in msg and "content" in msg:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
+CHAT_MAX_TOKENS = 800
 
-            # Add current question with context
-            messages.append({
-                "role": "user",
-                "content": f"""Context from meetings:
-{request.context}
+def _build_chat_messages(request: ChatRequest, context: List[str], sources: List[Dict[str, Any]]):
+    """
+    System prompt, conversation history and the question with its meeting context,
+    packed into the model's context window: the most relevant chunks and the most
+    recent turns win. Returns (messages, sources of the chunks that made it in).
+    """
+    history = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in request.conversationHistory
+        if "role" in msg and "content" in msg
+    ]
+
+    packed = _prompt_packer().pack(
+        system=CHAT_SYSTEM_PROMPT,
+        user=f"""Context from meetings:
+{{context}}
 
 Question: {request.question}
 
-Please provide a detailed answer based on the meeting context above."""
-            })
+Please provide a detailed answer based on the meeting context above.""",
+        output_tokens=CHAT_MAX_TOKENS,
+        # A caller-provided context is one blob: cut it rather than drop it
+        sections=[PromptSection("context", context, truncate=not sources)],
+        history=history,
+    )
+    if sources:
+        sources = [sources[i] for i in packed.included["context"]]
+    return packed.messages, sources
+
+# Chat Assistant endpoint (AskFred-style RAG)
+@app.post("/api/v1/chat", response_model=ChatResponse)
+async def chat_assistant(request: ChatRequest):
+    """
+    AI Chat Assistant using Retrieval-Augmented Generation (RAG).
+    Answers questions about meetings using provided context.
+    """
+    REQUESTS_TOTAL.inc()
+
+    try:
+        with REQUESTS_DURATION.time():
+            logger.info(f"Processing chat question: {request.question[:100]}...")
+
+            if not request.question or len(request.question.strip()) == 0:
+                raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+            if len(request.question) > 1000:
+                raise HTTPException(status_code=400, detail="Question too long (max 1000 characters)")
+
+            context, sources = await _retrieve_chat_context(request)
+
+            messages, sources = _build_chat_messages(request, context, sources)
 
-            # Call GPT-4 for response
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=messages,
-                temperature=0.3,  # Lower temperature for more factual responses
-                max_tokens=800,
+            # Interactive call: hedge a slow primary against the next provider
+            completion = await _chat_completion(
+                _llm_request(messages, temperature=0.3, max_tokens=CHAT_MAX_TOKENS),  # Lower temperature for more factual responses
+                hedge=True,
+                priority=RequestPriority.INTERACTIVE,
             )
 
-            answer = completion.choices[0].message.content
+            answer = completion.content
 
             # Calculate confidence based on completion metadata
-            finish_reason = completion.choices[0].finish_reason
+            finish_reason = completion.finish_reason
             confidence = 0.9 if finish_reason == "stop" else 0.7
 
             # Generate conversation ID for tracking
@@ -795,19 +1129,89 @@ Please provide a detailed answer based on the meeting context above."""
             return ChatResponse(
                 answer=answer,
                 conversationId=conversation_id,
-                confidence=confidence
+                confidence=confidence,
+                sources=sources
             )
 
+    except HTTPException:
+        raise
     except openai.BadRequestError as e:
         logger.error(f"OpenAI API error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid request to AI service: {str(e)}")
-    except openai.RateLimitError as e:
+    except (openai.RateLimitError, RateLimitExceeded) as e:
         logger.error(f"OpenAI rate limit: {str(e)}")
         raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
     except Exception as e:
         logger.error(f"Chat assistant error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat assistant failed: {str(e)}")
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Streaming Chat Assistant endpoint
+@app.post("/api/v1/chat/stream")
+async def chat_assistant_stream(request: ChatRequest):
+    """
+    Streaming variant of the chat assistant.
+    Relays answer tokens as server-sent events:
+      event: token  data: {"content": str}
+      event: done   data: {"conversationId", "finishReason", "usage", "provider", "confidence", "sources"}
+      event: error  data: {"detail": str}
+    """
+    REQUESTS_TOTAL.inc()
+    started = time.time()
+
+    if not request.question or len(request.question.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    if len(request.question) > 1000:
+        raise HTTPException(status_code=400, detail="Question too long (max 1000 characters)")
+
+    logger.info(f"Processing streaming chat question: {request.question[:100]}...")
+
+    context, sources = await _retrieve_chat_context(request)
+    messages, sources = _build_chat_messages(request, context, sources)
+    conversation_id = str(uuid.uuid4())
+
+    async def event_stream():
+        metadata: Dict[str, Any] = {}
+        first_token = True
+        try:
+            stream = get_providers().chat_completion_stream(
+                _llm_request(messages, temperature=0.3, max_tokens=CHAT_MAX_TOKENS),
+                metadata=metadata,
+            )
+            # Set inside the generator: it runs after the endpoint function returned
+            with request_priority(RequestPriority.INTERACTIVE):
+                async for token in stream:
+                    if first_token:
+                        CHAT_TIME_TO_FIRST_TOKEN.observe(time.time() - started)
+                        first_token = False
+                    yield _sse("token", {"content": token})
+
+            finish_reason = metadata.get("finish_reason", "stop")
+            yield _sse("done", {
+                "conversationId": conversation_id,
+                "finishReason": finish_reason,
+                "usage": metadata.get("usage", {}),
+                "provider": metadata.get("provider"),
+                "confidence": 0.9 if finish_reason == "stop" else 0.7,
+                "sources": sources,
+            })
+            REQUESTS_DURATION.observe(time.time() - started)
+            logger.info(f"Streaming chat completed in {time.time() - started:.2f}s")
+
+        except Exception as e:
+            logger.error(f"Streaming chat error: {str(e)}")
+            yield _sse("error", {"detail": f"Chat assistant failed: {str(e)}", "conversationId": conversation_id})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Super Summarize endpoint
 @app.post("/api/v1/super-summarize", response_model=SuperSummarizeResponse)
 async def super_summarize(request: SuperSummarizeRequest):
@@ -855,25 +1259,24 @@ Return your response as a JSON object with these keys:
 Number of meetings: {request.meetingCount}
 
 Meeting Data:
-{request.meetings}
+{{meetings}}
 
 Please analyze these meetings and provide a comprehensive super summary."""
 
-            # Call GPT-4 for analysis
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            # Fit as much meeting data as the model's context window allows
+            packed = _prompt_packer().pack(
+                system=system_prompt,
+                user=user_prompt,
+                output_tokens=2000,
+                sections=[PromptSection("meetings", [request.meetings], truncate=True)],
+            )
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.3,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(SuperSummarizeResponse),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             # Validate and format response
             result = SuperSummarizeResponse(
                 overallSummary=parsed_response.get("overallSummary", "No summary generated"),
@@ -893,7 +1296,7 @@ Please analyze these meetings and provide a comprehensive super summary."""
         logger.error(f"OpenAI API error: {str(e)}")
         SUMMARIZATION_ERRORS.inc()
         raise HTTPException(status_code=400, detail=f"Invalid request to AI service: {str(e)}")
-    except openai.RateLimitError as e:
+    except (openai.RateLimitError, RateLimitExceeded) as e:
         logger.error(f"OpenAI rate limit: {str(e)}")
         SUMMARIZATION_ERRORS.inc()
         raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
@@ -933,6 +1336,12 @@ class SalesCallAnalysisResponse(BaseModel):
     strengths: List[str]
     improvements: List[str]
 
+# Fields the model scores; talk time, questions, filler words and pace are computed locally
+SALES_CALL_LLM_FIELDS = [
+    "monologueCount", "longestMonologue", "interruptionCount", "overallScore", "engagementScore",
+    "listeningScore", "clarityScore", "coachingInsights", "strengths", "improvements",
+]
+
 @app.post("/api/v1/analyze-sales-call", response_model=SalesCallAnalysisResponse)
 async def analyze_sales_call(request: SalesCallAnalysisRequest):
     """
@@ -1001,25 +1410,19 @@ Talk Time Ratio: {talk_ratio:.2f} (Rep:Prospect)
 Question Count: {question_count}
 
 Transcript:
-{request.transcript[:4000]}
+{{transcript}}
 
 Please provide detailed coaching analysis."""
 
             # Call GPT-4 for analysis
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            packed = _pack_transcript_prompt(system_prompt, user_prompt, request.transcript, max_tokens=1500)
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.3,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(SalesCallAnalysisResponse, include=SALES_CALL_LLM_FIELDS),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             # Build response
             result = SalesCallAnalysisResponse(
                 talkRatio=round(talk_ratio, 2),
@@ -1049,7 +1452,7 @@ Please provide detailed coaching analysis."""
     except openai.BadRequestError as e:
         logger.error(f"OpenAI API error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid request to AI service: {str(e)}")
-    except openai.RateLimitError as e:
+    except (openai.RateLimitError, RateLimitExceeded) as e:
         logger.error(f"OpenAI rate limit: {str(e)}")
         raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
     except json.JSONDecodeError as e:
@@ -1081,28 +1484,9 @@ class HighlightDetectionResponse(BaseModel):
     totalHighlights: int
     processingTime: float
 
-# Video Highlight Detection endpoint
-@app.post("/api/v1/detect-highlights", response_model=HighlightDetectionResponse)
-async def detect_highlights(request: HighlightDetectionRequest):
-    """
-    Detect highlights in video transcript using GPT-4
-    Identifies key moments like decisions, action items, questions, etc.
-    """
-    REQUESTS_TOTAL.inc()
-    start_time = datetime.utcnow()
-
-    try:
-        with REQUESTS_DURATION.time():
-            logger.info(f"Detecting highlights for transcript of length: {len(request.text)}")
-
-            if not request.text or len(request.text.strip()) == 0:
-                raise HTTPException(status_code=400, detail="Transcript text cannot be empty")
-
-            if len(request.text) > 100000:
-                raise HTTPException(status_code=400, detail="Transcript text too large (max 100,000 characters)")
-
-            # Build comprehensive prompt for GPT-4
-            system_prompt = """You are an AI video analyst specialized in identifying key moments in meeting transcripts.
+def _highlight_analysis(request: HighlightDetectionRequest, start_time: datetime) -> TextAnalysis:
+    # Build comprehensive prompt for GPT-4
+    system_prompt = """You are an AI video analyst specialized in identifying key moments in meeting transcripts.
 Your task is to analyze the transcript and identify important highlights that viewers would want to review.
 
 Highlight Types:
@@ -1126,72 +1510,93 @@ For each highlight, provide:
 Return your response as a JSON object with a single key "highlights" containing an array of highlight objects.
 Aim to identify 3-10 highlights total, focusing on the most important moments."""
 
-            user_prompt = f"""Video Duration: {request.videoDuration} seconds
+    user_prompt = f"""Video Duration: {request.videoDuration} seconds
 
 Transcript:
-{request.text[:10000]}
+{{transcript}}
 
 Please analyze this transcript and identify the key highlights."""
 
-            # Call GPT-4 for highlight detection
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000,
-                response_format={"type": "json_object"}
-            )
+    def parse(parsed_response: Dict[str, Any]) -> HighlightDetectionResponse:
+        # Extract and validate highlights
+        raw_highlights = parsed_response.get("highlights", [])
+
+        # Filter by confidence threshold
+        filtered_highlights = [
+            h for h in raw_highlights
+            if h.get("confidence", 0) >= request.minConfidence
+        ]
+
+        # Convert to VideoHighlight objects
+        highlights = []
+        for h in filtered_highlights:
+            try:
+                highlight = VideoHighlight(
+                    type=h.get("type", "key_moment"),
+                    title=h.get("title", "Untitled Highlight"),
+                    description=h.get("description", ""),
+                    startTime=float(h.get("startTime", 0)),
+                    endTime=float(h.get("endTime", 0)),
+                    confidence=float(h.get("confidence", 0.5)),
+                    text=h.get("text", ""),
+                    keywords=h.get("keywords", []),
+                    importance=h.get("importance", "medium")
+                )
+                highlights.append(highlight)
+            except Exception as e:
+                logger.warning(f"Failed to parse highlight: {e}")
+                continue
+
+        return HighlightDetectionResponse(
+            highlights=highlights,
+            totalHighlights=len(highlights),
+            processingTime=(datetime.utcnow() - start_time).total_seconds()
+        )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
+    return TextAnalysis(
+        key="highlights",
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        schema=json_schema(HighlightDetectionResponse, include=["highlights"]),
+        max_tokens=2000,
+        temperature=0.3,
+        parse=parse,
+        context=f"Video Duration: {request.videoDuration} seconds",
+    )
 
-            # Extract and validate highlights
-            raw_highlights = parsed_response.get("highlights", [])
+def _validate_highlight_text(text: str):
+    if not text or len(text.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Transcript text cannot be empty")
 
-            # Filter by confidence threshold
-            filtered_highlights = [
-                h for h in raw_highlights
-                if h.get("confidence", 0) >= request.minConfidence
-            ]
+    if len(text) > 100000:
+        raise HTTPException(status_code=400, detail="Transcript text too large (max 100,000 characters)")
 
-            # Convert to VideoHighlight objects
-            highlights = []
-            for h in filtered_highlights:
-                try:
-                    highlight = VideoHighlight(
-                        type=h.get("type", "key_moment"),
-                        title=h.get("title", "Untitled Highlight"),
-                        description=h.get("description", ""),
-                        startTime=float(h.get("startTime", 0)),
-                        endTime=float(h.get("endTime", 0)),
-                        confidence=float(h.get("confidence", 0.5)),
-                        text=h.get("text", ""),
-                        keywords=h.get("keywords", []),
-                        importance=h.get("importance", "medium")
-                    )
-                    highlights.append(highlight)
-                except Exception as e:
-                    logger.warning(f"Failed to parse highlight: {e}")
-                    continue
-
-            # Calculate processing time
-            processing_time = (datetime.utcnow() - start_time).total_seconds()
-
-            logger.info(f"Highlight detection completed: {len(highlights)} highlights found in {processing_time:.2f}s")
-
-            return HighlightDetectionResponse(
-                highlights=highlights,
-                totalHighlights=len(highlights),
-                processingTime=processing_time
-            )
+# Video Highlight Detection endpoint
+@app.post("/api/v1/detect-highlights", response_model=HighlightDetectionResponse)
+async def detect_highlights(request: HighlightDetectionRequest):
+    """
+    Detect highlights in video transcript using GPT-4
+    Identifies key moments like decisions, action items, questions, etc.
+    """
+    _count_request()
+    start_time = datetime.utcnow()
 
+    try:
+        with _time_request():
+            logger.info(f"Detecting highlights for transcript of length: {len(request.text)}")
+
+            _validate_highlight_text(request.text)
+
+            # Call GPT-4 for highlight detection
+            result = await _run_text_analysis(_highlight_analysis(request, start_time), request.text)
+
+            logger.info(f"Highlight detection completed: {result.totalHighlights} highlights found in {result.processingTime:.2f}s")
+
+            return result
     except openai.BadRequestError as e:
         logger.error(f"OpenAI API error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid request to AI service: {str(e)}")
-    except openai.RateLimitError as e:
+    except (openai.RateLimitError, RateLimitExceeded) as e:
         logger.error(f"OpenAI rate limit: {str(e)}")
         raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
     except json.JSONDecodeError as e:
@@ -1216,88 +1621,129 @@ class LiveAnalyzeResponse(BaseModel):
     toneAnalysis: Dict[str, Any]
     speakingTime: Dict[str, Any]
     keywords: List[str]
+    summary: str = ""
+    analyzedChars: int = 0
 
-# Live Analysis endpoint
-@app.post("/api/v1/live-analyze", response_model=LiveAnalyzeResponse)
-async def live_analyze(request: LiveAnalyzeRequest):
-    """
-    Perform real-time AI analysis on live meeting transcripts.
-    Extract action items, questions, decisions, and tone analysis in real-time.
-    """
-    REQUESTS_TOTAL.inc()
+LIVE_ANALYSIS_PROMPT = """You are an AI assistant specialized in real-time meeting analysis.
+You receive a running summary of the meeting so far, the findings already reported,
+and the NEW portion of the live transcript since the last analysis.
 
-    try:
-        with REQUESTS_DURATION.time():
-            logger.info(f"Performing live analysis for session {request.liveSessionId}")
-
-            if not request.context or len(request.context.strip()) == 0:
-                raise HTTPException(status_code=400, detail="Context cannot be empty")
-
-            # Build comprehensive analysis prompt
-            system_prompt = """You are an AI assistant specialized in real-time meeting analysis.
-Your task is to analyze the most recent portion of a live meeting transcript and extract:
+From the NEW portion, extract:
 1. Action items - Tasks assigned to people with deadlines
 2. Questions - Important questions raised that need answers
 3. Decisions - Key decisions made during the discussion
-4. Tone analysis - Overall tone and sentiment of the discussion
+4. Tone analysis - Current tone and sentiment of the discussion
 5. Speaking patterns - Who's dominating, who's quiet
 
-Be concise and actionable. Focus on what was just discussed.
+Do not repeat findings that were already reported. Be concise and actionable.
+Update the running summary so it covers the whole meeting in at most 150 words.
 
 Return your response as a JSON object with these keys:
-- actionItems: array of objects with: {task: string, owner: string (if mentioned), deadline: string (if mentioned), confidence: float}
-- questions: array of objects with: {question: string, askedBy: string (if identifiable), priority: "high"|"medium"|"low", confidence: float}
-- decisions: array of objects with: {decision: string, madeBy: string (if identifiable), impact: string, confidence: float}
+- summary: string (updated running summary of the whole meeting)
+- actionItems: array of NEW objects with: {task: string, owner: string (if mentioned), deadline: string (if mentioned), confidence: float}
+- questions: array of NEW objects with: {question: string, askedBy: string (if identifiable), priority: "high"|"medium"|"low", confidence: float}
+- decisions: array of NEW objects with: {decision: string, madeBy: string (if identifiable), impact: string, confidence: float}
 - toneAnalysis: object with: {overall: string, sentiment: float (-1 to 1), energy: float (0-1), engagement: float (0-1)}
 - speakingTime: object with speaker names as keys and talking percentage as values
-- keywords: array of important keywords/topics discussed (max 10)
+- keywords: array of important keywords/topics in the new portion (max 10)
 """
 
-            user_prompt = f"""Analyze this recent portion of the live meeting:
+# Keys of LIVE_ANALYSIS_PROMPT's JSON, in the order it lists them
+LIVE_ANALYSIS_FIELDS = ["summary", "actionItems", "questions", "decisions", "toneAnalysis", "speakingTime", "keywords"]
+
+LIVE_ANALYSIS_TYPES = {
+    "action_items": "actionItems",
+    "questions": "questions",
+    "decisions": "decisions",
+}
+
+async def _analyze_live_delta(state: LiveSessionState, delta: str, analysis_types: List[str]):
+    """Analyze one transcript delta against the running summary and merge the findings"""
+    known = state.known_findings()
+    skipped_types = [key for analysis, key in LIVE_ANALYSIS_TYPES.items() if analysis not in analysis_types]
+
+    user_prompt = f"""Running summary so far:
+{state.summary or "(the meeting just started)"}
+
+Already reported (do not repeat):
+{json.dumps(known, ensure_ascii=False)}
+
+New transcript since the last analysis:
+{{transcript}}
+
+Extract actionable insights from what was just discussed."""
+    if skipped_types:
+        user_prompt += f"\n\nReturn empty arrays for: {', '.join(skipped_types)}"
+
+    packed = _pack_transcript_prompt(LIVE_ANALYSIS_PROMPT, user_prompt, delta, max_tokens=1500)
+    parsed_response = await _complete_json(
+        packed.messages,
+        temperature=0.3,
+        max_tokens=packed.output_tokens,
+        hedge=True,
+        priority=RequestPriority.INTERACTIVE,
+        schema=json_schema(LiveAnalyzeResponse, include=LIVE_ANALYSIS_FIELDS),
+    )
 
-{request.context}
+    added = get_live_session_store().merge(state, parsed_response)
+    logger.info(f"Live delta analyzed for {state.live_session_id}: {len(delta)} chars, new findings {added}")
+
+def _live_response(state: LiveSessionState) -> LiveAnalyzeResponse:
+    """Build the API response from accumulated session state"""
+    return LiveAnalyzeResponse(
+        liveSessionId=state.live_session_id,
+        actionItems=state.findings["actionItems"],
+        questions=state.findings["questions"],
+        decisions=state.findings["decisions"],
+        toneAnalysis=state.tone_analysis,
+        speakingTime=state.speaking_time,
+        keywords=state.keywords,
+        summary=state.summary,
+        analyzedChars=state.analyzed_chars,
+    )
 
-Focus on extracting actionable insights from what was just discussed."""
+# Live Analysis endpoint
+@app.post("/api/v1/live-analyze", response_model=LiveAnalyzeResponse)
+async def live_analyze(request: LiveAnalyzeRequest):
+    """
+    Perform real-time AI analysis on live meeting transcripts.
+    Only the transcript delta since the previous call is sent to the LLM, together
+    with a running summary; findings accumulate per liveSessionId.
+    """
+    REQUESTS_TOTAL.inc()
 
-            # Call GPT-4 for analysis
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
-            )
+    try:
+        with REQUESTS_DURATION.time():
+            logger.info(f"Performing live analysis for session {request.liveSessionId}")
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
+            if not request.context or len(request.context.strip()) == 0:
+                raise HTTPException(status_code=400, detail="Context cannot be empty")
 
-            # Validate and format response
-            result = LiveAnalyzeResponse(
-                liveSessionId=request.liveSessionId,
-                actionItems=parsed_response.get("actionItems", []),
-                questions=parsed_response.get("questions", []),
-                decisions=parsed_response.get("decisions", []),
-                toneAnalysis=parsed_response.get("toneAnalysis", {
-                    "overall": "neutral",
-                    "sentiment": 0.0,
-                    "energy": 0.5,
-                    "engagement": 0.5
-                }),
-                speakingTime=parsed_response.get("speakingTime", {}),
-                keywords=parsed_response.get("keywords", [])
-            )
+            store = get_live_session_store()
+            async with store.lock(request.liveSessionId):
+                state = store.get_or_create(request.liveSessionId, request.meetingId)
+                delta = store.compute_delta(state, request.context)
+
+                if delta.strip():
+                    text, skipped = store.take_delta(delta)
+                    if skipped:
+                        logger.info(f"Live delta for {request.liveSessionId} capped, skipped {skipped} older chars")
+                    await _analyze_live_delta(state, text, request.analysisTypes)
+
+                # Only advance once the delta has been analyzed, so failures are retried
+                store.mark_analyzed(state, delta)
+                result = _live_response(state)
 
             logger.info(f"Live analysis completed: {len(result.actionItems)} action items, {len(result.questions)} questions, {len(result.decisions)} decisions")
 
             return result
 
+    except HTTPException:
+        raise
     except openai.BadRequestError as e:
         logger.error(f"OpenAI API error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Invalid request to AI service: {str(e)}")
-    except openai.RateLimitError as e:
+    except (openai.RateLimitError, RateLimitExceeded) as e:
         logger.error(f"OpenAI rate limit: {str(e)}")
         raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
     except json.JSONDecodeError as e:
@@ -1307,6 +1753,84 @@ Focus on extracting actionable insights from what was just discussed."""
         logger.error(f"Live analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Live analysis failed: {str(e)}")
 
+@app.websocket("/ws/live-analyze/{live_session_id}")
+async def live_analyze_ws(websocket: WebSocket, live_session_id: str, meetingId: str = ""):
+    """
+    Push channel for live analysis.
+
+    Client messages:
+      {"type": "delta", "text": "<new transcript text>", "analysisTypes": [...]}
+      {"type": "flush"}  - analyze buffered text now
+      {"type": "end"}    - flush, return the final analysis and end the session
+    Server messages:
+      {"type": "analysis", "data": LiveAnalyzeResponse}
+      {"type": "error", "detail": str}
+      {"type": "ended", "data": LiveAnalyzeResponse}
+
+    Bursts of deltas are debounced into one LLM call and a newer delta cancels
+    a stale in-flight analysis.
+    """
+    await websocket.accept()
+    store = get_live_session_store()
+    state = store.get_or_create(live_session_id, meetingId)
+    analysis_types = list(LiveAnalyzeRequest.model_fields["analysisTypes"].default)
+
+    async def analyze(session: LiveSessionState, text: str):
+        REQUESTS_TOTAL.inc()
+        with REQUESTS_DURATION.time(), usage_endpoint("/ws/live-analyze/{live_session_id}"):
+            await _analyze_live_delta(session, text, analysis_types)
+
+    async def publish(session: LiveSessionState):
+        await websocket.send_json({"type": "analysis", "data": _live_response(session).model_dump()})
+
+    async def on_error(error: Exception):
+        await websocket.send_json({"type": "error", "detail": f"Live analysis failed: {str(error)}"})
+
+    scheduler = LiveAnalysisScheduler(store, state, analyze, publish, on_error)
+    logger.info(f"🔌 Live analysis socket opened for session {live_session_id}")
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = json.loads(raw)
+            except json.JSONDecodeError as e:
+                await websocket.send_json({"type": "error", "detail": f"Invalid JSON message: {e}"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            message_type = message.get("type", "delta")
+
+            if message_type == "delta":
+                if message.get("analysisTypes"):
+                    analysis_types = message["analysisTypes"]
+                scheduler.push(message.get("text") or "")
+            elif message_type == "flush":
+                await scheduler.flush()
+            elif message_type == "end":
+                await scheduler.flush()
+                store.end(live_session_id)
+                await websocket.send_json({"type": "ended", "data": _live_response(state).model_dump()})
+                await websocket.close()
+                break
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {message_type}"})
+
+    except WebSocketDisconnect:
+        # Buffered text stays in the session so a reconnect picks it up
+        logger.info(f"🔌 Live analysis socket closed for session {live_session_id}")
+    finally:
+        await scheduler.close()
+
+@app.delete("/api/v1/live-analyze/{live_session_id}", response_model=LiveAnalyzeResponse)
+async def end_live_session(live_session_id: str):
+    """End a live session and return its final accumulated analysis"""
+    state = get_live_session_store().end(live_session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Live session not found: {live_session_id}")
+    return _live_response(state)
+
 # Root endpoint
 
 # ====================================
@@ -1327,29 +1851,18 @@ class CategorizationResponse(BaseModel):
     topics: List[str]
     industryTags: List[str]
 
-# Smart Categorization endpoint
-@app.post("/api/v1/categorize", response_model=CategorizationResponse)
-async def categorize_meeting(request: CategorizationRequest):
-    """
-    Auto-categorize meetings using GPT-4 with custom category support
-    """
-    REQUESTS_TOTAL.inc()
-
-    try:
-        with REQUESTS_DURATION.time():
-            logger.info(f"Categorizing meeting text of length: {len(request.text)}")
+# Default categories
+DEFAULT_MEETING_CATEGORIES = [
+    "Sales Call", "Client Meeting", "Internal Standup",
+    "1-on-1", "Team Sync", "Product Review",
+    "Interview", "Customer Support", "Board Meeting",
+    "All-Hands", "Training Session", "Sprint Planning"
+]
 
-            # Default categories
-            default_categories = [
-                "Sales Call", "Client Meeting", "Internal Standup",
-                "1-on-1", "Team Sync", "Product Review",
-                "Interview", "Customer Support", "Board Meeting",
-                "All-Hands", "Training Session", "Sprint Planning"
-            ]
-
-            categories = request.customCategories if request.customCategories else default_categories
+def _categorization_analysis(request: CategorizationRequest) -> TextAnalysis:
+    categories = request.customCategories if request.customCategories else DEFAULT_MEETING_CATEGORIES
 
-            system_prompt = f"""You are an AI assistant that categorizes business meetings.
+    system_prompt = f"""You are an AI assistant that categorizes business meetings.
 
 Available categories: {', '.join(categories)}
 
@@ -1362,32 +1875,44 @@ Analyze the meeting text and:
 
 Return JSON with: category, confidence, suggestedCategories (array of {{name, score}}), topics (array), industryTags (array)"""
 
-            user_prompt = f"Categorize this meeting:\n\n{request.text[:2000]}"
+    user_prompt = "Categorize this meeting:\n\n{transcript}"
+    context = f"Industry context: {request.industryContext}" if request.industryContext else ""
+    if context:
+        user_prompt += f"\n\n{context}"
+
+    def parse(parsed_response: Dict[str, Any]) -> CategorizationResponse:
+        return CategorizationResponse(
+            category=parsed_response.get("category", "Uncategorized"),
+            confidence=float(parsed_response.get("confidence", 0.7)),
+            suggestedCategories=parsed_response.get("suggestedCategories", []),
+            topics=parsed_response.get("topics", []),
+            industryTags=parsed_response.get("industryTags", [])
+        )
 
-            if request.industryContext:
-                user_prompt += f"\n\nIndustry context: {request.industryContext}"
+    return TextAnalysis(
+        key="categorization",
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        schema=json_schema(CategorizationResponse),
+        max_tokens=800,
+        temperature=0.2,
+        parse=parse,
+        context=context,
+    )
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                max_tokens=800,
-                response_format={"type": "json_object"}
-            )
+# Smart Categorization endpoint
+@app.post("/api/v1/categorize", response_model=CategorizationResponse)
+async def categorize_meeting(request: CategorizationRequest):
+    """
+    Auto-categorize meetings using GPT-4 with custom category support
+    """
+    _count_request()
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
+    try:
+        with _time_request():
+            logger.info(f"Categorizing meeting text of length: {len(request.text)}")
 
-            result = CategorizationResponse(
-                category=parsed_response.get("category", "Uncategorized"),
-                confidence=float(parsed_response.get("confidence", 0.7)),
-                suggestedCategories=parsed_response.get("suggestedCategories", []),
-                topics=parsed_response.get("topics", []),
-                industryTags=parsed_response.get("industryTags", [])
-            )
+            result = await _run_text_analysis(_categorization_analysis(request), request.text)
 
             logger.info(f"Categorization completed: {result.category} ({result.confidence})")
             return result
@@ -1396,6 +1921,88 @@ Return JSON with: category, confidence, suggestedCategories (array of {{name, sc
         logger.error(f"Categorization error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Categorization failed: {str(e)}")
 
+# Combined text analysis: one LLM call for several analyses of the same text
+LLM_TEXT_ANALYSES = ["summarize", "sentiment", "categorize", "highlights"]
+
+class TextAnalysesRequest(BaseModel):
+    text: str = Field(..., description="Meeting text to analyze")
+    analyses: List[str] = Field(default_factory=lambda: list(LLM_TEXT_ANALYSES), description="Analyses to run in one LLM call")
+    style: Optional[str] = Field("bullet_points", description="Summary style")
+    max_length: Optional[int] = Field(200, description="Maximum summary length in words")
+    customCategories: Optional[List[str]] = Field(None, description="Custom categories")
+    industryContext: Optional[str] = Field(None, description="Industry context")
+    videoDuration: Optional[float] = Field(None, description="Video duration in seconds for highlight times (estimated from the text if omitted)")
+    minConfidence: Optional[float] = Field(0.6, description="Minimum highlight confidence")
+
+class TextAnalysesResponse(BaseModel):
+    summary: Optional[SummarizationResponse] = None
+    sentiment: Optional[SentimentResponse] = None
+    categorization: Optional[CategorizationResponse] = None
+    highlights: Optional[HighlightDetectionResponse] = None
+    processingTime: float
+
+def _text_analyses(request: TextAnalysesRequest, start_time: datetime) -> List[TextAnalysis]:
+    """The requested analyses as they'd be built by their own endpoints"""
+    # Without a duration, estimate the length at ~150 words per minute for highlight times
+    video_duration = request.videoDuration or len(request.text.split()) * 0.4
+    builders = {
+        "summarize": lambda: _summary_analysis(SummarizationRequest(
+            text=request.text, max_length=request.max_length, style=request.style
+        )),
+        "sentiment": lambda: _sentiment_analysis(SentimentRequest(text=request.text)),
+        "categorize": lambda: _categorization_analysis(CategorizationRequest(
+            text=request.text, customCategories=request.customCategories, industryContext=request.industryContext
+        )),
+        "highlights": lambda: _highlight_analysis(HighlightDetectionRequest(
+            text=request.text, videoDuration=video_duration, minConfidence=request.minConfidence
+        ), start_time),
+    }
+    return [builders[name]() for name in dict.fromkeys(request.analyses)]
+
+@app.post("/api/v1/analyze-text", response_model=TextAnalysesResponse)
+async def analyze_text(request: TextAnalysesRequest):
+    """
+    Summary, sentiment, categorization and/or highlights in a single LLM call
+
+    Same prompts, schemas and response models as /summarize, /sentiment,
+    /categorize and /detect-highlights, but the transcript is sent once for
+    all of them instead of once per analysis.
+    """
+    REQUESTS_TOTAL.inc()
+    start_time = datetime.utcnow()
+
+    unknown = [name for name in request.analyses if name not in LLM_TEXT_ANALYSES]
+    if unknown or not request.analyses:
+        raise HTTPException(status_code=400, detail=f"Unknown analyses: {unknown}. Use one or more of: {LLM_TEXT_ANALYSES}")
+    if "highlights" in request.analyses:
+        _validate_highlight_text(request.text)
+
+    try:
+        with REQUESTS_DURATION.time():
+            logger.info(f"Analyzing text of length {len(request.text)} in one call: {request.analyses}")
+
+            results = await _run_combined_analysis(_text_analyses(request, start_time), request.text)
+            result = TextAnalysesResponse(
+                **results,
+                processingTime=(datetime.utcnow() - start_time).total_seconds()
+            )
+
+            logger.info(f"Combined analysis completed in {result.processingTime:.2f}s: {list(results)}")
+            return result
+
+    except (openai.RateLimitError, RateLimitExceeded) as e:
+        logger.error(f"OpenAI rate limit: {str(e)}")
+        raise HTTPException(status_code=429, detail="AI service rate limit exceeded. Please try again later.")
+    except openai.APIError as e:
+        logger.error(f"OpenAI API error: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"OpenAI API error: {str(e)}")
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to parse AI response: {str(e)}")
+    except Exception as e:
+        logger.error(f"Combined analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Combined analysis failed: {str(e)}")
+
 # Vocabulary Expansion Models
 class VocabularyExpansionRequest(BaseModel):
     text: str = Field(..., description="Text containing acronyms/jargon")
@@ -1436,25 +2043,19 @@ Tasks:
 
 Return JSON with: expandedText, expansions (array of {{term, expansion, position}}), detectedAcronyms (array), suggestions (array of {{term, possibleExpansion}})"""
 
-            user_prompt = f"Expand acronyms and terminology:\n\n{request.text[:2000]}"
+            user_prompt = "Expand acronyms and terminology:\n\n{transcript}"
 
             if request.industryContext:
                 user_prompt += f"\n\nIndustry: {request.industryContext}"
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            packed = _pack_transcript_prompt(system_prompt, user_prompt, request.text, max_tokens=1500)
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.1,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(VocabularyExpansionResponse),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             result = VocabularyExpansionResponse(
                 expandedText=parsed_response.get("expandedText", request.text),
                 expansions=parsed_response.get("expansions", []),
@@ -1523,24 +2124,18 @@ Objectives: {', '.join(request.objectives) if request.objectives else 'None spec
 Action Items: {len(request.actionItems) if request.actionItems else 0}
 
 Transcript (excerpt):
-{request.meetingText[:2000]}
+{{transcript}}
 
 Provide comprehensive scoring and recommendations."""
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            packed = _pack_transcript_prompt(system_prompt, user_prompt, request.meetingText, max_tokens=1500)
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.3,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(QualityScoreResponse, exclude=["overallScore"]),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             # Calculate overall score
             scores = [
                 parsed_response.get("engagementScore", 50),
@@ -1616,30 +2211,30 @@ Analyze recent meeting history to predict:
 
 Return JSON with: predictedTopics (array of {topic, probability, reason}), reasoning, confidence"""
 
-            meetings_summary = "\n\n".join([
+            # Most recent meetings first, as many as fit
+            meetings = [
                 f"Meeting: {m.get('title', 'Untitled')}\nTopics: {', '.join(m.get('topics', []))}\nAction Items: {', '.join(m.get('actionItems', []))}"
-                for m in request.recentMeetings[:10]
-            ])
+                for m in request.recentMeetings
+            ]
 
-            user_prompt = f"Predict next meeting topics:\n\n{meetings_summary}"
+            user_prompt = "Predict next meeting topics:\n\n{meetings}"
 
             if request.teamContext:
                 user_prompt += f"\n\nTeam context: {request.teamContext}"
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            packed = _prompt_packer().pack(
+                system=system_prompt,
+                user=user_prompt,
+                output_tokens=1000,
+                sections=[PromptSection("meetings", meetings)],
+            )
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.5,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(PredictNextTopicsResponse),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             result = PredictNextTopicsResponse(
                 predictedTopics=parsed_response.get("predictedTopics", []),
                 reasoning=parsed_response.get("reasoning", ""),
@@ -1680,37 +2275,40 @@ Consider:
 
 Return JSON with: suggestedAttendees (array of {name, email, reason, priority}), reasoning (object mapping name to reason), optionalAttendees (array)"""
 
-            meetings_summary = "\n\n".join([
+            # Most recent meetings first, as many as fit after the team roster
+            meetings = [
                 f"Meeting: {m.get('title', '')}\nAttendees: {', '.join(m.get('attendees', []))}\nTopics: {', '.join(m.get('topics', []))}"
-                for m in request.recentMeetings[:10]
-            ])
+                for m in request.recentMeetings
+            ]
 
-            available = "\n".join([f"- {a.get('name', '')} ({a.get('email', '')}): {a.get('role', '')}" for a in request.availableAttendees])
+            available = [f"- {a.get('name', '')} ({a.get('email', '')}): {a.get('role', '')}" for a in request.availableAttendees]
 
             user_prompt = f"""Meeting Topic: {request.meetingTopic}
 
 Available Team Members:
-{available}
+{{available}}
 
 Recent Meetings Context:
-{meetings_summary}
+{{meetings}}
 
 Who should attend this meeting?"""
 
-            completion = client.chat.completions.create(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
+            packed = _prompt_packer().pack(
+                system=system_prompt,
+                user=user_prompt,
+                output_tokens=1000,
+                sections=[
+                    PromptSection("available", available, separator="\n"),
+                    PromptSection("meetings", meetings),
                 ],
+            )
+            parsed_response = await _complete_json(
+                packed.messages,
                 temperature=0.4,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
+                max_tokens=packed.output_tokens,
+                schema=json_schema(PredictAttendeesResponse),
             )
 
-            response_text = completion.choices[0].message.content
-            parsed_response = json.loads(response_text)
-
             result = PredictAttendeesResponse(
                 suggestedAttendees=parsed_response.get("suggestedAttendees", []),
                 reasoning=parsed_response.get("reasoning", {}),
@@ -1810,6 +2408,33 @@ class PDFExportRequest(BaseModel):
     report_type: str = Field("summary", description="Type of report: summary or analytics")
     include_transcript: bool = Field(False, description="Include full transcript")
 
+def _render_pdf(request: PDFExportRequest) -> bytes:
+    # Get PDF service
+    pdf_service = get_pdf_service()
+
+    if not pdf_service.is_available():
+        raise HTTPException(
+            status_code=503,
+            detail="PDF export is not available. Please install reportlab: pip install reportlab"
+        )
+
+    # Add include_transcript flag to meeting data
+    meeting_data = request.meeting_data.copy()
+    meeting_data['include_transcript'] = request.include_transcript
+
+    # Generate PDF based on type
+    if request.report_type == "summary":
+        return pdf_service.generate_meeting_summary_pdf(meeting_data)
+    elif request.report_type == "analytics":
+        return pdf_service.generate_analytics_report_pdf(meeting_data)
+    raise HTTPException(
+        status_code=400,
+        detail=f"Invalid report type: {request.report_type}. Use 'summary' or 'analytics'"
+    )
+
+def _pdf_filename(request: PDFExportRequest) -> str:
+    return f"{request.report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
 # PDF Export endpoint - REAL IMPLEMENTATION with reportlab
 @app.post("/api/v1/export-pdf")
 async def export_meeting_pdf(request: PDFExportRequest):
@@ -1823,29 +2448,7 @@ async def export_meeting_pdf(request: PDFExportRequest):
         with REQUESTS_DURATION.time():
             logger.info(f"Generating PDF report, type: {request.report_type}")
 
-            # Get PDF service
-            pdf_service = get_pdf_service()
-
-            if not pdf_service.is_available():
-                raise HTTPException(
-                    status_code=503,
-                    detail="PDF export is not available. Please install reportlab: pip install reportlab"
-                )
-
-            # Add include_transcript flag to meeting data
-            meeting_data = request.meeting_data.copy()
-            meeting_data['include_transcript'] = request.include_transcript
-
-            # Generate PDF based on type
-            if request.report_type == "summary":
-                pdf_content = pdf_service.generate_meeting_summary_pdf(meeting_data)
-            elif request.report_type == "analytics":
-                pdf_content = pdf_service.generate_analytics_report_pdf(meeting_data)
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid report type: {request.report_type}. Use 'summary' or 'analytics'"
-                )
+            pdf_content = _render_pdf(request)
 
             # Return PDF as response
             from fastapi.responses import StreamingResponse
@@ -1853,7 +2456,7 @@ async def export_meeting_pdf(request: PDFExportRequest):
 
             pdf_buffer = io.BytesIO(pdf_content)
 
-            filename = f"{request.report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = _pdf_filename(request)
 
             logger.info(f"PDF generated successfully: {len(pdf_content)} bytes")
 
@@ -1871,6 +2474,309 @@ async def export_meeting_pdf(request: PDFExportRequest):
         logger.error(f"PDF export error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"PDF export failed: {str(e)}")
 
+# One-shot meeting analysis
+MEETING_ANALYSES = ["summarize", "sentiment", "entities", "keywords", "categorize", "highlights"]
+
+class MeetingAnalysisRequest(BaseModel):
+    audio_url: Optional[str] = Field(None, description="URL to audio file")
+    transcript: Optional[str] = Field(None, description="Transcript text, instead of audio_url")
+    language: Optional[str] = Field(None, description="Language code (e.g., 'en')")
+    enable_diarization: bool = Field(True, description="Label transcript segments with speakers")
+    num_speakers: Optional[int] = None
+    analyses: List[str] = Field(default_factory=lambda: list(MEETING_ANALYSES), description="Text analyses to run")
+    summary_style: Optional[str] = Field("bullet_points", description="Summary style")
+    summary_max_length: Optional[int] = Field(200, description="Maximum summary length in words")
+    combine_llm_analyses: bool = Field(True, description="Run the requested LLM analyses (summarize, sentiment, categorize, highlights) as one LLM call")
+
+class MeetingAnalysisResponse(BaseModel):
+    analysis_id: str
+    transcript: str
+    transcription: Optional[TranscriptionResponse] = None
+    diarization: Optional[SpeakerDiarizationResponse] = None
+    summary: Optional[SummarizationResponse] = None
+    sentiment: Optional[SentimentResponse] = None
+    entities: Optional[EntityExtractionResponse] = None
+    keywords: Optional[KeywordExtractionResponse] = None
+    categorization: Optional[CategorizationResponse] = None
+    highlights: Optional[HighlightDetectionResponse] = None
+    timings: Dict[str, Dict[str, Any]]
+    errors: Dict[str, str]
+    total_time_ms: float
+
+def _meeting_dag(request: MeetingAnalysisRequest, audio_paths: List[str]) -> DAG:
+    """fetch → transcribe ‖ diarize → merge → text analyses, all on the one merged transcript"""
+    dag = DAG("analyze_meeting")
+
+    if request.audio_url:
+        async def fetch(_):
+            audio_paths.append(await _download_audio(request.audio_url))
+            return audio_paths[-1]
+
+        async def transcribe(inputs):
+            TRANSCRIPTION_REQUESTS.inc()
+            return await _transcribe(inputs["fetch"], request.language, True)
+
+        async def diarize(inputs):
+            return await (await get_diarization_service()).diarize(audio_path=inputs["fetch"], num_speakers=request.num_speakers)
+
+        async def merge(inputs):
+            transcription = inputs["transcribe"]
+            if "diarize" not in inputs:
+                return {"text": transcription.text, "duration": transcription.duration}
+
+            diarization_service = await get_diarization_service()
+            merged_segments = diarization_service.merge_with_transcription(
+                [{"start": seg["start_time"], "end": seg["end_time"], "text": seg["text"]} for seg in transcription.segments],
+                inputs["diarize"]
+            )
+            text = "\n".join(f"{seg['speaker']}: {seg['text'].strip()}" for seg in merged_segments if seg["text"].strip())
+            return {
+                "text": text or transcription.text,
+                "duration": transcription.duration,
+                "diarization": _diarization_response(merged_segments, diarization_service),
+            }
+
+        dag.add("fetch", fetch)
+        dag.add("transcribe", transcribe, deps=["fetch"])
+        merge_deps = ["transcribe"]
+        if request.enable_diarization:
+            dag.add("diarize", diarize, deps=["fetch"], optional=True)
+            merge_deps.append("diarize")
+        dag.add("merge", merge, deps=merge_deps)
+    else:
+        async def merge(_):
+            # Without timestamps, estimate the length at ~150 words per minute for highlight times
+            return {"text": request.transcript, "duration": len(request.transcript.split()) * 0.4}
+
+        dag.add("merge", merge)
+
+    text_analyses = {
+        "summarize": lambda merged: summarize_text(SummarizationRequest(
+            text=merged["text"], max_length=request.summary_max_length, style=request.summary_style
+        )),
+        "sentiment": lambda merged: analyze_sentiment(SentimentRequest(text=merged["text"])),
+        "entities": lambda merged: extract_entities(EntityExtractionRequest(text=merged["text"])),
+        "keywords": lambda merged: extract_keywords(KeywordExtractionRequest(text=merged["text"])),
+        "categorize": lambda merged: categorize_meeting(CategorizationRequest(text=merged["text"])),
+        "highlights": lambda merged: detect_highlights(HighlightDetectionRequest(
+            text=merged["text"], videoDuration=merged["duration"]
+        )),
+    }
+    analyses = list(dict.fromkeys(request.analyses))
+    combined = [name for name in analyses if name in LLM_TEXT_ANALYSES] if request.combine_llm_analyses else []
+    if len(combined) > 1:
+        # One prompt prefill of the transcript instead of one per analysis
+        async def combined_analyses(inputs):
+            merged = inputs["merge"]
+            text_request = TextAnalysesRequest(
+                text=merged["text"],
+                analyses=combined,
+                style=request.summary_style,
+                max_length=request.summary_max_length,
+                videoDuration=merged["duration"],
+            )
+            return await _run_combined_analysis(_text_analyses(text_request, datetime.utcnow()), merged["text"])
+
+        dag.add("combined", combined_analyses, deps=["merge"], optional=True)
+        analyses = [name for name in analyses if name not in combined]
+
+    for name in analyses:
+        analysis = text_analyses[name]
+        dag.add(name, lambda inputs, analysis=analysis: analysis(inputs["merge"]), deps=["merge"], optional=True)
+
+    return dag
+
+@app.post("/api/v1/analyze-meeting", response_model=MeetingAnalysisResponse)
+async def analyze_meeting(request: MeetingAnalysisRequest):
+    """
+    Transcribe, diarize and analyze a meeting in one call
+
+    Transcription and diarization run concurrently on one download, then
+    every requested text analysis runs concurrently on the merged
+    transcript, with the LLM ones sharing a single call unless
+    combine_llm_analyses is off. A failed analysis is reported in `errors`
+    without failing the others; `timings` has per-step status and duration.
+    """
+    REQUESTS_TOTAL.inc()
+
+    if not request.audio_url and not (request.transcript and request.transcript.strip()):
+        raise HTTPException(status_code=400, detail="Provide audio_url or transcript")
+    unknown = [name for name in request.analyses if name not in MEETING_ANALYSES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown analyses: {unknown}. Use: {MEETING_ANALYSES}")
+
+    audio_paths: List[str] = []
+    try:
+        with REQUESTS_DURATION.time():
+            logger.info(f"🧩 Analyzing meeting ({request.audio_url or f'{len(request.transcript)} chars'}): {request.analyses}")
+            step = _endpoint_step.set(True)
+            try:
+                run = await _meeting_dag(request, audio_paths).run()
+            finally:
+                _endpoint_step.reset(step)
+
+    except DAGFailed as e:
+        error = e.node.error
+        if isinstance(error, httpx.HTTPError):
+            raise HTTPException(status_code=400, detail=f"Failed to download audio: {str(error)}")
+        if isinstance(error, openai.APIError):
+            raise HTTPException(status_code=502, detail=f"OpenAI API error: {str(error)}")
+        logger.error(f"Meeting analysis error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Meeting analysis failed at {e.node.name}: {str(error)}")
+    finally:
+        for path in audio_paths:
+            _remove_file(path)
+
+    merged = run.result("merge")
+    combined = run.result("combined", {})
+    result = MeetingAnalysisResponse(
+        analysis_id=str(uuid.uuid4()),
+        transcript=merged["text"],
+        transcription=run.result("transcribe"),
+        diarization=merged.get("diarization"),
+        summary=run.result("summarize", combined.get("summary")),
+        sentiment=run.result("sentiment", combined.get("sentiment")),
+        entities=run.result("entities"),
+        keywords=run.result("keywords"),
+        categorization=run.result("categorize", combined.get("categorization")),
+        highlights=run.result("highlights", combined.get("highlights")),
+        timings=run.timings(),
+        errors=run.errors(),
+        total_time_ms=round(run.duration * 1000, 1),
+    )
+
+    logger.info(f"✅ Meeting analysis completed in {result.total_time_ms:.0f}ms ({len(result.errors)} failed steps)")
+    return result
+
+# Background jobs: long-running endpoints as durable, retried queue jobs
+async def _export_pdf_job(request: PDFExportRequest) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    pdf_content = await loop.run_in_executor(None, _render_pdf, request)
+    return {
+        "filename": _pdf_filename(request),
+        "content_type": "application/pdf",
+        "content_base64": base64.b64encode(pdf_content).decode("ascii"),
+    }
+
+JOB_ENDPOINTS = {
+    "transcribe": (TranscriptionRequest, lambda request: transcribe_audio(request, BackgroundTasks())),
+    "diarize": (SpeakerDiarizationRequest, speaker_diarization),
+    "analyze_meeting": (MeetingAnalysisRequest, analyze_meeting),
+    "export_pdf": (PDFExportRequest, _export_pdf_job),
+}
+
+def _job_handler(request_model: type, endpoint: Callable) -> JobHandler:
+    async def handle(payload: Dict[str, Any]) -> Any:
+        result = await endpoint(request_model(**payload))
+        return result.model_dump() if isinstance(result, BaseModel) else result
+    return handle
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    job_type: _job_handler(request_model, endpoint) for job_type, (request_model, endpoint) in JOB_ENDPOINTS.items()
+}
+
+class JobSubmitRequest(BaseModel):
+    type: str = Field(..., description=f"Job type: {', '.join(JOB_ENDPOINTS)}")
+    payload: Dict[str, Any] = Field(..., description="Request body of the matching endpoint")
+    maxAttempts: Optional[int] = Field(None, ge=1, le=10, description="Attempts before the job fails (default JOB_MAX_ATTEMPTS)")
+
+class JobStatusResponse(BaseModel):
+    jobId: str
+    type: str
+    status: str
+    attempts: int
+    maxAttempts: int
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    error: Optional[str] = None
+    resultUrl: Optional[str] = None
+
+def _job_status(job: Job) -> JobStatusResponse:
+    def timestamp(value: Optional[float]) -> Optional[datetime]:
+        return datetime.utcfromtimestamp(value) if value else None
+
+    return JobStatusResponse(
+        jobId=job.id,
+        type=job.type,
+        status=job.status,
+        attempts=job.attempts,
+        maxAttempts=job.max_attempts,
+        createdAt=timestamp(job.created_at),
+        startedAt=timestamp(job.started_at),
+        finishedAt=timestamp(job.finished_at),
+        error=job.error,
+        resultUrl=f"/api/v1/jobs/{job.id}/result" if job.status == "succeeded" else None,
+    )
+
+async def _find_job(job_id: str) -> Job:
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found (or its result expired)")
+    return job
+
+@app.post("/api/v1/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_job(request: JobSubmitRequest):
+    """
+    Queue a long-running request (transcribe, diarize, analyze_meeting,
+    export_pdf) to run on a worker; poll /api/v1/jobs/{job_id} for its status
+    """
+    REQUESTS_TOTAL.inc()
+
+    if request.type not in JOB_ENDPOINTS:
+        raise HTTPException(status_code=400, detail=f"Unknown job type: {request.type}. Use: {list(JOB_ENDPOINTS)}")
+
+    # Reject bad payloads now rather than in the worker
+    request_model = JOB_ENDPOINTS[request.type][0]
+    try:
+        payload = request_model(**request.payload).model_dump()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    job = await get_job_queue().enqueue(request.type, payload, max_attempts=request.maxAttempts)
+    return _job_status(job)
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Status of a background job"""
+    return _job_status(await _find_job(job_id))
+
+@app.get("/api/v1/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a succeeded job: the endpoint's JSON response, or the file for export_pdf"""
+    job = await _find_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed after {job.attempts} attempts: {job.error}")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}", headers={"Retry-After": "5"})
+
+    result = job.result
+    if isinstance(result, dict) and "content_base64" in result:
+        return Response(
+            base64.b64decode(result["content_base64"]),
+            media_type=result.get("content_type", "application/octet-stream"),
+            headers={"Content-Disposition": f"attachment; filename={result.get('filename', job.id)}"},
+        )
+    return result
+
+_job_worker: Optional[JobWorker] = None
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Run JOB_WORKERS job slots in the API process (0 = only separate `python -m app.worker` processes)"""
+    global _job_worker
+    concurrency = int(os.getenv("JOB_WORKERS", "1"))
+    if concurrency > 0:
+        _job_worker = JobWorker(get_job_queue(), JOB_HANDLERS, concurrency=concurrency)
+        _job_worker.start()
+    else:
+        logger.warning("⚠️ JOB_WORKERS=0: queued jobs only run if a `python -m app.worker` process is up")
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    if _job_worker is not None:
+        await _job_worker.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint - NOW WITH REAL ML!"""
@@ -1899,6 +2805,7 @@ async def root():
         },
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "metrics": "/metrics",
             "transcribe": "/api/v1/transcribe",
             "summarize": "/api/v1/summarize",
@@ -1908,6 +2815,7 @@ async def root():
             "extract_keywords": "/api/v1/extract-keywords [NEW - REAL KeyBERT]",
             "export_pdf": "/api/v1/export-pdf [NEW - REAL reportlab]",
             "chat": "/api/v1/chat",
+            "index_meeting": "/api/v1/index-meeting",
             "super_summarize": "/api/v1/super-summarize",
             "sales_analysis": "/api/v1/analyze-sales-call",
             "categorize": "/api/v1/categorize",
@@ -1918,7 +2826,14 @@ async def root():
             "train_model": "/api/v1/train-model",
             "model_status": "/api/v1/train-model/{job_id}",
             "detect_highlights": "/api/v1/detect-highlights",
-            "live_analyze": "/api/v1/live-analyze"
+            "live_analyze": "/api/v1/live-analyze",
+            "live_analyze_ws": "/ws/live-analyze/{live_session_id}",
+            "chat_stream": "/api/v1/chat/stream",
+            "analyze_meeting": "/api/v1/analyze-meeting",
+            "analyze_text": "/api/v1/analyze-text",
+            "submit_job": "/api/v1/jobs",
+            "job_status": "/api/v1/jobs/{job_id}",
+            "job_result": "/api/v1/jobs/{job_id}/result"
         }
     }
 
@@ -0,0 +1,280 @@
+"""
+Admission Control
+Classifies HTTP requests into priority classes (interactive, normal, batch)
+and admits them through per-class concurrency pools with bounded queues, so
+backfills can't starve live meetings of the worker's capacity
+
+Requests over a full queue or max wait, and batch requests while interactive
+traffic is under pressure, are shed with 503 + Retry-After. The class is also
+set as the request priority for the provider rate limiter.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from .providers.rate_limiter import RequestPriority, request_priority
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+ADMISSION_QUEUE_TIME = Histogram(
+    'admission_queue_seconds',
+    'Time requests waited for an admission slot',
+    ['priority'],
+)
+ADMISSION_REJECTIONS = Counter(
+    'admission_rejections_total',
+    'Requests shed by admission control',
+    ['priority', 'reason'],
+)
+ADMISSION_IN_FLIGHT = Gauge('admission_in_flight', 'Admitted requests in flight', ['priority'])
+ADMISSION_QUEUED = Gauge('admission_queued', 'Requests waiting for admission', ['priority'])
+
+# Route prefixes per class; everything else that isn't exempt is NORMAL
+INTERACTIVE_ROUTES = ("/api/v1/chat", "/api/v1/live-analyze")
+BATCH_ROUTES = ("/api/v1/super-summarize", "/api/v1/train-model", "/api/v1/index-meeting")
+EXEMPT_ROUTES = ("/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+# Clients mark backfills with this header; it can lower a route's class, never raise it
+PRIORITY_HEADER = b"x-request-priority"
+
+# Defaults per class: (concurrency, queue depth, max queue wait in seconds)
+_POOL_DEFAULTS = {
+    RequestPriority.INTERACTIVE: (32, 64, 10.0),
+    RequestPriority.NORMAL: (16, 32, 30.0),
+    RequestPriority.BATCH: (4, 8, 60.0),
+}
+
+
+def _matches(path: str, prefixes: tuple) -> bool:
+    return any(path == prefix or path.startswith(prefix.rstrip("/") + "/") for prefix in prefixes)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+    status_code = 503
+
+    def __init__(self, priority: RequestPriority, reason: str, retry_after: int):
+        super().__init__(f"{priority.name.lower()} request shed ({reason}), retry after {retry_after}s")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+    """Concurrency slots for one class with a bounded FIFO wait queue"""
+
+    def __init__(self, priority: RequestPriority, concurrency: int, max_queue: int, max_wait: float):
+        self.priority = priority
+        self.label = priority.name.lower()
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.service_time = 1.0  # EWMA of admitted request durations, seconds
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new arrival"""
+        backlog = (self.queued + 1) / self.concurrency
+        return int(min(120, max(1, math.ceil(self.service_time * backlog))))
+
+    async def acquire(self):
+        if self.in_flight < self.concurrency and not self._waiters:
+            self._admitted(0.0)
+            return
+        if self.queued >= self.max_queue:
+            raise AdmissionRejected(self.priority, "queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(priority=self.label).inc()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)  # the slot was handed over as we gave up; pass it on
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionRejected(self.priority, "max_wait", self.retry_after())
+        finally:
+            ADMISSION_QUEUED.labels(priority=self.label).dec()
+        # release() handed its slot to this waiter, in_flight already counts it
+        ADMISSION_QUEUE_TIME.labels(priority=self.label).observe(time.monotonic() - started)
+
+    def _admitted(self, waited: float):
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(priority=self.label).inc()
+        ADMISSION_QUEUE_TIME.labels(priority=self.label).observe(waited)
+
+    def release(self, duration: Optional[float]):
+        """Free a slot (handing it to the next waiter); duration feeds the Retry-After estimate"""
+        if duration is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * duration
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.labels(priority=self.label).dec()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "service_time": round(self.service_time, 3),
+        }
+
+
+class AdmissionController:
+    """
+    Request classification and per-class pools
+
+    Configured with ADMISSION_<CLASS>_CONCURRENCY, _QUEUE and _MAX_WAIT.
+    Batch requests are shed while the interactive pool has waiters or is
+    over ADMISSION_PRESSURE_THRESHOLD of its slots.
+    """
+
+    def __init__(self):
+        self.pools: Dict[RequestPriority, AdmissionPool] = {}
+        for priority, (concurrency, max_queue, max_wait) in _POOL_DEFAULTS.items():
+            prefix = f"ADMISSION_{priority.name}"
+            self.pools[priority] = AdmissionPool(
+                priority,
+                concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+                max_queue=int(os.getenv(f"{prefix}_QUEUE", str(max_queue))),
+                max_wait=float(os.getenv(f"{prefix}_MAX_WAIT", str(max_wait))),
+            )
+        self.pressure_threshold = float(os.getenv("ADMISSION_PRESSURE_THRESHOLD", "0.8"))
+
+    def classify(self, method: str, path: str, headers: Dict[bytes, bytes]) -> Optional[RequestPriority]:
+        """Priority class of a request, or None if it bypasses admission"""
+        if method == "OPTIONS" or path == "/" or _matches(path, EXEMPT_ROUTES):
+            return None  # CORS preflights are answered by CORSMiddleware without doing work
+        if method == "GET" and _matches(path, ("/api/v1/jobs",)):
+            return None  # job status polling is cheap; the jobs themselves run on workers
+
+        if _matches(path, INTERACTIVE_ROUTES):
+            priority = RequestPriority.INTERACTIVE
+        elif _matches(path, BATCH_ROUTES):
+            priority = RequestPriority.BATCH
+        else:
+            priority = RequestPriority.NORMAL
+
+        requested = headers.get(PRIORITY_HEADER, b"").decode("latin-1").strip().upper()
+        if requested in RequestPriority.__members__:
+            priority = max(priority, RequestPriority[requested])
+        return priority
+
+    def under_pressure(self) -> bool:
+        interactive = self.pools[RequestPriority.INTERACTIVE]
+        return interactive.queued > 0 or interactive.in_flight >= interactive.concurrency * self.pressure_threshold
+
+    async def admit(self, priority: RequestPriority) -> AdmissionPool:
+        pool = self.pools[priority]
+        try:
+            if priority == RequestPriority.BATCH and self.under_pressure():
+                raise AdmissionRejected(priority, "pressure", pool.retry_after())
+            await pool.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTIONS.labels(priority=pool.label, reason=e.reason).inc()
+            raise
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "under_pressure": self.under_pressure(),
+            **{pool.label: pool.stats() for pool in self.pools.values()},
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting HTTP requests through the controller's pools
+
+    The slot is held until the response body has been sent, so streaming
+    responses count for their whole duration. WebSockets are long-lived
+    sessions and bypass the pools but run at INTERACTIVE priority.
+    """
+
+    def __init__(self, app: Any, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any):
+        if scope["type"] == "websocket":
+            with request_priority(RequestPriority.INTERACTIVE):
+                await self.app(scope, receive, send)
+            return
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller or get_admission_controller()
+        priority = controller.classify(scope["method"], scope["path"], dict(scope.get("headers") or []))
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            pool = await controller.admit(priority)
+        except AdmissionRejected as e:
+            logger.warning(f"🚦 Shed {scope['method']} {scope['path']}: {e}")
+            await self._reject(send, e)
+            return
+
+        started = time.monotonic()
+        try:
+            with request_priority(priority):
+                await self.app(scope, receive, send)
+        finally:
+            pool.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send: Any, error: AdmissionRejected):
+        body = json.dumps({
+            "detail": "Service is at capacity for this request class, retry later",
+            "priority": error.priority.name.lower(),
+            "reason": error.reason,
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(error.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Singleton instance
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the admission controller"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
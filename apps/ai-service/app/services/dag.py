@@ -0,0 +1,182 @@
+"""
+DAG Scheduler
+Runs a small graph of async steps, each as soon as the steps it depends on
+have finished, so independent work (transcription and diarization, the
+text analyses of one transcript) overlaps and intermediate results are
+computed once and shared
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+DAG_NODE_DURATION = Histogram(
+    'dag_node_duration_seconds',
+    'Duration of one DAG node',
+    ['graph', 'node', 'status'],
+)
+
+# A node receives the results of the nodes it depends on, by name
+NodeFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class DAGNode:
+    """One step of a graph"""
+    name: str
+    func: NodeFunc
+    deps: List[str] = field(default_factory=list)
+    optional: bool = False  # a failure is recorded and dependents run without its result
+    timeout: Optional[float] = None
+
+
+@dataclass
+class NodeRun:
+    """Outcome of one node in a run"""
+    name: str
+    status: str = "pending"  # running, ok, error, cancelled
+    result: Any = None
+    error: Optional[BaseException] = None
+    started_at: Optional[float] = None  # seconds since the run started
+    duration: float = 0.0
+
+    def timing(self) -> Dict[str, Any]:
+        timing: Dict[str, Any] = {"status": self.status, "duration_ms": round(self.duration * 1000, 1)}
+        if self.started_at is not None:
+            timing["started_ms"] = round(self.started_at * 1000, 1)
+        if self.error is not None:
+            timing["error"] = str(self.error) or type(self.error).__name__
+        return timing
+
+
+class DAGFailed(RuntimeError):
+    """A required node failed; `node` is its NodeRun"""
+
+    def __init__(self, node: NodeRun, run: "DAGRun"):
+        super().__init__(f"DAG node '{node.name}' failed: {node.error}")
+        self.node = node
+        self.run = run
+
+
+@dataclass
+class DAGRun:
+    """Results and per-node timing of one execution"""
+    nodes: Dict[str, NodeRun]
+    duration: float = 0.0
+
+    def result(self, name: str, default: Any = None) -> Any:
+        node = self.nodes.get(name)
+        return node.result if node is not None and node.status == "ok" else default
+
+    def timings(self) -> Dict[str, Dict[str, Any]]:
+        return {name: node.timing() for name, node in self.nodes.items()}
+
+    def errors(self) -> Dict[str, str]:
+        return {name: str(node.error) for name, node in self.nodes.items() if node.status == "error"}
+
+
+class DAG:
+    """
+    Dependency graph of async steps
+
+    Nodes are added in any order; run() starts every node as soon as all of
+    its dependencies have finished and passes it their results. A failed
+    required node cancels the rest of the run and raises DAGFailed; a failed
+    optional node only records the error and its dependents get no input
+    under its name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nodes: Dict[str, DAGNode] = {}
+
+    def add(
+        self,
+        name: str,
+        func: NodeFunc,
+        deps: Sequence[str] = (),
+        optional: bool = False,
+        timeout: Optional[float] = None,
+    ) -> "DAG":
+        if name in self.nodes:
+            raise ValueError(f"Duplicate DAG node: {name}")
+        self.nodes[name] = DAGNode(name, func, list(deps), optional, timeout)
+        return self
+
+    def _validate(self):
+        for node in self.nodes.values():
+            missing = [dep for dep in node.deps if dep not in self.nodes]
+            if missing:
+                raise ValueError(f"DAG node '{node.name}' depends on unknown nodes: {missing}")
+
+        # Kahn's algorithm: every node must be reachable without a cycle
+        indegree = {name: len(node.deps) for name, node in self.nodes.items()}
+        ready = [name for name, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for other in self.nodes.values():
+                if name in other.deps:
+                    indegree[other.name] -= 1
+                    if indegree[other.name] == 0:
+                        ready.append(other.name)
+        if visited != len(self.nodes):
+            raise ValueError(f"DAG '{self.name}' has a cycle")
+
+    async def run(self) -> DAGRun:
+        self._validate()
+        run = DAGRun(nodes={name: NodeRun(name) for name in self.nodes})
+        started = time.monotonic()
+        tasks: Dict[asyncio.Task, str] = {}
+
+        def start_ready():
+            for name, node in self.nodes.items():
+                state = run.nodes[name]
+                if state.status != "pending":
+                    continue
+                if all(run.nodes[dep].status in ("ok", "error") for dep in node.deps):
+                    inputs = {dep: run.nodes[dep].result for dep in node.deps if run.nodes[dep].status == "ok"}
+                    state.status = "running"
+                    state.started_at = time.monotonic() - started
+                    tasks[asyncio.create_task(self._run_node(node, inputs))] = name
+
+        try:
+            start_ready()
+            while tasks:
+                done, _ = await asyncio.wait(list(tasks), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks.pop(task)
+                    state = run.nodes[name]
+                    state.duration = time.monotonic() - started - state.started_at
+                    error = task.exception()
+                    if error is None:
+                        state.status, state.result = "ok", task.result()
+                    else:
+                        state.status, state.error = "error", error
+                        logger.warning(f"DAG {self.name}: node '{name}' failed: {error}")
+                    DAG_NODE_DURATION.labels(graph=self.name, node=name, status=state.status).observe(state.duration)
+                    if state.status == "error" and not self.nodes[name].optional:
+                        raise DAGFailed(state, run)
+                start_ready()
+        finally:
+            for task, name in tasks.items():
+                task.cancel()
+                run.nodes[name].status = "cancelled"
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            run.duration = time.monotonic() - started
+
+        return run
+
+    async def _run_node(self, node: DAGNode, inputs: Dict[str, Any]) -> Any:
+        if node.timeout:
+            return await asyncio.wait_for(node.func(inputs), timeout=node.timeout)
+        return await node.func(inputs)
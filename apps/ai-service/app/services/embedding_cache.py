@@ -0,0 +1,188 @@
+"""
+Embedding Cache
+Provider-agnostic cache of text embeddings keyed by (provider, model, sha256(text))
+Vectors are stored on disk as float16 in SQLite with a small in-memory LRU in front
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+EMBEDDING_CACHE_HITS = Counter('embedding_cache_hits_total', 'Embedding cache hits', ['provider', 'model'])
+EMBEDDING_CACHE_MISSES = Counter('embedding_cache_misses_total', 'Embedding cache misses', ['provider', 'model'])
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def text_digest(text: str) -> str:
+    """Stable cache key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache
+
+    - Memory: LRU of recently used vectors (float32)
+    - Disk: SQLite table of float16 vectors, half the size of float32 and
+      accurate to ~1e-3 relative error, which is well below what cosine
+      ranking can distinguish
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_items: Optional[int] = None):
+        self.path = path or os.getenv(
+            "EMBEDDING_CACHE_PATH",
+            str(Path.home() / ".openmeet" / "embedding_cache.sqlite")
+        )
+        self.memory_items = memory_items or int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "20000"))
+
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                namespace TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, digest)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+        logger.info(f"💾 Embedding cache initialized ({self.path})")
+
+    @staticmethod
+    def _namespace(provider: str, model: str) -> str:
+        return f"{provider}:{model}"
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray):
+        """Insert into the memory LRU (caller holds the lock)"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def lookup(self, provider: str, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors in input order, None for misses (blocking)"""
+        namespace = self._namespace(provider, model)
+        digests = [text_digest(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            missing = []
+            for digest in set(digests):
+                vector = self._memory.get((namespace, digest))
+                if vector is not None:
+                    self._memory.move_to_end((namespace, digest))
+                    found[digest] = vector
+                else:
+                    missing.append(digest)
+
+            for i in range(0, len(missing), _SQL_CHUNK):
+                chunk = missing[i:i + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE namespace = ? AND digest IN ({placeholders})",
+                    [namespace, *chunk],
+                ).fetchall()
+                for digest, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                    found[digest] = vector
+                    self._remember((namespace, digest), vector)
+
+        hits = sum(1 for digest in digests if digest in found)
+        if hits:
+            EMBEDDING_CACHE_HITS.labels(provider=provider, model=model).inc(hits)
+        if len(digests) - hits:
+            EMBEDDING_CACHE_MISSES.labels(provider=provider, model=model).inc(len(digests) - hits)
+
+        return [found[digest].tolist() if digest in found else None for digest in digests]
+
+    def store(self, provider: str, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Persist vectors for texts (blocking)"""
+        namespace = self._namespace(provider, model)
+        now = time.time()
+        rows = []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                digest = text_digest(text)
+                array = np.asarray(vector, dtype=np.float32)
+                self._remember((namespace, digest), array)
+                rows.append((namespace, digest, array.shape[0], array.astype(np.float16).tobytes(), now))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (namespace, digest, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    async def get_many(self, provider: str, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Async wrapper around lookup()"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.lookup, provider, model, list(texts))
+
+    async def put_many(self, provider: str, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Async wrapper around store()"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store, provider, model, list(texts), list(vectors))
+
+    def purge(self, older_than_days: float) -> int:
+        """Delete entries older than the given age, returns rows removed"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM embeddings WHERE created_at < ?", (cutoff,))
+            self._conn.commit()
+            self._memory.clear()
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        """Cache size information"""
+        with self._lock:
+            rows, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+            return {
+                "disk_entries": rows,
+                "disk_vector_bytes": size,
+                "memory_entries": len(self._memory),
+            }
+
+
+# Singleton instance
+_cache_instance: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create embedding cache instance"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = EmbeddingCache()
+    return _cache_instance
+
+
+def is_enabled() -> bool:
+    """Check if embedding caching is enabled"""
+    return os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
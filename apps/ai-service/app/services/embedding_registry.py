@@ -0,0 +1,286 @@
+"""
+Embedding Model Registry
+Keeps warm, shared SentenceTransformer instances and merges concurrent
+embedding requests into a single encode() call per model
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size',
+    'Texts per merged embedding encode call',
+    ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+EMBEDDING_BATCH_REQUESTS = Histogram(
+    'embedding_batch_requests',
+    'Caller requests merged into one embedding encode call',
+    ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+EMBEDDING_BATCH_LATENCY = Histogram(
+    'embedding_batch_latency_seconds',
+    'Wall time of a merged embedding encode call',
+    ['model'],
+)
+EMBEDDING_QUEUE_WAIT = Histogram(
+    'embedding_queue_wait_seconds',
+    'Time a request waited before its batch was dispatched',
+    ['model'],
+)
+EMBEDDING_MODEL_LOADS = Counter(
+    'embedding_model_loads_total',
+    'Embedding model loads (should stay at one per model per process)',
+    ['model'],
+)
+
+
+@dataclass
+class _PendingEmbedding:
+    """Single caller request waiting in a batcher queue"""
+    texts: List[str]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching queue for one embedding model
+
+    The first queued request opens a batch window of max_latency_ms. Requests
+    arriving inside the window are merged until max_batch_size texts are
+    collected, then the whole batch is encoded in one executor call and the
+    results are split back per caller.
+    """
+
+    def __init__(self, model_name: str, model: Any, max_batch_size: int = 64, max_latency_ms: float = 10.0):
+        self.model_name = model_name
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Running totals for get_stats()
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """Queue texts for the next batch and wait for their embeddings"""
+        if not texts:
+            return []
+
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait(_PendingEmbedding(texts=texts, future=future, enqueued_at=time.monotonic()))
+        return await future
+
+    def _ensure_worker(self):
+        """Start the batch worker on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        """Collect requests into batches until cancelled"""
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            count = len(first.texts)
+            deadline = first.enqueued_at + self.max_latency
+
+            while count < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                count += len(item.texts)
+
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[_PendingEmbedding]):
+        """Encode a merged batch and resolve every caller future"""
+        # Drop callers that went away while queued
+        batch = [p for p in batch if not p.future.done()]
+        if not batch:
+            return
+
+        texts = [text for pending in batch for text in pending.texts]
+        dispatched_at = time.monotonic()
+        for pending in batch:
+            EMBEDDING_QUEUE_WAIT.labels(model=self.model_name).observe(dispatched_at - pending.enqueued_at)
+
+        try:
+            vectors = await self._loop.run_in_executor(
+                None,
+                lambda: self.model.encode(
+                    texts,
+                    batch_size=self.max_batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                )
+            )
+        except Exception as e:
+            logger.error(f"Embedding batch failed for {self.model_name}: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        elapsed = time.monotonic() - dispatched_at
+        EMBEDDING_BATCH_SIZE.labels(model=self.model_name).observe(len(texts))
+        EMBEDDING_BATCH_REQUESTS.labels(model=self.model_name).observe(len(batch))
+        EMBEDDING_BATCH_LATENCY.labels(model=self.model_name).observe(elapsed)
+        self.batches += 1
+        self.texts += len(texts)
+        self.requests += len(batch)
+
+        offset = 0
+        for pending in batch:
+            count = len(pending.texts)
+            if not pending.future.done():
+                pending.future.set_result(vectors[offset:offset + count].tolist())
+            offset += count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching statistics since startup"""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_latency_ms": self.max_latency * 1000.0,
+        }
+
+
+class EmbeddingModelRegistry:
+    """
+    Process-wide registry of warm embedding models
+
+    Each model is loaded once (concurrent first requests share one load) and
+    fronted by an EmbeddingBatcher so concurrent callers share encode calls.
+    """
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[str], Any]] = None,
+        max_batch_size: Optional[int] = None,
+        max_latency_ms: Optional[float] = None,
+    ):
+        self.loader = loader or self._load_with_hf_manager
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+        self.max_latency_ms = max_latency_ms if max_latency_ms is not None else float(
+            os.getenv("EMBEDDING_MAX_BATCH_LATENCY_MS", "10")
+        )
+
+        self._models: Dict[str, Any] = {}
+        self._batchers: Dict[str, EmbeddingBatcher] = {}
+        self._load_times: Dict[str, float] = {}
+        self._load_lock = threading.Lock()
+
+        logger.info(
+            f"📦 Embedding registry initialized "
+            f"(max_batch={self.max_batch_size}, max_latency={self.max_latency_ms}ms)"
+        )
+
+    @staticmethod
+    def _load_with_hf_manager(model_name: str) -> Any:
+        """Default loader: HuggingFace model manager"""
+        from .huggingface_manager import get_hf_manager
+
+        model, _ = get_hf_manager().load_embedding_model(model_name)
+        return model
+
+    def get_model(self, model_name: str) -> Any:
+        """Get a warm model instance, loading it once if needed (blocking)"""
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._load_lock:
+            model = self._models.get(model_name)
+            if model is None:
+                start_time = time.time()
+                model = self.loader(model_name)
+                self._load_times[model_name] = time.time() - start_time
+                self._models[model_name] = model
+                EMBEDDING_MODEL_LOADS.labels(model=model_name).inc()
+                logger.info(f"✅ Embedding model warm: {model_name} ({self._load_times[model_name]:.1f}s)")
+        return model
+
+    async def get_batcher(self, model_name: str) -> EmbeddingBatcher:
+        """Get the batcher for a model, loading the model off the event loop"""
+        batcher = self._batchers.get(model_name)
+        if batcher is None:
+            loop = asyncio.get_running_loop()
+            model = await loop.run_in_executor(None, self.get_model, model_name)
+            batcher = self._batchers.setdefault(
+                model_name,
+                EmbeddingBatcher(model_name, model, self.max_batch_size, self.max_latency_ms),
+            )
+        return batcher
+
+    async def encode(self, model_name: str, texts: List[str]) -> List[List[float]]:
+        """Embed texts with a shared model through its micro-batching queue"""
+        batcher = await self.get_batcher(model_name)
+        return await batcher.encode(texts)
+
+    async def warm_up(self, model_names: List[str]):
+        """Load models ahead of the first request"""
+        await asyncio.gather(*(self.get_batcher(name) for name in model_names))
+
+    def is_loaded(self, model_name: str) -> bool:
+        """Check if a model is already warm"""
+        return model_name in self._models
+
+    def unload(self, model_name: str):
+        """Drop a model and its batcher"""
+        batcher = self._batchers.pop(model_name, None)
+        if batcher and batcher._worker:
+            batcher._worker.cancel()
+        self._models.pop(model_name, None)
+        self._load_times.pop(model_name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded models with load time and batching statistics"""
+        return {
+            name: {
+                "load_time": round(self._load_times.get(name, 0.0), 3),
+                **(self._batchers[name].get_stats() if name in self._batchers else {}),
+            }
+            for name in self._models
+        }
+
+
+# Singleton instance
+_registry_instance: Optional[EmbeddingModelRegistry] = None
+
+
+def get_embedding_registry() -> EmbeddingModelRegistry:
+    """Get or create embedding model registry instance"""
+    global _registry_instance
+    if _registry_instance is None:
+        _registry_instance = EmbeddingModelRegistry()
+    return _registry_instance
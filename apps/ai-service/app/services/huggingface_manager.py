@@ -15,11 +15,12 @@ from huggingface_hub import (
     snapshot_download,
     login,
     HfApi,
-    HfFolder,
 )
 from transformers import AutoTokenizer, AutoModelForCausalLM, AutoModel, AutoConfig
 import gc
 
+from .model_residency import ModelResidencyManager
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +59,9 @@ class HuggingFaceModelManager:
         self.loaded_models: Dict[str, Any] = {}
         self.loaded_tokenizers: Dict[str, Any] = {}
 
+        # Memory budget for loaded models (evicts idle ones via unload_model)
+        self.residency = ModelResidencyManager(unload=self.unload_model)
+
         # Model registry (recommended models)
         self.model_registry = {
             # Fast Whisper models
@@ -87,6 +91,7 @@ class HuggingFaceModelManager:
                 "size": "16GB",
                 "description": "Best quality, requires 24GB VRAM",
                 "quantized": "unsloth/Meta-Llama-3.1-8B-Instruct-bnb-4bit",
+                "gguf": "bartowski/Meta-Llama-3.1-8B-Instruct-GGUF",
             },
             "qwen2.5-7b": {
                 "repo_id": "Qwen/Qwen2.5-7B-Instruct",
@@ -94,6 +99,7 @@ class HuggingFaceModelManager:
                 "size": "14GB",
                 "description": "Excellent for code and reasoning",
                 "quantized": "Qwen/Qwen2.5-7B-Instruct-GPTQ-Int4",
+                "gguf": "bartowski/Qwen2.5-7B-Instruct-GGUF",
             },
             "gemma-2-9b": {
                 "repo_id": "google/gemma-2-9b-it",
@@ -101,12 +107,37 @@ class HuggingFaceModelManager:
                 "size": "18GB",
                 "description": "Google's latest, very capable",
                 "quantized": "unsloth/gemma-2-9b-it-bnb-4bit",
+                "gguf": "bartowski/gemma-2-9b-it-GGUF",
             },
             "phi-3.5-mini": {
                 "repo_id": "microsoft/Phi-3.5-mini-instruct",
                 "type": "llm",
                 "size": "7.6GB",
                 "description": "Fast, lightweight, great quality",
+                "gguf": "bartowski/Phi-3.5-mini-instruct-GGUF",
+            },
+
+            # Draft models for speculative decoding (share their target's tokenizer)
+            "llama-3.2-1b": {
+                "repo_id": "meta-llama/Llama-3.2-1B-Instruct",
+                "type": "llm",
+                "size": "2.5GB",
+                "description": "Draft model for Llama 3.1 8B",
+                "gguf": "bartowski/Llama-3.2-1B-Instruct-GGUF",
+            },
+            "qwen2.5-0.5b": {
+                "repo_id": "Qwen/Qwen2.5-0.5B-Instruct",
+                "type": "llm",
+                "size": "1GB",
+                "description": "Draft model for Qwen 2.5 7B",
+                "gguf": "bartowski/Qwen2.5-0.5B-Instruct-GGUF",
+            },
+            "gemma-2-2b": {
+                "repo_id": "google/gemma-2-2b-it",
+                "type": "llm",
+                "size": "5.2GB",
+                "description": "Draft model for Gemma 2 9B",
+                "gguf": "bartowski/gemma-2-2b-it-GGUF",
             },
 
             # Vision models
@@ -185,6 +216,16 @@ class HuggingFaceModelManager:
             logger.error(f"❌ Failed to download model {model_name}: {e}")
             raise
 
+    @staticmethod
+    def llm_cache_key(model_name: str, quantization: Optional[str] = None, device: str = "auto") -> str:
+        """Key of a loaded LLM in loaded_models (and in the residency manager)"""
+        return f"{model_name}_{quantization}_{device}"
+
+    def _estimate_bytes(self, model_name: str, quantization: Optional[str] = None) -> int:
+        """Registry size estimate for reserving memory before a load"""
+        estimate = self.estimate_model_memory(model_name, quantization)
+        return int(estimate.get("actual_size_gb", 0) * 1024 ** 3)
+
     def load_llm(
         self,
         model_name: str,
@@ -206,11 +247,15 @@ class HuggingFaceModelManager:
         """
         try:
             # Check if already loaded
-            cache_key = f"{model_name}_{quantization}_{device}"
+            cache_key = self.llm_cache_key(model_name, quantization, device)
             if cache_key in self.loaded_models:
                 logger.info(f"♻️ Using cached model: {model_name}")
+                self.residency.touch(cache_key)
                 return self.loaded_models[cache_key], self.loaded_tokenizers[cache_key]
 
+            # Evict idle models first so the new one fits in the memory budget
+            self.residency.reserve(cache_key, self._estimate_bytes(model_name, quantization))
+
             # Get repo_id
             if model_name in self.model_registry:
                 model_info = self.model_registry[model_name]
@@ -266,19 +311,74 @@ class HuggingFaceModelManager:
             # Cache models
             self.loaded_models[cache_key] = model
             self.loaded_tokenizers[cache_key] = tokenizer
+            self.residency.admit(cache_key, model_name, model, kind="llm")
 
             logger.info(f"✅ LLM loaded successfully: {repo_id}")
             return model, tokenizer
 
         except Exception as e:
+            self.residency.cancel(self.llm_cache_key(model_name, quantization, device))
             logger.error(f"❌ Failed to load LLM {model_name}: {e}")
             raise
 
+    @staticmethod
+    def gguf_cache_key(model_name: str, quant: str) -> str:
+        """Key of a loaded GGUF model in loaded_models (and in the residency manager)"""
+        return f"{model_name}_gguf-{quant}"
+
+    def load_gguf(self, model_name: str, quant: Optional[str] = None) -> Any:
+        """
+        Load a GGUF quantization of an LLM for llama.cpp CPU inference
+
+        Args:
+            model_name: Model name from registry (its "gguf" repo) or a GGUF repo_id
+            quant: Quantization file to use, e.g. "Q4_K_M" or "Q5_K_M"
+
+        Returns:
+            llama_cpp.Llama with memory-mapped weights
+        """
+        from .providers.gguf_backend import load_gguf_model
+
+        quant = quant or os.getenv("LOCAL_GGUF_QUANT", "Q4_K_M")
+        cache_key = self.gguf_cache_key(model_name, quant)
+        try:
+            if cache_key in self.loaded_models:
+                logger.info(f"♻️ Using cached GGUF model: {model_name}")
+                self.residency.touch(cache_key)
+                return self.loaded_models[cache_key]
+
+            model_info = self.model_registry.get(model_name)
+            if model_info is not None and "gguf" not in model_info:
+                raise ValueError(f"No GGUF build registered for {model_name}")
+            repo_id = model_info["gguf"] if model_info else model_name
+
+            self.residency.reserve(cache_key, self._estimate_bytes(model_name, "4bit"))
+            logger.info(f"🔧 Loading GGUF LLM: {repo_id} ({quant})")
+            model = load_gguf_model(repo_id, f"*{quant}.gguf", cache_dir=self.cache_dir)
+
+            self.loaded_models[cache_key] = model
+            self.residency.admit(cache_key, model_name, model, kind="llm")
+
+            logger.info(f"✅ GGUF LLM loaded successfully: {repo_id} ({quant})")
+            return model
+
+        except Exception as e:
+            self.residency.cancel(cache_key)
+            logger.error(f"❌ Failed to load GGUF LLM {model_name}: {e}")
+            raise
+
     def load_embedding_model(self, model_name: str = "bge-large-en-v1.5") -> tuple:
         """Load embedding model for semantic search"""
         try:
             from sentence_transformers import SentenceTransformer
 
+            # Check if already loaded
+            cache_key = f"{model_name}_embedding"
+            if cache_key in self.loaded_models:
+                logger.info(f"♻️ Using cached embedding model: {model_name}")
+                self.residency.touch(cache_key)
+                return self.loaded_models[cache_key], None
+
             if model_name in self.model_registry:
                 repo_id = self.model_registry[model_name]["repo_id"]
             else:
@@ -286,12 +386,18 @@ class HuggingFaceModelManager:
 
             logger.info(f"🔧 Loading embedding model: {repo_id}")
 
+            self.residency.reserve(cache_key, self._estimate_bytes(model_name))
             model = SentenceTransformer(repo_id, cache_folder=self.cache_dir)
 
+            # Cache model (pinned: the embedding registry keeps its own warm reference)
+            self.loaded_models[cache_key] = model
+            self.residency.admit(cache_key, model_name, model, kind="embedding", pinned=True)
+
             logger.info(f"✅ Embedding model loaded: {repo_id}")
             return model, None
 
         except Exception as e:
+            self.residency.cancel(f"{model_name}_embedding")
             logger.error(f"❌ Failed to load embedding model: {e}")
             raise
 
@@ -306,6 +412,7 @@ class HuggingFaceModelManager:
                     del self.loaded_models[key]
                 if key in self.loaded_tokenizers:
                     del self.loaded_tokenizers[key]
+                self.residency.forget(key)
 
             # Force garbage collection
             gc.collect()
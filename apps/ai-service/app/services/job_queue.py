@@ -0,0 +1,495 @@
+"""
+Job Queue
+Durable queue for long-running AI work (transcription, diarization, PDF
+export) so it outlives the HTTP request and the pod that accepted it
+
+Jobs are claimed with a lease that the worker renews while it runs; a job
+whose worker died is picked up again once its lease expires. Failures are
+retried with exponential backoff up to max_attempts, and finished jobs are
+kept for a result TTL. Backends: Redis (shared by API replicas and worker
+processes) or SQLite (single host, also across processes).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Counter, Histogram
+
+from .providers.rate_limiter import RequestPriority, request_priority
+from .tokenizer_service import usage_endpoint
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+JOBS_SUBMITTED = Counter('jobs_submitted_total', 'Background jobs submitted', ['type'])
+JOBS_FINISHED = Counter('jobs_finished_total', 'Background job attempts by outcome', ['type', 'outcome'])
+JOB_DURATION = Histogram('job_duration_seconds', 'Background job attempt duration', ['type'])
+JOB_QUEUE_WAIT = Histogram('job_queue_wait_seconds', 'Time from submission to first start', ['type'])
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+# A handler gets the job payload and returns a JSON-serializable result
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Job:
+    """A unit of background work and its outcome"""
+    id: str
+    type: str
+    payload: Dict[str, Any]
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "Job":
+        return cls(**json.loads(data))
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff before retry number `attempt` (1-based)"""
+    base = float(os.getenv("JOB_RETRY_DELAY", "5"))
+    return min(300.0, base * 2 ** (attempt - 1))
+
+
+class JobQueue(ABC):
+    """
+    Backend-independent queue API
+
+    Backends implement _insert, _load, _claim, _store and _extend_lease;
+    state transitions (attempt counting, retries, result TTL) live here.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self.result_ttl = float(os.getenv("JOB_RESULT_TTL", "86400"))
+        self.default_max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], max_attempts: Optional[int] = None) -> Job:
+        job = Job(
+            id=str(uuid.uuid4()),
+            type=job_type,
+            payload=payload,
+            max_attempts=max_attempts or self.default_max_attempts,
+        )
+        await self._insert(job)
+        JOBS_SUBMITTED.labels(type=job_type).inc()
+        logger.info(f"📥 Queued {job_type} job {job.id} ({self.backend})")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self._load(job_id)
+
+    async def dequeue(self, timeout: float) -> Optional[Job]:
+        """Claim the next ready job, waiting up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self._claim()
+            if job is not None:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def _claim(self) -> Optional[Job]:
+        """Lease one ready job (queued and due, or running with an expired lease)"""
+        while True:
+            job = await self._claim_next(time.time() + self.lease_seconds)
+            if job is None:
+                return None
+            if job.attempts >= job.max_attempts:
+                # Its worker died mid-attempt once too often
+                await self._finish(job, FAILED, error=job.error or "Worker lost the job too many times")
+                continue
+            job.attempts += 1
+            job.status = RUNNING
+            if job.started_at is None:
+                JOB_QUEUE_WAIT.labels(type=job.type).observe(time.time() - job.created_at)
+            job.started_at = time.time()
+            await self._store(job, ready_at=None, ttl=None)
+            return job
+
+    async def heartbeat(self, job: Job):
+        """Renew the lease of a running job"""
+        await self._extend_lease(job.id, time.time() + self.lease_seconds)
+
+    async def complete(self, job: Job, result: Any):
+        await self._finish(job, SUCCEEDED, result=result)
+
+    async def fail(self, job: Job, error: str, retry: bool = True) -> Job:
+        """Record a failed attempt; requeue with backoff while attempts remain"""
+        job.error = error
+        if retry and job.attempts < job.max_attempts:
+            job.status = QUEUED
+            delay = retry_delay(job.attempts)
+            await self._store(job, ready_at=time.time() + delay, ttl=None)
+            logger.warning(f"🔁 {job.type} job {job.id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+        else:
+            await self._finish(job, FAILED, error=error)
+            logger.error(f"❌ {job.type} job {job.id} failed after {job.attempts} attempts: {error}")
+        return job
+
+    async def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        await self._store(job, ready_at=None, ttl=self.result_ttl)
+
+    @abstractmethod
+    async def _insert(self, job: Job):
+        pass
+
+    @abstractmethod
+    async def _load(self, job_id: str) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    async def _claim_next(self, lease_until: float) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    async def _store(self, job: Job, ready_at: Optional[float], ttl: Optional[float]):
+        """Persist job; ready_at requeues it, ttl marks it finished and expiring"""
+        pass
+
+    @abstractmethod
+    async def _extend_lease(self, job_id: str, lease_until: float):
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """Jobs in one SQLite table; claims are serialized with BEGIN IMMEDIATE so processes can share the file"""
+
+    backend = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__()
+        self.path = path or os.getenv("JOB_QUEUE_PATH", str(Path.home() / ".openmeet" / "jobs.sqlite"))
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                ready_at REAL NOT NULL,
+                lease_until REAL,
+                expires_at REAL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, ready_at)")
+        logger.info(f"💾 Job queue initialized ({self.path})")
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    async def _insert(self, job: Job):
+        await self._run(
+            self._execute,
+            "INSERT INTO jobs (id, status, ready_at, data) VALUES (?, ?, ?, ?)",
+            (job.id, job.status, job.created_at, job.to_json()),
+        )
+
+    async def _load(self, job_id: str) -> Optional[Job]:
+        rows = await self._run(
+            self._execute,
+            "SELECT data FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (job_id, time.time()),
+        )
+        return Job.from_json(rows[0][0]) if rows else None
+
+    def _claim_sync(self, lease_until: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                row = self._conn.execute(
+                    """
+                    SELECT id, data FROM jobs
+                    WHERE (status = ? AND ready_at <= ?) OR (status = ? AND lease_until < ?)
+                    ORDER BY ready_at LIMIT 1
+                    """,
+                    (QUEUED, now, RUNNING, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, lease_until = ? WHERE id = ?", (RUNNING, lease_until, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job.from_json(row[1]) if row is not None else None
+
+    async def _claim_next(self, lease_until: float) -> Optional[Job]:
+        return await self._run(self._claim_sync, lease_until)
+
+    async def _store(self, job: Job, ready_at: Optional[float], ttl: Optional[float]):
+        await self._run(
+            self._execute,
+            """
+            UPDATE jobs SET status = ?, data = ?,
+                ready_at = COALESCE(?, ready_at),
+                expires_at = ?
+            WHERE id = ?
+            """,
+            (job.status, job.to_json(), ready_at, time.time() + ttl if ttl else None, job.id),
+        )
+
+    async def _extend_lease(self, job_id: str, lease_until: float):
+        await self._run(
+            self._execute, "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?", (lease_until, job_id, RUNNING)
+        )
+
+    async def stats(self) -> Dict[str, Any]:
+        rows = await self._run(
+            self._execute,
+            "SELECT status, COUNT(*) FROM jobs WHERE expires_at IS NULL OR expires_at > ? GROUP BY status",
+            (time.time(),),
+        )
+        return {"backend": self.backend, "path": self.path, **{status: count for status, count in rows}}
+
+
+# Move due retries and jobs with expired leases to the queue, then lease the
+# oldest queued job. Returns its id or nil.
+_CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, key in ipairs({KEYS[2], KEYS[3]}) do
+  local due = redis.call('ZRANGEBYSCORE', key, '-inf', now)
+  for _, id in ipairs(due) do
+    redis.call('ZREM', key, id)
+    redis.call('LPUSH', KEYS[1], id)
+  end
+end
+local id = redis.call('RPOP', KEYS[1])
+if id then
+  redis.call('ZADD', KEYS[3], ARGV[2], id)
+end
+return id
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Jobs shared by all API replicas and workers through Redis
+
+    - {prefix}:job:{id}  job JSON, with a TTL once finished
+    - {prefix}:queue     list of ready job ids (FIFO)
+    - {prefix}:delayed   zset of retries by ready time
+    - {prefix}:running   zset of leased jobs by lease expiry
+
+    The prefix is a hash tag ("{jobs}:queue") so all keys land in one Redis
+    Cluster slot, as the claim script and MULTI pipelines need.
+    """
+
+    backend = "redis"
+
+    def __init__(self, redis_client: Any, prefix: str = "jobs"):
+        super().__init__()
+        self.redis = redis_client
+        self.prefix = prefix
+        self._claim_script = redis_client.register_script(_CLAIM_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return f"{{{self.prefix}}}:{name}"
+
+    async def _insert(self, job: Job):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(f"job:{job.id}"), job.to_json())
+            pipe.lpush(self._key("queue"), job.id)
+            await pipe.execute()
+
+    async def _load(self, job_id: str) -> Optional[Job]:
+        data = await self.redis.get(self._key(f"job:{job_id}"))
+        return Job.from_json(data) if data else None
+
+    async def _claim_next(self, lease_until: float) -> Optional[Job]:
+        while True:
+            job_id = await self._claim_script(
+                keys=[self._key("queue"), self._key("delayed"), self._key("running")],
+                args=[time.time(), lease_until],
+            )
+            if job_id is None:
+                return None
+            job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+            job = await self._load(job_id)
+            if job is not None and not job.done:
+                return job
+            await self.redis.zrem(self._key("running"), job_id)  # expired or already finished
+
+    async def _store(self, job: Job, ready_at: Optional[float], ttl: Optional[float]):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(f"job:{job.id}"), job.to_json(), ex=int(ttl) if ttl else None)
+            if ready_at is not None or ttl:
+                pipe.zrem(self._key("running"), job.id)
+            if ready_at is not None:
+                pipe.zadd(self._key("delayed"), {job.id: ready_at})
+            await pipe.execute()
+
+    async def _extend_lease(self, job_id: str, lease_until: float):
+        await self.redis.zadd(self._key("running"), {job_id: lease_until}, xx=True)
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.llen(self._key("queue"))
+            pipe.zcard(self._key("delayed"))
+            pipe.zcard(self._key("running"))
+            queued, delayed, running = await pipe.execute()
+        return {"backend": self.backend, QUEUED: queued + delayed, "retrying": delayed, RUNNING: running}
+
+
+class JobWorker:
+    """
+    Runs queued jobs with up to `concurrency` in flight
+
+    Handlers run at BATCH priority so their LLM calls yield to interactive
+    requests, and their token usage is attributed to "job:<type>".
+    Exceptions with a 4xx status_code (bad input) are not retried.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int = 1):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+        self._tasks: list = []
+
+    def start(self):
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._loop(slot)) for slot in range(self.concurrency)]
+        logger.info(f"👷 Job worker {self.worker_id} started ({self.concurrency} slots, {self.queue.backend} queue)")
+
+    async def stop(self, grace: float = 30.0):
+        """Stop claiming and wait up to grace seconds for running jobs (unfinished ones are re-leased later)"""
+        self._stopping.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run(self):
+        self.start()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _loop(self, slot: int):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.dequeue(timeout=5.0)
+            except Exception as e:
+                logger.error(f"Job worker slot {slot} could not claim a job: {e}")
+                await asyncio.sleep(self.queue.poll_interval * 5)
+                continue
+            if job is not None:
+                await self.process(job)
+
+    async def process(self, job: Job):
+        handler = self.handlers.get(job.type)
+        if handler is None:
+            await self.queue.fail(job, f"Unknown job type: {job.type}", retry=False)
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        started = time.monotonic()
+        try:
+            with request_priority(RequestPriority.BATCH), usage_endpoint(f"job:{job.type}"):
+                result = await handler(job.payload)
+        except asyncio.CancelledError:
+            raise  # shutdown: the lease expires and another worker picks it up
+        except Exception as e:
+            status_code = getattr(e, "status_code", None)
+            retry = not (isinstance(status_code, int) and 400 <= status_code < 500)
+            error = str(getattr(e, "detail", None) or e) or type(e).__name__
+            JOBS_FINISHED.labels(type=job.type, outcome="retry" if retry and job.attempts < job.max_attempts else "failed").inc()
+            await self.queue.fail(job, error, retry=retry)
+        else:
+            JOBS_FINISHED.labels(type=job.type, outcome="succeeded").inc()
+            await self.queue.complete(job, result)
+            logger.info(f"✅ {job.type} job {job.id} succeeded in {time.monotonic() - started:.1f}s")
+        finally:
+            heartbeat.cancel()
+            JOB_DURATION.labels(type=job.type).observe(time.monotonic() - started)
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                await self.queue.heartbeat(job)
+            except Exception as e:
+                logger.warning(f"Lease renewal for job {job.id} failed: {e}")
+
+
+# Singleton instance
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Get or create the job queue
+
+    JOB_QUEUE_BACKEND=redis shares jobs through REDIS_URL; sqlite (default)
+    keeps them in JOB_QUEUE_PATH on this host.
+    """
+    global _job_queue
+    if _job_queue is None:
+        backend = os.getenv("JOB_QUEUE_BACKEND", "sqlite").lower()
+        if backend == "redis" and REDIS_AVAILABLE:
+            _job_queue = RedisJobQueue(aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379")))
+        else:
+            if backend == "redis":
+                logger.warning("JOB_QUEUE_BACKEND=redis but redis is not installed, using SQLite")
+            _job_queue = SQLiteJobQueue()
+    return _job_queue
@@ -0,0 +1,383 @@
+"""
+Live Session Store
+Tracks incremental analysis state per live meeting session so each analysis
+call only sends the new transcript delta plus a compact running summary
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import WebSocketDisconnect
+from prometheus_client import Counter as MetricCounter
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+LIVE_ANALYSES_CANCELLED = MetricCounter('live_analyses_cancelled_total', 'In-flight live analyses cancelled by newer transcript text')
+LIVE_DELTAS_DEBOUNCED = MetricCounter('live_deltas_debounced_total', 'Transcript deltas merged into a later live analysis')
+
+# Finding lists and the field that identifies a finding within each
+FINDING_KEYS = {
+    "actionItems": "task",
+    "questions": "question",
+    "decisions": "decision",
+}
+
+_SPEAKER_LINE = re.compile(r"^\s*([^:\n]{1,40}):\s+(.+)$", re.MULTILINE)
+
+
+def _normalize(text: str) -> str:
+    """Normalize finding text for duplicate detection"""
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split())
+
+
+def _is_duplicate(a: str, b: str, threshold: float = 0.8) -> bool:
+    """Exact or high-overlap match between two normalized strings"""
+    if a == b:
+        return True
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return False
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b) >= threshold
+
+
+@dataclass
+class LiveSessionState:
+    """Accumulated analysis state for one live session"""
+    live_session_id: str
+    meeting_id: str
+    analyzed_chars: int = 0
+    tail: str = ""
+    pending: str = ""
+    summary: str = ""
+    findings: Dict[str, List[Dict[str, Any]]] = field(
+        default_factory=lambda: {key: [] for key in FINDING_KEYS}
+    )
+    tone_analysis: Dict[str, Any] = field(default_factory=lambda: {
+        "overall": "neutral",
+        "sentiment": 0.0,
+        "energy": 0.5,
+        "engagement": 0.5,
+    })
+    speaker_words: Counter = field(default_factory=Counter)
+    llm_speaking_time: Dict[str, Any] = field(default_factory=dict)
+    keyword_counts: Counter = field(default_factory=Counter)
+    analyses: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def speaking_time(self) -> Dict[str, Any]:
+        """Talk share per speaker from transcript labels, LLM estimate otherwise"""
+        total = sum(self.speaker_words.values())
+        if not total:
+            return self.llm_speaking_time
+        return {speaker: round(100.0 * words / total, 1) for speaker, words in self.speaker_words.most_common()}
+
+    @property
+    def keywords(self) -> List[str]:
+        return [keyword for keyword, _ in self.keyword_counts.most_common(10)]
+
+    def known_findings(self, limit: int = 15) -> Dict[str, List[str]]:
+        """Most recent finding texts per type, used to tell the LLM what it already reported"""
+        return {
+            key: [item.get(text_key, "") for item in self.findings[key][-limit:]]
+            for key, text_key in FINDING_KEYS.items()
+        }
+
+
+class LiveSessionStore:
+    """
+    In-process store of live session states
+
+    Callers keep sending the whole (or a sliding window of the) transcript;
+    the store finds where the previously analyzed text ends and hands back
+    only the new delta.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, tail_chars: int = 200, max_delta_chars: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or int(os.getenv("LIVE_SESSION_TTL_SECONDS", "10800"))
+        self.tail_chars = tail_chars
+        self.max_delta_chars = max_delta_chars or int(os.getenv("LIVE_MAX_DELTA_CHARS", "8000"))
+
+        self._sessions: Dict[str, LiveSessionState] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def get(self, live_session_id: str) -> Optional[LiveSessionState]:
+        return self._sessions.get(live_session_id)
+
+    def get_or_create(self, live_session_id: str, meeting_id: str) -> LiveSessionState:
+        """Get session state, creating it on first use"""
+        self._evict_expired()
+        state = self._sessions.get(live_session_id)
+        if state is None:
+            state = LiveSessionState(live_session_id=live_session_id, meeting_id=meeting_id)
+            self._sessions[live_session_id] = state
+            logger.info(f"🎬 Live session started: {live_session_id}")
+        return state
+
+    def lock(self, live_session_id: str) -> asyncio.Lock:
+        """Per-session lock serializing analyses of the same session"""
+        if live_session_id not in self._locks:
+            self._locks[live_session_id] = asyncio.Lock()
+        return self._locks[live_session_id]
+
+    def end(self, live_session_id: str) -> Optional[LiveSessionState]:
+        """Drop a session, returning its final state"""
+        self._locks.pop(live_session_id, None)
+        return self._sessions.pop(live_session_id, None)
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        for session_id in [sid for sid, s in self._sessions.items() if s.updated_at < cutoff]:
+            self.end(session_id)
+            logger.info(f"⌛ Live session expired: {session_id}")
+
+    def compute_delta(self, state: LiveSessionState, context: str) -> str:
+        """
+        Return the part of context not analyzed yet
+
+        The tail of the analyzed text is located in the new context; anything
+        after it is new. If the tail isn't found the caller has moved to a
+        non-overlapping window and the whole context is new.
+        """
+        if not state.tail:
+            return context
+
+        position = context.rfind(state.tail)
+        if position >= 0:
+            return context[position + len(state.tail):]
+
+        # Retry with a shorter anchor in case the window start cut into the tail
+        anchor = state.tail[-min(len(state.tail), 60):]
+        position = context.rfind(anchor)
+        if position >= 0:
+            return context[position + len(anchor):]
+
+        return context
+
+    def take_delta(self, delta: str) -> Tuple[str, int]:
+        """
+        Bound a delta to max_delta_chars (keeping the most recent text)
+
+        Returns (text to analyze, chars skipped).
+        """
+        if len(delta) <= self.max_delta_chars:
+            return delta, 0
+        skipped = len(delta) - self.max_delta_chars
+        return delta[skipped:], skipped
+
+    def mark_analyzed(self, state: LiveSessionState, delta: str):
+        """Advance the analyzed offset past delta"""
+        state.analyzed_chars += len(delta)
+        state.tail = (state.tail + delta)[-self.tail_chars:]
+        for speaker, text in _SPEAKER_LINE.findall(delta):
+            state.speaker_words[speaker.strip()] += len(text.split())
+        state.updated_at = time.time()
+
+    def merge(self, state: LiveSessionState, result: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Merge new findings into the accumulated state
+
+        Duplicates (same or near-same text) update the existing entry with any
+        newly filled fields and the higher confidence. Returns counts of newly
+        added findings per type.
+        """
+        added = {}
+        for key, text_key in FINDING_KEYS.items():
+            added[key] = 0
+            for item in result.get(key) or []:
+                if not isinstance(item, dict) or not item.get(text_key):
+                    continue
+                normalized = _normalize(str(item[text_key]))
+                existing = next(
+                    (e for e in state.findings[key] if _is_duplicate(_normalize(str(e.get(text_key, ""))), normalized)),
+                    None,
+                )
+                if existing is None:
+                    state.findings[key].append(item)
+                    added[key] += 1
+                    continue
+                for field_name, value in item.items():
+                    if value and not existing.get(field_name):
+                        existing[field_name] = value
+                if float(item.get("confidence") or 0) > float(existing.get("confidence") or 0):
+                    existing["confidence"] = item["confidence"]
+
+        if result.get("summary"):
+            state.summary = str(result["summary"])
+        if isinstance(result.get("toneAnalysis"), dict) and result["toneAnalysis"]:
+            state.tone_analysis = result["toneAnalysis"]
+        if isinstance(result.get("speakingTime"), dict) and result["speakingTime"]:
+            state.llm_speaking_time = result["speakingTime"]
+        for keyword in result.get("keywords") or []:
+            if isinstance(keyword, str) and keyword.strip():
+                state.keyword_counts[keyword.strip().lower()] += 1
+
+        state.analyses += 1
+        state.updated_at = time.time()
+        return added
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self._sessions),
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class LiveAnalysisScheduler:
+    """
+    Debounces pushed transcript deltas for one session into single analyses
+
+    Deltas are buffered in state.pending. An analysis starts once no new delta
+    arrived for debounce_ms, or max_wait_ms after the oldest buffered delta.
+    A delta arriving while an analysis is in flight cancels it and the next
+    analysis covers the whole buffer, unless the oldest buffered text already
+    waited max_wait_ms, in which case the running analysis is left to finish
+    so a steady stream of deltas can't starve the session. A failed analysis
+    keeps its text buffered and is retried with exponential backoff.
+    """
+
+    # Longest wait before retrying a failed analysis, seconds
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(
+        self,
+        store: "LiveSessionStore",
+        state: LiveSessionState,
+        analyze: Callable[[LiveSessionState, str], Awaitable[None]],
+        publish: Callable[[LiveSessionState], Awaitable[None]],
+        on_error: Optional[Callable[[Exception], Awaitable[None]]] = None,
+        debounce_ms: Optional[float] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.store = store
+        self.state = state
+        self.analyze = analyze
+        self.publish = publish
+        self.on_error = on_error
+        self.debounce = (debounce_ms if debounce_ms is not None else float(os.getenv("LIVE_DEBOUNCE_MS", "1500"))) / 1000.0
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("LIVE_MAX_WAIT_MS", "8000"))) / 1000.0
+
+        self._pending_since: Optional[float] = time.monotonic() if state.pending else None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._disconnected = False
+
+    def push(self, text: str):
+        """Buffer a transcript delta and (re)schedule analysis"""
+        if not text:
+            return
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        else:
+            LIVE_DELTAS_DEBOUNCED.inc()
+        self.state.pending += text
+        self._schedule()
+
+    def _schedule(self):
+        now = time.monotonic()
+        if self._inflight and not self._inflight.done():
+            if now - self._pending_since >= self.max_wait:
+                # Let it finish; _run reschedules for the remaining buffer
+                return
+            self._inflight.cancel()
+            LIVE_ANALYSES_CANCELLED.inc()
+
+        if self._timer:
+            self._timer.cancel()
+        delay = min(self.debounce, max(0.0, self._pending_since + self.max_wait - now))
+        self._timer = asyncio.get_running_loop().call_later(delay, self._start)
+
+    def _retry(self):
+        """Re-run a failed analysis of the buffered text after a backoff"""
+        delay = min(self.MAX_RETRY_DELAY, max(self.debounce, 0.1) * 2 ** (self._failures - 1))
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._start)
+        logger.info(f"Retrying live analysis for {self.state.live_session_id} in {delay:.1f}s")
+
+    def _start(self):
+        self._timer = None
+        if self._disconnected or (self._inflight and not self._inflight.done()):
+            return
+        self._inflight = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """Analyze the current buffer and publish the updated state"""
+        try:
+            async with self.store.lock(self.state.live_session_id):
+                size = len(self.state.pending)
+                if not size:
+                    return
+                text, skipped = self.store.take_delta(self.state.pending)
+                if skipped:
+                    logger.info(f"Live delta for {self.state.live_session_id} capped, skipped {skipped} older chars")
+                await self.analyze(self.state, text)
+
+                consumed = self.state.pending[:size]
+                self.state.pending = self.state.pending[size:]
+                self.store.mark_analyzed(self.state, consumed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Live analysis failed for {self.state.live_session_id}: {e}")
+            self._failures += 1
+            if self.on_error:
+                await self._send(self.on_error, e)
+            if self.state.pending and not self._disconnected:
+                self._retry()
+            return
+
+        self._failures = 0
+        self._pending_since = time.monotonic() if self.state.pending else None
+        await self._send(self.publish, self.state)
+        if self.state.pending and not self._disconnected:
+            self._schedule()
+
+    async def _send(self, callback: Callable[[Any], Awaitable[None]], arg: Any):
+        """Deliver to the client; a closed socket stops further analyses instead of failing the task"""
+        try:
+            await callback(arg)
+        except (WebSocketDisconnect, RuntimeError) as e:
+            logger.info(f"Live session {self.state.live_session_id} client gone, stopping analyses: {e}")
+            self._disconnected = True
+
+    async def flush(self):
+        """Analyze buffered text now and wait for the result"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._inflight and not self._inflight.done():
+            await asyncio.gather(self._inflight, return_exceptions=True)
+        if self.state.pending:
+            self._start()
+            await asyncio.gather(self._inflight, return_exceptions=True)
+
+    async def close(self):
+        """Stop pending and in-flight analyses; buffered text stays in state.pending"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._inflight and not self._inflight.done():
+            self._inflight.cancel()
+            await asyncio.gather(self._inflight, return_exceptions=True)
+
+
+# Singleton instance
+_store_instance: Optional[LiveSessionStore] = None
+
+
+def get_live_session_store() -> LiveSessionStore:
+    """Get or create live session store instance"""
+    global _store_instance
+    if _store_instance is None:
+        _store_instance = LiveSessionStore()
+    return _store_instance
@@ -0,0 +1,290 @@
+"""
+Model Residency Manager
+Keeps locally loaded models within a memory budget: measures each model's
+real footprint after loading, evicts idle models (LRU or LFU) before a new
+load would exceed the budget, and never evicts pinned or in-use models
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+RESIDENT_BYTES = Gauge(
+    'local_model_resident_bytes',
+    'Measured memory footprint of resident local models',
+    ['model'],
+)
+RESIDENCY_BUDGET = Gauge(
+    'local_model_residency_budget_bytes',
+    'Memory budget for resident local models',
+)
+RESIDENCY_EVICTIONS = Counter(
+    'local_model_evictions_total',
+    'Local models unloaded to stay within the memory budget',
+    ['model'],
+)
+
+GB = 1024 ** 3
+
+
+class ResidencyBudgetExceeded(RuntimeError):
+    """Raised when a model can't be loaded without evicting pinned or in-use models"""
+
+
+@dataclass
+class ResidentModel:
+    """A loaded model and its residency bookkeeping"""
+    key: str  # loader cache key, e.g. "qwen2.5-7b_4bit_auto"
+    model_name: str
+    kind: str  # "llm", "embedding", ...
+    footprint_bytes: int
+    pinned: bool = False
+    refs: int = 0  # in-flight users; never evicted while > 0
+    uses: int = 0
+    loaded_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def measure_footprint(model: Any) -> int:
+    """Bytes held by a model's weights and buffers (on any device)"""
+    model_path = getattr(model, "model_path", None)
+    if isinstance(model_path, str) and os.path.isfile(model_path):
+        return os.path.getsize(model_path)  # llama.cpp: memory-mapped GGUF weights
+
+    if hasattr(model, "get_memory_footprint"):
+        try:
+            return int(model.get_memory_footprint())
+        except Exception as e:
+            logger.debug(f"get_memory_footprint failed, summing tensors: {e}")
+
+    total = 0
+    seen = set()
+    for tensors in (getattr(model, "parameters", None), getattr(model, "buffers", None)):
+        if tensors is None:
+            continue
+        for tensor in tensors():
+            if tensor.data_ptr() in seen:
+                continue  # tied weights
+            seen.add(tensor.data_ptr())
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def system_memory_bytes() -> Optional[int]:
+    """Memory available to this process: the cgroup limit in a container, else physical RAM"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit() and int(value) < 1 << 60:
+                return int(value)
+        except OSError:
+            continue
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ModelResidencyManager:
+    """
+    Memory-budgeted residency for locally loaded models
+
+    Loaders call reserve() with an estimate before loading (evicting idle
+    models to make room) and admit() with the loaded model afterwards, which
+    replaces the estimate with the measured footprint. Eviction candidates
+    are unpinned models with no references, least recently (lru) or least
+    frequently (lfu) used first; the unload callback frees them.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: Optional[int] = None,
+        policy: Optional[str] = None,
+        pinned: Optional[str] = None,
+        unload: Optional[Callable[[str], None]] = None,
+    ):
+        if budget_bytes is None:
+            budget_gb = os.getenv("LOCAL_MODEL_MEMORY_BUDGET_GB")
+            if budget_gb:
+                budget_bytes = int(float(budget_gb) * GB)
+            else:
+                available = system_memory_bytes()
+                fraction = float(os.getenv("LOCAL_MODEL_MEMORY_FRACTION", "0.75"))
+                budget_bytes = int(available * fraction) if available else 0
+        self.budget_bytes = budget_bytes  # 0 = unlimited
+        self.policy = (policy or os.getenv("LOCAL_MODEL_EVICTION_POLICY", "lru")).lower()
+        if self.policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {self.policy}")
+        pinned = pinned if pinned is not None else os.getenv("LOCAL_MODEL_PINNED", "")
+        self.pinned_names = {name.strip() for name in pinned.split(",") if name.strip()}
+        self.unload = unload
+
+        self._models: Dict[str, ResidentModel] = {}
+        self._reserved: Dict[str, int] = {}  # loads in progress: key -> estimated bytes
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+        RESIDENCY_BUDGET.set(self.budget_bytes)
+        budget = f"{self.budget_bytes / GB:.1f}GB" if self.budget_bytes else "unlimited"
+        logger.info(f"🧠 Model residency: budget {budget}, {self.policy} eviction, pinned {sorted(self.pinned_names) or 'none'}")
+
+    @property
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(m.footprint_bytes for m in self._models.values()) + sum(self._reserved.values())
+
+    def reserve(self, key: str, estimate_bytes: int):
+        """
+        Make room for a model about to be loaded
+
+        Raises ResidencyBudgetExceeded if enough memory can't be freed.
+        """
+        with self._lock:
+            self._make_room(estimate_bytes, exclude=key)
+            self._reserved[key] = estimate_bytes
+
+    def cancel(self, key: str):
+        """Drop the reservation of a load that failed"""
+        with self._lock:
+            self._reserved.pop(key, None)
+
+    def admit(self, key: str, model_name: str, model: Any, kind: str = "llm", pinned: bool = False) -> ResidentModel:
+        """Register a loaded model with its measured footprint"""
+        footprint = measure_footprint(model)
+        with self._lock:
+            estimate = self._reserved.pop(key, 0)
+            entry = ResidentModel(
+                key=key,
+                model_name=model_name,
+                kind=kind,
+                footprint_bytes=footprint or estimate,
+                pinned=pinned or model_name in self.pinned_names or key in self.pinned_names,
+                uses=1,
+            )
+            self._models[key] = entry
+            RESIDENT_BYTES.labels(model=key).set(entry.footprint_bytes)
+
+            # The estimate may have been low: evict others until back within budget
+            try:
+                self._make_room(0, exclude=key)
+            except ResidencyBudgetExceeded as e:
+                logger.warning(f"Model residency over budget after loading {key}: {e}")
+
+        logger.info(f"📏 {key} footprint: {entry.footprint_bytes / GB:.2f}GB (estimated {estimate / GB:.2f}GB)")
+        return entry
+
+    def is_resident(self, key: str) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def touch(self, key: str):
+        """Record a use of a resident model (cache hit)"""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                entry.uses += 1
+                entry.last_used = time.monotonic()
+
+    def acquire(self, key: str):
+        """Hold a reference so the model isn't evicted"""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                entry.refs += 1
+                entry.uses += 1
+                entry.last_used = time.monotonic()
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                entry.last_used = time.monotonic()
+
+    @contextmanager
+    def in_use(self, key: str) -> Iterator[None]:
+        """Hold a reference for the duration of the block (e.g. one generation)"""
+        self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    def pin(self, name: str):
+        """Never evict a model (by registry name or cache key), including future loads"""
+        with self._lock:
+            self.pinned_names.add(name)
+            for entry in self._models.values():
+                if name in (entry.model_name, entry.key):
+                    entry.pinned = True
+
+    def unpin(self, name: str):
+        with self._lock:
+            self.pinned_names.discard(name)
+            for entry in self._models.values():
+                if name in (entry.model_name, entry.key):
+                    entry.pinned = False
+
+    def forget(self, key: str):
+        """Drop bookkeeping for a model that was unloaded"""
+        with self._lock:
+            if self._models.pop(key, None) is not None:
+                RESIDENT_BYTES.remove(key)
+
+    def _victim(self, exclude: str) -> Optional[ResidentModel]:
+        candidates = [
+            entry for entry in self._models.values()
+            if entry.key != exclude and not entry.pinned and entry.refs == 0
+        ]
+        if not candidates:
+            return None
+        if self.policy == "lfu":
+            return min(candidates, key=lambda entry: (entry.uses, entry.last_used))
+        return min(candidates, key=lambda entry: entry.last_used)
+
+    def _make_room(self, needed_bytes: int, exclude: str):
+        """Evict idle models until needed_bytes more fit in the budget (lock held)"""
+        if not self.budget_bytes:
+            return
+        while self.used_bytes + needed_bytes > self.budget_bytes:
+            victim = self._victim(exclude)
+            if victim is None:
+                raise ResidencyBudgetExceeded(
+                    f"Need {needed_bytes / GB:.2f}GB but {self.used_bytes / GB:.2f}GB of the "
+                    f"{self.budget_bytes / GB:.2f}GB budget is held by pinned or in-use models"
+                )
+            logger.info(f"♻️ Evicting {victim.key} ({victim.footprint_bytes / GB:.2f}GB, {victim.uses} uses)")
+            self.forget(victim.key)
+            if self.unload is not None:
+                self.unload(victim.key)
+            self.evictions += 1
+            RESIDENCY_EVICTIONS.labels(model=victim.key).inc()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_gb": round(self.budget_bytes / GB, 2),
+                "used_gb": round(self.used_bytes / GB, 2),
+                "policy": self.policy,
+                "evictions": self.evictions,
+                "models": {
+                    entry.key: {
+                        "kind": entry.kind,
+                        "footprint_gb": round(entry.footprint_bytes / GB, 2),
+                        "pinned": entry.pinned,
+                        "refs": entry.refs,
+                        "uses": entry.uses,
+                    }
+                    for entry in self._models.values()
+                },
+            }
@@ -0,0 +1,189 @@
+"""
+Prompt Packer
+Fits a system prompt, a user prompt template and ranked optional content
+(transcripts, context chunks, meeting history, conversation turns) into the
+target model's context window minus the output budget, using real token counts
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from .tokenizer_service import TOKENS_PER_MESSAGE, TokenizerService, get_tokenizer_service
+
+logger = logging.getLogger(__name__)
+
+# Used when the model isn't in any provider registry (vLLM/Ollama model names)
+DEFAULT_CONTEXT_WINDOW = 8192
+
+_SLOT = re.compile(r"\{(\w+)\}")
+
+
+@dataclass
+class PromptSection:
+    """
+    Optional content for one {slot} of the user prompt template
+
+    Items are given highest priority first and packed in that order; an
+    item that doesn't fit is skipped in favour of smaller ones after it.
+    With truncate=True the first item that doesn't fit is instead cut to
+    the remaining budget and packing stops (use for a long transcript).
+    """
+    slot: str
+    items: Sequence[str]
+    separator: str = "\n\n"
+    truncate: bool = False
+    max_tokens: Optional[int] = None  # cap for this section
+    empty: str = ""  # slot text when nothing fits
+
+
+@dataclass
+class PackedPrompt:
+    """Result of PromptPacker.pack"""
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    budget: int
+    output_tokens: int
+    included: Dict[str, List[int]] = field(default_factory=dict)  # slot -> indices of packed items
+    dropped: Dict[str, int] = field(default_factory=dict)  # slot -> items left out
+    truncated: List[str] = field(default_factory=list)  # slots whose last item was cut
+
+    @property
+    def complete(self) -> bool:
+        return not self.truncated and not any(self.dropped.values())
+
+
+class PromptPacker:
+    """
+    Packs prompts for one model
+
+    Budget = context_window - output_tokens - safety margin. The system
+    prompt and the template text are required; conversation history is
+    packed next (newest turns first, up to history_share of the budget),
+    then sections in the order given. Approximate tokenizers get a larger
+    margin since their counts can be off by a few percent.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        context_window: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        tokenizer: Optional[TokenizerService] = None,
+        safety_margin: Optional[int] = None,
+    ):
+        self.model = model
+        self.context_window = context_window or DEFAULT_CONTEXT_WINDOW
+        self.max_output_tokens = max_output_tokens
+        self.tokenizer = tokenizer or get_tokenizer_service()
+        self.safety_margin = safety_margin if safety_margin is not None else int(os.getenv("PROMPT_SAFETY_MARGIN_TOKENS", "64"))
+
+    def count(self, text: str) -> int:
+        return self.tokenizer.count(text, self.model)
+
+    @staticmethod
+    def _fill(template: str, fills: Dict[str, str]) -> str:
+        """Substitute {slot} placeholders in one pass (content may itself contain braces)"""
+        return _SLOT.sub(lambda match: fills.get(match.group(1), match.group(0)), template)
+
+    def _margin(self) -> int:
+        if self.tokenizer.get(self.model).exact:
+            return self.safety_margin
+        return max(self.safety_margin, self.context_window // 10)
+
+    def pack(
+        self,
+        system: str,
+        user: str,
+        output_tokens: int,
+        sections: Sequence[PromptSection] = (),
+        history: Sequence[Dict[str, str]] = (),
+        history_share: float = 0.25,
+    ) -> PackedPrompt:
+        """
+        Build messages that fit the context window
+
+        user is a template whose {slot} placeholders are filled from sections
+        (other braces are left alone). Raises ValueError if the required
+        parts alone don't fit.
+        """
+        if self.max_output_tokens:
+            output_tokens = min(output_tokens, self.max_output_tokens)
+        # Never let the output budget crowd out the prompt entirely
+        output_tokens = min(output_tokens, self.context_window // 2)
+        budget = self.context_window - output_tokens - self._margin()
+
+        skeleton = self._fill(user, {section.slot: "" for section in sections})
+        used = self.tokenizer.count_messages(
+            [{"role": "system", "content": system}, {"role": "user", "content": skeleton}], self.model
+        )
+        if used > budget:
+            raise ValueError(
+                f"Prompt needs {used} tokens but {self.model} has only {budget} "
+                f"of its {self.context_window}-token context left after the output budget"
+            )
+
+        # Conversation history: newest turns first, whole messages only
+        history_messages: List[Dict[str, str]] = []
+        history_budget = min(budget - used, int(budget * history_share))
+        for message in reversed(list(history)):
+            cost = self.count(message.get("content", "")) + TOKENS_PER_MESSAGE
+            if cost > history_budget:
+                break
+            history_messages.insert(0, message)
+            history_budget -= cost
+            used += cost
+        dropped = {"history": len(history) - len(history_messages)} if history else {}
+
+        included: Dict[str, List[int]] = {}
+        truncated: List[str] = []
+        fills: Dict[str, str] = {}
+        for section in sections:
+            available = budget - used
+            if section.max_tokens is not None:
+                available = min(available, section.max_tokens)
+
+            separator_tokens = self.count(section.separator)
+            parts: List[str] = []
+            indices: List[int] = []
+            for index, item in enumerate(section.items):
+                cost = self.count(item) + (separator_tokens if parts else 0)
+                if cost <= available:
+                    parts.append(item)
+                    indices.append(index)
+                    available -= cost
+                    used += cost
+                    continue
+                if not section.truncate:
+                    continue  # a smaller, lower-ranked item may still fit
+                room = available - (separator_tokens if parts else 0)
+                cut = self.tokenizer.truncate(item, room, self.model) if room > 0 else ""
+                if cut:
+                    used += self.count(cut) + (separator_tokens if parts else 0)
+                    parts.append(cut)
+                    indices.append(index)
+                    truncated.append(section.slot)
+                break
+
+            included[section.slot] = indices
+            dropped[section.slot] = len(section.items) - len(indices)
+            fills[section.slot] = section.separator.join(parts) if parts else section.empty
+
+        packed = PackedPrompt(
+            messages=[{"role": "system", "content": system}, *history_messages, {"role": "user", "content": self._fill(user, fills)}],
+            prompt_tokens=used,
+            budget=budget,
+            output_tokens=output_tokens,
+            included=included,
+            dropped=dropped,
+            truncated=truncated,
+        )
+        if not packed.complete:
+            left_out = {slot: count for slot, count in dropped.items() if count}
+            logger.info(
+                f"✂️ Packed prompt for {self.model}: {used}/{budget} tokens, "
+                f"dropped {left_out or 'nothing'}, truncated {truncated or 'nothing'}"
+            )
+        return packed
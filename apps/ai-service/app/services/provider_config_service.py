@@ -50,10 +50,13 @@ class ProviderConfigService:
                 provider_type=ProviderType.OPENAI,
                 enabled=os.getenv("OPENAI_ENABLED", "true").lower() == "true",
                 api_key=os.getenv("OPENAI_API_KEY"),
+                api_base=os.getenv("OPENAI_BASE_URL"),
                 organization=os.getenv("OPENAI_ORGANIZATION"),
                 priority=int(os.getenv("OPENAI_PRIORITY", "50")),
                 max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "3")),
                 timeout=int(os.getenv("OPENAI_TIMEOUT", "60")),
+                rate_limit_rpm=int(os.getenv("OPENAI_RATE_LIMIT_RPM", "0")) or None,
+                rate_limit_tpm=int(os.getenv("OPENAI_RATE_LIMIT_TPM", "0")) or None,
             )
             logger.info("✅ OpenAI configuration loaded from environment")
 
@@ -66,6 +69,9 @@ class ProviderConfigService:
                 priority=int(os.getenv("ANTHROPIC_PRIORITY", "60")),
                 max_retries=int(os.getenv("ANTHROPIC_MAX_RETRIES", "3")),
                 timeout=int(os.getenv("ANTHROPIC_TIMEOUT", "60")),
+                rate_limit_rpm=int(os.getenv("ANTHROPIC_RATE_LIMIT_RPM", "0")) or None,
+                rate_limit_tpm=int(os.getenv("ANTHROPIC_RATE_LIMIT_TPM", "0")) or None,
+                custom_config={"chat_model": os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")},
             )
             logger.info("✅ Anthropic configuration loaded from environment")
 
@@ -21,8 +21,6 @@ from .base_provider import (
 )
 
 from .openai_provider import OpenAIProvider
-from .anthropic_provider import AnthropicProvider
-from .local_provider import LocalProvider
 from .provider_manager import (
     ProviderManager,
     ProviderStrategy,
@@ -60,3 +58,14 @@ __all__ = [
     "get_provider_manager",
     "initialize_providers",
 ]
+
+
+def __getattr__(name):
+    # The Anthropic SDK and torch take seconds to import; their providers load on first use
+    if name == "AnthropicProvider":
+        from .anthropic_provider import AnthropicProvider
+        return AnthropicProvider
+    if name == "LocalProvider":
+        from .local_provider import LocalProvider
+        return LocalProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,7 +5,7 @@ Supports: Claude 3.5 Sonnet, Claude 3 Opus, Claude 3 Haiku
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional, AsyncIterator
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
 import anthropic
 from anthropic import Anthropic, AsyncAnthropic
 import os
@@ -27,6 +27,7 @@ from .base_provider import (
     VisionRequest,
     VisionResponse,
 )
+from ..tokenizer_service import get_tokenizer_service
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,8 @@ logger = logging.getLogger(__name__)
 class AnthropicProvider(AIProvider):
     """Anthropic (Claude) API provider implementation"""
 
+    default_chat_model = "claude-3-5-sonnet-20241022"
+
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
 
@@ -46,14 +49,14 @@ class AnthropicProvider(AIProvider):
             api_key=api_key,
             base_url=config.api_base,
             timeout=config.timeout,
-            max_retries=config.max_retries,
+            max_retries=self.client_max_retries(),
         )
 
         self.async_client = AsyncAnthropic(
             api_key=api_key,
             base_url=config.api_base,
             timeout=config.timeout,
-            max_retries=config.max_retries,
+            max_retries=self.client_max_retries(),
         )
 
         # Model registry
@@ -160,7 +163,11 @@ class AnthropicProvider(AIProvider):
             logger.error(f"Anthropic chat completion failed: {e}")
             raise
 
-    async def chat_completion_stream(self, request: ChatRequest) -> AsyncIterator[str]:
+    async def chat_completion_stream(
+        self,
+        request: ChatRequest,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
         """Generate streaming chat completion"""
         try:
             model = request.model or "claude-3-5-sonnet-20241022"
@@ -185,6 +192,18 @@ class AnthropicProvider(AIProvider):
                 async for text in stream.text_stream:
                     yield text
 
+                if metadata is not None:
+                    final = await stream.get_final_message()
+                    metadata.update(
+                        model=final.model,
+                        finish_reason=final.stop_reason,
+                        usage={
+                            "prompt_tokens": final.usage.input_tokens,
+                            "completion_tokens": final.usage.output_tokens,
+                            "total_tokens": final.usage.input_tokens + final.usage.output_tokens,
+                        },
+                    )
+
         except Exception as e:
             logger.error(f"Anthropic streaming failed: {e}")
             raise
@@ -241,22 +260,23 @@ class AnthropicProvider(AIProvider):
             logger.error(f"Anthropic vision failed: {e}")
             raise
 
+    def chat_model(self, model: Optional[str]) -> Optional[str]:
+        """Claude models not in the registry (newer releases) are passed through"""
+        if model and model.startswith("claude"):
+            return model
+        return super().chat_model(model)
+
     def list_models(self) -> List[ModelInfo]:
         """List available models"""
         return list(self.models.values())
 
     async def health_check(self) -> bool:
-        """Check Anthropic API health"""
+        """Check Anthropic API health (models list: authenticated but not billed)"""
         try:
-            # Simple test request
-            await self.async_client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=10,
-                messages=[{"role": "user", "content": "Hi"}],
-            )
+            await self.async_client.models.list(limit=1)
             return True
         except Exception as e:
-            logger.warning(f"Anthropic health check failed: {e}")
+            logger.debug(f"Anthropic health check failed: {e}")
             return False
 
     def get_capabilities(self) -> List[ModelCapability]:
@@ -280,9 +300,7 @@ class AnthropicProvider(AIProvider):
             if not model_info:
                 return {"input_cost": 0.0, "output_cost": 0.0, "total_cost": 0.0}
 
-            # Token estimation
-            total_chars = sum(len(msg.content) for msg in request.messages)
-            estimated_input_tokens = total_chars // 4
+            estimated_input_tokens = get_tokenizer_service().count_messages(request.messages, model_id)
             estimated_output_tokens = request.max_tokens or 1000
 
             input_cost = (estimated_input_tokens / 1000) * model_info.cost_per_1k_input
@@ -45,6 +45,7 @@ class ProviderConfig:
     max_retries: int = 3
     timeout: int = 60
     rate_limit_rpm: Optional[int] = None  # Requests per minute
+    rate_limit_tpm: Optional[int] = None  # Tokens per minute
     custom_config: Dict[str, Any] = field(default_factory=dict)
 
 
@@ -62,6 +63,8 @@ class ModelInfo:
     supports_streaming: bool = False
     supports_function_calling: bool = False
     description: Optional[str] = None
+    draft_model: Optional[str] = None  # registry key of a small same-tokenizer model for speculative decoding
+    speculative: Optional[Dict[str, Any]] = None  # live speculative decoding stats (acceptance rate, speedup)
 
 
 @dataclass
@@ -109,6 +112,8 @@ class ChatRequest:
     stop: Optional[List[str]] = None
     stream: bool = False
     functions: Optional[List[Dict[str, Any]]] = None
+    response_format: Optional[Dict[str, Any]] = None  # e.g. {"type": "json_object"}
+    response_schema: Optional[Dict[str, Any]] = None  # JSON schema local models decode within
 
 
 @dataclass
@@ -162,6 +167,11 @@ class AIProvider(ABC):
     Provides unified interface for OpenAI, Anthropic, Local models, etc.
     """
 
+    # Model used by generate_embedding when the request doesn't name one
+    default_embedding_model: Optional[str] = None
+    # Model used by chat_completion when the request names none of ours
+    default_chat_model: Optional[str] = None
+
     def __init__(self, config: ProviderConfig):
         self.config = config
         self.provider_type = config.provider_type
@@ -178,8 +188,17 @@ class AIProvider(ABC):
         pass
 
     @abstractmethod
-    async def chat_completion_stream(self, request: ChatRequest) -> AsyncIterator[str]:
-        """Generate streaming chat completion"""
+    async def chat_completion_stream(
+        self,
+        request: ChatRequest,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate streaming chat completion
+
+        If metadata is given it receives model, finish_reason and usage once
+        the stream is exhausted.
+        """
         pass
 
     @abstractmethod
@@ -215,6 +234,46 @@ class AIProvider(ABC):
         """Get provider priority (lower = higher priority)"""
         return self.config.priority
 
+    def get_model_info(self, model: Optional[str]) -> Optional[ModelInfo]:
+        """Registry entry for a model, by registry key or model_id"""
+        if not model:
+            return None
+        models = getattr(self, "models", {})
+        model_info = models.get(model) or models.get(model.split("/")[-1])
+        if model_info is None:
+            model_info = next((info for info in models.values() if info.model_id == model), None)
+        return model_info
+
+    def chat_model(self, model: Optional[str]) -> Optional[str]:
+        """
+        Model to serve a chat request for `model` with
+
+        Requests fall back and hedge across providers, so a model from another
+        provider (e.g. the OpenAI LLM_MODEL) is swapped for the configured
+        custom_config["chat_model"] or this provider's default.
+        """
+        if model and self.get_model_info(model) is not None:
+            return model
+        return self.config.custom_config.get("chat_model") or self.default_chat_model or model
+
+    def usage_cost(self, model: Optional[str], usage: Optional[Dict[str, Any]]) -> float:
+        """USD cost of reported token usage at the model's list prices"""
+        model_info = self.get_model_info(model)
+        if model_info is None or not usage:
+            return 0.0
+        return (
+            (usage.get("prompt_tokens") or 0) / 1000 * model_info.cost_per_1k_input
+            + (usage.get("completion_tokens") or 0) / 1000 * model_info.cost_per_1k_output
+        )
+
+    def is_rate_limited(self) -> bool:
+        """Whether ProviderManager enforces rate limits (and owns 429 retries) for this provider"""
+        return bool(self.config.rate_limit_rpm or self.config.rate_limit_tpm)
+
+    def client_max_retries(self) -> int:
+        """SDK-level retries; disabled when ProviderManager's rate limiter retries calls itself"""
+        return 0 if self.is_rate_limited() else self.config.max_retries
+
     def supports_capability(self, capability: ModelCapability) -> bool:
         """Check if provider supports capability"""
         return capability in self.get_capabilities()
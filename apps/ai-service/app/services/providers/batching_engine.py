@@ -0,0 +1,474 @@
+"""
+Continuous Batching Engine
+In-process scheduler for one local causal LM: new sequences are prefilled
+and admitted into the running decode batch at token boundaries, every
+decode step advances all active sequences at once, and tokens are streamed
+per sequence through asyncio queues
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import torch
+import torch.nn.functional as F
+from prometheus_client import Counter, Gauge, Histogram
+
+from .constrained_decoding import JSONSchemaConstraint, TokenVocabulary
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+BATCH_SIZE = Histogram(
+    'local_batch_size',
+    'Sequences advanced per decode step',
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+BATCH_QUEUE_WAIT = Histogram(
+    'local_batch_queue_wait_seconds',
+    'Time from submission to admission into the decode batch',
+)
+BATCH_TOKENS_GENERATED = Counter(
+    'local_batch_tokens_generated_total',
+    'Tokens generated by the continuous batching engine',
+)
+BATCH_ACTIVE = Gauge(
+    'local_batch_active_sequences',
+    'Sequences currently in the decode batch',
+)
+BATCH_WAITING = Gauge(
+    'local_batch_waiting_sequences',
+    'Sequences waiting for admission',
+)
+
+KVLayers = List[Tuple[torch.Tensor, torch.Tensor]]
+
+
+def _cache_layers(cache: Any) -> KVLayers:
+    """Per-layer (key, value) tensors of a transformers cache or legacy tuple"""
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "key_cache"):
+        return list(zip(cache.key_cache, cache.value_cache))
+    return [(k, v) for k, v in cache]
+
+
+def _build_cache(layers: KVLayers) -> Any:
+    """DynamicCache holding the given per-layer tensors"""
+    from transformers import DynamicCache
+
+    cache = DynamicCache()
+    for layer_idx, (k, v) in enumerate(layers):
+        cache.update(k, v, layer_idx)
+    return cache
+
+
+def eos_token_ids(model: Any, tokenizer: Any) -> Set[int]:
+    """End-of-sequence token ids from the tokenizer and the model's generation config"""
+    ids: Set[int] = set()
+    candidates: Iterable[Any] = [
+        getattr(tokenizer, "eos_token_id", None),
+        getattr(getattr(model, "generation_config", None), "eos_token_id", None),
+    ]
+    for candidate in candidates:
+        if isinstance(candidate, int):
+            ids.add(candidate)
+        elif candidate:
+            ids.update(candidate)
+    return ids
+
+
+def _sample(logits: torch.Tensor, temperature: float, top_p: float) -> int:
+    """Next token for one sequence: greedy at temperature 0, else nucleus sampling"""
+    if temperature <= 0:
+        return int(torch.argmax(logits))
+    probs = torch.softmax(logits.float() / temperature, dim=-1)
+    if top_p < 1.0:
+        sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+        cumulative = torch.cumsum(sorted_probs, dim=-1)
+        sorted_probs[(cumulative - sorted_probs) > top_p] = 0.0
+        return int(sorted_ids[torch.multinomial(sorted_probs / sorted_probs.sum(), 1)])
+    return int(torch.multinomial(probs, 1))
+
+
+class GenerationSequence:
+    """
+    One request in the engine
+
+    Created on the event loop; the engine thread pushes decoded text to
+    `queue`. After the stream ends, completion_tokens and finish_reason are
+    set ("stop", "length" or "cancelled"). With a response_schema, engines
+    decode through `constraint` (or their own grammar support) and the
+    sequence stops when the JSON document is complete.
+    """
+
+    def __init__(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        past_key_values: Any = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+        constraint: Optional[JSONSchemaConstraint] = None,
+    ):
+        self.input_ids = input_ids
+        self.past_key_values = past_key_values
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.response_schema = response_schema
+        self.constraint = constraint
+
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.submitted_at = time.monotonic()
+
+        self.generated: List[int] = []
+        self.emitted_text = ""
+        self.finish_reason: Optional[str] = None
+        self.cancelled = False
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.input_ids.shape[1]
+
+    @property
+    def completion_tokens(self) -> int:
+        return len(self.generated)
+
+    def _put(self, kind: str, value: Any = None):
+        """Hand an item to the consumer (called from the engine thread)"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, (kind, value))
+
+    def sample(self, logits: torch.Tensor) -> int:
+        """Next token from this sequence's logits (1-D), within its schema if it has one"""
+        if self.constraint is not None:
+            logits = self.constraint.mask(logits, self.temperature, self.max_new_tokens - len(self.generated))
+        return _sample(logits, self.temperature, self.top_p)
+
+    def append_token(self, token_id: int, tokenizer: Any, eos_token_ids: Set[int]) -> bool:
+        """
+        Record a sampled token and stream its text (called from the engine thread)
+
+        Returns False for end of sequence, which isn't part of the completion.
+        Sets finish_reason and ends the stream once the sequence is done.
+        """
+        added = token_id not in eos_token_ids
+        if not added:
+            self.finish_reason = "stop"
+        else:
+            self.generated.append(token_id)
+            if self.constraint is not None:
+                self.constraint.advance(token_id)
+            # Decode the whole completion so multi-token characters come out whole
+            text = tokenizer.decode(self.generated, skip_special_tokens=True)
+            if not text.endswith("�") and len(text) > len(self.emitted_text):
+                self._put("text", text[len(self.emitted_text):])
+                self.emitted_text = text
+            if self.constraint is not None and self.constraint.done:
+                self.finish_reason = "stop"
+            elif len(self.generated) >= self.max_new_tokens:
+                self.finish_reason = "length"
+
+        if self.finish_reason is not None:
+            self._put("done")
+        return added
+
+    def cancel(self):
+        """Stop generating at the next token boundary"""
+        self.cancelled = True
+
+    async def stream(self) -> AsyncIterator[str]:
+        """Decoded text increments until the sequence finishes"""
+        try:
+            while True:
+                kind, value = await self.queue.get()
+                if kind == "text":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            if self.finish_reason is None:
+                self.cancel()
+
+
+class ContinuousBatchingEngine:
+    """
+    Continuous batching for one model
+
+    The running batch keeps a left-padded KV cache ([batch, heads, length,
+    dim] per layer) plus an attention mask. Each loop iteration:
+    1. Retires finished and cancelled sequences (dropping their cache rows)
+    2. Admits waiting sequences while max_batch_size and max_batch_tokens
+       (padded KV positions across the batch) allow, prefilling each alone
+       (from a cached prompt prefix if one was passed) and padding it in
+    3. Runs one decode step for every active sequence
+
+    Batch state is only touched by the engine thread, and prefill and
+    decode run there one after another.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        max_batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size or int(os.getenv("LOCAL_MAX_BATCH_SIZE", "8"))
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("LOCAL_MAX_BATCH_TOKENS", "32768"))
+        self.eos_token_ids = eos_token_ids(model, tokenizer)
+        self.vocabulary = TokenVocabulary(tokenizer)
+
+        self._waiting: Deque[GenerationSequence] = deque()
+        self._active: List[GenerationSequence] = []
+        self._layers: KVLayers = []
+        self._mask: Optional[torch.Tensor] = None  # [batch, length]
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._draining = False
+        self._thread: Optional[threading.Thread] = None
+        self.steps = 0
+        self.batched_tokens = 0
+        self.tokens_generated = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="local-batching-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = False):
+        """
+        Stop the engine thread
+
+        With drain=True no new sequences are accepted but queued and running
+        ones finish first; otherwise they fail.
+        """
+        if drain:
+            self._draining = True
+        else:
+            self._running = False
+        self._wakeup.set()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the worker thread to exit after stop()"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        past_key_values: Any = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> GenerationSequence:
+        """
+        Queue a prompt (shape [1, length]) for generation
+
+        past_key_values may hold an already prefilled prefix of input_ids;
+        response_schema constrains the output to a JSON document.
+        Must be called from the event loop that consumes the stream.
+        """
+        if not self._running or self._draining:
+            raise RuntimeError("Batching engine is not running")
+        constraint = JSONSchemaConstraint(response_schema, self.vocabulary, self.eos_token_ids) if response_schema else None
+        sequence = GenerationSequence(
+            input_ids, max_new_tokens, temperature, top_p, past_key_values, response_schema, constraint
+        )
+        with self._lock:
+            self._waiting.append(sequence)
+            BATCH_WAITING.set(len(self._waiting))
+        self._wakeup.set()
+        return sequence
+
+    # Engine thread
+
+    def _run(self):
+        logger.info(f"⚙️ Batching engine started (max batch {self.max_batch_size}, max tokens {self.max_batch_tokens})")
+        while self._running:
+            try:
+                self._retire()
+                self._admit()
+                # A sequence whose first sampled token was EOS finished in prefill
+                self._retire()
+                if not self._active:
+                    if self._draining and not self._waiting:
+                        break
+                    self._wakeup.wait(timeout=1.0)
+                    self._wakeup.clear()
+                    continue
+                self._decode_step()
+            except Exception as e:
+                logger.error(f"Batching engine step failed: {e}")
+                self._fail_all(e)
+
+        self._running = False
+        self._fail_all(RuntimeError("Batching engine stopped"))
+
+    def _fail_all(self, error: Exception):
+        with self._lock:
+            sequences = self._active + list(self._waiting)
+            self._waiting.clear()
+        self._active = []
+        self._layers = []
+        self._mask = None
+        for sequence in sequences:
+            if sequence.finish_reason is not None:
+                continue
+            sequence.finish_reason = "error"
+            sequence._put("error", error)
+        BATCH_ACTIVE.set(0)
+        BATCH_WAITING.set(0)
+
+    def _batch_length(self) -> int:
+        return 0 if self._mask is None else self._mask.shape[1]
+
+    def _admit(self):
+        while True:
+            with self._lock:
+                if not self._waiting or len(self._active) >= self.max_batch_size:
+                    break
+                sequence = self._waiting[0]
+                if sequence.cancelled:
+                    self._waiting.popleft()
+                    BATCH_WAITING.set(len(self._waiting))
+                    continue
+                # Padded KV positions once this sequence has decoded to completion
+                length = max(self._batch_length(), sequence.prompt_tokens) + sequence.max_new_tokens
+                if self._active and (len(self._active) + 1) * length > self.max_batch_tokens:
+                    break
+                self._waiting.popleft()
+                BATCH_WAITING.set(len(self._waiting))
+
+            BATCH_QUEUE_WAIT.observe(time.monotonic() - sequence.submitted_at)
+            try:
+                self._prefill(sequence)
+            except Exception as e:
+                logger.error(f"Prefill failed: {e}")
+                sequence.finish_reason = "error"
+                sequence._put("error", e)
+
+    @torch.no_grad()
+    def _prefill(self, sequence: GenerationSequence):
+        """Run the prompt alone, sample its first token and pad it into the batch"""
+        device = self.model.device
+        input_ids = sequence.input_ids.to(device)
+        cache = sequence.past_key_values
+        cached = cache.get_seq_length() if cache is not None and hasattr(cache, "get_seq_length") else 0
+        sequence.past_key_values = None
+
+        outputs = self.model(input_ids=input_ids[:, cached:], past_key_values=cache, use_cache=True)
+        layers = _cache_layers(outputs.past_key_values)
+        length = layers[0][0].shape[2]
+
+        if not self._active:
+            self._layers = layers
+            self._mask = torch.ones((1, length), dtype=torch.long, device=device)
+        else:
+            batch_length = self._batch_length()
+            target = max(batch_length, length)
+            new_pad, batch_pad = target - length, target - batch_length
+            self._layers = [
+                (
+                    torch.cat([F.pad(bk, (0, 0, batch_pad, 0)), F.pad(k, (0, 0, new_pad, 0))], dim=0),
+                    torch.cat([F.pad(bv, (0, 0, batch_pad, 0)), F.pad(v, (0, 0, new_pad, 0))], dim=0),
+                )
+                for (bk, bv), (k, v) in zip(self._layers, layers)
+            ]
+            new_mask = torch.cat(
+                [torch.zeros((1, new_pad), dtype=torch.long, device=device), torch.ones((1, length), dtype=torch.long, device=device)],
+                dim=1,
+            )
+            self._mask = torch.cat([F.pad(self._mask, (batch_pad, 0)), new_mask], dim=0)
+
+        self._active.append(sequence)
+        BATCH_ACTIVE.set(len(self._active))
+        self._append_token(sequence, sequence.sample(outputs.logits[0, -1]))
+
+    @torch.no_grad()
+    def _decode_step(self):
+        """Advance every active sequence by one token"""
+        device = self.model.device
+        batch = len(self._active)
+        input_ids = torch.tensor([[sequence.generated[-1]] for sequence in self._active], device=device)
+        position_ids = self._mask.sum(dim=1, keepdim=True)
+        self._mask = torch.cat([self._mask, torch.ones((batch, 1), dtype=torch.long, device=device)], dim=1)
+
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=self._mask,
+            position_ids=position_ids,
+            past_key_values=_build_cache(self._layers),
+            use_cache=True,
+        )
+        self._layers = _cache_layers(outputs.past_key_values)
+
+        self.steps += 1
+        self.batched_tokens += batch
+        BATCH_SIZE.observe(batch)
+        logits = outputs.logits[:, -1]
+        for row, sequence in enumerate(self._active):
+            if sequence.finish_reason is None:
+                self._append_token(sequence, sequence.sample(logits[row]))
+
+    def _append_token(self, sequence: GenerationSequence, token_id: int):
+        """Record a sampled token, stream its text and mark the sequence finished if done"""
+        if sequence.append_token(token_id, self.tokenizer, self.eos_token_ids):
+            self.tokens_generated += 1
+            BATCH_TOKENS_GENERATED.inc()
+
+    def _retire(self):
+        """Drop finished and cancelled sequences from the batch"""
+        keep = [i for i, sequence in enumerate(self._active) if sequence.finish_reason is None and not sequence.cancelled]
+        if len(keep) == len(self._active):
+            return
+
+        for sequence in self._active:
+            if sequence.cancelled and sequence.finish_reason is None:
+                sequence.finish_reason = "cancelled"
+                sequence._put("done")
+
+        if not keep:
+            self._active, self._layers, self._mask = [], [], None
+        else:
+            index = torch.tensor(keep, device=self._mask.device)
+            mask = self._mask.index_select(0, index)
+            # Trim columns that are padding for every remaining sequence
+            start = int(mask.any(dim=0).nonzero()[0])
+            self._mask = mask[:, start:]
+            self._layers = [
+                (k.index_select(0, index)[:, :, start:], v.index_select(0, index)[:, :, start:])
+                for k, v in self._layers
+            ]
+            self._active = [self._active[i] for i in keep]
+        BATCH_ACTIVE.set(len(self._active))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            waiting = len(self._waiting)
+        return {
+            "running": self._running,
+            "active": len(self._active),
+            "waiting": waiting,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_tokens": self.max_batch_tokens,
+            "steps": self.steps,
+            "tokens_generated": self.tokens_generated,
+            "mean_batch_size": round(self.batched_tokens / self.steps, 2) if self.steps else 0.0,
+        }
@@ -0,0 +1,187 @@
+"""
+Circuit Breaker
+Per-provider closed/open/half-open breakers fed by call outcomes and
+background health probes, so a degraded provider is skipped instantly
+"""
+
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+CIRCUIT_STATE = Gauge(
+    'provider_circuit_state',
+    'Provider circuit state (0=closed, 1=half_open, 2=open)',
+    ['provider'],
+)
+CIRCUIT_TRANSITIONS = Counter(
+    'provider_circuit_transitions_total',
+    'Provider circuit state transitions',
+    ['provider', 'state'],
+)
+CIRCUIT_REJECTIONS = Counter(
+    'provider_circuit_rejections_total',
+    'Calls skipped because the provider circuit was open',
+    ['provider'],
+)
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker state"""
+    CLOSED = "closed"  # Normal operation
+    OPEN = "open"  # Failing, calls are skipped
+    HALF_OPEN = "half_open"  # Recovery, limited trial calls
+
+
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+def is_provider_fault(error: Exception) -> bool:
+    """
+    Whether an error says something about provider health
+
+    Client errors (bad request, auth, not found) are the caller's fault and
+    must not open the circuit; timeouts, throttling and 5xx do.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return status_code in (408, 429)
+    return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one provider
+
+    - CLOSED: calls pass; failure_threshold consecutive failures open it
+    - OPEN: calls are rejected until recovery_timeout has passed
+    - HALF_OPEN: up to half_open_max_calls trial calls; a success closes
+      the circuit, a failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_in_flight = 0
+        self.last_error: Optional[str] = None
+        self.last_probe: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+        CIRCUIT_STATE.labels(provider=name).set(0)
+
+    def _transition(self, state: CircuitState):
+        """Change state (caller holds the lock)"""
+        if state == self.state:
+            return
+        logger.info(f"🔌 Circuit {self.name}: {self.state.value} -> {state.value}")
+        self.state = state
+        if state == CircuitState.OPEN:
+            self.opened_at = time.monotonic()
+        if state != CircuitState.HALF_OPEN:
+            self.half_open_in_flight = 0
+        CIRCUIT_STATE.labels(provider=self.name).set(_STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(provider=self.name, state=state.value).inc()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go to this provider
+
+        Every allowed call must be followed by record_success(),
+        record_failure() or release().
+        """
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    CIRCUIT_REJECTIONS.labels(provider=self.name).inc()
+                    return False
+                self._transition(CircuitState.HALF_OPEN)
+
+            if self.state == CircuitState.HALF_OPEN:
+                if self.half_open_in_flight >= self.half_open_max_calls:
+                    CIRCUIT_REJECTIONS.labels(provider=self.name).inc()
+                    return False
+                self.half_open_in_flight += 1
+
+            return True
+
+    def is_available(self) -> bool:
+        """Non-reserving check used for ranking and status"""
+        with self._lock:
+            if self.state == CircuitState.OPEN:
+                return time.monotonic() - self.opened_at >= self.recovery_timeout
+            if self.state == CircuitState.HALF_OPEN:
+                return self.half_open_in_flight < self.half_open_max_calls
+            return True
+
+    def release(self):
+        """Give back an allowed call that didn't produce an outcome"""
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN and self.half_open_in_flight > 0:
+                self.half_open_in_flight -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self, error: Optional[Exception] = None):
+        with self._lock:
+            self.consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)[:200]
+            if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._transition(CircuitState.OPEN)
+
+    def record_probe(self, healthy: bool, latency: float):
+        """
+        Apply a background health probe result
+
+        A failed probe counts like a failed request, so a closed circuit opens
+        only at failure_threshold consecutive failures. A healthy probe moves
+        an open circuit to half-open so real traffic can confirm recovery.
+        """
+        with self._lock:
+            self.last_probe = {"healthy": healthy, "latency": round(latency, 4), "timestamp": time.time()}
+            if not healthy:
+                self.last_error = "health probe failed"
+                if self.state == CircuitState.OPEN:
+                    return
+                self.consecutive_failures += 1
+                if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                    self._transition(CircuitState.OPEN)
+            elif self.state == CircuitState.OPEN:
+                self._transition(CircuitState.HALF_OPEN)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == CircuitState.OPEN:
+                retry_in = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state.value,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in": retry_in,
+                "last_error": self.last_error,
+                "last_probe": self.last_probe,
+            }
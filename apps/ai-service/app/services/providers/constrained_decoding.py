@@ -0,0 +1,435 @@
+"""
+Constrained Decoding
+Token-level JSON schema enforcement for local LLMs: each decode step keeps
+only tokens whose text extends a prefix of a schema-valid JSON document,
+the document is closed before the token budget runs out, and generation
+ends as soon as the top-level value closes
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = " \t\n\r"
+DIGITS = "0123456789"
+HEX_DIGITS = "0123456789abcdefABCDEF"
+
+# Consecutive whitespace allowed between tokens (pretty-printing), so a model can't loop on newlines
+MAX_WHITESPACE = 32
+# Numbers longer than this must end once they can (stops 0.33333... runs)
+MAX_NUMBER_LENGTH = 24
+# Allowed tokens kept per step when sampling (greedy needs only the best one)
+MAX_SAMPLED_CANDIDATES = 16
+# Candidates are checked in score order this many at a time; sampling keeps
+# the allowed tokens of the first chunk that has any
+SCAN_CHUNK = 256
+
+ANY_SCHEMA: Dict[str, Any] = {}
+_ANY_ALTERNATIVES = [
+    {"type": "object"}, {"type": "array"}, {"type": "string"},
+    {"type": "number"}, {"type": "boolean"}, {"type": "null"},
+]
+
+# Parser state: a stack of frames (top last) and the current whitespace run.
+# Frames are tuples so that trying a candidate token never copies the stack:
+#   ("value", schema)                  expecting a value, whitespace first
+#   ("lit", text)                      structural text, whitespace first
+#   ("word", text)                     rest of a literal (true, "key", ...), no whitespace
+#   ("str", escape, options, typed)    inside a string; options limits an enum
+#   ("num", phase, integer, length)    inside a number
+#   ("arr", item_schema, phase)        phase: "start" or "next"
+#   ("dict", value_schema, phase)      free-form object; phase: "start", "key", "colon" or "next"
+Frames = Tuple[Tuple[Any, ...], ...]
+State = Tuple[Frames, int]
+
+_NUMBER_ACCEPTING = {"zero", "int", "frac", "exp"}
+
+
+def _alternatives(schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Concrete single-type schemas a value may match"""
+    if "anyOf" in schema or "oneOf" in schema:
+        return [alt for option in schema.get("anyOf", schema.get("oneOf")) for alt in _alternatives(option)]
+    if "enum" in schema:
+        return [schema]
+    kind = schema.get("type")
+    if kind is None:
+        return _ANY_ALTERNATIVES
+    if isinstance(kind, list):
+        return [dict(schema, type=t) for t in kind]
+    return [schema]
+
+
+def _start_value(rest: Frames, schema: Dict[str, Any], ch: str) -> Optional[Frames]:
+    """Frames after the first character of a value matching schema"""
+    for alt in _alternatives(schema):
+        kind = alt.get("type")
+        if "enum" in alt:
+            options = tuple(json.dumps(option)[1:-1] for option in alt["enum"] if isinstance(option, str))
+            if ch == '"' and options:
+                return rest + (("str", 0, options, ""),)
+        elif kind == "string" and ch == '"':
+            return rest + (("str", 0, None, ""),)
+        elif kind in ("number", "integer") and (ch == "-" or ch in DIGITS):
+            phase = "sign" if ch == "-" else "zero" if ch == "0" else "int"
+            return rest + (("num", phase, kind == "integer", 1),)
+        elif kind == "boolean" and ch in "tf":
+            return rest + (("word", "rue" if ch == "t" else "alse"),)
+        elif kind == "null" and ch == "n":
+            return rest + (("word", "ull"),)
+        elif kind == "array" and ch == "[":
+            return rest + (("arr", alt.get("items", ANY_SCHEMA), "start"),)
+        elif kind == "object" and ch == "{":
+            properties = alt.get("properties")
+            if not properties:
+                values = alt.get("additionalProperties", ANY_SCHEMA)
+                return rest + (("dict", values if isinstance(values, dict) else ANY_SCHEMA, "start"),)
+            # Fixed keys in declaration order: push the rest of the object as literal and value frames
+            parts: List[Tuple[Any, ...]] = []
+            for i, (name, prop) in enumerate(properties.items()):
+                if i:
+                    parts.append(("lit", ","))
+                parts.append(("lit", json.dumps(name)))
+                parts.append(("lit", ":"))
+                parts.append(("value", prop))
+            parts.append(("lit", "}"))
+            return rest + tuple(reversed(parts))
+    return None
+
+
+def _number_phase(phase: str, ch: str, integer: bool) -> Optional[str]:
+    if ch in DIGITS:
+        if phase in ("sign", "int"):
+            return "int"
+        if phase in ("dot", "frac"):
+            return "frac"
+        if phase in ("exp_start", "exp_sign", "exp"):
+            return "exp"
+        return None  # no digits after a leading zero
+    if integer:
+        return None
+    if ch == "." and phase in ("zero", "int"):
+        return "dot"
+    if ch in "eE" and phase in ("zero", "int", "frac"):
+        return "exp_start"
+    if ch in "+-" and phase == "exp_start":
+        return "exp_sign"
+    return None
+
+
+def _step(frames: Frames, ch: str) -> Optional[Frames]:
+    """Frames after consuming ch, or None if ch can't continue a valid document"""
+    while frames:
+        top, rest = frames[-1], frames[:-1]
+        kind = top[0]
+
+        if kind == "value":
+            return frames if ch in WHITESPACE else _start_value(rest, top[1], ch)
+
+        if kind == "lit":
+            if ch in WHITESPACE:
+                return frames
+            text = top[1]
+            if ch != text[0]:
+                return None
+            return rest + (("word", text[1:]),) if len(text) > 1 else rest
+
+        if kind == "word":
+            text = top[1]
+            if ch != text[0]:
+                return None
+            return rest + (("word", text[1:]),) if len(text) > 1 else rest
+
+        if kind == "str":
+            _, escape, options, typed = top
+            if escape == -1:  # after a backslash
+                if ch == "u":
+                    escape = 4
+                elif ch in '"\\/bfnrt':
+                    escape = 0
+                else:
+                    return None
+            elif escape > 0:  # \uXXXX digits
+                if ch not in HEX_DIGITS:
+                    return None
+                escape -= 1
+            elif ch == '"':
+                if options is not None and typed not in options:
+                    return None
+                return rest
+            elif ch == "\\":
+                escape = -1
+            elif ord(ch) < 0x20:
+                return None  # raw control characters must be escaped
+            if options is not None:
+                typed += ch
+                if not any(option.startswith(typed) for option in options):
+                    return None
+            return rest + (("str", escape, options, typed),)
+
+        if kind == "num":
+            _, phase, integer, length = top
+            too_long = length >= MAX_NUMBER_LENGTH and phase in _NUMBER_ACCEPTING
+            next_phase = None if too_long else _number_phase(phase, ch, integer)
+            if next_phase is not None:
+                return rest + (("num", next_phase, integer, length + 1),)
+            if phase not in _NUMBER_ACCEPTING:
+                return None
+            frames = rest  # the number ended; ch belongs to what follows
+            continue
+
+        if kind == "arr":
+            if ch in WHITESPACE:
+                return frames
+            _, items, phase = top
+            if ch == "]":
+                return rest
+            if phase == "next":
+                return rest + (("arr", items, "next"), ("value", items)) if ch == "," else None
+            return _start_value(rest + (("arr", items, "next"),), items, ch)
+
+        if kind == "dict":
+            if ch in WHITESPACE:
+                return frames
+            _, values, phase = top
+            if ch == "}" and phase in ("start", "next"):
+                return rest
+            if ch == '"' and phase in ("start", "key"):
+                return rest + (("dict", values, "colon"), ("str", 0, None, ""))
+            if ch == ":" and phase == "colon":
+                return rest + (("dict", values, "next"), ("value", values))
+            if ch == "," and phase == "next":
+                return rest + (("dict", values, "key"),)
+            return None
+
+        return None
+    return None  # the document is complete
+
+
+def _minimal_value(schema: Dict[str, Any]) -> str:
+    """Shortest JSON text matching schema"""
+    alt = _alternatives(schema)[0]
+    if "enum" in alt:
+        return json.dumps(alt["enum"][0])
+    kind = alt.get("type")
+    if kind == "object":
+        properties = alt.get("properties") or {}
+        return "{" + ",".join(f"{json.dumps(name)}:{_minimal_value(prop)}" for name, prop in properties.items()) + "}"
+    return {"string": '""', "number": "0", "integer": "0", "boolean": "false", "null": "null", "array": "[]"}[kind]
+
+
+def closing_text(frames: Frames) -> str:
+    """Shortest text that completes the document from frames"""
+    parts: List[str] = []
+    for frame in reversed(frames):
+        kind = frame[0]
+        if kind == "value":
+            parts.append(_minimal_value(frame[1]))
+        elif kind in ("lit", "word"):
+            parts.append(frame[1])
+        elif kind == "str":
+            _, escape, options, typed = frame
+            parts.append("n" if escape == -1 else "0" * escape)
+            if options is not None:
+                parts.append(next(option for option in options if option.startswith(typed))[len(typed):])
+            parts.append('"')
+        elif kind == "num":
+            parts.append("" if frame[1] in _NUMBER_ACCEPTING else "0")
+        elif kind == "arr":
+            parts.append("]")
+        elif kind == "dict":
+            values, phase = frame[1], frame[2]
+            if phase == "key":
+                parts.append('"":')
+            if phase in ("key", "colon"):
+                parts.append((":" if phase == "colon" else "") + _minimal_value(values))
+            parts.append("}")
+    return "".join(parts)
+
+
+def advance_state(state: State, text: str) -> Optional[State]:
+    """Parser state after text, or None if text breaks the schema"""
+    frames, whitespace = state
+    for ch in text:
+        if ch in WHITESPACE and not (frames and frames[-1][0] == "str"):
+            whitespace += 1
+            if whitespace > MAX_WHITESPACE:
+                return None
+        else:
+            whitespace = 0
+        frames = _step(frames, ch)
+        if frames is None:
+            return None
+    return frames, whitespace
+
+
+def _ranked_chunks(scores: torch.Tensor) -> Iterator[List[int]]:
+    """Token ids in descending score order, SCAN_CHUNK at a time; sorts the vocabulary only if the top-k isn't enough"""
+    yield torch.topk(scores, min(SCAN_CHUNK, scores.shape[0])).indices.tolist()
+    if scores.shape[0] > SCAN_CHUNK:
+        order = torch.argsort(scores, descending=True)
+        for start in range(0, order.shape[0], SCAN_CHUNK):
+            yield order[start:start + SCAN_CHUNK].tolist()
+
+
+class TokenVocabulary:
+    """
+    Text each token id adds to a completion, decoded on first use
+
+    Tokens are decoded after an anchor token so that SentencePiece/BPE word
+    prefixes keep their leading space. Partial UTF-8 tokens decode to U+FFFD,
+    which is only valid inside strings.
+    """
+
+    def __init__(self, tokenizer: Any):
+        self.tokenizer = tokenizer
+        self._anchor = tokenizer.encode("a", add_special_tokens=False)[-1:]
+        self._anchor_text = tokenizer.decode(self._anchor, skip_special_tokens=True)
+        self._texts: Dict[int, str] = {}
+
+    def text(self, token_id: int) -> str:
+        text = self._texts.get(token_id)
+        if text is None:
+            decoded = self.tokenizer.decode(self._anchor + [token_id], skip_special_tokens=True)
+            if decoded.startswith(self._anchor_text):
+                text = decoded[len(self._anchor_text):]
+            else:
+                text = self.tokenizer.decode([token_id], skip_special_tokens=True)
+            self._texts[token_id] = text
+        return text
+
+    def first_token(self, text: str) -> Optional[int]:
+        """First token of the tokenizer's own encoding of text"""
+        ids = self.tokenizer.encode(text, add_special_tokens=False)
+        return ids[0] if ids else None
+
+
+class JSONSchemaConstraint:
+    """
+    Schema-valid decoding for one sequence
+
+    mask() is called with each step's logits and advance() with the token
+    that was picked; done turns true when the top-level value closes. Only
+    the highest-scoring candidates are checked (the best one for greedy
+    decoding), so the cost per step is a few parser advances rather than a
+    pass over the vocabulary. Objects with properties are generated with
+    every property, in declaration order. Once the remaining token budget
+    only just covers the shortest completion of the document, that
+    completion is forced, so a truncated generation still parses.
+    """
+
+    def __init__(self, schema: Dict[str, Any], vocabulary: TokenVocabulary, eos_token_ids: Iterable[int] = ()):
+        self.schema = schema
+        self.vocabulary = vocabulary
+        self.eos_token_ids = list(eos_token_ids)
+        self.state: State = ((("value", schema),), 0)
+        self._candidates: Dict[int, Optional[State]] = {}  # tokens checked this step
+        self._closing: Optional[str] = None  # forced completion once the budget is tight
+
+    @property
+    def done(self) -> bool:
+        return not self.state[0]
+
+    def _try(self, token_id: int) -> Optional[State]:
+        if token_id not in self._candidates:
+            text = self.vocabulary.text(token_id)
+            if not text or (self._closing is not None and not self._closing.startswith(text)):
+                self._candidates[token_id] = None
+            else:
+                self._candidates[token_id] = advance_state(self.state, text)
+        return self._candidates[token_id]
+
+    def mask(self, logits: torch.Tensor, temperature: float = 0.0, remaining_tokens: Optional[int] = None) -> torch.Tensor:
+        """
+        Logits (1-D) with every token that would break the schema set to -inf
+
+        remaining_tokens is the output budget left including this step.
+        """
+        self._candidates = {}
+        self._closing = None
+        if remaining_tokens is not None:
+            closing = closing_text(self.state[0])
+            if len(closing) >= remaining_tokens:  # every token adds at least one character
+                self._closing = closing
+        limit = MAX_SAMPLED_CANDIDATES if temperature > 0 else 1
+
+        allowed: List[int] = []
+        for chunk in _ranked_chunks(logits.float()):
+            for token_id in chunk:
+                if token_id in self._candidates:
+                    continue  # already checked in the top-k chunk
+                if self._try(token_id) is not None:
+                    allowed.append(token_id)
+                    if len(allowed) >= limit:
+                        break
+            if allowed:
+                break
+            if self._closing is not None:
+                # The model doesn't want to close: start with how the tokenizer spells the completion
+                token_id = self.vocabulary.first_token(self._closing)
+                if token_id is not None and self._try(token_id) is not None:
+                    allowed.append(token_id)
+                    break
+
+        masked = torch.full_like(logits, float("-inf"))
+        if not allowed:
+            logger.warning("No token continues the JSON schema; ending the sequence")
+            masked[self.eos_token_ids] = 0.0
+            return masked
+        index = torch.tensor(allowed, device=logits.device)
+        kept = logits[index]
+        if torch.isinf(kept).all():
+            kept = torch.zeros_like(kept)  # a previous filter (e.g. top-p) ruled out every allowed token
+        masked[index] = kept
+        return masked
+
+    def advance(self, token_id: int):
+        """Move past a token picked from mask()ed logits"""
+        if token_id in self.eos_token_ids:
+            return  # the sequence ends here anyway
+        state = self._try(token_id)
+        self._candidates = {}
+        if state is None:
+            raise ValueError(f"Token {token_id} ({self.vocabulary.text(token_id)!r}) breaks the JSON schema")
+        self.state = state
+
+
+class JSONSchemaLogitsProcessor:
+    """
+    JSONSchemaConstraint for transformers generate() (batch size 1)
+
+    Pair it with JSONSchemaStoppingCriteria so generation ends as soon as
+    the JSON value closes.
+    """
+
+    def __init__(self, constraint: JSONSchemaConstraint, prompt_tokens: int, max_new_tokens: int, temperature: float = 0.0):
+        self.constraint = constraint
+        self.prompt_tokens = prompt_tokens
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self._seen = prompt_tokens
+
+    def _sync(self, input_ids: torch.Tensor):
+        while self._seen < input_ids.shape[1]:
+            self.constraint.advance(int(input_ids[0, self._seen]))
+            self._seen += 1
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor) -> torch.Tensor:
+        self._sync(input_ids)
+        remaining = self.prompt_tokens + self.max_new_tokens - input_ids.shape[1]
+        return self.constraint.mask(scores[0], self.temperature, remaining).unsqueeze(0)
+
+
+class JSONSchemaStoppingCriteria:
+    """Ends generate() once the JSONSchemaLogitsProcessor's document is complete"""
+
+    def __init__(self, processor: JSONSchemaLogitsProcessor):
+        self.processor = processor
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor, **kwargs) -> torch.Tensor:
+        self.processor._sync(input_ids)
+        done = self.processor.constraint.done
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
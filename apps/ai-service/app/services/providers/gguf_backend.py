@@ -0,0 +1,248 @@
+"""
+GGUF Backend
+llama.cpp inference for local LLMs on CPU-only nodes: Q4/Q5 quantized GGUF
+weights are memory-mapped and decoded with llama.cpp's multi-threaded CPU
+kernels, behind the same submit()/stream() interface as the transformers
+engines
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import torch
+
+from .batching_engine import GenerationSequence
+
+# llama_cpp is imported when a GGUF model is loaded
+LLAMA_CPP_AVAILABLE = importlib.util.find_spec("llama_cpp") is not None
+
+logger = logging.getLogger(__name__)
+
+# End-of-turn markers of the chat formats LocalProvider builds
+_END_OF_TURN = ("<|eot_id|>", "<|im_end|>", "<end_of_turn>", "<|end|>")
+
+
+def load_gguf_model(
+    repo_id: str,
+    filename: str,
+    cache_dir: Optional[str] = None,
+    n_ctx: Optional[int] = None,
+    n_threads: Optional[int] = None,
+    n_batch: Optional[int] = None,
+) -> Any:
+    """Download (once) and memory-map a GGUF model from the HuggingFace Hub"""
+    if not LLAMA_CPP_AVAILABLE:
+        raise RuntimeError("llama.cpp not available. Install with: pip install llama-cpp-python")
+
+    from llama_cpp import Llama
+
+    threads = n_threads or int(os.getenv("LOCAL_GGUF_THREADS", "0")) or None
+    return Llama.from_pretrained(
+        repo_id=repo_id,
+        filename=filename,
+        cache_dir=cache_dir,
+        n_ctx=n_ctx or int(os.getenv("LOCAL_GGUF_CONTEXT", "8192")),
+        n_threads=threads,
+        n_threads_batch=threads,
+        n_batch=n_batch or int(os.getenv("LOCAL_GGUF_BATCH", "512")),
+        n_gpu_layers=0,
+        use_mmap=True,
+        verbose=False,
+    )
+
+
+class GGUFTokenizer:
+    """
+    HuggingFace-style tokenizer facade over a llama.cpp model
+
+    Lets GenerationSequence streaming and the tokenizer service use the
+    vocabulary embedded in the GGUF file.
+    """
+
+    chat_template = None
+
+    def __init__(self, llm: Any, name: str):
+        self.llm = llm
+        self.name_or_path = name
+        self.eos_token_id = llm.token_eos()
+        self.bos_token_id = llm.token_bos()
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> List[int]:
+        # special=True parses the chat markers in LocalProvider's prompt formats
+        ids = self.llm.tokenize(text.encode("utf-8"), add_bos=add_special_tokens, special=True)
+        if len(ids) > 1 and ids[0] == ids[1] == self.bos_token_id:
+            ids = ids[1:]  # prompt already starts with the BOS marker
+        return ids
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = True) -> str:
+        return self.llm.detokenize(ids).decode("utf-8", errors="replace")
+
+    def end_of_turn_ids(self) -> List[int]:
+        ids = [self.eos_token_id]
+        for marker in _END_OF_TURN:
+            tokens = self.llm.tokenize(marker.encode("utf-8"), add_bos=False, special=True)
+            if len(tokens) == 1:
+                ids.append(tokens[0])
+        return ids
+
+
+class GGUFEngine:
+    """
+    Serial llama.cpp generation for one model
+
+    A llama.cpp context can't be shared between threads, so sequences run
+    one at a time on a worker thread. Consecutive prompts reuse the KV cache
+    of their common prefix (the endpoint's system prompt) automatically.
+    Response schemas are enforced with llama.cpp's own JSON-schema grammars.
+    """
+
+    def __init__(self, llm: Any, model_name: str, tokenizer: Optional[GGUFTokenizer] = None):
+        self.llm = llm
+        self.model_name = model_name
+        self.tokenizer = tokenizer or GGUFTokenizer(llm, model_name)
+        self.eos_token_ids = set(self.tokenizer.end_of_turn_ids())
+        self.context_window = llm.n_ctx()
+
+        self._waiting: Deque[GenerationSequence] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._draining = False
+        self._thread: Optional[threading.Thread] = None
+        self._grammars: Dict[str, Any] = {}  # schema JSON -> compiled LlamaGrammar
+        self.sequences = 0
+        self.tokens_generated = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="local-gguf-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = False):
+        """Stop the worker thread, finishing queued sequences first if drain is set"""
+        if drain:
+            self._draining = True
+        else:
+            self._running = False
+        self._wakeup.set()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the worker thread to exit after stop()"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def tokenize(self, prompt: str) -> torch.Tensor:
+        """Prompt ids, shape [1, length]"""
+        return torch.tensor([self.tokenizer.encode(prompt)])
+
+    def submit(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        past_key_values: Any = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> GenerationSequence:
+        """Queue a prompt from tokenize(); the output budget is clipped to the llama.cpp context"""
+        if not self._running or self._draining:
+            raise RuntimeError("GGUF engine is not running")
+        available = self.context_window - input_ids.shape[1]
+        if available <= 0:
+            raise ValueError(
+                f"Prompt of {input_ids.shape[1]} tokens exceeds the {self.context_window}-token "
+                f"llama.cpp context of {self.model_name} (LOCAL_GGUF_CONTEXT)"
+            )
+        sequence = GenerationSequence(
+            input_ids, min(max_new_tokens, available), temperature, top_p, response_schema=response_schema
+        )
+        with self._lock:
+            self._waiting.append(sequence)
+        self._wakeup.set()
+        return sequence
+
+    def _run(self):
+        logger.info(f"⚙️ GGUF engine started for {self.model_name} (context {self.context_window})")
+        while self._running:
+            with self._lock:
+                sequence = self._waiting.popleft() if self._waiting else None
+            if sequence is None:
+                if self._draining:
+                    break
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            if sequence.cancelled:
+                continue
+
+            try:
+                self._generate(sequence)
+            except Exception as e:
+                logger.error(f"GGUF generation failed: {e}")
+                sequence.finish_reason = "error"
+                sequence._put("error", e)
+
+        self._running = False
+        with self._lock:
+            pending = list(self._waiting)
+            self._waiting.clear()
+        for sequence in pending:
+            sequence.finish_reason = "error"
+            sequence._put("error", RuntimeError("GGUF engine stopped"))
+
+    def _grammar(self, schema: Dict[str, Any]) -> Any:
+        key = json.dumps(schema, sort_keys=True)
+        if key not in self._grammars:
+            from llama_cpp import LlamaGrammar
+
+            self._grammars[key] = LlamaGrammar.from_json_schema(json.dumps(schema), verbose=False)
+        return self._grammars[key]
+
+    def _generate(self, sequence: GenerationSequence):
+        self.sequences += 1
+        grammar = self._grammar(sequence.response_schema) if sequence.response_schema else None
+        tokens = self.llm.generate(
+            sequence.input_ids[0].tolist(),
+            temp=sequence.temperature,
+            top_p=sequence.top_p,
+            top_k=0,  # ChatRequest only carries temperature and top_p
+            min_p=0.0,
+            repeat_penalty=1.0,
+            reset=True,  # keeps the KV cache of the prefix shared with the previous prompt
+            grammar=grammar,  # samples end of sequence once the JSON document closes
+        )
+        for token_id in tokens:
+            if sequence.cancelled:
+                sequence.finish_reason = "cancelled"
+                sequence._put("done")
+                break
+            if not sequence.append_token(token_id, self.tokenizer, self.eos_token_ids):
+                break
+            self.tokens_generated += 1
+            if sequence.finish_reason is not None:
+                break
+        else:
+            # llama.cpp ended the generator itself (context full)
+            if sequence.finish_reason is None:
+                sequence.finish_reason = "length"
+                sequence._put("done")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = len(self._waiting)
+        return {
+            "backend": "gguf",
+            "running": self._running,
+            "waiting": waiting,
+            "context_window": self.context_window,
+            "threads": self.llm.n_threads if hasattr(self.llm, "n_threads") else None,
+            "sequences": self.sequences,
+            "tokens_generated": self.tokens_generated,
+        }
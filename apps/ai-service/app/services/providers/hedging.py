@@ -0,0 +1,69 @@
+"""
+Request Hedging
+Budget and metrics for hedged provider calls: when the primary provider is
+slower than its observed p90, the same request is sent to the next provider
+and the first answer wins
+"""
+
+import threading
+from typing import Any, Dict
+
+from prometheus_client import Counter
+
+# Prometheus metrics
+HEDGED_REQUESTS = Counter(
+    'provider_hedged_requests_total',
+    'Hedge requests fired at a secondary provider',
+    ['capability'],
+)
+HEDGE_SUPPRESSED = Counter(
+    'provider_hedges_suppressed_total',
+    'Hedges not fired because the hedge budget was exhausted',
+    ['capability'],
+)
+HEDGE_WINS = Counter(
+    'provider_hedge_wins_total',
+    'Winner of hedged requests',
+    ['capability', 'winner'],
+)
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a fraction of requests for one capability
+
+    Every hedge-eligible request earns `ratio` credits (up to `burst`); a
+    hedge spends one credit. With ratio=0.1, at most ~10% of requests cost
+    a second provider call.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = burst
+        self.requests = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.requests += 1
+            self.credits = min(self.burst, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.credits < 1.0:
+                return False
+            self.credits -= 1.0
+            self.hedges += 1
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_rate": round(self.hedges / self.requests, 4) if self.requests else 0.0,
+                "credits": round(self.credits, 2),
+                "ratio": self.ratio,
+            }
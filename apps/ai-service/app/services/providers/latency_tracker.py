@@ -0,0 +1,140 @@
+"""
+Latency Tracker
+Rolling per-provider, per-capability latency and error statistics used for
+latency- and cost-aware provider routing
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus metrics
+PROVIDER_LATENCY = Histogram(
+    'provider_request_latency_seconds',
+    'Provider call latency (time to first token for streams)',
+    ['provider', 'capability'],
+)
+PROVIDER_REQUESTS = Counter(
+    'provider_requests_total',
+    'Provider calls by outcome',
+    ['provider', 'capability', 'outcome'],
+)
+PROVIDER_LATENCY_EWMA = Gauge(
+    'provider_latency_ewma_seconds',
+    'Exponentially weighted moving average of provider latency',
+    ['provider', 'capability'],
+)
+PROVIDER_ERROR_RATE = Gauge(
+    'provider_error_rate',
+    'Provider error rate over the rolling window',
+    ['provider', 'capability'],
+)
+
+
+@dataclass
+class LatencyStats:
+    """Rolling statistics for one (provider, capability) pair"""
+    window: int = 200
+    alpha: float = 0.2
+    ewma: Optional[float] = None
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+    last_updated: float = 0.0
+
+    def __post_init__(self):
+        self.latencies = deque(self.latencies, maxlen=self.window)
+        self.outcomes = deque(self.outcomes, maxlen=self.window)
+
+    def record(self, latency: float, success: bool):
+        self.outcomes.append(success)
+        if success:
+            self.latencies.append(latency)
+            self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+        self.last_updated = time.time()
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def success_rate(self) -> float:
+        """Laplace-smoothed success rate, 0.5 with no data"""
+        return (sum(self.outcomes) + 1) / (len(self.outcomes) + 2)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return float(np.percentile(np.fromiter(self.latencies, dtype=float), q))
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "samples": self.samples,
+            "ewma": round(self.ewma, 4) if self.ewma is not None else None,
+            "p50": round(p50, 4) if p50 is not None else None,
+            "p95": round(p95, 4) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class LatencyTracker:
+    """
+    Thread-safe registry of LatencyStats keyed by (provider, capability)
+
+    Latencies of failed calls aren't mixed into the percentiles (fast
+    failures would make a broken provider look quick); failures only count
+    towards the error rate.
+    """
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.window = window
+        self.alpha = alpha
+        self._stats: Dict[Tuple[str, str], LatencyStats] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, capability: str) -> LatencyStats:
+        key = (provider, capability)
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = LatencyStats(window=self.window, alpha=self.alpha)
+            return self._stats[key]
+
+    def record(self, provider: str, capability: str, latency: float, success: bool):
+        """Record one call outcome"""
+        stats = self.get(provider, capability)
+        with self._lock:
+            stats.record(latency, success)
+
+        PROVIDER_REQUESTS.labels(provider=provider, capability=capability, outcome="success" if success else "error").inc()
+        PROVIDER_ERROR_RATE.labels(provider=provider, capability=capability).set(stats.error_rate)
+        if success:
+            PROVIDER_LATENCY.labels(provider=provider, capability=capability).observe(latency)
+            PROVIDER_LATENCY_EWMA.labels(provider=provider, capability=capability).set(stats.ewma)
+
+    def record_censored(self, provider: str, capability: str, latency: float):
+        """
+        Record a lower bound for a call abandoned before it finished (e.g. a
+        hedge loser), so cancelling slow calls doesn't hide the tail
+        """
+        stats = self.get(provider, capability)
+        with self._lock:
+            stats.latencies.append(latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Statistics as {capability: {provider: stats}}"""
+        with self._lock:
+            result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (provider, capability), stats in self._stats.items():
+                result.setdefault(capability, {})[provider] = stats.to_dict()
+            return result
@@ -5,9 +5,11 @@ Zero API costs, full privacy, offline capability
 """
 
 import asyncio
+import dataclasses
 import logging
-from typing import List, Dict, Any, Optional, AsyncIterator
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Union
 import os
+import threading
 import time
 import torch
 
@@ -27,21 +29,47 @@ from .base_provider import (
     VisionRequest,
     VisionResponse,
 )
+from .batching_engine import ContinuousBatchingEngine, GenerationSequence, eos_token_ids
+from .constrained_decoding import (
+    JSONSchemaConstraint,
+    JSONSchemaLogitsProcessor,
+    JSONSchemaStoppingCriteria,
+    TokenVocabulary,
+)
+from .gguf_backend import LLAMA_CPP_AVAILABLE, GGUFEngine, GGUFTokenizer
+from .prefix_cache import PrefixCache
+from .speculative_decoding import SpeculativeDecoder
+from ..tokenizer_service import get_tokenizer_service
 
 logger = logging.getLogger(__name__)
 
 
+class StopEventCriteria:
+    """Ends generate() once `event` is set, e.g. when the stream consumer is gone"""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids: torch.Tensor, scores: torch.Tensor, **kwargs) -> torch.Tensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
 class LocalProvider(AIProvider):
     """Local model provider using HuggingFace models"""
 
+    default_embedding_model = "bge-large-en-v1.5"
+    default_chat_model = "llama-3.1-8b"
+
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
 
         # Import local services
         from ..local_whisper import get_local_whisper, is_available as whisper_available
         from ..huggingface_manager import get_hf_manager
+        from ..embedding_registry import get_embedding_registry
 
         self.hf_manager = get_hf_manager(token=config.api_key or os.getenv("HUGGINGFACE_TOKEN"))
+        self.embedding_registry = get_embedding_registry()
         self.whisper_service = None
         self.whisper_available = whisper_available()
 
@@ -49,6 +77,39 @@ class LocalProvider(AIProvider):
         self.current_llm = None
         self.current_llm_tokenizer = None
         self.current_llm_name = None
+        self.current_llm_key = None  # hf_manager cache / residency key
+        # Model switches wait for generations on the current LLM, then drop it before loading
+        self._switch_lock = asyncio.Lock()
+        self._active_generations = 0
+        self._generations_idle = asyncio.Event()
+        self._generations_idle.set()
+        self.token_vocabulary: Optional[TokenVocabulary] = None  # constrained decoding with generate()
+
+        # Prefilled KV caches of shared system-prompt prefixes for current_llm
+        self.prefix_cache = PrefixCache()
+
+        # LLM backend: transformers, or llama.cpp with GGUF weights ("auto" = GGUF on CPU-only nodes)
+        backend = os.getenv("LOCAL_LLM_BACKEND", "auto").lower()
+        if backend == "auto":
+            backend = "gguf" if LLAMA_CPP_AVAILABLE and not torch.cuda.is_available() else "transformers"
+        self.llm_backend = backend
+        # bitsandbytes 4-bit needs CUDA; "none" loads full-precision weights
+        quantization = os.getenv("LOCAL_LLM_QUANTIZATION", "4bit").lower()
+        self.quantization = None if quantization == "none" else quantization
+        self.gguf_quant = os.getenv("LOCAL_GGUF_QUANT", "Q4_K_M")
+        self.gguf_engine: Optional[GGUFEngine] = None
+
+        # Continuous batching of concurrent generations on current_llm
+        self.batching_enabled = os.getenv("LOCAL_BATCHING_ENABLED", "true").lower() == "true"
+        self.batching_engine: Optional[ContinuousBatchingEngine] = None
+
+        # Draft-and-verify decoding for models with a draft_model; off by default, "auto" = on CUDA nodes
+        speculative = os.getenv("LOCAL_SPECULATIVE_DECODING", "false").lower()
+        self.speculative_enabled = self.llm_backend == "transformers" and (
+            speculative == "true" or (speculative == "auto" and torch.cuda.is_available())
+        )
+        self.speculative_decoder: Optional[SpeculativeDecoder] = None
+        self.current_draft_key = None
 
         # Model registry
         self.models = {
@@ -90,6 +151,7 @@ class LocalProvider(AIProvider):
                 cost_per_1k_output=0.0,
                 supports_streaming=True,
                 description="Meta's best 8B model, excellent quality",
+                draft_model="llama-3.2-1b",
             ),
             "qwen2.5-7b": ModelInfo(
                 model_id="Qwen/Qwen2.5-7B-Instruct",
@@ -102,6 +164,7 @@ class LocalProvider(AIProvider):
                 cost_per_1k_output=0.0,
                 supports_streaming=True,
                 description="Alibaba's model, great for code and reasoning",
+                draft_model="qwen2.5-0.5b",
             ),
             "gemma-2-9b": ModelInfo(
                 model_id="google/gemma-2-9b-it",
@@ -114,6 +177,7 @@ class LocalProvider(AIProvider):
                 cost_per_1k_output=0.0,
                 supports_streaming=True,
                 description="Google's latest, very capable",
+                draft_model="gemma-2-2b",
             ),
             "phi-3.5-mini": ModelInfo(
                 model_id="microsoft/Phi-3.5-mini-instruct",
@@ -128,6 +192,44 @@ class LocalProvider(AIProvider):
                 description="Microsoft's lightweight model, fast and efficient",
             ),
 
+            # Draft models for speculative decoding (same tokenizers as their targets)
+            "llama-3.2-1b": ModelInfo(
+                model_id="meta-llama/Llama-3.2-1B-Instruct",
+                name="Llama 3.2 1B (Local)",
+                provider=ProviderType.LOCAL,
+                capabilities=[ModelCapability.CHAT, ModelCapability.TEXT_GENERATION],
+                context_window=128000,
+                max_output_tokens=4096,
+                cost_per_1k_input=0.0,
+                cost_per_1k_output=0.0,
+                supports_streaming=True,
+                description="Draft model for Llama 3.1 8B",
+            ),
+            "qwen2.5-0.5b": ModelInfo(
+                model_id="Qwen/Qwen2.5-0.5B-Instruct",
+                name="Qwen 2.5 0.5B (Local)",
+                provider=ProviderType.LOCAL,
+                capabilities=[ModelCapability.CHAT, ModelCapability.TEXT_GENERATION],
+                context_window=32768,
+                max_output_tokens=4096,
+                cost_per_1k_input=0.0,
+                cost_per_1k_output=0.0,
+                supports_streaming=True,
+                description="Draft model for Qwen 2.5 7B",
+            ),
+            "gemma-2-2b": ModelInfo(
+                model_id="google/gemma-2-2b-it",
+                name="Gemma 2 2B (Local)",
+                provider=ProviderType.LOCAL,
+                capabilities=[ModelCapability.CHAT, ModelCapability.TEXT_GENERATION],
+                context_window=8192,
+                max_output_tokens=4096,
+                cost_per_1k_input=0.0,
+                cost_per_1k_output=0.0,
+                supports_streaming=True,
+                description="Draft model for Gemma 2 9B",
+            ),
+
             # Vision models
             "moondream2": ModelInfo(
                 model_id="vikhyatk/moondream2",
@@ -212,34 +314,38 @@ class LocalProvider(AIProvider):
 
     async def chat_completion(self, request: ChatRequest) -> ChatResponse:
         """Generate chat completion with local LLM"""
+        model_key = None
         try:
             start_time = time.time()
 
             # Load model if not already loaded
             model_id = request.model or "llama-3.1-8b"
-            await self._ensure_llm_loaded(model_id)
-
-            # Build prompt from messages
-            prompt = self._build_prompt(request.messages, model_id)
-
-            # Generate response in thread pool
-            loop = asyncio.get_event_loop()
-            response_text = await loop.run_in_executor(
-                None,
-                lambda: self._generate_text(prompt, request)
-            )
+            model_key = await self._acquire_llm(model_id)
+
+            # Build prompt from messages (system prefix + per-request suffix)
+            prefix, suffix = self._build_prompt_parts(request.messages, model_id)
+
+            if self._generation_engine() is not None:
+                sequence = await self._submit(prefix, suffix, request)
+                response_text = "".join([text async for text in sequence.stream()]).strip()
+                input_tokens, output_tokens = sequence.prompt_tokens, sequence.completion_tokens
+                finish_reason = sequence.finish_reason
+            else:
+                # Generate response in thread pool
+                loop = asyncio.get_event_loop()
+                response_text, input_tokens, output_tokens, max_new_tokens = await loop.run_in_executor(
+                    None,
+                    lambda: self._generate_text(prefix, suffix, request)
+                )
+                finish_reason = "length" if output_tokens >= max_new_tokens else "stop"
 
             processing_time = time.time() - start_time
 
-            # Estimate tokens (rough)
-            input_tokens = len(prompt.split())
-            output_tokens = len(response_text.split())
-
             return ChatResponse(
                 content=response_text,
                 model=model_id,
                 provider="local",
-                finish_reason="stop",
+                finish_reason=finish_reason,
                 usage={
                     "prompt_tokens": input_tokens,
                     "completion_tokens": output_tokens,
@@ -250,76 +356,127 @@ class LocalProvider(AIProvider):
         except Exception as e:
             logger.error(f"Local chat completion failed: {e}")
             raise
+        finally:
+            if model_key is not None:
+                self._release_llm(model_key)
 
-    async def chat_completion_stream(self, request: ChatRequest) -> AsyncIterator[str]:
+    async def chat_completion_stream(
+        self,
+        request: ChatRequest,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
         """Generate streaming chat completion"""
+        model_key = None
+        thread = None
+        stop = threading.Event()
         try:
             model_id = request.model or "llama-3.1-8b"
-            await self._ensure_llm_loaded(model_id)
-
-            prompt = self._build_prompt(request.messages, model_id)
-
-            # Generate with streaming
-            inputs = self.current_llm_tokenizer(prompt, return_tensors="pt").to(self.current_llm.device)
-
-            from transformers import TextIteratorStreamer
-            from threading import Thread
-
-            streamer = TextIteratorStreamer(self.current_llm_tokenizer, skip_special_tokens=True)
-
+            model_key = await self._acquire_llm(model_id)
+
+            prefix, suffix = self._build_prompt_parts(request.messages, model_id)
+
+            if self._generation_engine() is not None:
+                sequence = await self._submit(prefix, suffix, request)
+                async for text in sequence.stream():
+                    yield text
+
+                if metadata is not None:
+                    metadata.update(
+                        model=model_id,
+                        finish_reason=sequence.finish_reason,
+                        usage={
+                            "prompt_tokens": sequence.prompt_tokens,
+                            "completion_tokens": sequence.completion_tokens,
+                            "total_tokens": sequence.prompt_tokens + sequence.completion_tokens,
+                        },
+                    )
+                return
+
+            # Tokenize (and prefill an uncached prefix) off the event loop
+            loop = asyncio.get_running_loop()
+            inputs = await loop.run_in_executor(None, self._prepare_inputs, prefix, suffix)
+
+            from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+            streamer = TextIteratorStreamer(self.current_llm_tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+            prompt_tokens = inputs["input_ids"].shape[1]
+            max_new_tokens = self._max_new_tokens(prompt_tokens, request)
+            constrained = self._constrained_generate_kwargs(request, prompt_tokens, max_new_tokens)
+            stopping_criteria = constrained.pop("stopping_criteria", StoppingCriteriaList())
+            stopping_criteria.append(StopEventCriteria(stop))
             generation_kwargs = dict(
                 inputs,
                 streamer=streamer,
-                max_new_tokens=request.max_tokens or 1000,
+                max_new_tokens=max_new_tokens,
                 temperature=request.temperature,
                 top_p=request.top_p,
                 do_sample=True if request.temperature > 0 else False,
+                stopping_criteria=stopping_criteria,
+                **constrained,
             )
 
-            thread = Thread(target=self.current_llm.generate, kwargs=generation_kwargs)
+            thread = threading.Thread(target=self.current_llm.generate, kwargs=generation_kwargs)
             thread.start()
 
-            for text in streamer:
+            # Pull tokens off the event loop so a slow model can't block it
+            tokens = iter(streamer)
+            generated = []
+            while True:
+                text = await loop.run_in_executor(None, next, tokens, None)
+                if text is None:
+                    break
+                generated.append(text)
                 yield text
 
-            thread.join()
+            await loop.run_in_executor(None, thread.join)
+
+            if metadata is not None:
+                completion_tokens = len(self.current_llm_tokenizer.encode("".join(generated), add_special_tokens=False))
+                metadata.update(
+                    model=model_id,
+                    finish_reason="length" if completion_tokens >= max_new_tokens else "stop",
+                    usage={
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                )
 
         except Exception as e:
             logger.error(f"Local streaming failed: {e}")
             raise
+        finally:
+            if thread is not None and thread.is_alive():
+                # Consumer timed out or went away: stop generate() before the model can be unloaded
+                stop.set()
+                await asyncio.get_running_loop().run_in_executor(None, thread.join)
+            if model_key is not None:
+                self._release_llm(model_key)
 
     async def generate_embedding(self, request: EmbeddingRequest) -> EmbeddingResponse:
         """Generate embeddings with local model"""
         try:
-            from sentence_transformers import SentenceTransformer
-
-            model_id = request.model or "bge-large-en-v1.5"
+            model_id = request.model or self.default_embedding_model
             model_info = self.models.get(model_id)
 
             if not model_info:
                 raise ValueError(f"Unknown embedding model: {model_id}")
 
-            # Load embedding model
-            loop = asyncio.get_event_loop()
-            model = await loop.run_in_executor(
-                None,
-                lambda: SentenceTransformer(model_info.model_id)
-            )
-
-            # Generate embeddings
+            # Shared warm model; concurrent calls are merged into one encode()
             input_texts = [request.input] if isinstance(request.input, str) else request.input
-            embeddings = await loop.run_in_executor(
-                None,
-                lambda: model.encode(input_texts, convert_to_numpy=True).tolist()
-            )
+            embeddings = await self.embedding_registry.encode(model_id, input_texts)
+
+            tokenizer = get_tokenizer_service()
+            prompt_tokens = sum(tokenizer.count(text, model_info.model_id) for text in input_texts)
 
             return EmbeddingResponse(
                 embeddings=embeddings,
                 model=model_id,
                 provider="local",
                 usage={
-                    "prompt_tokens": sum(len(text.split()) for text in input_texts),
-                    "total_tokens": sum(len(text.split()) for text in input_texts),
+                    "prompt_tokens": prompt_tokens,
+                    "total_tokens": prompt_tokens,
                 },
             )
 
@@ -337,6 +494,19 @@ class LocalProvider(AIProvider):
             logger.error(f"Local vision failed: {e}")
             raise
 
+    def get_model_info(self, model: Optional[str]) -> Optional[ModelInfo]:
+        """Registry entry, with live speculative decoding stats for the current LLM"""
+        model_info = super().get_model_info(model)
+        if model_info is not None and self.speculative_decoder is not None and model_info is self.models.get(self.current_llm_name):
+            model_info = dataclasses.replace(model_info, speculative=self.speculative_decoder.get_stats())
+        return model_info
+
+    def chat_model(self, model: Optional[str]) -> Optional[str]:
+        """Registry model if requested, else the configured LOCAL_LLM_MODEL"""
+        if model and self.get_model_info(model) is not None:
+            return model
+        return self.config.custom_config.get("llm_model") or self.default_chat_model
+
     def list_models(self) -> List[ModelInfo]:
         """List available models"""
         return list(self.models.values())
@@ -346,10 +516,10 @@ class LocalProvider(AIProvider):
         try:
             # Check if we have GPU available
             cuda_available = torch.cuda.is_available()
-            logger.info(f"Local provider health: CUDA={cuda_available}")
+            logger.debug(f"Local provider health: CUDA={cuda_available}")
             return True
         except Exception as e:
-            logger.warning(f"Local health check failed: {e}")
+            logger.debug(f"Local health check failed: {e}")
             return False
 
     def get_capabilities(self) -> List[ModelCapability]:
@@ -377,74 +547,302 @@ class LocalProvider(AIProvider):
 
     # Private helper methods
 
+    async def _acquire_llm(self, model_id: str) -> str:
+        """
+        Load model_id if needed and hold it for one generation
+
+        Returns the residency key to hand back to _release_llm().
+        """
+        async with self._switch_lock:
+            await self._ensure_llm_loaded(model_id)
+            # Reference the LLM so the residency manager can't evict it mid-generation
+            self.hf_manager.residency.acquire(self.current_llm_key)
+            self._active_generations += 1
+            self._generations_idle.clear()
+            return self.current_llm_key
+
+    def _release_llm(self, model_key: str):
+        self.hf_manager.residency.release(model_key)
+        self._active_generations -= 1
+        if self._active_generations == 0:
+            self._generations_idle.set()
+
     async def _ensure_llm_loaded(self, model_id: str):
-        """Ensure LLM is loaded"""
+        """
+        Make model_id the current LLM (caller holds _switch_lock)
+
+        Generations on the current LLM finish first and it is dropped before
+        the new one loads, so the residency manager can evict it and the two
+        never have to fit in memory together.
+        """
         if self.current_llm_name == model_id:
             return  # Already loaded
 
-        logger.info(f"🔄 Loading local LLM: {model_id}")
-
         model_info = self.models.get(model_id)
         if not model_info:
             raise ValueError(f"Unknown model: {model_id}")
 
+        if self.current_llm_name is not None:
+            logger.info(f"🔄 Switching local LLM {self.current_llm_name} -> {model_id} ({self._active_generations} generations to drain)")
+            await self._generations_idle.wait()
+            await self._unload_current_llm()
+
+        logger.info(f"🔄 Loading local LLM: {model_id}")
+
         # Load in thread pool (blocking operation)
         loop = asyncio.get_event_loop()
-        model, tokenizer = await loop.run_in_executor(
-            None,
-            lambda: self.hf_manager.load_llm(
-                model_name=model_id,
-                device="auto",
-                quantization="4bit",  # Use 4-bit quantization to save VRAM
+        if self.llm_backend == "gguf":
+            model = await loop.run_in_executor(
+                None,
+                lambda: self.hf_manager.load_gguf(model_name=model_id, quant=self.gguf_quant)
+            )
+            tokenizer = GGUFTokenizer(model, model_id)
+        else:
+            model, tokenizer = await loop.run_in_executor(
+                None,
+                lambda: self.hf_manager.load_llm(
+                    model_name=model_id,
+                    device="auto",
+                    quantization=self.quantization,  # 4-bit by default to save VRAM
+                )
             )
-        )
 
         self.current_llm = model
         self.current_llm_tokenizer = tokenizer
         self.current_llm_name = model_id
+        if self.llm_backend == "gguf":
+            self.current_llm_key = self.hf_manager.gguf_cache_key(model_id, self.gguf_quant)
+        else:
+            self.current_llm_key = self.hf_manager.llm_cache_key(model_id, self.quantization, "auto")
+        # The current model stays resident while it's current
+        self.hf_manager.residency.acquire(self.current_llm_key)
+
+        draft = await self._load_draft_model(model_info)
+        if self.llm_backend == "gguf":
+            self.gguf_engine = GGUFEngine(model, model_id, tokenizer)
+            self.gguf_engine.start()
+        else:
+            if draft is not None:
+                self.speculative_decoder = SpeculativeDecoder(model, draft, tokenizer, model_id)
+                self.speculative_decoder.start()
+            if self.batching_enabled:
+                self.batching_engine = ContinuousBatchingEngine(model, tokenizer)
+                self.batching_engine.start()
+
+        # Token accounting for this model uses the tokenizer we just loaded
+        get_tokenizer_service().register(model_id, tokenizer)
+        get_tokenizer_service().register(model_info.model_id, tokenizer)
 
         logger.info(f"✅ Local LLM loaded: {model_id}")
 
+    async def _load_draft_model(self, model_info: ModelInfo) -> Optional[Any]:
+        """Draft model paired with the current LLM, if speculative decoding applies"""
+        if not self.speculative_enabled or not model_info.draft_model:
+            return None
+
+        draft_id = model_info.draft_model
+        loop = asyncio.get_event_loop()
+        try:
+            draft, _ = await loop.run_in_executor(
+                None,
+                lambda: self.hf_manager.load_llm(model_name=draft_id, device="auto", quantization=self.quantization)
+            )
+        except Exception as e:
+            logger.warning(f"Draft model {draft_id} unavailable, decoding without it: {e}")
+            return None
+
+        self.current_draft_key = self.hf_manager.llm_cache_key(draft_id, self.quantization, "auto")
+        self.hf_manager.residency.acquire(self.current_draft_key)
+        logger.info(f"🎯 Speculative decoding: {self.current_llm_name} with draft {draft_id}")
+        return draft
+
+    async def _unload_current_llm(self):
+        """Drop the current LLM once its engine has exited, leaving it evictable"""
+        engines = [engine for engine in (self.batching_engine, self.speculative_decoder, self.gguf_engine) if engine is not None]
+        keys = [key for key in (self.current_llm_key, self.current_draft_key) if key is not None]
+        self._drop_current_llm()
+        loop = asyncio.get_running_loop()
+        for engine in engines:
+            await loop.run_in_executor(None, engine.join)
+        for key in keys:
+            self.hf_manager.residency.release(key)
+
+    def _drop_current_llm(self):
+        """Forget the current LLM (generations already running on it finish first)"""
+        for engine in (self.batching_engine, self.speculative_decoder, self.gguf_engine):
+            if engine is not None:
+                engine.stop(drain=True)
+        self.batching_engine = None
+        self.speculative_decoder = None
+        self.gguf_engine = None
+        self.prefix_cache.clear()
+        self.current_llm = None
+        self.current_llm_tokenizer = None
+        self.current_llm_name = None
+        self.token_vocabulary = None
+        self.current_llm_key = None
+        self.current_draft_key = None
+
+    def _generation_engine(self) -> Optional[Union[ContinuousBatchingEngine, SpeculativeDecoder, GGUFEngine]]:
+        """
+        Where generations of the current LLM are submitted (None: per-request generate())
+
+        The speculative decoder runs one sequence at a time, so once it is
+        busy concurrent requests go to the batching engine instead of queueing.
+        """
+        if self.gguf_engine is not None:
+            return self.gguf_engine
+        if self.speculative_decoder is not None and (self.batching_engine is None or self.speculative_decoder.pending() == 0):
+            return self.speculative_decoder
+        return self.batching_engine
+
     def _build_prompt(self, messages: List[ChatMessage], model_id: str) -> str:
         """Build prompt from messages based on model format"""
+        return "".join(self._build_prompt_parts(messages, model_id))
+
+    def _build_prompt_parts(self, messages: List[ChatMessage], model_id: str) -> Tuple[str, str]:
+        """
+        Build prompt as (prefix, suffix): the leading system messages, which are
+        identical across calls of an endpoint, and the rest of the conversation
+        """
+        prefix_parts = []
+        prompt_parts = []
+
         # Llama 3.1 format
         if "llama" in model_id.lower():
-            prompt_parts = []
             for msg in messages:
                 if msg.role == "system":
-                    prompt_parts.append(f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{msg.content}<|eot_id|>")
+                    part = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n{msg.content}<|eot_id|>"
                 elif msg.role == "user":
-                    prompt_parts.append(f"<|start_header_id|>user<|end_header_id|>\n{msg.content}<|eot_id|>")
+                    part = f"<|start_header_id|>user<|end_header_id|>\n{msg.content}<|eot_id|>"
                 elif msg.role == "assistant":
-                    prompt_parts.append(f"<|start_header_id|>assistant<|end_header_id|>\n{msg.content}<|eot_id|>")
+                    part = f"<|start_header_id|>assistant<|end_header_id|>\n{msg.content}<|eot_id|>"
+                else:
+                    continue
+                (prefix_parts if msg.role == "system" and not prompt_parts else prompt_parts).append(part)
             prompt_parts.append("<|start_header_id|>assistant<|end_header_id|>")
-            return "".join(prompt_parts)
 
         # Default format (for Qwen, Gemma, Phi)
         else:
-            prompt_parts = []
             for msg in messages:
                 if msg.role == "system":
-                    prompt_parts.append(f"System: {msg.content}\n\n")
+                    part = f"System: {msg.content}\n\n"
                 elif msg.role == "user":
-                    prompt_parts.append(f"User: {msg.content}\n\n")
+                    part = f"User: {msg.content}\n\n"
                 elif msg.role == "assistant":
-                    prompt_parts.append(f"Assistant: {msg.content}\n\n")
+                    part = f"Assistant: {msg.content}\n\n"
+                else:
+                    continue
+                (prefix_parts if msg.role == "system" and not prompt_parts else prompt_parts).append(part)
             prompt_parts.append("Assistant: ")
-            return "".join(prompt_parts)
 
-    def _generate_text(self, prompt: str, request: ChatRequest) -> str:
-        """Generate text (blocking, run in executor)"""
-        inputs = self.current_llm_tokenizer(prompt, return_tensors="pt").to(self.current_llm.device)
+        return "".join(prefix_parts), "".join(prompt_parts)
+
+    def _max_new_tokens(self, prompt_tokens: int, request: ChatRequest) -> int:
+        """Requested output budget, clipped to what's left of the context window"""
+        max_new_tokens = request.max_tokens or 1000
+        model_info = self.models.get(self.current_llm_name)
+        if model_info and model_info.context_window:
+            available = model_info.context_window - prompt_tokens
+            if available <= 0:
+                raise ValueError(
+                    f"Prompt of {prompt_tokens} tokens exceeds the {model_info.context_window}-token "
+                    f"context window of {self.current_llm_name}"
+                )
+            max_new_tokens = min(max_new_tokens, available)
+        return max_new_tokens
+
+    def _prepare_inputs(self, prefix: str, suffix: str) -> Dict[str, Any]:
+        """
+        generate() inputs for prefix + suffix
+
+        With a cached prefix only the suffix is tokenized, and generate()
+        continues from a copy of the prefix's KV cache so only the suffix is
+        prefilled.
+        """
+        tokenizer = self.current_llm_tokenizer
+        device = self.current_llm.device
+
+        cached = None
+        if prefix and self.prefix_cache.enabled:
+            cached = self.prefix_cache.get_or_prefill(self.current_llm, tokenizer, prefix)
+        if cached is None:
+            return dict(tokenizer(prefix + suffix, return_tensors="pt").to(device))
+
+        prefix_ids, past_key_values = cached
+        suffix_ids = tokenizer(suffix, return_tensors="pt", add_special_tokens=False).input_ids.to(device)
+        input_ids = torch.cat([prefix_ids, suffix_ids], dim=1)
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "past_key_values": past_key_values,
+        }
+
+    async def _submit(self, prefix: str, suffix: str, request: ChatRequest) -> GenerationSequence:
+        """Queue a generation on the current LLM's engine"""
+        loop = asyncio.get_running_loop()
+        if self.gguf_engine is not None:
+            # llama.cpp reuses the KV cache of a prefix shared with the previous prompt itself
+            input_ids = await loop.run_in_executor(None, self.gguf_engine.tokenize, prefix + suffix)
+            inputs = {"input_ids": input_ids}
+        else:
+            # Tokenize (and prefill an uncached prefix) off the event loop
+            inputs = await loop.run_in_executor(None, self._prepare_inputs, prefix, suffix)
+        return self._generation_engine().submit(
+            inputs["input_ids"],
+            max_new_tokens=self._max_new_tokens(inputs["input_ids"].shape[1], request),
+            temperature=request.temperature,
+            top_p=request.top_p,
+            past_key_values=inputs.get("past_key_values"),
+            response_schema=self._response_schema(request),
+        )
+
+    def _response_schema(self, request: ChatRequest) -> Optional[Dict[str, Any]]:
+        """JSON schema to decode within: the request's, or any object in JSON mode"""
+        if request.response_schema:
+            return request.response_schema
+        if request.response_format and request.response_format.get("type") == "json_object":
+            return {"type": "object"}
+        return None
+
+    def _constrained_generate_kwargs(self, request: ChatRequest, prompt_tokens: int, max_new_tokens: int) -> Dict[str, Any]:
+        """generate() logits processor and stopping criterion enforcing the response schema"""
+        schema = self._response_schema(request)
+        if schema is None:
+            return {}
+
+        from transformers import LogitsProcessorList, StoppingCriteriaList
+
+        tokenizer = self.current_llm_tokenizer
+        if self.token_vocabulary is None or self.token_vocabulary.tokenizer is not tokenizer:
+            self.token_vocabulary = TokenVocabulary(tokenizer)
+        constraint = JSONSchemaConstraint(schema, self.token_vocabulary, eos_token_ids(self.current_llm, tokenizer))
+        processor = JSONSchemaLogitsProcessor(constraint, prompt_tokens, max_new_tokens, request.temperature)
+        return {
+            "logits_processor": LogitsProcessorList([processor]),
+            "stopping_criteria": StoppingCriteriaList([JSONSchemaStoppingCriteria(processor)]),
+        }
+
+    def _generate_text(self, prefix: str, suffix: str, request: ChatRequest) -> Tuple[str, int, int, int]:
+        """
+        Generate text (blocking, run in executor)
+
+        Returns (text, prompt tokens, completion tokens, max new tokens).
+        """
+        inputs = self._prepare_inputs(prefix, suffix)
+        prompt_tokens = inputs["input_ids"].shape[1]
+        max_new_tokens = self._max_new_tokens(prompt_tokens, request)
 
         outputs = self.current_llm.generate(
             **inputs,
-            max_new_tokens=request.max_tokens or 1000,
+            max_new_tokens=max_new_tokens,
             temperature=request.temperature,
             top_p=request.top_p,
             do_sample=True if request.temperature > 0 else False,
             pad_token_id=self.current_llm_tokenizer.eos_token_id,
+            **self._constrained_generate_kwargs(request, prompt_tokens, max_new_tokens),
         )
 
-        response = self.current_llm_tokenizer.decode(outputs[0][inputs.input_ids.shape[1]:], skip_special_tokens=True)
-        return response.strip()
+        completion_ids = outputs[0][prompt_tokens:]
+        response = self.current_llm_tokenizer.decode(completion_ids, skip_special_tokens=True)
+        return response.strip(), prompt_tokens, len(completion_ids), max_new_tokens
@@ -5,7 +5,7 @@ Supports: GPT-4, GPT-3.5, Whisper, DALL-E, Embeddings
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional, AsyncIterator
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
 import openai
 from openai import OpenAI, AsyncOpenAI
 import os
@@ -27,6 +27,7 @@ from .base_provider import (
     VisionRequest,
     VisionResponse,
 )
+from ..tokenizer_service import get_tokenizer_service
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,9 @@ logger = logging.getLogger(__name__)
 class OpenAIProvider(AIProvider):
     """OpenAI API provider implementation"""
 
+    default_embedding_model = "text-embedding-3-large"
+    default_chat_model = "gpt-4-turbo-preview"
+
     def __init__(self, config: ProviderConfig):
         super().__init__(config)
 
@@ -47,7 +51,7 @@ class OpenAIProvider(AIProvider):
             organization=config.organization,
             base_url=config.api_base,
             timeout=config.timeout,
-            max_retries=config.max_retries,
+            max_retries=self.client_max_retries(),
         )
 
         self.async_client = AsyncOpenAI(
@@ -55,7 +59,7 @@ class OpenAIProvider(AIProvider):
             organization=config.organization,
             base_url=config.api_base,
             timeout=config.timeout,
-            max_retries=config.max_retries,
+            max_retries=self.client_max_retries(),
         )
 
         # Model registry
@@ -178,6 +182,10 @@ class OpenAIProvider(AIProvider):
                 for msg in request.messages
             ]
 
+            extra_kwargs = {}
+            if request.response_format:
+                extra_kwargs["response_format"] = request.response_format
+
             response = await self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -189,6 +197,7 @@ class OpenAIProvider(AIProvider):
                 stop=request.stop,
                 stream=False,
                 functions=request.functions,
+                **extra_kwargs,
             )
 
             choice = response.choices[0]
@@ -210,7 +219,11 @@ class OpenAIProvider(AIProvider):
             logger.error(f"OpenAI chat completion failed: {e}")
             raise
 
-    async def chat_completion_stream(self, request: ChatRequest) -> AsyncIterator[str]:
+    async def chat_completion_stream(
+        self,
+        request: ChatRequest,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
         """Generate streaming chat completion"""
         try:
             model = request.model or "gpt-4-turbo-preview"
@@ -227,12 +240,29 @@ class OpenAIProvider(AIProvider):
                 max_tokens=request.max_tokens,
                 top_p=request.top_p,
                 stream=True,
+                stream_options={"include_usage": True},
             )
 
+            finish_reason = None
+            usage = {}
             async for chunk in stream:
+                # The usage chunk arrives last with no choices
+                if chunk.usage:
+                    usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens,
+                    }
+                if not chunk.choices:
+                    continue
+                if chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
 
+            if metadata is not None:
+                metadata.update(model=model, finish_reason=finish_reason or "stop", usage=usage)
+
         except Exception as e:
             logger.error(f"OpenAI streaming failed: {e}")
             raise
@@ -240,7 +270,7 @@ class OpenAIProvider(AIProvider):
     async def generate_embedding(self, request: EmbeddingRequest) -> EmbeddingResponse:
         """Generate embeddings"""
         try:
-            model = request.model or "text-embedding-3-large"
+            model = request.model or self.default_embedding_model
 
             # Handle single string or list
             input_texts = [request.input] if isinstance(request.input, str) else request.input
@@ -276,6 +306,10 @@ class OpenAIProvider(AIProvider):
             logger.error(f"OpenAI vision failed: {e}")
             raise
 
+    def chat_model(self, model: Optional[str]) -> Optional[str]:
+        """Requested model as-is; OpenAI-compatible servers (vLLM, Ollama) serve their own names"""
+        return model or self.config.custom_config.get("chat_model") or self.default_chat_model
+
     def list_models(self) -> List[ModelInfo]:
         """List available models"""
         return list(self.models.values())
@@ -287,7 +321,7 @@ class OpenAIProvider(AIProvider):
             await self.async_client.models.list()
             return True
         except Exception as e:
-            logger.warning(f"OpenAI health check failed: {e}")
+            logger.debug(f"OpenAI health check failed: {e}")
             return False
 
     def get_capabilities(self) -> List[ModelCapability]:
@@ -313,9 +347,7 @@ class OpenAIProvider(AIProvider):
             if not model_info:
                 return {"input_cost": 0.0, "output_cost": 0.0, "total_cost": 0.0}
 
-            # Rough token estimation (4 chars ≈ 1 token)
-            total_chars = sum(len(msg.content) for msg in request.messages)
-            estimated_input_tokens = total_chars // 4
+            estimated_input_tokens = get_tokenizer_service().count_messages(request.messages, model_id)
             estimated_output_tokens = request.max_tokens or 500
 
             input_cost = (estimated_input_tokens / 1000) * model_info.cost_per_1k_input
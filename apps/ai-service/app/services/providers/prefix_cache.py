@@ -0,0 +1,114 @@
+"""
+Prefix Cache
+Reuses the prefilled KV cache of shared prompt prefixes (the fixed system
+prompts every endpoint sends) so local generation only prefills the unique
+suffix of each request
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+PREFIX_CACHE_LOOKUPS = Counter(
+    'local_prefix_cache_lookups_total',
+    'Prefix KV cache lookups in the local LLM path',
+    ['result'],
+)
+PREFIX_CACHE_TOKENS_REUSED = Counter(
+    'local_prefix_cache_tokens_reused_total',
+    'Prompt tokens served from a cached prefix instead of being prefilled',
+)
+
+
+@dataclass
+class PrefixEntry:
+    """Tokenized and prefilled prompt prefix"""
+    input_ids: torch.Tensor  # shape (1, prefix_len)
+    past_key_values: Any  # transformers Cache (or legacy tuple) after prefilling input_ids
+    hits: int = 0
+
+    @property
+    def length(self) -> int:
+        return self.input_ids.shape[1]
+
+
+class PrefixCache:
+    """
+    LRU of prefilled prompt prefixes for one loaded model
+
+    Keys are the prefix text, so a prompt template is tokenized and
+    prefilled once. Callers get a private copy of the KV cache because
+    generate() appends to it in place.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, min_tokens: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("LOCAL_PREFIX_CACHE_SIZE", "16"))
+        self.min_tokens = min_tokens if min_tokens is not None else int(os.getenv("LOCAL_PREFIX_CACHE_MIN_TOKENS", "32"))
+        self.enabled = os.getenv("LOCAL_PREFIX_CACHE_ENABLED", "true").lower() == "true"
+
+        self._entries: "OrderedDict[str, PrefixEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(prefix: str) -> str:
+        return hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+    def get_or_prefill(self, model: Any, tokenizer: Any, prefix: str) -> Optional[Tuple[torch.Tensor, Any]]:
+        """
+        (prefix input_ids, copy of its KV cache), prefilling on a miss
+
+        Returns None for prefixes too short to be worth caching.
+        """
+        key = self._key(prefix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.hits += 1
+
+        if entry is None:
+            input_ids = tokenizer(prefix, return_tensors="pt").input_ids.to(model.device)
+            if input_ids.shape[1] < self.min_tokens:
+                PREFIX_CACHE_LOOKUPS.labels(result="skipped").inc()
+                return None
+
+            with torch.no_grad():
+                outputs = model(input_ids=input_ids, use_cache=True)
+            entry = PrefixEntry(input_ids=input_ids, past_key_values=outputs.past_key_values)
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            PREFIX_CACHE_LOOKUPS.labels(result="miss").inc()
+            logger.debug(f"Prefilled prompt prefix of {entry.length} tokens")
+        else:
+            PREFIX_CACHE_LOOKUPS.labels(result="hit").inc()
+            PREFIX_CACHE_TOKENS_REUSED.inc(entry.length)
+
+        return entry.input_ids, copy.deepcopy(entry.past_key_values)
+
+    def clear(self):
+        """Drop all entries (the KV tensors belong to the model being unloaded)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "cached_tokens": sum(entry.length for entry in self._entries.values()),
+                "hits": sum(entry.hits for entry in self._entries.values()),
+            }
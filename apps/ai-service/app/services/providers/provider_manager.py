@@ -4,10 +4,15 @@ Central service for managing AI providers with fallback support
 """
 
 import asyncio
+import dataclasses
 import logging
-from typing import List, Dict, Any, Optional, Union
+import os
+import time
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Awaitable, Callable
 from enum import Enum
 
+from prometheus_client import Counter
+
 from .base_provider import (
     AIProvider,
     ProviderType,
@@ -24,17 +29,48 @@ from .base_provider import (
     VisionResponse,
 )
 from .openai_provider import OpenAIProvider
-from .anthropic_provider import AnthropicProvider
-from .local_provider import LocalProvider
+from .latency_tracker import LatencyTracker
+from .circuit_breaker import CircuitBreaker, is_provider_fault
+from .hedging import HedgeBudget, HEDGED_REQUESTS, HEDGE_SUPPRESSED, HEDGE_WINS
+from .rate_limiter import (
+    ProviderRateLimiter,
+    RateLimitExceeded,
+    backoff_delay,
+    estimate_request_tokens,
+    get_shared_redis,
+    is_transient_error,
+    rate_limit_retry_after,
+    transient_backoff_delay,
+)
+from ..embedding_cache import EmbeddingCache, get_embedding_cache, is_enabled as embedding_cache_enabled
+from ..tokenizer_service import get_tokenizer_service, record_usage
 
 logger = logging.getLogger(__name__)
 
+# Prometheus metrics
+ROUTING_DECISIONS = Counter(
+    'provider_routing_decisions_total',
+    'Provider ranked first by the routing strategy',
+    ['capability', 'strategy', 'provider'],
+)
+
+# Log prefix and action name per capability
+CAPABILITY_LABELS = {
+    ModelCapability.TRANSCRIPTION: ("🎤", "Transcription"),
+    ModelCapability.CHAT: ("💬", "Chat"),
+    ModelCapability.EMBEDDING: ("📊", "Embedding"),
+    ModelCapability.VISION: ("👁️", "Vision"),
+}
+
+# Latency key for streaming chat (time to first token)
+STREAM_STAT_KEY = "chat_stream"
+
 
 class ProviderStrategy(str, Enum):
     """Provider selection strategy"""
-    PRIORITY = "priority"  # Use provider with highest priority
-    COST_OPTIMIZED = "cost_optimized"  # Use cheapest provider
-    FASTEST = "fastest"  # Use fastest provider
+    PRIORITY = "priority"  # Use provider with highest priority, no fallback
+    COST_OPTIMIZED = "cost_optimized"  # Cheapest expected cost per successful call first
+    FASTEST = "fastest"  # Lowest live latency first
     FALLBACK = "fallback"  # Try primary, fallback to others on failure
 
 
@@ -47,6 +83,29 @@ class ProviderManager:
         self.providers: Dict[ProviderType, AIProvider] = {}
         self.strategy = ProviderStrategy.FALLBACK
         self.default_providers: Dict[ModelCapability, ProviderType] = {}
+        self.embedding_cache: Optional[EmbeddingCache] = get_embedding_cache() if embedding_cache_enabled() else None
+        self.stream_first_token_timeout = float(os.getenv("PROVIDER_STREAM_FIRST_TOKEN_TIMEOUT", "15"))
+
+        # Latency-aware routing
+        self.latency_tracker = LatencyTracker(window=int(os.getenv("PROVIDER_LATENCY_WINDOW", "200")))
+        self.min_samples = int(os.getenv("PROVIDER_ROUTING_MIN_SAMPLES", "5"))
+        self.attempt_cost = float(os.getenv("PROVIDER_ATTEMPT_COST", "0.001"))
+        self.routing_decisions: Dict[str, Dict[str, Any]] = {}
+
+        # Circuit breakers and background health probing
+        self.circuit_breakers: Dict[ProviderType, CircuitBreaker] = {}
+        self.health_check_interval = float(os.getenv("PROVIDER_HEALTH_CHECK_INTERVAL", "30"))
+        self.health_check_timeout = float(os.getenv("PROVIDER_HEALTH_CHECK_TIMEOUT", "5"))
+        self._health_task: Optional[asyncio.Task] = None
+
+        # Hedged requests
+        self.hedge_budget_ratio = float(os.getenv("PROVIDER_HEDGE_BUDGET", "0.1"))
+        self.hedge_default_delay = float(os.getenv("PROVIDER_HEDGE_DEFAULT_DELAY", "2.0"))
+        self.hedge_budgets: Dict[str, HedgeBudget] = {}
+
+        # Rate limiting (providers with rate_limit_rpm / rate_limit_tpm)
+        self.rate_limiters: Dict[ProviderType, ProviderRateLimiter] = {}
+        self.max_retry_after = float(os.getenv("RATE_LIMIT_MAX_RETRY_AFTER", "20"))
 
         logger.info("🚀 Provider Manager initialized")
 
@@ -56,13 +115,24 @@ class ProviderManager:
             if provider_type == ProviderType.OPENAI:
                 provider = OpenAIProvider(config)
             elif provider_type == ProviderType.ANTHROPIC:
+                from .anthropic_provider import AnthropicProvider
                 provider = AnthropicProvider(config)
             elif provider_type == ProviderType.LOCAL:
+                # Imports torch and the local inference engines
+                from .local_provider import LocalProvider
                 provider = LocalProvider(config)
             else:
                 raise ValueError(f"Unsupported provider type: {provider_type}")
 
             self.providers[provider_type] = provider
+            self.circuit_breakers[provider_type] = self._new_circuit_breaker(provider_type)
+            if config.rate_limit_rpm or config.rate_limit_tpm:
+                self.rate_limiters[provider_type] = ProviderRateLimiter(
+                    provider_type.value,
+                    rpm=config.rate_limit_rpm,
+                    tpm=config.rate_limit_tpm,
+                    redis_client=get_shared_redis(),
+                )
             logger.info(f"✅ Registered provider: {provider_type.value} (priority={config.priority})")
 
         except Exception as e:
@@ -73,8 +143,23 @@ class ProviderManager:
         """Unregister a provider"""
         if provider_type in self.providers:
             del self.providers[provider_type]
+            self.circuit_breakers.pop(provider_type, None)
+            self.rate_limiters.pop(provider_type, None)
             logger.info(f"🗑️ Unregistered provider: {provider_type.value}")
 
+    def _new_circuit_breaker(self, provider_type: ProviderType) -> CircuitBreaker:
+        return CircuitBreaker(
+            provider_type.value,
+            failure_threshold=int(os.getenv("PROVIDER_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("PROVIDER_CIRCUIT_RECOVERY_TIMEOUT", "30")),
+        )
+
+    def get_circuit_breaker(self, provider_type: ProviderType) -> CircuitBreaker:
+        """Get the circuit breaker for a provider"""
+        if provider_type not in self.circuit_breakers:
+            self.circuit_breakers[provider_type] = self._new_circuit_breaker(provider_type)
+        return self.circuit_breakers[provider_type]
+
     def set_default_provider(self, capability: ModelCapability, provider_type: ProviderType):
         """Set default provider for a capability"""
         if provider_type not in self.providers:
@@ -96,56 +181,365 @@ class ProviderManager:
         ]
         return sorted(providers, key=lambda p: p.get_priority())
 
-    async def transcribe(
+    async def rank_providers(
         self,
-        request: TranscriptionRequest,
-        provider_type: Optional[ProviderType] = None
-    ) -> TranscriptionResponse:
+        capability: ModelCapability,
+        request: Any = None,
+        stat_key: Optional[str] = None
+    ) -> List[AIProvider]:
         """
-        Transcribe audio with automatic provider selection and fallback
+        Order the providers for a capability according to the strategy
 
-        Args:
-            request: Transcription request
-            provider_type: Specific provider to use (None = auto-select)
+        - PRIORITY / FALLBACK: static priority
+        - FASTEST: live p50/p95 latency, penalized by error rate
+        - COST_OPTIMIZED: estimated cost per successful call
 
-        Returns:
-            TranscriptionResponse
+        Providers with fewer than min_samples observations are tried first
+        (in priority order) so every provider gets measured.
         """
+        providers = self.get_providers_for_capability(capability)
+        key = stat_key or capability.value
+        scores: Dict[str, float] = {}
+
+        if len(providers) > 1 and self.strategy == ProviderStrategy.FASTEST:
+            scores = {p.provider_type.value: self._latency_score(p, key) for p in providers}
+        elif len(providers) > 1 and self.strategy == ProviderStrategy.COST_OPTIMIZED:
+            costs = await asyncio.gather(*(self._cost_score(p, request, key) for p in providers))
+            scores = {p.provider_type.value: cost for p, cost in zip(providers, costs)}
+
+        if scores:
+            providers = sorted(providers, key=lambda p: (scores[p.provider_type.value], p.get_priority()))
+
+        if providers:
+            self._record_decision(key, providers, scores)
+        return providers
+
+    def _latency_score(self, provider: AIProvider, key: str) -> float:
+        """Expected seconds per successful call (0 while under-sampled)"""
+        stats = self.latency_tracker.get(provider.provider_type.value, key)
+        if stats.samples < self.min_samples:
+            return 0.0
+        p50, p95 = stats.percentile(50), stats.percentile(95)
+        if p50 is None:
+            return float("inf")
+        return (p50 + 0.25 * (p95 - p50)) / stats.success_rate
+
+    @staticmethod
+    def _for_provider(provider: AIProvider, request: ChatRequest) -> ChatRequest:
+        """The chat request with its model mapped to one this provider serves"""
+        model = provider.chat_model(request.model)
+        return request if model == request.model else dataclasses.replace(request, model=model)
+
+    async def _cost_score(self, provider: AIProvider, request: Any, key: str) -> float:
+        """Expected USD per successful call (0 while under-sampled)"""
+        stats = self.latency_tracker.get(provider.provider_type.value, key)
+        if stats.samples < self.min_samples:
+            return 0.0
+        if isinstance(request, ChatRequest):
+            request = self._for_provider(provider, request)
         try:
-            # Get providers for transcription
-            if provider_type:
-                providers = [self.providers.get(provider_type)]
-            else:
-                providers = self.get_providers_for_capability(ModelCapability.TRANSCRIPTION)
+            cost = (await provider.estimate_cost(request)).get("total_cost", 0.0)
+        except Exception as e:
+            logger.debug(f"Cost estimate failed for {provider.provider_type.value}: {e}")
+            cost = 0.0
+        # Every failed attempt costs a retry elsewhere, so free but flaky providers aren't free
+        return (cost + self.attempt_cost) / stats.success_rate
+
+    def _record_decision(self, key: str, providers: List[AIProvider], scores: Dict[str, float]):
+        """Remember the latest ordering per capability for status reporting"""
+        selected = providers[0].provider_type.value
+        self.routing_decisions[key] = {
+            "strategy": self.strategy.value,
+            "order": [p.provider_type.value for p in providers],
+            "scores": {name: round(score, 6) for name, score in scores.items()},
+            "timestamp": time.time(),
+        }
+        ROUTING_DECISIONS.labels(capability=key, strategy=self.strategy.value, provider=selected).inc()
 
-            if not providers:
-                raise RuntimeError("No providers available for transcription")
+    async def _execute(
+        self,
+        capability: ModelCapability,
+        request: Any,
+        provider_type: Optional[ProviderType],
+        call: Callable[[AIProvider], Awaitable[Any]],
+        hedge: bool = False
+    ) -> Any:
+        """
+        Run call against providers in routing order
 
-            # Try providers in order
-            last_error = None
-            for provider in providers:
-                try:
-                    logger.info(f"🎤 Transcribing with {provider.provider_type.value}...")
-                    result = await provider.transcribe(request)
-                    logger.info(f"✅ Transcription successful with {provider.provider_type.value}")
-                    return result
+        Every strategy except PRIORITY falls back to the next provider on
+        failure; PRIORITY raises the first error. Providers whose circuit is
+        open are skipped without being called. With hedge=True a slow primary
+        is raced against the next provider (see _execute_hedged).
+        """
+        emoji, action = CAPABILITY_LABELS[capability]
 
-                except NotImplementedError:
-                    logger.debug(f"Provider {provider.provider_type.value} doesn't support transcription")
-                    continue
+        if provider_type:
+            providers = [self.providers[provider_type]] if provider_type in self.providers else []
+        else:
+            providers = await self.rank_providers(capability, request)
 
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"⚠️ Transcription failed with {provider.provider_type.value}: {e}")
+        if not providers:
+            raise RuntimeError(f"No providers available for {action.lower()}")
+
+        if hedge and len(providers) > 1:
+            return await self._execute_hedged(capability, request, providers, call)
+
+        last_error = None
+        skipped = []
+        for provider in providers:
+            name = provider.provider_type.value
+            breaker = self.get_circuit_breaker(provider.provider_type)
+            if not breaker.allow_request():
+                skipped.append(name)
+                logger.info(f"⏭️ Skipping {name}: circuit {breaker.state.value}")
+                continue
+
+            start_time = time.monotonic()
+            try:
+                logger.info(f"{emoji} {action} with {name}...")
+                result = await self._limited_call(provider, request, call)
+
+            except NotImplementedError:
+                breaker.release()
+                logger.debug(f"Provider {name} doesn't support {action.lower()}")
+                continue
+
+            except RateLimitExceeded as e:
+                breaker.release()
+                last_error = e
+                logger.warning(f"⏳ {e}")
+                if self.strategy == ProviderStrategy.PRIORITY:
+                    raise
+                continue
+
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+
+            except Exception as e:
+                self.latency_tracker.record(name, capability.value, time.monotonic() - start_time, False)
+                self._record_breaker_failure(breaker, e)
+                last_error = e
+                logger.warning(f"⚠️ {action} failed with {name}: {e}")
+
+                if self.strategy == ProviderStrategy.PRIORITY:
+                    raise
 
-                    if self.strategy != ProviderStrategy.FALLBACK:
+                logger.info("🔄 Trying next provider...")
+                continue
+
+            self.latency_tracker.record(name, capability.value, time.monotonic() - start_time, True)
+            breaker.record_success()
+            logger.info(f"✅ {action} successful with {name}")
+            return result
+
+        if last_error is None and skipped:
+            raise RuntimeError(f"No providers available for {action.lower()}: circuit open for {', '.join(skipped)}")
+        raise RuntimeError(f"All providers failed. Last error: {last_error}") from last_error
+
+    async def _limited_call(
+        self,
+        provider: AIProvider,
+        request: Any,
+        call: Callable[[AIProvider], Awaitable[Any]]
+    ) -> Any:
+        """
+        Call a provider through its rate limiter
+
+        Upstream 429s pause the provider's bucket for Retry-After (for every
+        caller, and every replica with the Redis backend) and the call is
+        retried up to config.max_retries times, unless Retry-After exceeds
+        RATE_LIMIT_MAX_RETRY_AFTER, in which case the error propagates so
+        the caller can fall back to another provider. The SDK's own retries
+        are off for these providers, so transient errors (5xx, timeouts,
+        connection errors) are retried here too, with jittered backoff.
+        """
+        limiter = self.rate_limiters.get(provider.provider_type)
+        if limiter is None:
+            result = await call(provider)
+            self._record_usage(provider, getattr(result, "model", None), getattr(result, "usage", None))
+            return result
+
+        tokens = estimate_request_tokens(request)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            try:
+                result = await call(provider)
+                self._record_usage(provider, getattr(result, "model", None), getattr(result, "usage", None))
+                return result
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if retry_after is None:
+                    if not is_transient_error(e) or attempt >= provider.config.max_retries:
                         raise
+                    attempt += 1
+                    logger.info(f"🔁 Retrying {provider.provider_type.value} after {type(e).__name__} (attempt {attempt})")
+                    await asyncio.sleep(transient_backoff_delay(attempt - 1))
+                    continue
+                delay = backoff_delay(retry_after, attempt)
+                await limiter.backoff(delay)
+                attempt += 1
+                if attempt > provider.config.max_retries or delay > self.max_retry_after:
+                    raise
+                logger.info(f"🔁 Retrying {provider.provider_type.value} after rate limit (attempt {attempt})")
+
+    @staticmethod
+    def _record_usage(provider: AIProvider, model: Optional[str], usage: Optional[Dict[str, Any]]):
+        """Export token usage and its cost, attributed to the current endpoint"""
+        record_usage(provider.provider_type.value, usage, provider.usage_cost(model, usage))
+
+    def get_hedge_budget(self, capability: ModelCapability) -> HedgeBudget:
+        """Get the hedge budget for a capability"""
+        if capability.value not in self.hedge_budgets:
+            self.hedge_budgets[capability.value] = HedgeBudget(ratio=self.hedge_budget_ratio)
+        return self.hedge_budgets[capability.value]
+
+    def _hedge_delay(self, provider: AIProvider, key: str) -> float:
+        """Seconds to wait for a provider before hedging: its observed p90"""
+        stats = self.latency_tracker.get(provider.provider_type.value, key)
+        p90 = stats.percentile(90) if stats.samples >= self.min_samples else None
+        return p90 if p90 is not None else self.hedge_default_delay
+
+    async def _execute_hedged(
+        self,
+        capability: ModelCapability,
+        request: Any,
+        providers: List[AIProvider],
+        call: Callable[[AIProvider], Awaitable[Any]]
+    ) -> Any:
+        """
+        Hedged variant of _execute
 
-                    logger.info(f"🔄 Trying next provider...")
+        The primary gets its observed p90 latency to answer. After that, if
+        the capability's hedge budget allows, the same call is sent to the
+        next provider; the first success wins and the loser is cancelled.
+        Failures fall through to the remaining providers as usual.
+        """
+        emoji, action = CAPABILITY_LABELS[capability]
+        key = capability.value
+        budget = self.get_hedge_budget(capability)
+        budget.earn()
+
+        queue = list(providers)
+        running: Dict[asyncio.Task, tuple] = {}
+        skipped = []
+        last_error = None
+        hedge_decided = False
+        primary_name = None
+
+        def launch() -> bool:
+            """Start the next provider whose circuit allows a call"""
+            while queue:
+                provider = queue.pop(0)
+                breaker = self.get_circuit_breaker(provider.provider_type)
+                if not breaker.allow_request():
+                    skipped.append(provider.provider_type.value)
                     continue
+                logger.info(f"{emoji} {action} with {provider.provider_type.value}...")
+                task = asyncio.ensure_future(self._limited_call(provider, request, call))
+                running[task] = (provider, breaker, time.monotonic())
+                return True
+            return False
 
-            raise RuntimeError(f"All providers failed. Last error: {last_error}")
+        try:
+            if launch():
+                primary_name = next(iter(running.values()))[0].provider_type.value
+
+            while running:
+                timeout = None
+                if not hedge_decided and queue:
+                    provider, _, started = next(iter(running.values()))
+                    timeout = max(0.0, self._hedge_delay(provider, key) - (time.monotonic() - started))
+
+                done, _ = await asyncio.wait(running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedge_decided = True
+                    if budget.try_spend():
+                        if launch():
+                            HEDGED_REQUESTS.labels(capability=key).inc()
+                            logger.info(f"🏇 Hedging {action.lower()}: primary slower than p90")
+                    else:
+                        HEDGE_SUPPRESSED.labels(capability=key).inc()
+                    continue
 
+                for task in done:
+                    provider, breaker, started = running.pop(task)
+                    name = provider.provider_type.value
+                    try:
+                        result = task.result()
+                    except NotImplementedError:
+                        breaker.release()
+                        continue
+                    except RateLimitExceeded as e:
+                        breaker.release()
+                        last_error = e
+                        logger.warning(f"⏳ {e}")
+                        if self.strategy == ProviderStrategy.PRIORITY:
+                            raise
+                        continue
+                    except Exception as e:
+                        self.latency_tracker.record(name, key, time.monotonic() - started, False)
+                        self._record_breaker_failure(breaker, e)
+                        last_error = e
+                        logger.warning(f"⚠️ {action} failed with {name}: {e}")
+                        if self.strategy == ProviderStrategy.PRIORITY:
+                            raise
+                        continue
+
+                    self.latency_tracker.record(name, key, time.monotonic() - started, True)
+                    breaker.record_success()
+                    if hedge_decided and (running or name != primary_name):
+                        HEDGE_WINS.labels(capability=key, winner="primary" if name == primary_name else "hedge").inc()
+                    logger.info(f"✅ {action} successful with {name}")
+                    return result
+
+                # Everything in flight failed: fall back to the next provider
+                if not running:
+                    launch()
+
+        finally:
+            for task, (provider, breaker, started) in running.items():
+                task.cancel()
+                breaker.release()
+                self.latency_tracker.record_censored(provider.provider_type.value, key, time.monotonic() - started)
+            if running:
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+
+        if last_error is None and skipped:
+            raise RuntimeError(f"No providers available for {action.lower()}: circuit open for {', '.join(skipped)}")
+        raise RuntimeError(f"All providers failed. Last error: {last_error}") from last_error
+
+    @staticmethod
+    def _record_breaker_failure(breaker: CircuitBreaker, error: Exception):
+        """Count provider faults against the circuit, release it for client errors"""
+        if is_provider_fault(error):
+            breaker.record_failure(error)
+        else:
+            breaker.release()
+
+    async def transcribe(
+        self,
+        request: TranscriptionRequest,
+        provider_type: Optional[ProviderType] = None
+    ) -> TranscriptionResponse:
+        """
+        Transcribe audio with automatic provider selection and fallback
+
+        Args:
+            request: Transcription request
+            provider_type: Specific provider to use (None = auto-select)
+
+        Returns:
+            TranscriptionResponse
+        """
+        try:
+            return await self._execute(
+                ModelCapability.TRANSCRIPTION, request, provider_type,
+                lambda provider: provider.transcribe(request)
+            )
         except Exception as e:
             logger.error(f"❌ Transcription failed: {e}")
             raise
@@ -153,43 +547,138 @@ class ProviderManager:
     async def chat_completion(
         self,
         request: ChatRequest,
-        provider_type: Optional[ProviderType] = None
+        provider_type: Optional[ProviderType] = None,
+        hedge: bool = False
     ) -> ChatResponse:
-        """Chat completion with automatic provider selection"""
+        """
+        Chat completion with automatic provider selection
+
+        hedge=True races a slow primary against the next provider; use it for
+        interactive calls where tail latency matters more than spend.
+        """
         try:
-            if provider_type:
-                providers = [self.providers.get(provider_type)]
-            else:
-                providers = self.get_providers_for_capability(ModelCapability.CHAT)
+            return await self._execute(
+                ModelCapability.CHAT, request, provider_type,
+                lambda provider: provider.chat_completion(self._for_provider(provider, request)),
+                hedge=hedge
+            )
+        except Exception as e:
+            logger.error(f"❌ Chat completion failed: {e}")
+            raise
 
-            if not providers:
-                raise RuntimeError("No providers available for chat")
+    async def chat_completion_stream(
+        self,
+        request: ChatRequest,
+        provider_type: Optional[ProviderType] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        first_token_timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming chat completion with automatic provider selection and fallback
 
-            last_error = None
-            for provider in providers:
-                try:
-                    logger.info(f"💬 Chat with {provider.provider_type.value}...")
-                    result = await provider.chat_completion(request)
-                    logger.info(f"✅ Chat successful with {provider.provider_type.value}")
-                    return result
+        Providers are tried in routing order until one produces its first
+        token within first_token_timeout seconds. Once a token has been
+        emitted the stream is committed to that provider and later errors
+        propagate to the caller. Time to first token is what gets tracked
+        for FASTEST routing.
 
-                except NotImplementedError:
-                    continue
+        If metadata is given it receives provider, model, finish_reason and
+        usage once the stream is exhausted.
+        """
+        if provider_type:
+            providers = [self.providers[provider_type]] if provider_type in self.providers else []
+        else:
+            providers = await self.rank_providers(ModelCapability.CHAT, request, stat_key=STREAM_STAT_KEY)
 
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"⚠️ Chat failed with {provider.provider_type.value}: {e}")
+        if not providers:
+            raise RuntimeError("No providers available for chat")
 
-                    if self.strategy != ProviderStrategy.FALLBACK:
-                        raise
+        timeout = first_token_timeout if first_token_timeout is not None else self.stream_first_token_timeout
 
+        last_error = None
+        skipped = []
+        for provider in providers:
+            name = provider.provider_type.value
+            breaker = self.get_circuit_breaker(provider.provider_type)
+            if not breaker.allow_request():
+                skipped.append(name)
+                logger.info(f"⏭️ Skipping {name}: circuit {breaker.state.value}")
+                continue
+
+            limiter = self.rate_limiters.get(provider.provider_type)
+            if limiter is not None:
+                try:
+                    await limiter.acquire(estimate_request_tokens(request))
+                except RateLimitExceeded as e:
+                    breaker.release()
+                    last_error = e
+                    logger.warning(f"⏳ {e}")
+                    if self.strategy == ProviderStrategy.PRIORITY:
+                        raise
                     continue
+                except BaseException:
+                    breaker.release()
+                    raise
 
-            raise RuntimeError(f"All providers failed. Last error: {last_error}")
+            attempt_metadata: Dict[str, Any] = {}
+            stream = provider.chat_completion_stream(self._for_provider(provider, request), attempt_metadata)
+            start_time = time.monotonic()
+            try:
+                logger.info(f"💬 Streaming chat with {name}...")
+                try:
+                    first_token = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    first_token = None
 
-        except Exception as e:
-            logger.error(f"❌ Chat completion failed: {e}")
-            raise
+            except NotImplementedError:
+                breaker.release()
+                await stream.aclose()
+                continue
+
+            except asyncio.CancelledError:
+                breaker.release()
+                await stream.aclose()
+                raise
+
+            except Exception as e:
+                await stream.aclose()
+                self.latency_tracker.record(name, STREAM_STAT_KEY, time.monotonic() - start_time, False)
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"No first token from {name} within {timeout}s")
+                retry_after = rate_limit_retry_after(e)
+                if limiter is not None and retry_after is not None:
+                    await limiter.backoff(backoff_delay(retry_after, 0))
+                self._record_breaker_failure(breaker, e)
+                last_error = e
+                logger.warning(f"⚠️ Streaming chat failed with {name} before first token: {e}")
+
+                if self.strategy == ProviderStrategy.PRIORITY:
+                    raise e
+
+                logger.info("🔄 Trying next provider...")
+                continue
+
+            self.latency_tracker.record(name, STREAM_STAT_KEY, time.monotonic() - start_time, True)
+            breaker.record_success()
+
+            # Committed: relay the rest of this provider's stream
+            try:
+                if first_token is not None:
+                    yield first_token
+                async for token in stream:
+                    yield token
+            finally:
+                await stream.aclose()
+
+            self._record_usage(provider, attempt_metadata.get("model"), attempt_metadata.get("usage"))
+            if metadata is not None:
+                metadata.update(attempt_metadata, provider=name)
+            logger.info(f"✅ Streaming chat successful with {name}")
+            return
+
+        if last_error is None and skipped:
+            raise RuntimeError(f"No providers available for chat: circuit open for {', '.join(skipped)}")
+        raise RuntimeError(f"All providers failed. Last error: {last_error}") from last_error
 
     async def generate_embedding(
         self,
@@ -198,40 +687,57 @@ class ProviderManager:
     ) -> EmbeddingResponse:
         """Generate embeddings with automatic provider selection"""
         try:
-            if provider_type:
-                providers = [self.providers.get(provider_type)]
-            else:
-                providers = self.get_providers_for_capability(ModelCapability.EMBEDDING)
-
-            if not providers:
-                raise RuntimeError("No providers available for embeddings")
-
-            last_error = None
-            for provider in providers:
-                try:
-                    logger.info(f"📊 Embedding with {provider.provider_type.value}...")
-                    result = await provider.generate_embedding(request)
-                    logger.info(f"✅ Embedding successful with {provider.provider_type.value}")
-                    return result
-
-                except NotImplementedError:
-                    continue
-
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"⚠️ Embedding failed with {provider.provider_type.value}: {e}")
-
-                    if self.strategy != ProviderStrategy.FALLBACK:
-                        raise
-
-                    continue
-
-            raise RuntimeError(f"All providers failed. Last error: {last_error}")
-
+            return await self._execute(
+                ModelCapability.EMBEDDING, request, provider_type,
+                lambda provider: self._generate_embedding_cached(provider, request)
+            )
         except Exception as e:
             logger.error(f"❌ Embedding generation failed: {e}")
             raise
 
+    async def _generate_embedding_cached(
+        self,
+        provider: AIProvider,
+        request: EmbeddingRequest
+    ) -> EmbeddingResponse:
+        """
+        Serve cached vectors and send only the misses to the provider
+
+        Duplicate texts within a request are embedded once; results are
+        reassembled in input order.
+        """
+        if self.embedding_cache is None:
+            return await provider.generate_embedding(request)
+
+        texts = [request.input] if isinstance(request.input, str) else list(request.input)
+        provider_name = provider.provider_type.value
+        model = request.model or provider.default_embedding_model or "default"
+
+        embeddings = await self.embedding_cache.get_many(provider_name, model, texts)
+        misses = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+
+        usage = {"prompt_tokens": 0, "total_tokens": 0}
+        response_model = model
+        if misses:
+            result = await provider.generate_embedding(EmbeddingRequest(input=misses, model=request.model))
+            await self.embedding_cache.put_many(provider_name, model, misses, result.embeddings)
+
+            fresh = dict(zip(misses, result.embeddings))
+            embeddings = [vector if vector is not None else fresh[text] for text, vector in zip(texts, embeddings)]
+            usage = dict(result.usage)
+            response_model = result.model
+
+        miss_set = set(misses)
+        usage["cached_inputs"] = sum(1 for text in texts if text not in miss_set)
+        logger.debug(f"Embedding cache: {usage['cached_inputs']}/{len(texts)} hits ({provider_name}/{model})")
+
+        return EmbeddingResponse(
+            embeddings=embeddings,
+            model=response_model,
+            provider=provider_name,
+            usage=usage,
+        )
+
     async def vision_completion(
         self,
         request: VisionRequest,
@@ -239,52 +745,63 @@ class ProviderManager:
     ) -> VisionResponse:
         """Vision completion with automatic provider selection"""
         try:
-            if provider_type:
-                providers = [self.providers.get(provider_type)]
-            else:
-                providers = self.get_providers_for_capability(ModelCapability.VISION)
-
-            if not providers:
-                raise RuntimeError("No providers available for vision")
-
-            last_error = None
-            for provider in providers:
-                try:
-                    logger.info(f"👁️ Vision with {provider.provider_type.value}...")
-                    result = await provider.vision_completion(request)
-                    logger.info(f"✅ Vision successful with {provider.provider_type.value}")
-                    return result
-
-                except NotImplementedError:
-                    continue
-
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"⚠️ Vision failed with {provider.provider_type.value}: {e}")
-
-                    if self.strategy != ProviderStrategy.FALLBACK:
-                        raise
-
-                    continue
-
-            raise RuntimeError(f"All providers failed. Last error: {last_error}")
-
+            return await self._execute(
+                ModelCapability.VISION, request, provider_type,
+                lambda provider: provider.vision_completion(request)
+            )
         except Exception as e:
             logger.error(f"❌ Vision completion failed: {e}")
             raise
 
     async def health_check_all(self) -> Dict[str, bool]:
-        """Check health of all providers"""
-        results = {}
-        for provider_type, provider in self.providers.items():
+        """
+        Check health of all providers concurrently and feed the results to their circuit breakers
+
+        Routine results log at DEBUG; a provider going unhealthy or recovering logs a warning.
+        """
+        async def check(provider_type: ProviderType, provider: AIProvider):
+            start_time = time.monotonic()
             try:
-                is_healthy = await provider.health_check()
-                results[provider_type.value] = is_healthy
+                is_healthy = await asyncio.wait_for(provider.health_check(), self.health_check_timeout)
             except Exception as e:
-                logger.warning(f"Health check failed for {provider_type.value}: {e}")
-                results[provider_type.value] = False
-
-        return results
+                logger.debug(f"Health check failed for {provider_type.value}: {e}")
+                is_healthy = False
+            breaker = self.get_circuit_breaker(provider_type)
+            previous = breaker.last_probe
+            breaker.record_probe(is_healthy, time.monotonic() - start_time)
+            if previous is not None and previous["healthy"] != is_healthy:
+                logger.warning(f"🩺 {provider_type.value} health probe: {'healthy' if is_healthy else 'unhealthy'}")
+            else:
+                logger.debug(f"🩺 {provider_type.value} health probe: {'healthy' if is_healthy else 'unhealthy'}")
+            return provider_type.value, is_healthy
+
+        results = await asyncio.gather(*(check(t, p) for t, p in list(self.providers.items())))
+        return dict(results)
+
+    def start_health_monitor(self, interval: Optional[float] = None) -> Optional[asyncio.Task]:
+        """Start periodic background health probes (interval <= 0 disables them)"""
+        interval = interval if interval is not None else self.health_check_interval
+        if interval <= 0:
+            return None
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(self._health_monitor(interval))
+            logger.info(f"🩺 Provider health monitor started (every {interval}s)")
+        return self._health_task
+
+    async def stop_health_monitor(self):
+        """Stop background health probes"""
+        if self._health_task and not self._health_task.done():
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        self._health_task = None
+
+    async def _health_monitor(self, interval: float):
+        while True:
+            try:
+                await self.health_check_all()
+            except Exception as e:
+                logger.warning(f"Provider health probe failed: {e}")
+            await asyncio.sleep(interval)
 
     def list_all_models(self) -> Dict[str, List[ModelInfo]]:
         """List all available models from all providers"""
@@ -298,6 +815,14 @@ class ProviderManager:
 
         return models
 
+    def get_model_info(self, model: str) -> Optional[ModelInfo]:
+        """Registry entry for a model from the first provider (in priority order) that knows it"""
+        for provider in sorted(self.providers.values(), key=lambda p: p.get_priority()):
+            model_info = provider.get_model_info(model)
+            if model_info is not None:
+                return model_info
+        return None
+
     def get_provider_status(self) -> Dict[str, Any]:
         """Get status of all providers"""
         status = {
@@ -312,8 +837,17 @@ class ProviderManager:
                 "priority": provider.get_priority(),
                 "capabilities": [c.value for c in provider.get_capabilities()],
                 "models_count": len(provider.list_models()),
+                "circuit": self.get_circuit_breaker(provider_type).get_stats(),
             }
 
+        status["routing"] = {
+            "decisions": self.routing_decisions,
+            "latency": self.latency_tracker.snapshot(),
+            "hedging": {key: budget.get_stats() for key, budget in self.hedge_budgets.items()},
+            "rate_limits": {t.value: limiter.get_stats() for t, limiter in self.rate_limiters.items()},
+        }
+        status["tokenizers"] = get_tokenizer_service().get_stats()
+
         return status
 
     async def estimate_cost(
@@ -0,0 +1,396 @@
+"""
+Provider Rate Limiter
+Token-bucket admission control per provider for requests/min and tokens/min,
+with a priority wait queue, Retry-After backoff and an optional Redis-backed
+bucket shared by all replicas
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from ..tokenizer_service import get_tokenizer_service
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+RATE_LIMIT_WAIT = Histogram(
+    'provider_rate_limit_wait_seconds',
+    'Time spent waiting for provider rate limit admission',
+    ['provider', 'priority'],
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    'provider_rate_limit_rejections_total',
+    'Requests rejected because rate limit admission took too long',
+    ['provider', 'priority'],
+)
+RATE_LIMIT_BACKOFFS = Counter(
+    'provider_rate_limit_backoffs_total',
+    'Upstream 429 responses that paused a provider bucket',
+    ['provider'],
+)
+
+
+class RequestPriority(IntEnum):
+    """Admission priority, lower is served first"""
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+
+_request_priority: contextvars.ContextVar[RequestPriority] = contextvars.ContextVar(
+    "request_priority", default=RequestPriority.NORMAL
+)
+
+
+def current_priority() -> RequestPriority:
+    """Priority of the current request context"""
+    return _request_priority.get()
+
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    """Run provider calls in this block with the given admission priority"""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request can't be admitted within the maximum queue wait"""
+    status_code = 429
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"Rate limit for {provider} exceeded, retry after {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def estimate_request_tokens(request: Any) -> int:
+    """Token cost of a request for tokens/min accounting: prompt tokens plus the output budget"""
+    tokenizer = get_tokenizer_service()
+    model = getattr(request, "model", None)
+    messages = getattr(request, "messages", None)
+    if messages is not None:
+        return tokenizer.count_messages(messages, model) + (getattr(request, "max_tokens", None) or 500)
+
+    texts = getattr(request, "input", None)
+    if texts is None:
+        return 0
+    if isinstance(texts, str):
+        texts = [texts]
+    return sum(tokenizer.count(text, model) for text in texts)
+
+
+def rate_limit_retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds to back off if error is an upstream 429, else None
+
+    Reads retry-after-ms / retry-after headers when the SDK exposes the
+    response.
+    """
+    if isinstance(error, RateLimitExceeded):
+        return None
+    status_code = getattr(error, "status_code", None)
+    if status_code != 429 and type(error).__name__ != "RateLimitError":
+        return None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether error is worth retrying on the same provider
+
+    5xx, 408/409, timeouts and connection errors are; 429s are handled by
+    rate_limit_retry_after, and other 4xx are the caller's fault.
+    """
+    if isinstance(error, (RateLimitExceeded, asyncio.CancelledError)):
+        return False
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code >= 500 or status_code in (408, 409)
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+class _LocalBuckets:
+    """In-process token buckets"""
+
+    def __init__(self, limits: List[Tuple[str, float, float]]):
+        # name -> [capacity, refill per second, level, last refill]
+        now = time.monotonic()
+        self._buckets = {name: [capacity, rate, capacity, now] for name, capacity, rate in limits}
+        self._blocked_until = 0.0
+
+    async def take(self, amounts: Dict[str, float]) -> float:
+        """Take amounts from every bucket, or nothing; returns seconds to wait (0 = taken)"""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        wait = 0.0
+        for name, amount in amounts.items():
+            bucket = self._buckets[name]
+            capacity, rate, level, last = bucket
+            bucket[2] = level = min(capacity, level + (now - last) * rate)
+            bucket[3] = now
+            amount = min(amount, capacity)
+            if level < amount:
+                wait = max(wait, (amount - level) / rate)
+
+        if wait == 0.0:
+            for name, amount in amounts.items():
+                bucket = self._buckets[name]
+                bucket[2] -= min(amount, bucket[0])
+        return wait
+
+    async def block(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+# Atomically refill and take from N buckets (all or nothing). Uses the Redis
+# clock so replicas with skewed clocks agree. Returns the wait in seconds.
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local blocked = tonumber(redis.call('GET', KEYS[#KEYS]) or '0')
+if blocked > now then
+  return tostring(blocked - now)
+end
+local wait = 0
+local levels = {}
+for i = 1, #KEYS - 1 do
+  local capacity = tonumber(ARGV[(i - 1) * 3 + 1])
+  local rate = tonumber(ARGV[(i - 1) * 3 + 2])
+  local amount = math.min(tonumber(ARGV[(i - 1) * 3 + 3]), capacity)
+  local data = redis.call('HMGET', KEYS[i], 'level', 'ts')
+  local level = tonumber(data[1]) or capacity
+  local ts = tonumber(data[2]) or now
+  level = math.min(capacity, level + math.max(0, now - ts) * rate)
+  levels[i] = level
+  if level < amount then
+    wait = math.max(wait, (amount - level) / rate)
+  end
+end
+for i = 1, #KEYS - 1 do
+  local capacity = tonumber(ARGV[(i - 1) * 3 + 1])
+  local rate = tonumber(ARGV[(i - 1) * 3 + 2])
+  local amount = math.min(tonumber(ARGV[(i - 1) * 3 + 3]), capacity)
+  local level = levels[i]
+  if wait == 0 then
+    level = level - amount
+  end
+  redis.call('HSET', KEYS[i], 'level', level, 'ts', now)
+  redis.call('PEXPIRE', KEYS[i], math.ceil(capacity / rate * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+_BLOCK_SCRIPT = """
+local t = redis.call('TIME')
+local until_ts = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ts > current then
+  redis.call('SET', KEYS[1], tostring(until_ts), 'PX', math.ceil(tonumber(ARGV[1]) * 1000) + 1000)
+end
+return 1
+"""
+
+
+class _RedisBuckets:
+    """Token buckets shared by all replicas through Redis"""
+
+    def __init__(self, redis_client: Any, key_prefix: str, limits: List[Tuple[str, float, float]]):
+        self.redis = redis_client
+        self.limits = limits
+        self.keys = [f"{key_prefix}:{name}" for name, _, _ in limits]
+        self.block_key = f"{key_prefix}:blocked"
+        self._take = redis_client.register_script(_TAKE_SCRIPT)
+        self._block = redis_client.register_script(_BLOCK_SCRIPT)
+
+    async def take(self, amounts: Dict[str, float]) -> float:
+        args: List[float] = []
+        for name, capacity, rate in self.limits:
+            args.extend([capacity, rate, amounts.get(name, 0)])
+        return float(await self._take(keys=[*self.keys, self.block_key], args=args))
+
+    async def block(self, seconds: float):
+        await self._block(keys=[self.block_key], args=[seconds])
+
+
+class ProviderRateLimiter:
+    """
+    Requests/min and tokens/min admission control for one provider
+
+    Waiters queue by (priority, arrival); only the head of the queue takes
+    from the buckets, so interactive requests overtake queued batch work
+    and a large request isn't starved by a stream of small ones.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        redis_client: Any = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+        limits = []
+        if rpm:
+            limits.append(("rpm", float(rpm), rpm / 60.0))
+        if tpm:
+            limits.append(("tpm", float(tpm), tpm / 60.0))
+
+        if redis_client is not None:
+            self.backend = "redis"
+            # Hash-tagged so the bucket and block keys share a Redis Cluster slot for the Lua scripts
+            self._buckets = _RedisBuckets(redis_client, f"ratelimit:{{{name}}}", limits)
+        else:
+            self.backend = "memory"
+            self._buckets = _LocalBuckets(limits)
+
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def acquire(self, tokens: int = 0, priority: Optional[RequestPriority] = None):
+        """
+        Wait until the request is admitted
+
+        Raises RateLimitExceeded if admission would take longer than max_wait.
+        """
+        priority = current_priority() if priority is None else priority
+        amounts: Dict[str, float] = {}
+        if self.rpm:
+            amounts["rpm"] = 1
+        if self.tpm:
+            amounts["tpm"] = tokens
+        if not amounts:
+            return
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+
+        entry = (int(priority), next(self._sequence))
+        heapq.heappush(self._waiters, entry)
+        started = time.monotonic()
+        try:
+            while True:
+                elapsed = time.monotonic() - started
+                if self._waiters[0] is entry:
+                    wait = await self._buckets.take(amounts)
+                    if wait <= 0:
+                        break
+                    if elapsed + wait > self.max_wait:
+                        self.rejected += 1
+                        RATE_LIMIT_REJECTIONS.labels(provider=self.name, priority=priority.name.lower()).inc()
+                        raise RateLimitExceeded(self.name, wait)
+                else:
+                    wait = self.max_wait - elapsed
+                    if wait <= 0:
+                        self.rejected += 1
+                        RATE_LIMIT_REJECTIONS.labels(provider=self.name, priority=priority.name.lower()).inc()
+                        raise RateLimitExceeded(self.name, 1.0)
+
+                # Sleep until the bucket refills or the queue head changes
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._notify()
+
+        self.admitted += 1
+        RATE_LIMIT_WAIT.labels(provider=self.name, priority=priority.name.lower()).observe(time.monotonic() - started)
+
+    async def backoff(self, retry_after: float):
+        """Pause admissions after an upstream 429 (shared across replicas with Redis)"""
+        RATE_LIMIT_BACKOFFS.labels(provider=self.name).inc()
+        logger.warning(f"⏳ {self.name} rate limited upstream, pausing {retry_after:.1f}s")
+        await self._buckets.block(retry_after)
+        self._notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+_redis_client: Any = None
+
+
+def get_shared_redis() -> Any:
+    """
+    Redis client for shared buckets, or None for in-process buckets
+
+    Enabled with RATE_LIMIT_BACKEND=redis (uses REDIS_URL).
+    """
+    global _redis_client
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() != "redis":
+        return None
+    if not REDIS_AVAILABLE:
+        logger.warning("RATE_LIMIT_BACKEND=redis but redis is not installed, using in-process buckets")
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    return _redis_client
+
+
+def backoff_delay(retry_after: float, attempt: int) -> float:
+    """Retry-After if the provider sent one, else capped exponential backoff"""
+    if retry_after > 0:
+        return retry_after
+    return min(30.0, float(math.pow(2, attempt)))
+
+
+def transient_backoff_delay(attempt: int) -> float:
+    """Jittered exponential backoff for transient errors (0.5s, 1s, 2s ... capped at 8s)"""
+    return min(8.0, 0.5 * math.pow(2, attempt)) * random.uniform(0.75, 1.0)
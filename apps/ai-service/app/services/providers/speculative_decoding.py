@@ -0,0 +1,357 @@
+"""
+Speculative Decoding
+Assisted generation for local LLMs: a small draft model of the same
+family proposes a few tokens, the target model verifies them in one forward
+pass, and every accepted token saves a full target decode step
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import torch
+from prometheus_client import Counter, Gauge, Histogram
+
+from .batching_engine import GenerationSequence, eos_token_ids
+from .constrained_decoding import JSONSchemaConstraint, TokenVocabulary
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+SPECULATIVE_DRAFTED = Counter(
+    'local_speculative_draft_tokens_total',
+    'Draft tokens proposed to the target model',
+    ['model'],
+)
+SPECULATIVE_ACCEPTED = Counter(
+    'local_speculative_accepted_tokens_total',
+    'Draft tokens accepted by the target model',
+    ['model'],
+)
+SPECULATIVE_TOKENS_PER_STEP = Histogram(
+    'local_speculative_tokens_per_step',
+    'Tokens produced per target forward pass',
+    ['model'],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 12),
+)
+SPECULATIVE_SPEEDUP = Gauge(
+    'local_speculative_speedup',
+    'Estimated decode speedup over generating with the target model alone',
+    ['model'],
+)
+
+
+def _probs(logits: torch.Tensor, temperature: float, top_p: float) -> torch.Tensor:
+    """Sampling distribution after temperature and nucleus filtering"""
+    probs = torch.softmax(logits.float() / temperature, dim=-1)
+    if top_p < 1.0:
+        sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+        cumulative = torch.cumsum(sorted_probs, dim=-1)
+        sorted_probs[(cumulative - sorted_probs) > top_p] = 0.0
+        probs = torch.zeros_like(probs).scatter_(-1, sorted_ids, sorted_probs)
+        probs = probs / probs.sum()
+    return probs
+
+
+def _crop(cache: Any, length: int):
+    """Drop KV entries past length (rejected draft positions)"""
+    if cache is not None and cache.get_seq_length() > length:
+        cache.crop(length - cache.get_seq_length())  # negative: number of entries to remove
+
+
+class SpeculativeDecoder:
+    """
+    Draft-and-verify generation for one target/draft model pair
+
+    Each round the draft proposes up to num_draft_tokens tokens and the target
+    scores all of them in a single forward pass. Drafts are accepted by
+    speculative sampling (exact match under greedy decoding), so the output
+    follows the target model's distribution; the first rejected position is
+    resampled from the target and both KV caches are cropped back to the
+    accepted tokens. The draft length grows while whole drafts are accepted
+    and shrinks on rejections.
+
+    The two models must share a tokenizer. Sequences are submitted like
+    ContinuousBatchingEngine.submit and decoded one at a time on a worker
+    thread; LocalProvider overflows concurrent requests to its batching
+    engine while pending() is non-zero. Sequences with
+    a response_schema decode on the target alone, one constrained token per
+    pass.
+    """
+
+    def __init__(
+        self,
+        target: Any,
+        draft: Any,
+        tokenizer: Any,
+        model_name: str,
+        num_draft_tokens: Optional[int] = None,
+    ):
+        self.target = target
+        self.draft = draft
+        self.tokenizer = tokenizer
+        self.model_name = model_name
+        self.num_draft_tokens = num_draft_tokens or int(os.getenv("LOCAL_SPECULATIVE_DRAFT_TOKENS", "5"))
+        self.max_draft_tokens = self.num_draft_tokens * 2
+        self.eos_token_ids = eos_token_ids(target, tokenizer)
+        self.vocabulary = TokenVocabulary(tokenizer)
+        # Same tokenizer, but embedding matrices may be padded to different sizes
+        self.vocab_size = min(target.config.vocab_size, draft.config.vocab_size)
+
+        self._waiting: Deque[GenerationSequence] = deque()
+        self._current: Optional[GenerationSequence] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._draining = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.sequences = 0
+        self.rounds = 0
+        self.drafted = 0
+        self.accepted = 0
+        self.tokens_generated = 0
+        self.draft_time = 0.0
+        self.target_time = 0.0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="local-speculative-decoder", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = False):
+        """Stop the worker thread, finishing queued sequences first if drain is set"""
+        if drain:
+            self._draining = True
+        else:
+            self._running = False
+        self._wakeup.set()
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the worker thread to exit after stop()"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float = 0.7,
+        top_p: float = 1.0,
+        past_key_values: Any = None,
+        response_schema: Optional[Dict[str, Any]] = None,
+    ) -> GenerationSequence:
+        """Queue a prompt (shape [1, length]); past_key_values may hold a prefilled prefix"""
+        if not self._running or self._draining:
+            raise RuntimeError("Speculative decoder is not running")
+        constraint = JSONSchemaConstraint(response_schema, self.vocabulary, self.eos_token_ids) if response_schema else None
+        sequence = GenerationSequence(
+            input_ids, max_new_tokens, temperature, top_p, past_key_values, response_schema, constraint
+        )
+        with self._lock:
+            self._waiting.append(sequence)
+        self._wakeup.set()
+        return sequence
+
+    def _run(self):
+        logger.info(f"⚙️ Speculative decoder started for {self.model_name} ({self.num_draft_tokens} draft tokens)")
+        while self._running:
+            with self._lock:
+                sequence = self._waiting.popleft() if self._waiting else None
+                self._current = sequence
+            if sequence is None:
+                if self._draining:
+                    break
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            if sequence.cancelled:
+                continue
+
+            try:
+                self._generate(sequence)
+            except Exception as e:
+                logger.error(f"Speculative decoding failed: {e}")
+                sequence.finish_reason = "error"
+                sequence._put("error", e)
+            finally:
+                with self._lock:
+                    self._current = None
+
+        self._running = False
+        with self._lock:
+            pending = list(self._waiting)
+            self._waiting.clear()
+        for sequence in pending:
+            sequence.finish_reason = "error"
+            sequence._put("error", RuntimeError("Speculative decoder stopped"))
+
+    @torch.no_grad()
+    def _generate(self, sequence: GenerationSequence):
+        device = self.target.device
+        greedy = sequence.temperature <= 0
+        ids: List[int] = sequence.input_ids[0].tolist()
+
+        # The target cache always covers ids[:-1]; the last token is fed with the drafts
+        target_cache = sequence.past_key_values
+        sequence.past_key_values = None
+        cached = target_cache.get_seq_length() if target_cache is not None else 0
+        if cached >= len(ids):
+            _crop(target_cache, len(ids) - 1)
+            cached = len(ids) - 1
+        if cached < len(ids) - 1:
+            outputs = self.target(
+                input_ids=torch.tensor([ids[cached:-1]], device=device),
+                past_key_values=target_cache,
+                use_cache=True,
+            )
+            target_cache = outputs.past_key_values
+
+        draft_cache = None
+        draft_length = 0  # tokens of ids covered by draft_cache
+        num_draft = self.num_draft_tokens
+        self.sequences += 1
+
+        while sequence.finish_reason is None:
+            if sequence.cancelled:
+                sequence.finish_reason = "cancelled"
+                sequence._put("done")
+                break
+
+            # Draft proposals, leaving room for the target's own token
+            started = time.monotonic()
+            steps = min(num_draft, sequence.max_new_tokens - len(sequence.generated) - 1)
+            if sequence.constraint is not None:
+                steps = 0  # drafts would have to be verified against the schema too
+            drafts: List[int] = []
+            draft_probs: List[torch.Tensor] = []
+            feed = ids[draft_length:]
+            for _ in range(max(steps, 0)):
+                outputs = self.draft(
+                    input_ids=torch.tensor([feed], device=self.draft.device),
+                    past_key_values=draft_cache,
+                    use_cache=True,
+                )
+                draft_cache = outputs.past_key_values
+                draft_length += len(feed)
+                logits = outputs.logits[0, -1, :self.vocab_size].to(device)
+                if greedy:
+                    token = int(torch.argmax(logits))
+                else:
+                    q = _probs(logits, sequence.temperature, sequence.top_p)
+                    token = int(torch.multinomial(q, 1))
+                    draft_probs.append(q)
+                drafts.append(token)
+                feed = [token]
+            drafted_at = time.monotonic()
+
+            # One target pass scores the position after the last token and after each draft
+            outputs = self.target(
+                input_ids=torch.tensor([[ids[-1]] + drafts], device=device),
+                past_key_values=target_cache,
+                use_cache=True,
+            )
+            target_cache = outputs.past_key_values
+            logits = outputs.logits[0, :, :self.vocab_size]
+            self.draft_time += drafted_at - started
+            self.target_time += time.monotonic() - drafted_at
+
+            accepted = 0
+            next_token: Optional[int] = None
+            for position, token in enumerate(drafts):
+                if greedy:
+                    target_token = int(torch.argmax(logits[position]))
+                    if target_token == token:
+                        accepted += 1
+                        continue
+                    next_token = target_token
+                    break
+
+                p = _probs(logits[position], sequence.temperature, sequence.top_p)
+                q = draft_probs[position]
+                if torch.rand(1).item() < min(1.0, float(p[token] / q[token])):
+                    accepted += 1
+                    continue
+                # Rejected: resample from the part of p that q over-proposed
+                residual = torch.clamp(p - q, min=0.0)
+                residual = residual if residual.sum() > 0 else p
+                next_token = int(torch.multinomial(residual / residual.sum(), 1))
+                break
+
+            if next_token is None and sequence.constraint is not None:
+                next_token = sequence.sample(logits[len(drafts)])
+            elif next_token is None:
+                last = logits[len(drafts)]
+                next_token = int(torch.argmax(last)) if greedy else int(
+                    torch.multinomial(_probs(last, sequence.temperature, sequence.top_p), 1)
+                )
+
+            new_tokens = drafts[:accepted] + [next_token]
+            valid = len(ids) + accepted  # ids and accepted drafts, the caches' shared prefix
+            ids.extend(new_tokens)
+            _crop(target_cache, len(ids) - 1)
+            _crop(draft_cache, min(draft_length, valid))
+            draft_length = min(draft_length, valid)
+
+            self.rounds += 1
+            self.drafted += len(drafts)
+            self.accepted += accepted
+            SPECULATIVE_DRAFTED.labels(model=self.model_name).inc(len(drafts))
+            SPECULATIVE_ACCEPTED.labels(model=self.model_name).inc(accepted)
+            SPECULATIVE_TOKENS_PER_STEP.labels(model=self.model_name).observe(len(new_tokens))
+
+            for token in new_tokens:
+                if not sequence.append_token(token, self.tokenizer, self.eos_token_ids):
+                    break
+                self.tokens_generated += 1
+                if sequence.finish_reason is not None:
+                    break
+
+            if drafts and accepted == len(drafts):
+                num_draft = min(num_draft + 2, self.max_draft_tokens)
+            elif accepted < len(drafts):
+                num_draft = max(num_draft - 1, 1)
+
+        SPECULATIVE_SPEEDUP.labels(model=self.model_name).set(self.speedup)
+
+    def pending(self) -> int:
+        """Sequences queued or decoding"""
+        with self._lock:
+            return len(self._waiting) + (self._current is not None)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    @property
+    def speedup(self) -> float:
+        """
+        Estimated speedup over target-only decoding
+
+        A verification pass costs about as much as one target decode step on
+        a memory-bound CPU, so target-only decoding would have taken
+        tokens_generated * (target time per pass).
+        """
+        elapsed = self.draft_time + self.target_time
+        if not self.rounds or not elapsed:
+            return 0.0
+        return self.tokens_generated * (self.target_time / self.rounds) / elapsed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = len(self._waiting)
+        return {
+            "running": self._running,
+            "waiting": waiting,
+            "num_draft_tokens": self.num_draft_tokens,
+            "sequences": self.sequences,
+            "tokens_generated": self.tokens_generated,
+            "acceptance_rate": round(self.acceptance_rate, 3),
+            "tokens_per_target_pass": round(self.tokens_generated / self.rounds, 2) if self.rounds else 0.0,
+            "speedup": round(self.speedup, 2),
+        }
@@ -0,0 +1,480 @@
+"""
+Meeting Retrieval Service
+Chunks meeting transcripts, embeds them through the provider layer and keeps a
+per-organization vector index (FAISS / hnswlib HNSW, NumPy brute-force fallback)
+so chat prompts only carry the top-k relevant chunks
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+# ANN backends (pip install faiss-cpu / hnswlib), imported when the first index is created
+FAISS_AVAILABLE = importlib.util.find_spec("faiss") is not None
+HNSWLIB_AVAILABLE = importlib.util.find_spec("hnswlib") is not None
+
+if not FAISS_AVAILABLE and not HNSWLIB_AVAILABLE:
+    logger.warning("Neither faiss nor hnswlib installed, retrieval will use NumPy brute-force search")
+
+# Prometheus metrics
+RETRIEVAL_DURATION = Histogram('retrieval_search_duration_seconds', 'Vector search duration', ['backend'])
+RETRIEVAL_INDEX_DURATION = Histogram('retrieval_index_duration_seconds', 'Meeting indexing duration (incl. embeddings)')
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+@dataclass
+class RetrievedChunk:
+    """Transcript chunk returned by a search"""
+    meeting_id: str
+    chunk_index: int
+    text: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def chunk_text(text: str, max_chars: int = 1200, overlap: int = 150) -> List[str]:
+    """Split text into overlapping chunks on sentence boundaries"""
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+    chunks: List[str] = []
+    current = ""
+
+    for sentence in sentences:
+        # Hard-split sentences longer than a chunk
+        while len(sentence) > max_chars:
+            chunks.append(sentence[:max_chars])
+            sentence = sentence[max_chars - overlap:]
+
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = current[-overlap:] if overlap else ""
+        current = f"{current} {sentence}".strip()
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_segments(segments: Sequence[Dict[str, Any]], max_chars: int = 1200) -> List[Tuple[str, Dict[str, Any]]]:
+    """Group transcript segments into chunks, keeping speaker labels and start times"""
+    chunks: List[Tuple[str, Dict[str, Any]]] = []
+    lines: List[str] = []
+    size = 0
+    start_time = None
+
+    for seg in segments:
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        speaker = seg.get("speaker") or seg.get("speaker_id")
+        line = f"{speaker}: {text}" if speaker else text
+
+        if lines and size + len(line) > max_chars:
+            chunks.append(("\n".join(lines), {"start_time": start_time}))
+            lines, size, start_time = [], 0, None
+
+        if start_time is None:
+            start_time = seg.get("start_time", seg.get("start"))
+        lines.append(line)
+        size += len(line) + 1
+
+    if lines:
+        chunks.append(("\n".join(lines), {"start_time": start_time}))
+    return chunks
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _AnnIndex:
+    """Thin wrapper over the FAISS / hnswlib HNSW implementations (inner product)"""
+
+    def __init__(self, backend: str, dim: int):
+        self.backend = backend
+        self.dim = dim
+        self.index = None
+        self.lib = importlib.import_module(backend)  # faiss or hnswlib
+
+    def build(self, vectors: np.ndarray):
+        """Build from scratch; labels are row positions"""
+        if self.backend == "faiss":
+            self.index = self.lib.IndexHNSWFlat(self.dim, 32, self.lib.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 200
+        else:
+            self.index = self.lib.Index(space="ip", dim=self.dim)
+            self.index.init_index(max_elements=max(1024, len(vectors) * 2), ef_construction=200, M=16)
+        self.add(vectors, 0)
+
+    def add(self, vectors: np.ndarray, start_label: int):
+        """Append rows (labels continue from start_label)"""
+        if len(vectors) == 0:
+            return
+        data = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.backend == "faiss":
+            self.index.add(data)
+        else:
+            needed = start_label + len(data)
+            if needed > self.index.get_max_elements():
+                self.index.resize_index(needed * 2)
+            self.index.add_items(data, np.arange(start_label, needed))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (labels, scores) of the k nearest rows"""
+        data = np.ascontiguousarray(query[None, :], dtype=np.float32)
+        if self.backend == "faiss":
+            self.index.hnsw.efSearch = max(64, k * 2)
+            scores, labels = self.index.search(data, k)
+            return labels[0], scores[0]
+        self.index.set_ef(max(64, k * 2))
+        labels, distances = self.index.knn_query(data, k=k)
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def save(self, path: str):
+        if self.backend == "faiss":
+            self.lib.write_index(self.index, path)
+        else:
+            self.index.save_index(path)
+
+    def load(self, path: str, count: int):
+        if self.backend == "faiss":
+            self.index = self.lib.read_index(path)
+        else:
+            self.index = self.lib.Index(space="ip", dim=self.dim)
+            self.index.load_index(path, max_elements=max(1024, count * 2))
+
+    def __len__(self) -> int:
+        if self.index is None:
+            return 0
+        return self.index.ntotal if self.backend == "faiss" else self.index.get_current_count()
+
+
+class VectorIndex:
+    """
+    Vectors and chunk metadata for one organization
+
+    The float32 matrix is the source of truth (persisted as float16). The ANN
+    graph is appended to on insert and rebuilt lazily after deletions; it is
+    only consulted once the index is large enough for brute force to matter.
+    """
+
+    def __init__(self, directory: str, backend: str, ann_min_vectors: int = 5000):
+        self.directory = directory
+        self.backend = backend
+        self.ann_min_vectors = ann_min_vectors
+
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.chunks: List[Dict[str, Any]] = []
+
+        self._ann: Optional[_AnnIndex] = None
+        self._ann_dirty = True
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1] if self.vectors.size else 0
+
+    @property
+    def _ann_path(self) -> str:
+        return os.path.join(self.directory, f"index.{self.backend}")
+
+    def load(self):
+        """Load vectors, metadata and ANN graph from disk if present"""
+        vectors_path = os.path.join(self.directory, "vectors.npy")
+        meta_path = os.path.join(self.directory, "chunks.json")
+        if not os.path.exists(vectors_path) or not os.path.exists(meta_path):
+            return
+
+        self.vectors = np.load(vectors_path).astype(np.float32)
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        self.chunks = meta.get("chunks", [])
+
+        if self.backend != "numpy" and os.path.exists(self._ann_path) and len(self.chunks):
+            try:
+                self._ann = _AnnIndex(self.backend, self.dim)
+                self._ann.load(self._ann_path, len(self.chunks))
+                self._ann_dirty = len(self._ann) != len(self.chunks)
+            except Exception as e:
+                logger.warning(f"Failed to load ANN index, will rebuild: {e}")
+                self._ann, self._ann_dirty = None, True
+
+    def save(self):
+        """Persist vectors (float16), metadata and ANN graph"""
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(os.path.join(self.directory, "vectors.npy"), self.vectors.astype(np.float16))
+        with open(os.path.join(self.directory, "chunks.json"), "w") as f:
+            json.dump({"chunks": self.chunks}, f)
+        if self._ann is not None and not self._ann_dirty:
+            self._ann.save(self._ann_path)
+        elif os.path.exists(self._ann_path):
+            # Rows moved since the graph was built; a stale graph of the same size would map labels to the wrong chunks
+            os.remove(self._ann_path)
+
+    def add(self, vectors: np.ndarray, chunks: List[Dict[str, Any]]):
+        """Append normalized vectors with their chunk metadata"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.vectors.size and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} doesn't match index dimension {self.dim}; "
+                f"reindex the organization after changing embedding models"
+            )
+
+        start = len(self.chunks)
+        self.vectors = np.vstack([self.vectors, vectors]) if self.vectors.size else vectors
+        self.chunks.extend(chunks)
+
+        if self._ann is not None and not self._ann_dirty:
+            self._ann.add(vectors, start)
+
+    def remove_meeting(self, meeting_id: str) -> int:
+        """Drop all chunks of a meeting, returns the number removed"""
+        keep = [i for i, chunk in enumerate(self.chunks) if chunk["meeting_id"] != meeting_id]
+        removed = len(self.chunks) - len(keep)
+        if removed:
+            self.vectors = self.vectors[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+            self.chunks = [self.chunks[i] for i in keep]
+            self._ann_dirty = True
+        return removed
+
+    def _use_ann(self) -> bool:
+        return self.backend != "numpy" and len(self.chunks) >= self.ann_min_vectors
+
+    def _ensure_ann(self):
+        if self._ann is None or self._ann_dirty:
+            self._ann = _AnnIndex(self.backend, self.dim)
+            self._ann.build(self.vectors)
+            self._ann_dirty = False
+
+    def search(self, query: np.ndarray, top_k: int, meeting_ids: Optional[Sequence[str]] = None) -> List[Tuple[int, float]]:
+        """Return (row, score) pairs of the top_k most similar chunks"""
+        if not self.chunks:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32)[None, :])[0]
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Query dimension {query.shape[0]} doesn't match index dimension {self.dim}")
+
+        allowed = set(meeting_ids) if meeting_ids else None
+        rows = None
+        if allowed is not None:
+            rows = np.array([i for i, c in enumerate(self.chunks) if c["meeting_id"] in allowed], dtype=np.int64)
+            if len(rows) == 0:
+                return []
+
+        # ANN for large unfiltered (or weakly filtered) searches
+        if self._use_ann() and (rows is None or len(rows) >= self.ann_min_vectors):
+            self._ensure_ann()
+            oversample = top_k if rows is None else top_k * 4
+            k = min(len(self.chunks), oversample)
+            with RETRIEVAL_DURATION.labels(backend=self.backend).time():
+                labels, scores = self._ann.search(query, k)
+            results = [
+                (int(label), float(score))
+                for label, score in zip(labels, scores)
+                if label >= 0 and (allowed is None or self.chunks[label]["meeting_id"] in allowed)
+            ]
+            if len(results) >= min(top_k, len(rows) if rows is not None else top_k):
+                return results[:top_k]
+
+        # Exact brute force (small indexes or narrow filters)
+        with RETRIEVAL_DURATION.labels(backend="numpy").time():
+            candidates = self.vectors if rows is None else self.vectors[rows]
+            scores = candidates @ query
+            k = min(top_k, len(scores))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+        positions = best if rows is None else rows[best]
+        return [(int(pos), float(scores[i])) for pos, i in zip(positions, best)]
+
+
+class RetrievalService:
+    """
+    Index meeting transcripts per organization and retrieve relevant chunks
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None, index_dir: Optional[str] = None):
+        self.embedder = embedder or self._embed_with_provider_manager
+        self.index_dir = index_dir or os.getenv(
+            "RETRIEVAL_INDEX_DIR",
+            str(Path.home() / ".openmeet" / "indexes")
+        )
+        self.chunk_chars = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1200"))
+        self.ann_min_vectors = int(os.getenv("RETRIEVAL_ANN_MIN_VECTORS", "5000"))
+        self.backend = self._select_backend(os.getenv("RETRIEVAL_INDEX_BACKEND", "auto"))
+
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        logger.info(f"🔎 Retrieval service initialized (backend={self.backend}, dir={self.index_dir})")
+
+    @staticmethod
+    def _select_backend(requested: str) -> str:
+        requested = requested.lower()
+        if requested == "faiss" and FAISS_AVAILABLE:
+            return "faiss"
+        if requested == "hnswlib" and HNSWLIB_AVAILABLE:
+            return "hnswlib"
+        if requested == "auto":
+            if FAISS_AVAILABLE:
+                return "faiss"
+            if HNSWLIB_AVAILABLE:
+                return "hnswlib"
+        if requested not in ("auto", "numpy"):
+            logger.warning(f"Retrieval backend '{requested}' not available, using NumPy brute force")
+        return "numpy"
+
+    @staticmethod
+    async def _embed_with_provider_manager(texts: List[str]) -> List[List[float]]:
+        """Default embedder: provider layer (with embedding cache)"""
+        from .providers import EmbeddingRequest, get_provider_manager
+
+        response = await get_provider_manager().generate_embedding(
+            EmbeddingRequest(input=texts, model=os.getenv("RETRIEVAL_EMBEDDING_MODEL") or None)
+        )
+        return response.embeddings
+
+    @staticmethod
+    def _safe_name(organization_id: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", organization_id)
+
+    def _lock(self, organization_id: str) -> asyncio.Lock:
+        if organization_id not in self._locks:
+            self._locks[organization_id] = asyncio.Lock()
+        return self._locks[organization_id]
+
+    async def _get_index(self, organization_id: str) -> VectorIndex:
+        """Load an organization's index on first use"""
+        index = self._indexes.get(organization_id)
+        if index is None:
+            index = VectorIndex(
+                os.path.join(self.index_dir, self._safe_name(organization_id)),
+                self.backend,
+                self.ann_min_vectors,
+            )
+            await asyncio.get_running_loop().run_in_executor(None, index.load)
+            index = self._indexes.setdefault(organization_id, index)
+        return index
+
+    async def index_meeting(
+        self,
+        organization_id: str,
+        meeting_id: str,
+        text: Optional[str] = None,
+        segments: Optional[List[Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        (Re)index a meeting transcript
+
+        Args:
+            organization_id: Organization owning the index
+            meeting_id: Meeting ID (existing chunks are replaced)
+            text: Plain transcript text
+            segments: Transcript segments with speaker/start_time (preferred over text)
+            metadata: Extra fields stored with every chunk (e.g. title, date)
+
+        Returns:
+            Number of chunks indexed
+        """
+        if segments:
+            pieces = chunk_segments(segments, self.chunk_chars)
+        else:
+            pieces = [(chunk, {}) for chunk in chunk_text(text or "", self.chunk_chars)]
+
+        with RETRIEVAL_INDEX_DURATION.time():
+            vectors = await self.embedder([piece for piece, _ in pieces]) if pieces else []
+
+            chunks = [
+                {"meeting_id": meeting_id, "chunk_index": i, "text": piece, **(metadata or {}), **extra}
+                for i, (piece, extra) in enumerate(pieces)
+            ]
+
+            async with self._lock(organization_id):
+                index = await self._get_index(organization_id)
+                index.remove_meeting(meeting_id)
+                if chunks:
+                    index.add(np.asarray(vectors, dtype=np.float32), chunks)
+                await asyncio.get_running_loop().run_in_executor(None, index.save)
+
+        logger.info(f"📚 Indexed meeting {meeting_id} for org {organization_id}: {len(chunks)} chunks")
+        return len(chunks)
+
+    async def delete_meeting(self, organization_id: str, meeting_id: str) -> int:
+        """Remove a meeting from the index"""
+        async with self._lock(organization_id):
+            index = await self._get_index(organization_id)
+            removed = index.remove_meeting(meeting_id)
+            if removed:
+                await asyncio.get_running_loop().run_in_executor(None, index.save)
+        return removed
+
+    async def retrieve(
+        self,
+        organization_id: str,
+        query: str,
+        top_k: int = 8,
+        meeting_ids: Optional[Sequence[str]] = None,
+    ) -> List[RetrievedChunk]:
+        """Return the top_k chunks most relevant to the query"""
+        index = await self._get_index(organization_id)
+        if not index.chunks:
+            return []
+
+        query_vector = (await self.embedder([query]))[0]
+
+        # Indexing and deletes rebuild the index and chunk list under the same lock
+        async with self._lock(organization_id):
+            hits = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: index.search(np.asarray(query_vector, dtype=np.float32), top_k, meeting_ids)
+            )
+            chunks = [index.chunks[row] for row, _ in hits]
+
+        results = []
+        for chunk, (_, score) in zip(chunks, hits):
+            metadata = {k: v for k, v in chunk.items() if k not in ("meeting_id", "chunk_index", "text")}
+            results.append(RetrievedChunk(
+                meeting_id=chunk["meeting_id"],
+                chunk_index=chunk["chunk_index"],
+                text=chunk["text"],
+                score=score,
+                metadata=metadata,
+            ))
+        return results
+
+    async def get_index_stats(self, organization_id: str) -> Dict[str, Any]:
+        """Index size information for an organization"""
+        index = await self._get_index(organization_id)
+        return {
+            "backend": index.backend,
+            "chunks": len(index.chunks),
+            "meetings": len({c["meeting_id"] for c in index.chunks}),
+            "dimension": index.dim,
+        }
+
+
+# Singleton instance
+_retrieval_instance: Optional[RetrievalService] = None
+
+
+def get_retrieval_service() -> RetrievalService:
+    """Get or create retrieval service instance"""
+    global _retrieval_instance
+    if _retrieval_instance is None:
+        _retrieval_instance = RetrievalService()
+    return _retrieval_instance
@@ -4,7 +4,9 @@ Uses pyannote.audio for production-grade speaker identification
 """
 
 import os
+import asyncio
 import logging
+from functools import partial
 from typing import List, Dict, Any, Optional, NamedTuple
 from pathlib import Path
 import torch
@@ -15,6 +17,12 @@ import torchaudio
 if not hasattr(torchaudio, 'set_audio_backend'):
     torchaudio.set_audio_backend = lambda x: None
 
+if not hasattr(torchaudio, 'get_audio_backend'):
+    torchaudio.get_audio_backend = lambda: "soundfile"
+
+if not hasattr(torchaudio, 'list_audio_backends'):
+    torchaudio.list_audio_backends = lambda: ["soundfile", "sox"]
+
 # AudioMetaData was removed in torchaudio 2.2+, add compatibility shim
 if not hasattr(torchaudio, 'AudioMetaData'):
     class AudioMetaData(NamedTuple):
@@ -114,16 +122,13 @@ class SpeakerDiarizationService:
 
             # Configure pipeline parameters
             if num_speakers:
-                diarization_result = self.pipeline(
-                    audio_path,
-                    num_speakers=num_speakers
-                )
+                run_pipeline = partial(self.pipeline, audio_path, num_speakers=num_speakers)
             else:
-                diarization_result = self.pipeline(
-                    audio_path,
-                    min_speakers=min_speakers,
-                    max_speakers=max_speakers
-                )
+                run_pipeline = partial(self.pipeline, audio_path, min_speakers=min_speakers, max_speakers=max_speakers)
+
+            # The pipeline is blocking; run it off the event loop so transcription can overlap
+            loop = asyncio.get_running_loop()
+            diarization_result = await loop.run_in_executor(None, run_pipeline)
 
             # Convert pyannote Annotation to list of segments
             segments = []
@@ -259,6 +264,7 @@ class SpeakerDiarizationService:
             merged_seg = trans_seg.copy()
             merged_seg["speaker_id"] = speaker_id
             merged_seg["speaker"] = speaker_id.replace("_", " ").title()
+            merged_seg.setdefault("duration", max(0.0, trans_end - trans_start))
             merged_segments.append(merged_seg)
 
         logger.info(f"Merged {len(merged_segments)} transcription segments with speaker info")
@@ -0,0 +1,62 @@
+"""
+Structured Output
+JSON schemas for LLM responses, derived from the endpoints' Pydantic response
+models, that local providers enforce with constrained decoding
+"""
+
+import copy
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+
+def _resolve(schema: Any, defs: Dict[str, Any]) -> Any:
+    """Inline $ref definitions and drop annotations that don't constrain the output"""
+    if isinstance(schema, list):
+        return [_resolve(item, defs) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    if "$ref" in schema:
+        return _resolve(defs[schema["$ref"].split("/")[-1]], defs)
+
+    resolved = {}
+    for key, value in schema.items():
+        if key in ("title", "description", "default", "examples", "$defs"):
+            continue
+        if key == "properties":
+            resolved[key] = {name: _resolve(prop, defs) for name, prop in value.items()}
+        else:
+            resolved[key] = _resolve(value, defs)
+    return resolved
+
+
+@lru_cache(maxsize=None)
+def _cached_schema(model: Type[BaseModel], include: Optional[Tuple[str, ...]], exclude: Tuple[str, ...]) -> Dict[str, Any]:
+    full = model.model_json_schema()
+    schema = _resolve(full, full.get("$defs", {}))
+
+    names = [
+        name for name in (include or schema["properties"])
+        if name in schema["properties"] and name not in exclude
+    ]
+    schema["properties"] = {name: schema["properties"][name] for name in names}
+    # The prompts ask for every key, so generate all of them, in declaration order
+    schema["required"] = names
+    schema["additionalProperties"] = False
+    return schema
+
+
+def json_schema(
+    model: Type[BaseModel],
+    include: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """
+    Self-contained JSON schema of the object an LLM should return for model
+
+    include/exclude pick the top-level fields the model generates, for
+    response models that also carry fields computed by the endpoint.
+    """
+    return copy.deepcopy(_cached_schema(model, tuple(include) if include else None, tuple(exclude)))
@@ -0,0 +1,338 @@
+"""
+Tokenizer Service
+Real token counts per model (tiktoken for OpenAI models, HuggingFace
+tokenizers for local/open-weight models) for prompt budgeting,
+context-window fitting, usage metrics and cost estimates
+"""
+
+import asyncio
+import contextvars
+import importlib.util
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from prometheus_client import Counter
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# transformers is imported on first HF tokenizer load; importing it takes seconds
+HF_TOKENIZERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+LLM_TOKENS = Counter(
+    'llm_tokens_total',
+    'LLM tokens reported by providers',
+    ['endpoint', 'provider', 'kind'],
+)
+LLM_COST = Counter(
+    'llm_cost_usd_total',
+    'Estimated LLM spend from token usage and model prices',
+    ['endpoint', 'provider'],
+)
+
+# Chat framing overhead of OpenAI-style APIs: every message is wrapped in
+# <|start|>role...<|end|> and the reply is primed with <|start|>assistant
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+TOKENS_PER_REPLY = 3
+
+# Representative meeting prose used to measure a tokenizer's tokens per word
+_CALIBRATION_TEXT = (
+    "Thanks everyone for joining. Let's start with the quarterly roadmap review. "
+    "Sarah, can you walk us through the status of the onboarding redesign? "
+    "We shipped the first milestone on Tuesday, but integration testing found "
+    "two regressions in the billing flow, so the API migration slipped to next "
+    "sprint. Action item: Mike will follow up with the vendor about the SSO "
+    "contract by Friday, and we'll revisit the Q3 hiring plan in our 1:1s."
+)
+
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("usage_endpoint", default="unknown")
+
+
+def current_endpoint() -> str:
+    """Endpoint label that token usage in this context is attributed to"""
+    return _endpoint.get()
+
+
+@contextmanager
+def usage_endpoint(endpoint: str) -> Iterator[None]:
+    """Attribute token usage of provider calls in this block to endpoint"""
+    token = _endpoint.set(endpoint)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+def record_usage(provider: str, usage: Optional[Dict[str, Any]], cost: float = 0.0):
+    """Export provider-reported token usage (and its cost) for the current endpoint"""
+    if not usage:
+        return
+    endpoint = current_endpoint()
+    prompt_tokens = usage.get("prompt_tokens") or 0
+    completion_tokens = usage.get("completion_tokens") or 0
+    if prompt_tokens:
+        LLM_TOKENS.labels(endpoint=endpoint, provider=provider, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(endpoint=endpoint, provider=provider, kind="completion").inc(completion_tokens)
+    if cost > 0:
+        LLM_COST.labels(endpoint=endpoint, provider=provider).inc(cost)
+
+
+@dataclass
+class ModelTokenizer:
+    """Encoder for one model"""
+    name: str  # e.g. "tiktoken:o200k_base", "hf:Qwen/Qwen2.5-7B-Instruct", "heuristic"
+    exact: bool  # False when the encoding only approximates the model's tokenizer
+    encode: Callable[[str], List[int]]
+    decode: Callable[[List[int]], str]
+    chat_template: Optional[Callable[[List[Dict[str, str]]], List[int]]] = None
+
+
+def _heuristic_tokenizer() -> ModelTokenizer:
+    """Last resort when no tokenizer can be loaded: ~4 characters per token"""
+    def encode(text: str) -> List[int]:
+        return [0] * math.ceil(len(text) / 4)
+
+    return ModelTokenizer(name="heuristic", exact=False, encode=encode, decode=lambda ids: "")
+
+
+def _message_dicts(messages: Sequence[Any]) -> List[Dict[str, str]]:
+    """Normalize ChatMessage objects or role/content dicts"""
+    result = []
+    for message in messages:
+        if isinstance(message, dict):
+            result.append({k: v for k, v in message.items() if v is not None})
+        else:
+            entry = {"role": message.role, "content": message.content or ""}
+            if getattr(message, "name", None):
+                entry["name"] = message.name
+            result.append(entry)
+    return result
+
+
+class TokenizerService:
+    """
+    Per-model tokenizer registry
+
+    Resolution order for a model name:
+    1. A tokenizer registered by a provider that already loaded it (local LLMs)
+    2. tiktoken for OpenAI models (gpt-*, o1/o3/o4, text-embedding-*)
+    3. HuggingFace AutoTokenizer for repo ids ("org/name", e.g. vLLM models)
+    4. cl100k_base as an approximation (Claude, Ollama tags, unknown models)
+    5. A 4-chars-per-token heuristic when nothing can be loaded
+
+    Encoders are cached per model name, including failed lookups, so a
+    missing tokenizer is only searched for once. Lookups on request paths
+    only read the local HuggingFace cache unless TOKENIZER_ALLOW_DOWNLOAD is
+    set; preload() resolves (and downloads) the configured models' tokenizers
+    on the executor at startup.
+    """
+
+    def __init__(self, default_encoding: Optional[str] = None, allow_download: Optional[bool] = None):
+        self.default_encoding = default_encoding or os.getenv("TOKENIZER_DEFAULT_ENCODING", "cl100k_base")
+        if allow_download is None:
+            allow_download = os.getenv("TOKENIZER_ALLOW_DOWNLOAD", "false").lower() == "true"
+        self.allow_download = allow_download
+
+        self._tokenizers: Dict[str, ModelTokenizer] = {}
+        self._tokens_per_word: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, model: str, tokenizer: Any):
+        """Use an already loaded HuggingFace tokenizer for model"""
+        with self._lock:
+            self._tokenizers[model] = self._from_hf(model, tokenizer)
+            self._tokens_per_word.pop(model, None)
+
+    def get(self, model: Optional[str]) -> ModelTokenizer:
+        """Tokenizer for model (cached)"""
+        key = model or ""
+        with self._lock:
+            tokenizer = self._tokenizers.get(key)
+        if tokenizer is not None:
+            return tokenizer
+
+        tokenizer = self._load(key)
+        with self._lock:
+            tokenizer = self._tokenizers.setdefault(key, tokenizer)
+        logger.info(f"🔤 Tokenizer for {key or 'default'}: {tokenizer.name}{'' if tokenizer.exact else ' (approximate)'}")
+        return tokenizer
+
+    async def preload(self, models: Sequence[str]):
+        """Resolve tokenizers for models on the executor, downloading them if needed"""
+        loop = asyncio.get_running_loop()
+
+        def resolve(model: str):
+            with self._lock:
+                cached = self._tokenizers.get(model)
+            if cached is not None and cached.exact:
+                return
+            tokenizer = self._load(model, download=True)
+            with self._lock:
+                self._tokenizers[model] = tokenizer
+                self._tokens_per_word.pop(model, None)
+            logger.info(f"🔤 Preloaded tokenizer for {model or 'default'}: {tokenizer.name}{'' if tokenizer.exact else ' (approximate)'}")
+
+        results = await asyncio.gather(
+            *(loop.run_in_executor(None, resolve, model) for model in dict.fromkeys(models)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Tokenizer preload failed: {result}")
+
+    def _load(self, model: str, download: Optional[bool] = None) -> ModelTokenizer:
+        name = model.lower()
+        if download is None:
+            download = self.allow_download
+
+        if TIKTOKEN_AVAILABLE and name.startswith(("gpt-", "o1", "o3", "o4", "text-embedding-", "chatgpt-")):
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+                return self._from_tiktoken(encoding, exact=True)
+            except KeyError:
+                # Model name tiktoken doesn't know yet: everything after gpt-4 uses o200k
+                legacy = name.startswith(("gpt-3.5", "text-embedding-")) or (
+                    name.startswith("gpt-4") and not name.startswith(("gpt-4o", "gpt-4."))
+                )
+                encoding_name = "cl100k_base" if legacy else "o200k_base"
+                try:
+                    return self._from_tiktoken(tiktoken.get_encoding(encoding_name), exact=True)
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding {encoding_name} unavailable: {e}")
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable for {model}: {e}")
+
+        if HF_TOKENIZERS_AVAILABLE and "/" in model:
+            try:
+                from transformers import AutoTokenizer
+
+                tokenizer = AutoTokenizer.from_pretrained(
+                    model,
+                    token=os.getenv("HUGGINGFACE_TOKEN"),
+                    local_files_only=not download,
+                    trust_remote_code=True,
+                )
+                return self._from_hf(model, tokenizer)
+            except Exception as e:
+                logger.warning(f"HuggingFace tokenizer unavailable for {model}: {e}")
+
+        if TIKTOKEN_AVAILABLE:
+            try:
+                return self._from_tiktoken(tiktoken.get_encoding(self.default_encoding), exact=False)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding {self.default_encoding} unavailable: {e}")
+
+        return _heuristic_tokenizer()
+
+    @staticmethod
+    def _from_tiktoken(encoding: Any, exact: bool) -> ModelTokenizer:
+        return ModelTokenizer(
+            name=f"tiktoken:{encoding.name}",
+            exact=exact,
+            encode=lambda text: encoding.encode(text, disallowed_special=()),
+            decode=encoding.decode,
+        )
+
+    @staticmethod
+    def _from_hf(model: str, tokenizer: Any) -> ModelTokenizer:
+        def apply_chat_template(messages: List[Dict[str, str]]) -> List[int]:
+            return tokenizer.apply_chat_template(messages, tokenize=True, add_generation_prompt=True)
+
+        return ModelTokenizer(
+            name=f"hf:{getattr(tokenizer, 'name_or_path', None) or model}",
+            exact=True,
+            encode=lambda text: tokenizer.encode(text, add_special_tokens=False),
+            decode=lambda ids: tokenizer.decode(ids, skip_special_tokens=True),
+            chat_template=apply_chat_template if getattr(tokenizer, "chat_template", None) else None,
+        )
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """Number of tokens in text"""
+        if not text:
+            return 0
+        return len(self.get(model).encode(text))
+
+    def count_messages(self, messages: Sequence[Any], model: Optional[str] = None) -> int:
+        """
+        Prompt tokens of a chat request, including per-message framing
+
+        Uses the model's chat template when the tokenizer has one, otherwise
+        the OpenAI framing overhead.
+        """
+        tokenizer = self.get(model)
+        message_dicts = _message_dicts(messages)
+
+        if tokenizer.chat_template is not None:
+            try:
+                return len(tokenizer.chat_template(message_dicts))
+            except Exception as e:
+                logger.debug(f"Chat template failed for {model}, counting messages individually: {e}")
+
+        total = TOKENS_PER_REPLY
+        for message in message_dicts:
+            total += TOKENS_PER_MESSAGE
+            for key, value in message.items():
+                total += len(tokenizer.encode(value)) if value else 0
+                if key == "name":
+                    total += TOKENS_PER_NAME
+        return total
+
+    def truncate(self, text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """Longest prefix of text that fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        tokenizer = self.get(model)
+        ids = tokenizer.encode(text)
+        if len(ids) <= max_tokens:
+            return text
+        if tokenizer.name == "heuristic":
+            return text[:max_tokens * 4]
+        return tokenizer.decode(ids[:max_tokens])
+
+    def tokens_per_word(self, model: Optional[str] = None) -> float:
+        """Measured tokens per English word for model, for word-based length limits"""
+        key = model or ""
+        if key not in self._tokens_per_word:
+            words = len(_CALIBRATION_TEXT.split())
+            self._tokens_per_word[key] = max(1.0, self.count(_CALIBRATION_TEXT, model) / words)
+        return self._tokens_per_word[key]
+
+    def words_to_tokens(self, words: int, model: Optional[str] = None) -> int:
+        """Token budget for a text of the given number of words"""
+        return math.ceil(words * self.tokens_per_word(model))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tiktoken": TIKTOKEN_AVAILABLE,
+                "huggingface": HF_TOKENIZERS_AVAILABLE,
+                "models": {
+                    model or "default": {"tokenizer": tokenizer.name, "exact": tokenizer.exact}
+                    for model, tokenizer in self._tokenizers.items()
+                },
+            }
+
+
+# Singleton instance
+_tokenizer_service: Optional[TokenizerService] = None
+
+
+def get_tokenizer_service() -> TokenizerService:
+    """Get or create tokenizer service instance"""
+    global _tokenizer_service
+    if _tokenizer_service is None:
+        _tokenizer_service = TokenizerService()
+    return _tokenizer_service
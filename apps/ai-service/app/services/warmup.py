@@ -0,0 +1,212 @@
+"""
+Model Warm-up
+Loads the service's heavy ML models (local Whisper, pyannote diarization,
+spaCy NER, KeyBERT) in parallel in the background after startup, instead of
+at import time or on the first request that needs them
+
+The models to warm are set with WARMUP_MODELS (comma separated, "auto" or
+"none"). Readiness (/ready) passes once every configured model is loaded;
+liveness (/health) doesn't wait for them.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics
+MODEL_LOAD_SECONDS = Gauge('model_load_seconds', 'Time taken to load a model', ['model'])
+MODEL_LOADED = Gauge('model_loaded', 'Whether a model is loaded (1) or not (0)', ['model'])
+
+
+def _load_whisper() -> Any:
+    from .local_whisper import get_local_whisper
+
+    return get_local_whisper(
+        model_size=os.getenv("WHISPER_MODEL_SIZE", "small"),
+        device="auto",
+        compute_type="auto",
+    )
+
+
+def _load_diarization() -> Any:
+    from .speaker_diarization import get_diarization_service
+
+    return get_diarization_service()
+
+
+def _load_entities() -> Any:
+    from .entity_extraction import get_entity_service
+
+    return get_entity_service()
+
+
+def _load_keywords() -> Any:
+    from .keyword_extraction import get_keyword_service
+
+    return get_keyword_service()
+
+
+# Model name -> blocking loader returning the loaded service
+MODEL_LOADERS: Dict[str, Callable[[], Any]] = {
+    "whisper": _load_whisper,
+    "diarization": _load_diarization,
+    "entities": _load_entities,
+    "keywords": _load_keywords,
+}
+
+
+def configured_models() -> List[str]:
+    """
+    Models to warm up from WARMUP_MODELS
+
+    "auto" (default) warms local Whisper if WHISPER_PROVIDER=local, diarization
+    if a Hugging Face token is set, and the NER and keyword models.
+    """
+    setting = os.getenv("WARMUP_MODELS", "auto").strip().lower()
+    if setting in ("", "none"):
+        return []
+    if setting != "auto":
+        return [name.strip() for name in setting.split(",") if name.strip()]
+
+    models = []
+    if os.getenv("WHISPER_PROVIDER", "openai").lower() == "local":
+        models.append("whisper")
+    if os.getenv("HUGGINGFACE_TOKEN") or os.getenv("HF_TOKEN"):
+        models.append("diarization")
+    models.extend(["entities", "keywords"])
+    return models
+
+
+@dataclass
+class ModelStatus:
+    """Load state of one model"""
+    name: str
+    status: str = "pending"  # loading, loaded, error
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"status": self.status}
+        if self.duration is not None:
+            status["load_seconds"] = round(self.duration, 3)
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+class WarmupManager:
+    """
+    Loads models once, either in the background warm-up or on first use
+
+    load() is thread-safe: a request that needs a model while the warm-up is
+    still loading it waits for that load instead of starting a second one.
+    Async code uses load_async(), which does that wait (and any load) on the
+    executor so the event loop keeps serving other requests.
+    """
+
+    def __init__(self, models: Optional[List[str]] = None, loaders: Optional[Dict[str, Callable[[], Any]]] = None):
+        self.loaders = dict(loaders or MODEL_LOADERS)
+        self.models = configured_models() if models is None else models
+        unknown = [name for name in self.models if name not in self.loaders]
+        if unknown:
+            logger.warning(f"⚠️ Unknown WARMUP_MODELS ignored: {unknown}")
+            self.models = [name for name in self.models if name in self.loaders]
+
+        self.statuses: Dict[str, ModelStatus] = {name: ModelStatus(name) for name in self.models}
+        self._services: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self.loaders}
+        self._task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+
+    def load(self, name: str) -> Any:
+        """Loaded service for a model, loading it now if needed (blocking)"""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+
+        with self._locks[name]:
+            if name in self._services:
+                return self._services[name]
+            status = self.statuses.setdefault(name, ModelStatus(name))
+            status.status, status.error = "loading", None
+            started = time.monotonic()
+            try:
+                service = self.loaders[name]()
+            except Exception as e:
+                status.status, status.error = "error", str(e) or type(e).__name__
+                status.duration = time.monotonic() - started
+                MODEL_LOADED.labels(model=name).set(0)
+                raise
+            status.status, status.duration = "loaded", time.monotonic() - started
+            self._services[name] = service
+            MODEL_LOAD_SECONDS.labels(model=name).set(status.duration)
+            MODEL_LOADED.labels(model=name).set(1)
+            logger.info(f"🔥 Loaded {name} in {status.duration:.2f}s")
+            return service
+
+    async def load_async(self, name: str) -> Any:
+        """Loaded service for a model, loading or waiting for it off the event loop"""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+        return await asyncio.get_running_loop().run_in_executor(None, self.load, name)
+
+    async def warm_up(self):
+        """Load all configured models in parallel on the default executor"""
+        if not self.models:
+            return
+        loop = asyncio.get_running_loop()
+        self.started_at = time.monotonic()
+        logger.info(f"🔥 Warming up models: {', '.join(self.models)}")
+        results = await asyncio.gather(
+            *(loop.run_in_executor(None, self.load, name) for name in self.models),
+            return_exceptions=True,
+        )
+        self.duration = time.monotonic() - self.started_at
+        for name, result in zip(self.models, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Warm-up of {name} failed: {result}")
+        logger.info(f"🔥 Warm-up finished in {self.duration:.2f}s (ready={self.ready})")
+
+    def start(self):
+        """Start the warm-up in the background (no-op if already started)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm_up())
+
+    async def stop(self):
+        # Loads already running in executor threads can't be interrupted; this only drops the waiter
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    @property
+    def ready(self) -> bool:
+        return all(self.statuses[name].status == "loaded" for name in self.models)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "models": {name: self.statuses[name].to_dict() for name in self.models},
+        }
+
+
+# Singleton instance
+_warmup_manager: Optional[WarmupManager] = None
+
+
+def get_warmup_manager() -> WarmupManager:
+    """Get or create the warm-up manager"""
+    global _warmup_manager
+    if _warmup_manager is None:
+        _warmup_manager = WarmupManager()
+    return _warmup_manager
@@ -0,0 +1,49 @@
+"""
+Background Job Worker
+Runs queued jobs (see app/services/job_queue.py) outside the API process so
+workers scale separately from the HTTP tier
+
+Usage (from apps/ai-service, same image and environment as the API):
+    JOB_QUEUE_BACKEND=redis python -m app.worker --concurrency 2
+
+Metrics are served on WORKER_METRICS_PORT (default 9100). SIGTERM stops
+claiming new jobs and waits up to --grace seconds for running ones; any
+left unfinished are picked up by another worker once their lease expires.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+
+from prometheus_client import start_http_server
+
+from app.main import JOB_HANDLERS
+from app.services.job_queue import JobWorker, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run background AI jobs")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_WORKER_CONCURRENCY", "1")))
+    parser.add_argument("--grace", type=float, default=float(os.getenv("JOB_WORKER_GRACE_SECONDS", "30")))
+    args = parser.parse_args()
+
+    start_http_server(int(os.getenv("WORKER_METRICS_PORT", "9100")))
+
+    worker = JobWorker(get_job_queue(), JOB_HANDLERS, concurrency=args.concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker.start()
+    await stop.wait()
+    logger.info("🛑 Stopping job worker")
+    await worker.stop(grace=args.grace)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
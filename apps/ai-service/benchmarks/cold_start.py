@@ -0,0 +1,379 @@
+"""
+Cold Start Benchmark
+Measures what an autoscaled ai-service pod pays before it's useful:
+- import time of app.main per module (a `python -X importtime` breakdown)
+- time from process start to the first successful request, per endpoint,
+  each against a fresh uvicorn process
+- time until /ready passes (model warm-up) and peak RSS after warm-up
+
+The service runs against local stand-ins: a fake OpenAI-compatible server
+(chat completions, embeddings, audio transcriptions, models) started by this
+script, and tiny models (Whisper tiny, spaCy en_core_web_sm, a 3-layer
+MiniLM for KeyBERT), so results track startup cost rather than a provider.
+
+Usage (from apps/ai-service):
+    python benchmarks/cold_start.py --runs 3
+    python benchmarks/cold_start.py --endpoints health,summarize --json cold_start.json
+    python benchmarks/cold_start.py --skip-endpoints --import-top 40
+    python benchmarks/cold_start.py --env WHISPER_PROVIDER=local --warmup-models whisper,entities
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from local_llm_throughput import build_transcript  # noqa: E402
+
+# Lenient JSON the summarize/sentiment parsers accept (the fake server never sees the schema)
+STAND_IN_COMPLETION = {
+    "summary": "The team reviewed the roadmap and agreed on next steps.",
+    "key_points": ["Onboarding redesign shipped", "API migration slipped a sprint"],
+    "action_items": [{"task": "Follow up on SSO contract", "assignee": "Priya", "priority": "high"}],
+    "topics": ["roadmap", "hiring"],
+    "overall_sentiment": "positive",
+    "sentiment_score": 0.4,
+    "emotions": {"joy": 0.4, "neutral": 0.5, "concern": 0.1},
+    "segments": [],
+}
+STAND_IN_TRANSCRIPT = "Thanks everyone for joining. Let's start with the quarterly roadmap review."
+
+# Environment for the service under test: local stand-ins, tiny models, no external providers
+BENCHMARK_ENV = {
+    "OPENAI_API_KEY": "sk-benchmark",
+    "ANTHROPIC_API_KEY": "",
+    "LOCAL_MODELS_ENABLED": "false",
+    "WHISPER_PROVIDER": "openai",
+    "WHISPER_MODEL_SIZE": "tiny",
+    "SPACY_MODEL": "en_core_web_sm",
+    "USE_TRANSFORMERS": "false",
+    "KEYWORD_MODEL": "paraphrase-MiniLM-L3-v2",
+    "JOB_WORKERS": "0",
+    "PYTHONUNBUFFERED": "1",
+}
+
+
+def endpoint_requests(audio_url: str) -> Dict[str, Dict[str, Any]]:
+    """Name -> the request used to probe an endpoint"""
+    text = build_transcript(300)
+    return {
+        "health": {"method": "GET", "path": "/health"},
+        "summarize": {"method": "POST", "path": "/api/v1/summarize", "json": {"text": text}},
+        "sentiment": {"method": "POST", "path": "/api/v1/sentiment", "json": {"text": text}},
+        "entities": {"method": "POST", "path": "/api/v1/extract-entities", "json": {"text": text}},
+        "keywords": {"method": "POST", "path": "/api/v1/extract-keywords", "json": {"text": text, "top_n": 10}},
+        "transcribe": {
+            "method": "POST",
+            "path": "/api/v1/transcribe",
+            "json": {"audio_url": audio_url, "enable_timestamps": False, "enable_diarization": False},
+        },
+    }
+
+
+def silent_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Just enough of the OpenAI API for the service's clients"""
+
+    latency = 0.0
+    audio = silent_wav()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str = "application/json", status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload: Dict[str, Any]):
+        self._send(json.dumps(payload).encode())
+
+    def do_GET(self):
+        if self.path.endswith("/models"):
+            self._json({"object": "list", "data": [{"id": "gpt-4", "object": "model", "owned_by": "benchmark"}]})
+        elif self.path == "/audio.wav":
+            self._send(self.audio, content_type="audio/wav")
+        else:
+            self._send(b'{"error": "not found"}', status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency)
+        if self.path.endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            self._json({
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(STAND_IN_COMPLETION)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+            })
+        elif self.path.endswith("/embeddings"):
+            inputs = json.loads(body or b"{}").get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._json({
+                "object": "list",
+                "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8} for i in range(len(inputs))],
+                "model": "benchmark-embedding",
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            })
+        elif self.path.endswith("/audio/transcriptions"):
+            self._json({"text": STAND_IN_TRANSCRIPT})
+        else:
+            self._send(b'{"error": "not found"}', status=404)
+
+
+def start_fake_openai(latency: float) -> ThreadingHTTPServer:
+    FakeOpenAIHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_times(env: Dict[str, str], module: str = "app.main") -> Dict[str, Any]:
+    """Per-module self/cumulative import time (microseconds) from `python -X importtime`"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            modules.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": (len(match.group(3)) - 1) // 2,
+            })
+
+    packages: Dict[str, int] = defaultdict(int)
+    for entry in modules:
+        name = entry["module"]
+        # app.services.x is reported per service, third-party code per top-level package
+        package = ".".join(name.split(".")[:3]) if name.startswith("app.") else name.split(".")[0]
+        packages[package] += entry["self_us"]
+
+    target = next((entry for entry in reversed(modules) if entry["module"] == module), None)
+    return {
+        "module": module,
+        "process_wall_s": round(wall, 3),
+        "import_s": round(target["cumulative_us"] / 1e6, 3) if target else None,
+        "modules": modules,
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak resident set size of a running process (Linux VmHWM)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def wait_for(client: httpx.Client, request: Dict[str, Any], deadline: float, poll: float) -> Optional[int]:
+    """Retry a request until it returns 2xx; the last status, or None if nothing answered"""
+    status = None
+    while time.monotonic() < deadline:
+        try:
+            response = client.request(request["method"], request["path"], json=request.get("json"))
+            status = response.status_code
+            if response.is_success:
+                return status
+        except httpx.TransportError:
+            pass
+        time.sleep(poll)
+    return status
+
+
+def cold_request(endpoint: str, request: Dict[str, Any], env: Dict[str, str], args: argparse.Namespace) -> Dict[str, Any]:
+    """Start a fresh service, time its first successful request to an endpoint, then warm-up and RSS"""
+    port = free_port()
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if args.quiet else None,
+    )
+    result: Dict[str, Any] = {"endpoint": endpoint}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=args.request_timeout) as client:
+            deadline = started + args.timeout
+            status = wait_for(client, request, deadline, args.poll_interval)
+            result["first_success_s"] = round(time.monotonic() - started, 3) if status and 200 <= status < 300 else None
+            result["last_status"] = status
+
+            ready = wait_for(client, {"method": "GET", "path": "/ready"}, deadline, args.poll_interval)
+            result["ready_s"] = round(time.monotonic() - started, 3) if ready == 200 else None
+            if ready == 200:
+                result["models"] = client.get("/ready").json().get("models", {})
+            result["peak_rss_mb"] = peak_rss_mb(process.pid)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return result
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def median(key: str) -> Optional[float]:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    load_seconds: Dict[str, List[float]] = defaultdict(list)
+    for run in runs:
+        for name, model in (run.get("models") or {}).items():
+            if model.get("load_seconds") is not None:
+                load_seconds[name].append(model["load_seconds"])
+    return {
+        "endpoint": runs[0]["endpoint"],
+        "ok_runs": sum(1 for run in runs if run.get("first_success_s") is not None),
+        "first_success_s": median("first_success_s"),
+        "ready_s": median("ready_s"),
+        "peak_rss_mb": median("peak_rss_mb"),
+        "model_load_s": {name: round(statistics.median(values), 3) for name, values in load_seconds.items()},
+    }
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]):
+    widths = {column: max(len(column), *(len(str(row.get(column))) for row in rows)) for column in columns}
+    print("\n" + "  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ai-service import time, time to first request and peak RSS")
+    parser.add_argument("--endpoints", default="health,summarize,sentiment,entities,keywords,transcribe")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per endpoint")
+    parser.add_argument("--import-runs", type=int, default=3)
+    parser.add_argument("--import-top", type=int, default=25, help="Modules/packages to list")
+    parser.add_argument("--skip-imports", action="store_true")
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--warmup-models", help="WARMUP_MODELS for the service (default: its own default)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra service environment")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake OpenAI server waits per call")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Give up on a cold start after this many seconds")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--quiet", action="store_true", help="Hide the service's log output")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    fake = start_fake_openai(args.llm_latency)
+    fake_url = f"http://127.0.0.1:{fake.server_address[1]}"
+    scratch = tempfile.mkdtemp(prefix="cold-start-")
+    env = {
+        **os.environ,
+        **BENCHMARK_ENV,
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "PROVIDER_CONFIG_PATH": os.path.join(scratch, "provider_config.json"),
+        "JOB_QUEUE_PATH": os.path.join(scratch, "jobs.sqlite"),
+    }
+    if args.warmup_models is not None:
+        env["WARMUP_MODELS"] = args.warmup_models
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    results: Dict[str, Any] = {"python": sys.version.split()[0], "env": {key: env[key] for key in BENCHMARK_ENV}}
+
+    if not args.skip_imports:
+        print("🏁 import app.main (-X importtime)")
+        runs = [import_times(env) for _ in range(args.import_runs)]
+        # Module breakdown from the fastest run: the one least disturbed by the machine
+        best = min(runs, key=lambda run: run["import_s"] or float("inf"))
+        results["imports"] = {
+            "import_s": round(statistics.median(run["import_s"] for run in runs if run["import_s"] is not None), 3),
+            "process_wall_s": round(statistics.median(run["process_wall_s"] for run in runs), 3),
+            "top_modules": sorted(best["modules"], key=lambda entry: entry["cumulative_us"], reverse=True)[:args.import_top],
+            "top_packages": dict(list(best["packages"].items())[:args.import_top]),
+        }
+        print(f"  import: {results['imports']['import_s']}s, process: {results['imports']['process_wall_s']}s")
+        print_table(
+            [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in results["imports"]["top_packages"].items()],
+            ["package", "self_ms"],
+        )
+        print_table(
+            [{**entry, "cumulative_ms": round(entry["cumulative_us"] / 1000, 1), "self_ms": round(entry["self_us"] / 1000, 1)}
+             for entry in results["imports"]["top_modules"]],
+            ["module", "cumulative_ms", "self_ms"],
+        )
+
+    if not args.skip_endpoints:
+        requests = endpoint_requests(f"{fake_url}/audio.wav")
+        rows = []
+        for endpoint in args.endpoints.split(","):
+            if endpoint not in requests:
+                print(f"  ⚠️ unknown endpoint {endpoint}, choose from {', '.join(requests)}")
+                continue
+            print(f"🏁 cold {endpoint}")
+            runs = [cold_request(endpoint, requests[endpoint], env, args) for _ in range(args.runs)]
+            for run in runs:
+                if run["first_success_s"] is None:
+                    print(f"  ❌ no successful response (last status {run['last_status']})")
+            rows.append(summarize_runs(runs))
+            print(f"  {rows[-1]}")
+        results["endpoints"] = rows
+        if rows:
+            print_table(rows, ["endpoint", "ok_runs", "first_success_s", "ready_s", "peak_rss_mb", "model_load_s"])
+
+    fake.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
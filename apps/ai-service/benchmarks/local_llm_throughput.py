@@ -0,0 +1,159 @@
+"""
+Local LLM Throughput Benchmark
+Runs the same meeting-summary prompt through LocalProvider with each LLM
+backend (transformers, llama.cpp GGUF) and reports load time, time to first
+token, decode tokens/sec and aggregate throughput under concurrency
+
+Usage (from apps/ai-service):
+    python benchmarks/local_llm_throughput.py --model qwen2.5-0.5b
+    python benchmarks/local_llm_throughput.py --model qwen2.5-7b --backends gguf \\
+        --gguf-quants Q4_K_M,Q5_K_M --concurrency 1,4 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TRANSCRIPT_LINES = [
+    "Sarah: Thanks everyone for joining, let's start with the quarterly roadmap review.",
+    "Mike: The onboarding redesign shipped its first milestone on Tuesday.",
+    "Sarah: Integration testing found two regressions in the billing flow, right?",
+    "Mike: Yes, so the API migration slipped to next sprint while we fix them.",
+    "Priya: I'll follow up with the vendor about the SSO contract by Friday.",
+    "Sarah: Good. We also need to revisit the Q3 hiring plan in our one-on-ones.",
+    "Priya: Customer feedback on the new dashboard has been mostly positive.",
+    "Mike: Support tickets about exports dropped by a third since the last release.",
+]
+
+
+def build_transcript(words: int) -> str:
+    lines: List[str] = []
+    while sum(len(line.split()) for line in lines) < words:
+        lines.append(TRANSCRIPT_LINES[len(lines) % len(TRANSCRIPT_LINES)])
+    return "\n".join(lines)
+
+
+async def run_one(provider: Any, request: Any) -> Dict[str, float]:
+    """Stream one completion, timing the first token and the decode"""
+    metadata: Dict[str, Any] = {}
+    started = time.perf_counter()
+    first_token_at = None
+    async for _ in provider.chat_completion_stream(request, metadata):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+    finished = time.perf_counter()
+
+    completion_tokens = metadata.get("usage", {}).get("completion_tokens", 0)
+    first_token_at = first_token_at or finished
+    decode_time = finished - first_token_at
+    return {
+        "ttft": first_token_at - started,
+        "latency": finished - started,
+        "completion_tokens": completion_tokens,
+        "decode_tps": (completion_tokens - 1) / decode_time if completion_tokens > 1 and decode_time > 0 else 0.0,
+    }
+
+
+async def benchmark_backend(args: argparse.Namespace, backend: str, quant: str) -> List[Dict[str, Any]]:
+    os.environ["LOCAL_LLM_BACKEND"] = backend
+    os.environ["LOCAL_GGUF_QUANT"] = quant
+    os.environ["LOCAL_LLM_QUANTIZATION"] = args.quantization
+    os.environ.setdefault("LOCAL_SPECULATIVE_DECODING", "true" if args.speculative else "false")
+
+    from app.services.providers import ProviderConfig, ProviderType
+    from app.services.providers.base_provider import ChatMessage, ChatRequest
+    from app.services.providers.local_provider import LocalProvider
+
+    provider = LocalProvider(ProviderConfig(provider_type=ProviderType.LOCAL))
+    request = ChatRequest(
+        messages=[
+            ChatMessage(role="system", content="You are an expert meeting summarizer. Write a concise summary with action items."),
+            ChatMessage(role="user", content=f"Summarize this meeting:\n\n{build_transcript(args.prompt_words)}"),
+        ],
+        model=args.model,
+        temperature=0.0,
+        max_tokens=args.max_tokens,
+    )
+
+    label = f"{backend}" + (f" {quant}" if backend == "gguf" else f" {args.quantization}")
+    started = time.perf_counter()
+    await provider._ensure_llm_loaded(args.model)
+    load_time = time.perf_counter() - started
+    await run_one(provider, request)  # warm-up: first prefill, allocator, thread pools
+
+    results = []
+    for concurrency in args.concurrency:
+        runs: List[Dict[str, float]] = []
+        wall_start = time.perf_counter()
+        for _ in range(args.runs):
+            runs.extend(await asyncio.gather(*(run_one(provider, request) for _ in range(concurrency))))
+        wall = time.perf_counter() - wall_start
+
+        tokens = sum(run["completion_tokens"] for run in runs)
+        results.append({
+            "backend": label,
+            "model": args.model,
+            "concurrency": concurrency,
+            "load_s": round(load_time, 2),
+            "ttft_s": round(statistics.median(run["ttft"] for run in runs), 3),
+            "latency_s": round(statistics.median(run["latency"] for run in runs), 3),
+            "decode_tps": round(statistics.median(run["decode_tps"] for run in runs), 2),
+            "throughput_tps": round(tokens / wall, 2),
+            "completion_tokens": tokens // len(runs),
+        })
+        print(f"  {label:<22} c={concurrency:<3} {results[-1]}")
+
+    provider._drop_current_llm()
+    provider.hf_manager.unload_model(args.model)
+    return results
+
+
+def print_table(results: List[Dict[str, Any]]):
+    columns = ["backend", "concurrency", "load_s", "ttft_s", "latency_s", "decode_tps", "throughput_tps", "completion_tokens"]
+    widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+    print("\n" + "  ".join(column.ljust(widths[column]) for column in columns))
+    for row in results:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare local LLM backends on CPU/GPU")
+    parser.add_argument("--model", default="qwen2.5-0.5b", help="LocalProvider registry key")
+    parser.add_argument("--backends", default="transformers,gguf", help="Comma-separated: transformers, gguf")
+    parser.add_argument("--gguf-quants", default="Q4_K_M", help="Comma-separated GGUF quantizations, e.g. Q4_K_M,Q5_K_M")
+    parser.add_argument("--quantization", default="none", help="transformers quantization: 4bit, 8bit or none")
+    parser.add_argument("--speculative", action="store_true", help="Use the draft model on the transformers backend")
+    parser.add_argument("--prompt-words", type=int, default=400)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--runs", type=int, default=3, help="Rounds per concurrency level")
+    parser.add_argument("--concurrency", default="1", help="Comma-separated concurrent request counts")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    results: List[Dict[str, Any]] = []
+    for backend in args.backends.split(","):
+        quants = args.gguf_quants.split(",") if backend == "gguf" else [""]
+        for quant in quants:
+            print(f"🏁 {args.model} on {backend} {quant}".rstrip())
+            try:
+                results.extend(await benchmark_backend(args, backend, quant))
+            except Exception as e:
+                print(f"  ❌ {backend} {quant} failed: {e}")
+
+    if results:
+        print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
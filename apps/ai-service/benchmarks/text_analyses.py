@@ -0,0 +1,128 @@
+"""
+Combined Text Analysis Benchmark
+Runs summarize, sentiment, categorize and highlights on the same transcript
+as separate LLM calls (one after another and concurrently) and as one
+combined call (/api/v1/analyze-text), and reports provider-reported prompt
+and completion tokens and latency of each mode
+
+Uses whatever provider the service is configured with (OPENAI_API_KEY,
+LOCAL_* settings, ...).
+
+Usage (from apps/ai-service):
+    python benchmarks/text_analyses.py --transcript-words 1500 --runs 3
+    python benchmarks/text_analyses.py --analyses summarize,sentiment --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_llm_throughput import build_transcript  # noqa: E402
+
+
+def token_counts(endpoint: str) -> Dict[str, float]:
+    """Prompt/completion tokens recorded so far for an endpoint label, across providers"""
+    from prometheus_client import REGISTRY
+
+    counts = {"prompt": 0.0, "completion": 0.0}
+    for metric in REGISTRY.collect():
+        if metric.name != "llm_tokens":
+            continue
+        for sample in metric.samples:
+            if sample.name == "llm_tokens_total" and sample.labels.get("endpoint") == endpoint:
+                counts[sample.labels["kind"]] += sample.value
+    return counts
+
+
+async def run_mode(main: Any, mode: str, text: str, analyses: List[str]) -> Dict[str, float]:
+    """One run of a mode; token usage is attributed to a per-mode endpoint label"""
+    from app.services.tokenizer_service import usage_endpoint
+
+    endpoint = f"benchmark:{mode}"
+    before = token_counts(endpoint)
+    request = main.TextAnalysesRequest(text=text, analyses=analyses)
+    separate = {
+        "summarize": lambda: main.summarize_text(main.SummarizationRequest(text=text)),
+        "sentiment": lambda: main.analyze_sentiment(main.SentimentRequest(text=text)),
+        "categorize": lambda: main.categorize_meeting(main.CategorizationRequest(text=text)),
+        "highlights": lambda: main.detect_highlights(main.HighlightDetectionRequest(
+            text=text, videoDuration=len(text.split()) * 0.4
+        )),
+    }
+
+    started = time.perf_counter()
+    with usage_endpoint(endpoint):
+        if mode == "sequential":
+            for name in analyses:
+                await separate[name]()
+        elif mode == "concurrent":
+            await asyncio.gather(*(separate[name]() for name in analyses))
+        else:
+            await main.analyze_text(request)
+    latency = time.perf_counter() - started
+
+    after = token_counts(endpoint)
+    return {
+        "latency": latency,
+        "prompt_tokens": after["prompt"] - before["prompt"],
+        "completion_tokens": after["completion"] - before["completion"],
+    }
+
+
+def print_table(results: List[Dict[str, Any]]):
+    columns = ["mode", "llm_calls", "prompt_tokens", "completion_tokens", "latency_s"]
+    widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+    print("\n" + "  ".join(column.ljust(widths[column]) for column in columns))
+    for row in results:
+        print("  ".join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare separate and combined LLM text analyses")
+    parser.add_argument("--analyses", default="summarize,sentiment,categorize,highlights")
+    parser.add_argument("--modes", default="sequential,concurrent,combined")
+    parser.add_argument("--transcript-words", type=int, default=1500)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    analyses = args.analyses.split(",")
+
+    from app import main as service
+
+    text = build_transcript(args.transcript_words)
+    # Warm-up: model load, connection pools, tokenizers
+    await run_mode(service, "warmup", text, analyses[:1])
+
+    results = []
+    for mode in args.modes.split(","):
+        print(f"🏁 {mode}: {', '.join(analyses)}")
+        try:
+            runs = [await run_mode(service, mode, text, analyses) for _ in range(args.runs)]
+        except Exception as e:
+            print(f"  ❌ {mode} failed: {e}")
+            continue
+        results.append({
+            "mode": mode,
+            "llm_calls": 1 if mode == "combined" and len(analyses) > 1 else len(analyses),
+            "prompt_tokens": round(statistics.median(run["prompt_tokens"] for run in runs)),
+            "completion_tokens": round(statistics.median(run["completion_tokens"] for run in runs)),
+            "latency_s": round(statistics.median(run["latency"] for run in runs), 2),
+        })
+        print(f"  {results[-1]}")
+
+    if results:
+        print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
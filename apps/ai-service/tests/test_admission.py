@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.admission import AdmissionController, AdmissionMiddleware, AdmissionPool, AdmissionRejected
+from app.services.providers.rate_limiter import RequestPriority, current_priority
+
+INTERACTIVE, NORMAL, BATCH = RequestPriority.INTERACTIVE, RequestPriority.NORMAL, RequestPriority.BATCH
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setenv("ADMISSION_INTERACTIVE_CONCURRENCY", "2")
+    monkeypatch.setenv("ADMISSION_BATCH_CONCURRENCY", "1")
+    monkeypatch.setenv("ADMISSION_BATCH_QUEUE", "0")
+    return AdmissionController()
+
+
+def test_requests_are_classified_by_route_and_header(controller):
+    assert controller.classify("POST", "/api/v1/chat", {}) == INTERACTIVE
+    assert controller.classify("POST", "/api/v1/super-summarize", {}) == BATCH
+    assert controller.classify("POST", "/api/v1/summarize", {}) == NORMAL
+    assert controller.classify("POST", "/api/v1/chat", {b"x-request-priority": b"batch"}) == BATCH
+    assert controller.classify("POST", "/api/v1/index-meeting", {b"x-request-priority": b"interactive"}) == BATCH
+    assert controller.classify("GET", "/health", {}) is None
+    assert controller.classify("GET", "/api/v1/jobs/123", {}) is None
+
+
+def test_full_pool_queues_fifo_then_sheds():
+    async def scenario():
+        pool = AdmissionPool(NORMAL, concurrency=1, max_queue=2, max_wait=5.0)
+        order = []
+
+        async def request(name):
+            await pool.acquire()
+            order.append(name)
+
+        await pool.acquire()
+        waiting = [asyncio.create_task(request(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as shed:
+            await pool.acquire()
+
+        pool.release(0.5)
+        await waiting[0]
+        pool.release(0.5)
+        await waiting[1]
+        pool.release(0.5)
+        return order, shed.value, pool.in_flight
+
+    order, shed, in_flight = asyncio.run(scenario())
+
+    assert order == ["a", "b"]
+    assert shed.reason == "queue_full" and shed.retry_after >= 1
+    assert in_flight == 0
+
+
+def test_queued_request_is_shed_after_max_wait():
+    async def scenario():
+        pool = AdmissionPool(NORMAL, concurrency=1, max_queue=4, max_wait=0.05)
+        await pool.acquire()
+        with pytest.raises(AdmissionRejected) as shed:
+            await pool.acquire()
+        return shed.value, pool.queued, pool.in_flight
+
+    shed, queued, in_flight = asyncio.run(scenario())
+
+    assert shed.reason == "max_wait"
+    assert (queued, in_flight) == (0, 1)
+
+
+def test_batch_is_shed_while_interactive_is_under_pressure(controller):
+    async def scenario():
+        pools = [await controller.admit(INTERACTIVE) for _ in range(2)]
+        with pytest.raises(AdmissionRejected) as shed:
+            await controller.admit(BATCH)
+        for pool in pools:
+            pool.release(0.1)
+        admitted = await controller.admit(BATCH)
+        admitted.release(0.1)
+        return shed.value
+
+    assert asyncio.run(scenario()).reason == "pressure"
+
+
+def test_middleware_sheds_with_retry_after_and_sets_the_request_priority(controller):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.post("/api/v1/super-summarize")
+    async def super_summarize():
+        return {"priority": current_priority().name}
+
+    client = TestClient(app)
+    assert client.post("/api/v1/super-summarize").json() == {"priority": "BATCH"}
+
+    controller.pools[INTERACTIVE].in_flight = 2  # live meetings hold every interactive slot
+    response = client.post("/api/v1/super-summarize")
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.json()["reason"] == "pressure"
+
+
+def test_shed_responses_carry_cors_headers_and_preflights_bypass_admission(controller, monkeypatch):
+    from app import main
+    from app.services import admission
+
+    monkeypatch.setattr(admission, "_admission_controller", controller)
+    controller.pools[INTERACTIVE].in_flight = 2
+    controller.pools[BATCH].in_flight = 1  # and every batch slot is taken
+    client = TestClient(main.app)
+    origin = {"Origin": "https://app.example.com"}
+
+    shed = client.post("/api/v1/super-summarize", json={}, headers=origin)
+    preflight = client.options(
+        "/api/v1/super-summarize", headers={**origin, "Access-Control-Request-Method": "POST"}
+    )
+
+    assert shed.status_code == 503
+    assert shed.headers["access-control-allow-origin"]
+    assert preflight.status_code == 200
+    assert controller.classify("OPTIONS", "/api/v1/chat", {}) is None
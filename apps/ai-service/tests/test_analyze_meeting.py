@@ -0,0 +1,76 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app import main
+from app.services.prompt_packer import PromptPacker
+
+ANALYSIS_JSON = json.dumps({
+    "summary": "Budget approved",
+    "key_points": ["Budget approved"],
+    "action_items": [],
+    "topics": ["budget"],
+    "overall_sentiment": "positive",
+    "sentiment_score": 0.6,
+    "emotions": {},
+    "segments": [],
+})
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(monkeypatch):
+    async def chat_completion(request, hedge=False, priority=None):
+        return SimpleNamespace(content=ANALYSIS_JSON, finish_reason="stop")
+
+    monkeypatch.setattr(main, "_chat_completion", chat_completion)
+    monkeypatch.setattr(main, "_prompt_packer", lambda: PromptPacker("gpt-4", context_window=32768, max_output_tokens=4096))
+
+
+def requests_total():
+    return main.REQUESTS_TOTAL._value.get()
+
+
+def test_analyze_meeting_counts_one_request():
+    request = main.MeetingAnalysisRequest(
+        transcript="Alice: the budget is approved. Bob: great news.",
+        analyses=["summarize", "sentiment"],
+        combine_llm_analyses=False,
+    )
+    before = requests_total()
+
+    result = asyncio.run(main.analyze_meeting(request))
+
+    assert result.errors == {}
+    assert result.summary.summary == "Budget approved"
+    assert result.sentiment.overall_sentiment == "positive"
+    assert requests_total() - before == 1
+
+
+def test_stage_endpoints_still_count_when_called_directly():
+    before = requests_total()
+
+    asyncio.run(main.summarize_text(main.SummarizationRequest(text="Alice: the budget is approved.")))
+
+    assert requests_total() - before == 1
+
+
+def test_super_summarize_packs_meetings_into_the_context_window(monkeypatch):
+    sent = []
+
+    async def chat_completion(request, hedge=False, priority=None):
+        sent.append(request)
+        return SimpleNamespace(content=ANALYSIS_JSON, finish_reason="stop")
+
+    packer = PromptPacker("gpt-4", context_window=8192, max_output_tokens=4096)
+    monkeypatch.setattr(main, "_chat_completion", chat_completion)
+    monkeypatch.setattr(main, "_prompt_packer", lambda: packer)
+    meetings = "Meeting notes: the budget was discussed at length. " * 900  # ~45k characters
+
+    asyncio.run(main.super_summarize(main.SuperSummarizeRequest(meetings=meetings, meetingCount=3, timeRange="Q3")))
+
+    messages = [{"role": m.role, "content": m.content} for m in sent[0].messages]
+    assert packer.tokenizer.count_messages(messages, "gpt-4") + sent[0].max_tokens <= 8192
+    assert "Meeting notes" in messages[-1]["content"]
+    assert len(messages[-1]["content"]) < len(meetings)
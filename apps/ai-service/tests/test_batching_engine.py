@@ -0,0 +1,82 @@
+import asyncio
+
+import torch
+
+from app.services.providers.batching_engine import ContinuousBatchingEngine
+
+from conftest import EOS_TOKEN_ID
+
+
+def greedy_reference(model, input_ids, max_new_tokens):
+    """Greedy tokens without cache or batching, one full forward pass per token"""
+    ids = input_ids
+    generated = []
+    with torch.no_grad():
+        for _ in range(max_new_tokens):
+            token = int(model(input_ids=ids).logits[0, -1].argmax())
+            if token == EOS_TOKEN_ID:
+                break
+            generated.append(token)
+            ids = torch.cat([ids, torch.tensor([[token]])], dim=1)
+    return generated
+
+
+async def collect(sequence):
+    return "".join([text async for text in sequence.stream()])
+
+
+async def run_batch(engine, prompts, max_new_tokens):
+    sequences = [
+        engine.submit(ids, max_new_tokens=tokens, temperature=0.0)
+        for ids, tokens in zip(prompts, max_new_tokens)
+    ]
+    texts = await asyncio.gather(*(collect(sequence) for sequence in sequences))
+    return sequences, texts
+
+
+def encode(tokenizer, text):
+    return torch.tensor([tokenizer.encode(text, add_special_tokens=False)])
+
+
+def test_eos_as_first_token_does_not_fail_the_batch(tiny_model, tiny_tokenizer):
+    marker = tiny_tokenizer.convert_tokens_to_ids("!")
+
+    def eos_after_marker(module, args, kwargs, output):
+        input_ids = kwargs["input_ids"]
+        if input_ids.shape[1] > 1 and int(input_ids[0, -1]) == marker:
+            output.logits[:, -1, EOS_TOKEN_ID] = 1e4
+        return output
+
+    tiny_model.register_forward_hook(eos_after_marker, with_kwargs=True)
+    engine = ContinuousBatchingEngine(tiny_model, tiny_tokenizer, max_batch_size=4)
+    engine.start()
+    try:
+        prompts = [encode(tiny_tokenizer, "Summarize the meeting"), encode(tiny_tokenizer, "Stop now!")]
+        (running, stopped), texts = asyncio.run(run_batch(engine, prompts, [24, 24]))
+    finally:
+        engine.stop()
+
+    assert stopped.finish_reason == "stop"
+    assert stopped.completion_tokens == 0
+    assert texts[1] == ""
+    assert running.finish_reason in ("length", "stop")
+    assert running.finish_reason != "error"
+    assert running.completion_tokens > 0
+
+
+def test_mixed_length_batch_matches_unbatched_greedy(tiny_model, tiny_tokenizer):
+    texts = ["Hi", "Action items for Priya and Mike", "Q3 roadmap review notes"]
+    prompts = [encode(tiny_tokenizer, text) for text in texts]
+    max_new_tokens = [5, 12, 8]
+    expected = [greedy_reference(tiny_model, ids, tokens) for ids, tokens in zip(prompts, max_new_tokens)]
+
+    engine = ContinuousBatchingEngine(tiny_model, tiny_tokenizer, max_batch_size=4)
+    engine.start()
+    try:
+        sequences, outputs = asyncio.run(run_batch(engine, prompts, max_new_tokens))
+    finally:
+        engine.stop()
+
+    assert [sequence.generated for sequence in sequences] == expected
+    assert outputs == [tiny_tokenizer.decode(tokens) for tokens in expected]
+    assert engine.get_stats()["mean_batch_size"] > 1
@@ -0,0 +1,35 @@
+from app.services.providers.circuit_breaker import CircuitBreaker, CircuitState
+
+
+def test_failed_probes_count_against_the_failure_threshold():
+    breaker = CircuitBreaker("anthropic", failure_threshold=3, recovery_timeout=30)
+
+    breaker.record_probe(False, 0.1)
+    breaker.record_probe(False, 0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure(RuntimeError("HTTP 503"))
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_success_resets_probe_failures():
+    breaker = CircuitBreaker("anthropic", failure_threshold=2, recovery_timeout=30)
+
+    breaker.record_probe(False, 0.1)
+    breaker.record_success()
+    breaker.record_probe(False, 0.1)
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_healthy_probe_half_opens_and_failed_probe_reopens():
+    breaker = CircuitBreaker("anthropic", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    breaker.record_probe(True, 0.1)
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    breaker.record_probe(False, 0.1)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.get_stats()["last_probe"]["healthy"] is False
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from app import main
+from app.services.prompt_packer import PromptPacker
+
+
+class Section(BaseModel):
+    value: str
+
+
+def analysis(key, max_tokens=3000):
+    return main.TextAnalysis(
+        key=key,
+        system_prompt=f"Return {{\"value\": ...}} for {key}.",
+        user_prompt="Analyze this meeting transcript:\n\n{transcript}",
+        schema={"type": "object", "properties": {"value": {"type": "string"}}, "required": ["value"]},
+        max_tokens=max_tokens,
+        temperature=0.3,
+        parse=lambda data: Section(**data),
+    )
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """
+    Fake provider call: the combined request is answered by llm.combined,
+    single-analysis requests with a valid section
+    """
+    llm = SimpleNamespace(calls=[], combined=None)
+    monkeypatch.setattr(main, "_prompt_packer", lambda: PromptPacker("gpt-4", context_window=32768, max_output_tokens=4096))
+
+    async def chat_completion(request, hedge=False, priority=None):
+        properties = request.response_schema["properties"]
+        llm.calls.append({"keys": sorted(properties), "max_tokens": request.max_tokens})
+        if "value" not in properties:
+            content, finish_reason = llm.combined
+            return SimpleNamespace(content=content, finish_reason=finish_reason)
+        return SimpleNamespace(content=json.dumps({"value": "separate"}), finish_reason="stop")
+
+    monkeypatch.setattr(main, "_chat_completion", chat_completion)
+    return llm
+
+
+def run(analyses):
+    return asyncio.run(main._run_combined_analysis(analyses, "Alice: ship it. Bob: agreed."))
+
+
+def test_output_budget_is_capped_at_the_model_limit(llm):
+    llm.combined = (json.dumps({"summary": {"value": "a"}, "sentiment": {"value": "b"}}), "stop")
+
+    results = run([analysis("summary"), analysis("sentiment")])
+
+    assert llm.calls == [{"keys": ["sentiment", "summary"], "max_tokens": 4096}]
+    assert {key: result.value for key, result in results.items()} == {"summary": "a", "sentiment": "b"}
+
+
+def test_truncated_response_falls_back_to_separate_calls(llm):
+    llm.combined = ('{"summary": {"value": "cut', "length")
+
+    results = run([analysis("summary"), analysis("sentiment")])
+
+    assert [call["keys"] for call in llm.calls] == [["sentiment", "summary"], ["value"], ["value"]]
+    assert {key: result.value for key, result in results.items()} == {"summary": "separate", "sentiment": "separate"}
+
+
+def test_only_missing_or_invalid_sections_are_re_requested(llm):
+    llm.combined = (json.dumps({"summary": {"value": "a"}, "sentiment": {"score": 1}}), "stop")
+
+    results = run([analysis("summary"), analysis("sentiment"), analysis("highlights")])
+
+    assert len(llm.calls) == 3
+    assert list(results) == ["summary", "sentiment", "highlights"]
+    assert [results[key].value for key in results] == ["a", "separate", "separate"]
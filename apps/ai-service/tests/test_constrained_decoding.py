@@ -0,0 +1,91 @@
+import json
+
+import pytest
+import torch
+from transformers import LogitsProcessorList, StoppingCriteriaList
+
+from app.services.providers.constrained_decoding import (
+    JSONSchemaConstraint,
+    JSONSchemaLogitsProcessor,
+    JSONSchemaStoppingCriteria,
+    TokenVocabulary,
+    advance_state,
+    closing_text,
+)
+
+from conftest import EOS_TOKEN_ID
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "score": {"type": "integer"},
+        "sentiment": {"enum": ["positive", "neutral", "negative"]},
+        "topics": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+
+def start(schema=SCHEMA):
+    return (("value", schema),), 0
+
+
+def conforms(document):
+    return (
+        list(document) == ["summary", "score", "sentiment", "topics"]
+        and isinstance(document["summary"], str)
+        and isinstance(document["score"], int)
+        and document["sentiment"] in ("positive", "neutral", "negative")
+        and all(isinstance(topic, str) for topic in document["topics"])
+    )
+
+
+def generate(model, tokenizer, max_new_tokens, temperature=0.0, seed=0):
+    inputs = tokenizer("Analyze the meeting: ", return_tensors="pt")
+    prompt_tokens = inputs["input_ids"].shape[1]
+    constraint = JSONSchemaConstraint(SCHEMA, TokenVocabulary(tokenizer), [EOS_TOKEN_ID])
+    processor = JSONSchemaLogitsProcessor(constraint, prompt_tokens, max_new_tokens, temperature)
+    torch.manual_seed(seed)
+    output = model.generate(
+        **inputs,
+        max_new_tokens=max_new_tokens,
+        do_sample=temperature > 0,
+        temperature=temperature if temperature > 0 else None,
+        pad_token_id=EOS_TOKEN_ID,
+        logits_processor=LogitsProcessorList([processor]),
+        stopping_criteria=StoppingCriteriaList([JSONSchemaStoppingCriteria(processor)]),
+    )
+    new_tokens = output[0, prompt_tokens:].tolist()
+    return tokenizer.decode(new_tokens, skip_special_tokens=True), len(new_tokens), constraint
+
+
+def test_parser_accepts_valid_prefixes_and_rejects_invalid_ones():
+    assert advance_state(start(), '{"summary": "a \\"quoted\\" word", "score": -12') is not None
+    assert advance_state(start(), '{"score"') is None  # keys come in declaration order
+    assert advance_state(start(), '{"summary": "x", "score": 1.5') is None  # integer
+    assert advance_state(start(), '{"summary": "x", "score": 1, "sentiment": "mixed') is None  # enum
+
+
+def test_closing_text_completes_any_prefix():
+    prefix = '{"summary": "partial'
+    frames, _ = advance_state(start(), prefix)
+    document = json.loads(prefix + closing_text(frames))
+
+    assert conforms(document)
+    assert document["summary"] == "partial"
+
+
+@pytest.mark.parametrize("temperature", [0.0, 1.0])
+def test_generated_output_matches_the_schema(tiny_model, tiny_tokenizer, temperature):
+    text, generated, constraint = generate(tiny_model, tiny_tokenizer, max_new_tokens=200, temperature=temperature)
+
+    assert constraint.done
+    assert conforms(json.loads(text))  # nothing generated after the object closed
+
+
+def test_tight_budget_still_closes_the_document(tiny_model, tiny_tokenizer):
+    text, generated, constraint = generate(tiny_model, tiny_tokenizer, max_new_tokens=60)
+
+    assert constraint.done
+    assert generated <= 60
+    assert conforms(json.loads(text))
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import time
+
+from app import main
+
+
+class FakeDiarizationService:
+    async def diarize(self, audio_path, num_speakers=None):
+        return [{"speaker": "SPEAKER_0", "start": 0.0, "end": 2.0}]
+
+    def merge_with_transcription(self, transcription_segments, diarization_segments):
+        return [dict(seg, speaker_id="SPEAKER_0", speaker="SPEAKER_0") for seg in transcription_segments]
+
+    def get_speaker_stats(self, merged_segments):
+        return {"SPEAKER_0": {"total_duration": 2.0}}
+
+
+def test_diarize_keeps_the_event_loop_free_and_removes_the_audio(monkeypatch, tmp_path):
+    audio = tmp_path / "meeting.mp3"
+
+    async def download(audio_url):
+        audio.write_bytes(b"audio")
+        return str(audio)
+
+    def slow_whisper(audio_path, language, enable_timestamps):
+        time.sleep(0.3)  # blocking Whisper call
+        segments = [{"id": 1, "speaker": "Speaker 1", "text": "hello", "start_time": 0.0, "end_time": 2.0, "confidence": 0.9}]
+        return main.TranscriptionResponse(
+            transcription_id="t1", text="hello", segments=segments, language="en", duration=2.0, confidence=0.9
+        )
+
+    async def diarization_service():
+        return FakeDiarizationService()
+
+    monkeypatch.setattr(main, "_download_audio", download)
+    monkeypatch.setattr(main, "_transcribe_file", slow_whisper)
+    monkeypatch.setattr(main, "get_diarization_service", diarization_service)
+
+    async def scenario():
+        request = asyncio.create_task(main.speaker_diarization(main.SpeakerDiarizationRequest(audio_url="https://x/a.mp3")))
+        ticks = 0
+        while not request.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        return ticks, await request
+
+    ticks, result = asyncio.run(scenario())
+
+    assert ticks >= 10
+    assert result.segments[0]["text"] == "hello"
+    assert result.speakers == [{"id": "SPEAKER_0", "name": "Speaker 0", "total_time": 2.0}]
+    assert not os.path.exists(audio)
@@ -0,0 +1,129 @@
+import asyncio
+
+import fakeredis
+import pytest
+from redis.cluster import key_slot
+
+from app.services.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobWorker, RedisJobQueue, SQLiteJobQueue
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_queue(request, tmp_path, monkeypatch):
+    """Builds a queue with short leases and retry delays (call it inside the event loop)"""
+    monkeypatch.setenv("JOB_LEASE_SECONDS", "0.2")
+    monkeypatch.setenv("JOB_RETRY_DELAY", "0.05")
+    monkeypatch.setenv("JOB_POLL_INTERVAL", "0.01")
+
+    def build():
+        if request.param == "sqlite":
+            return SQLiteJobQueue(str(tmp_path / "jobs.sqlite"))
+        return RedisJobQueue(fakeredis.aioredis.FakeRedis())
+
+    return build
+
+
+def test_expired_lease_is_claimed_again(make_queue):
+    async def scenario():
+        queue = make_queue()
+        job = await queue.enqueue("transcribe", {"url": "a.wav"})
+        first = await queue.dequeue(timeout=0.1)
+        assert await queue.dequeue(timeout=0.05) is None  # leased
+
+        await asyncio.sleep(0.3)  # the worker died without renewing its lease
+        second = await queue.dequeue(timeout=0.5)
+        return job, first, second
+
+    job, first, second = asyncio.run(scenario())
+
+    assert first.id == second.id == job.id
+    assert (first.attempts, second.attempts) == (1, 2)
+    assert second.status == RUNNING
+
+
+def test_heartbeat_keeps_the_lease(make_queue):
+    async def scenario():
+        queue = make_queue()
+        await queue.enqueue("transcribe", {})
+        job = await queue.dequeue(timeout=0.1)
+        for _ in range(4):
+            await asyncio.sleep(0.1)
+            await queue.heartbeat(job)
+        return await queue.dequeue(timeout=0.05)
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_failed_attempt_is_retried_then_completed(make_queue):
+    async def scenario():
+        queue = make_queue()
+        job = await queue.enqueue("summarize", {"text": "hi"}, max_attempts=2)
+        claimed = await queue.dequeue(timeout=0.1)
+        await queue.fail(claimed, "provider timeout")
+        assert (await queue.get(job.id)).status == QUEUED
+        assert await queue.dequeue(timeout=0.01) is None  # still backing off
+
+        retried = await queue.dequeue(timeout=0.5)
+        await queue.complete(retried, {"summary": "ok"})
+        return await queue.get(job.id), await queue.dequeue(timeout=0.05)
+
+    done, nothing_left = asyncio.run(scenario())
+
+    assert done.status == SUCCEEDED
+    assert done.attempts == 2
+    assert done.result == {"summary": "ok"}
+    assert nothing_left is None
+
+
+def test_job_fails_once_attempts_run_out(make_queue):
+    async def scenario():
+        queue = make_queue()
+        job = await queue.enqueue("summarize", {}, max_attempts=1)
+        await queue.fail(await queue.dequeue(timeout=0.1), "bad output")
+        return await queue.get(job.id)
+
+    failed = asyncio.run(scenario())
+
+    assert failed.status == FAILED
+    assert failed.error == "bad output"
+
+
+def test_worker_retries_until_the_handler_succeeds(make_queue):
+    calls = []
+
+    async def flaky(payload):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise RuntimeError("provider down")
+        return {"ok": True}
+
+    async def scenario():
+        queue = make_queue()
+        job = await queue.enqueue("summarize", {"text": "hi"}, max_attempts=3)
+        worker = JobWorker(queue, {"summarize": flaky})
+        worker.start()
+        for _ in range(200):
+            done = await queue.get(job.id)
+            if done.done:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop(grace=1.0)
+        return done
+
+    done = asyncio.run(scenario())
+
+    assert done.status == SUCCEEDED
+    assert done.attempts == 3
+    assert len(calls) == 3
+
+
+def test_redis_keys_share_one_cluster_slot():
+    queue = RedisJobQueue(fakeredis.aioredis.FakeRedis())
+    keys = [queue._key(name) for name in ("queue", "delayed", "running", "job:123")]
+
+    assert keys[0] == "{jobs}:queue"
+    assert len({key_slot(key.encode()) for key in keys}) == 1
+
+
+def test_backends_must_implement_storage():
+    with pytest.raises(TypeError):
+        JobQueue()
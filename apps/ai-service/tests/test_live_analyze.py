@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def test_malformed_frames_get_an_error_and_keep_the_socket_open():
+    client = TestClient(main.app)
+
+    with client.websocket_connect("/ws/live-analyze/ws-malformed?meetingId=m1") as websocket:
+        websocket.send_text("{not json")
+        invalid = websocket.receive_json()
+        websocket.send_text('["delta"]')
+        not_object = websocket.receive_json()
+
+        websocket.send_json({"type": "end"})
+        ended = websocket.receive_json()
+
+    assert invalid["type"] == "error" and invalid["detail"].startswith("Invalid JSON message")
+    assert not_object == {"type": "error", "detail": "Messages must be JSON objects"}
+    assert ended["type"] == "ended"
@@ -0,0 +1,71 @@
+import asyncio
+
+from fastapi import WebSocketDisconnect
+
+from app.services.live_session import LiveAnalysisScheduler, LiveSessionStore
+
+
+def scheduler(analyze, publish, on_error=None):
+    store = LiveSessionStore()
+    state = store.get_or_create("s1", "m1")
+    return LiveAnalysisScheduler(store, state, analyze, publish, on_error, debounce_ms=10, max_wait_ms=100)
+
+
+def test_failed_analysis_is_retried_with_the_buffered_text():
+    analyzed, published, errors = [], [], []
+
+    async def analyze(state, text):
+        analyzed.append(text)
+        if len(analyzed) == 1:
+            raise RuntimeError("provider down")
+
+    async def publish(state):
+        published.append(state.pending)
+
+    async def on_error(error):
+        errors.append(str(error))
+
+    async def scenario():
+        live = scheduler(analyze, publish, on_error)
+        live.push("Alice: ship it on Friday.")
+        for _ in range(100):
+            if published:
+                break
+            await asyncio.sleep(0.01)
+        await live.close()
+        return live.state.pending
+
+    pending = asyncio.run(scenario())
+
+    assert errors == ["provider down"]
+    assert analyzed == ["Alice: ship it on Friday."] * 2
+    assert published == [""] and pending == ""
+
+
+def test_closed_socket_stops_analyses_without_task_errors():
+    analyzed = []
+    unhandled = []
+
+    async def analyze(state, text):
+        analyzed.append(text)
+
+    async def publish(state):
+        raise WebSocketDisconnect(1006)
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        live = scheduler(analyze, publish)
+        live.push("Alice: first.")
+        await live.flush()
+        live.state.pending += "Bob: second."  # arrived as the socket closed
+        live._start()
+        await asyncio.sleep(0.05)
+        inflight = live._inflight
+        await live.close()
+        return inflight
+
+    inflight = asyncio.run(scenario())
+
+    assert analyzed == ["Alice: first."]
+    assert inflight.done() and inflight.exception() is None
+    assert unhandled == []
@@ -0,0 +1,159 @@
+import asyncio
+import gc
+import weakref
+
+import pytest
+
+from app.services.model_residency import ModelResidencyManager, measure_footprint
+from app.services.providers.base_provider import ChatMessage, ChatRequest, ProviderConfig, ProviderType
+
+from conftest import build_tiny_model
+
+
+class FakeHFManager:
+    """hf_manager loading tiny GPT-2s into a residency budget with room for `slots` of them"""
+
+    def __init__(self, tokenizer, footprint, slots=1):
+        self.tokenizer = tokenizer
+        self.footprint = footprint
+        self.residency = ModelResidencyManager(
+            budget_bytes=int(footprint * (slots + 0.5)), policy="lru", pinned="", unload=self.unload_model
+        )
+        self.loaded_models = {}
+        self.built = {}  # model name -> weakref to every model built for it
+        self.live_at_load = []  # (model being loaded, other models still alive)
+
+    @staticmethod
+    def llm_cache_key(model_name, quantization=None, device="auto"):
+        return f"{model_name}_{quantization}_{device}"
+
+    def load_llm(self, model_name, device="auto", quantization=None):
+        key = self.llm_cache_key(model_name, quantization, device)
+        if key in self.loaded_models:
+            self.residency.touch(key)
+            return self.loaded_models[key], self.tokenizer
+
+        self.residency.reserve(key, self.footprint)
+        gc.collect()
+        self.live_at_load.append((model_name, [name for name, ref in self.built.items() if ref() is not None]))
+
+        model = build_tiny_model(self.tokenizer)
+        self.built[model_name] = weakref.ref(model)
+        self.loaded_models[key] = model
+        self.residency.admit(key, model_name, model)
+        return model, self.tokenizer
+
+    def unload_model(self, key):
+        self.loaded_models.pop(key, None)
+        self.residency.forget(key)
+
+
+def local_provider(monkeypatch, tokenizer, slots=1):
+    monkeypatch.setenv("LOCAL_LLM_BACKEND", "transformers")
+    monkeypatch.setenv("LOCAL_LLM_QUANTIZATION", "none")
+    monkeypatch.delenv("LOCAL_SPECULATIVE_DECODING", raising=False)
+    from app.services.providers.local_provider import LocalProvider
+
+    provider = LocalProvider(ProviderConfig(ProviderType.LOCAL))
+    provider.hf_manager = FakeHFManager(tokenizer, measure_footprint(build_tiny_model(tokenizer)), slots)
+    return provider
+
+
+@pytest.fixture
+def provider(monkeypatch, tiny_tokenizer):
+    provider = local_provider(monkeypatch, tiny_tokenizer)
+    yield provider
+    provider._drop_current_llm()
+
+
+def chat(model, max_tokens=8):
+    return ChatRequest(
+        messages=[ChatMessage(role="user", content="Summarize the meeting")],
+        model=model,
+        max_tokens=max_tokens,
+        temperature=0.0,
+    )
+
+
+def test_model_switch_drops_the_old_model_before_loading(provider):
+    async def scenario():
+        first = await provider.chat_completion(chat("qwen2.5-0.5b"))
+        second = await provider.chat_completion(chat("gemma-2-2b"))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert provider.hf_manager.live_at_load == [("qwen2.5-0.5b", []), ("gemma-2-2b", [])]
+    assert provider.hf_manager.residency.evictions == 1
+    assert first.model == "qwen2.5-0.5b" and second.model == "gemma-2-2b"
+
+
+def test_model_switch_waits_for_in_flight_generations(provider):
+    async def scenario():
+        running = asyncio.create_task(provider.chat_completion(chat("qwen2.5-0.5b", max_tokens=64)))
+        while provider._active_generations == 0:
+            await asyncio.sleep(0.01)
+        switched = await provider.chat_completion(chat("gemma-2-2b"))
+        return running.done(), await running, switched
+
+    finished_before_switch, running, switched = asyncio.run(scenario())
+
+    assert finished_before_switch
+    assert running.usage["completion_tokens"] > 0
+    assert running.finish_reason in ("length", "stop")
+    assert switched.model == "gemma-2-2b"
+    assert provider.hf_manager.live_at_load[-1] == ("gemma-2-2b", [])
+    assert provider._active_generations == 0
+
+
+def test_speculative_decoding_is_off_by_default(provider):
+    assert provider.speculative_enabled is False
+
+
+def test_busy_speculative_decoder_overflows_to_the_batching_engine(monkeypatch, tiny_tokenizer):
+    provider = local_provider(monkeypatch, tiny_tokenizer, slots=2)
+    provider.speculative_enabled = True  # on CUDA nodes with LOCAL_SPECULATIVE_DECODING=auto
+
+    async def scenario():
+        return await asyncio.gather(*(provider.chat_completion(chat("qwen2.5-7b", max_tokens=16)) for _ in range(3)))
+
+    try:
+        responses = asyncio.run(scenario())
+        speculative = provider.speculative_decoder.get_stats()
+        batching = provider.batching_engine.get_stats()
+    finally:
+        provider._drop_current_llm()
+
+    assert all(response.finish_reason in ("length", "stop") for response in responses)
+    assert speculative["sequences"] == 1
+    assert batching["tokens_generated"] > 0
+
+
+def test_abandoned_stream_stops_and_joins_the_generation_thread(monkeypatch, tiny_tokenizer):
+    monkeypatch.setenv("LOCAL_BATCHING_ENABLED", "false")
+    provider = local_provider(monkeypatch, tiny_tokenizer)
+    generated = []
+
+    from transformers import GPT2LMHeadModel
+
+    generate = GPT2LMHeadModel.generate
+
+    def recording_generate(self, **kwargs):
+        output = generate(self, **kwargs)
+        generated.append(output.shape[1] - kwargs["input_ids"].shape[1])
+        return output
+
+    monkeypatch.setattr(GPT2LMHeadModel, "generate", recording_generate)
+
+    async def scenario():
+        stream = provider.chat_completion_stream(chat("qwen2.5-0.5b", max_tokens=400))
+        await stream.__anext__()
+        await stream.aclose()  # e.g. the consumer hit its timeout
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        provider._drop_current_llm()
+
+    assert len(generated) == 1 and generated[0] < 400  # generate() returned before close did
+    assert provider._active_generations == 0
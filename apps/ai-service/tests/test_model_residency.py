@@ -0,0 +1,95 @@
+import pytest
+
+from app.services.model_residency import ModelResidencyManager, ResidencyBudgetExceeded
+
+MB = 1024 ** 2
+
+
+class Weights:
+    """Stand-in model whose footprint is reported by get_memory_footprint()"""
+
+    def __init__(self, size_bytes):
+        self.size_bytes = size_bytes
+
+    def get_memory_footprint(self):
+        return self.size_bytes
+
+
+def residency(budget_mb, policy="lru", pinned=""):
+    unloaded = []
+    manager = ModelResidencyManager(budget_bytes=budget_mb * MB, policy=policy, pinned=pinned, unload=unloaded.append)
+    return manager, unloaded
+
+
+def load(manager, key, size_mb, estimate_mb=None):
+    manager.reserve(key, (size_mb if estimate_mb is None else estimate_mb) * MB)
+    return manager.admit(key, key, Weights(size_mb * MB))
+
+
+def test_lru_evicts_the_least_recently_used_idle_model():
+    manager, unloaded = residency(100)
+    load(manager, "a", 40)
+    load(manager, "b", 40)
+    manager.touch("a")
+
+    load(manager, "c", 40)
+
+    assert unloaded == ["b"]
+    assert manager.is_resident("a") and manager.is_resident("c")
+    assert manager.used_bytes == 80 * MB
+
+
+def test_lfu_evicts_the_least_frequently_used_model():
+    manager, unloaded = residency(100, policy="lfu")
+    load(manager, "a", 40)
+    load(manager, "b", 40)
+    for _ in range(3):
+        manager.touch("a")
+    manager.touch("b")  # most recent, but fewer uses
+
+    load(manager, "c", 40)
+
+    assert unloaded == ["b"]
+
+
+def test_models_in_use_are_not_evicted():
+    manager, unloaded = residency(100)
+    load(manager, "a", 40)
+    load(manager, "b", 40)
+    manager.acquire("a")
+
+    load(manager, "c", 40)
+    manager.acquire("c")
+    assert unloaded == ["b"]
+
+    with pytest.raises(ResidencyBudgetExceeded):
+        manager.reserve("d", 40 * MB)
+
+    manager.release("a")
+    load(manager, "d", 40)
+    assert unloaded == ["b", "a"]
+
+
+def test_pinned_models_are_never_evicted():
+    manager, unloaded = residency(100, pinned="a")
+    load(manager, "a", 60)
+
+    with pytest.raises(ResidencyBudgetExceeded):
+        manager.reserve("b", 60 * MB)
+    assert unloaded == []
+
+    manager.cancel("b")
+    manager.unpin("a")
+    load(manager, "b", 60)
+    assert unloaded == ["a"]
+
+
+def test_measured_footprint_over_the_estimate_evicts_after_load():
+    manager, unloaded = residency(100)
+    load(manager, "a", 40)
+    load(manager, "b", 30)
+
+    load(manager, "c", 50, estimate_mb=20)
+
+    assert unloaded == ["a"]
+    assert manager.get_stats()["models"]["c"]["footprint_gb"] == round(50 * MB / 1024 ** 3, 2)
@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.prompt_packer import PromptPacker, PromptSection
+from app.services.tokenizer_service import TokenizerService
+
+SYSTEM = "You summarize meetings."
+
+
+@pytest.fixture
+def tokenizer(tiny_tokenizer):
+    """Character-level tokenizer, so one character costs one token"""
+    service = TokenizerService(allow_download=False)
+    service.register("tiny", tiny_tokenizer)
+    return service
+
+
+def packer(tokenizer, context_window, **kwargs):
+    return PromptPacker("tiny", context_window=context_window, tokenizer=tokenizer, safety_margin=0, **kwargs)
+
+
+def test_oversized_items_are_skipped_for_smaller_lower_ranked_ones(tokenizer):
+    items = ["a" * 40, "b" * 500, "c" * 30, "d" * 80, "e" * 10]
+    packed = packer(tokenizer, 300).pack(
+        SYSTEM, "Context: {context}", output_tokens=100, sections=[PromptSection("context", items, separator=" | ")]
+    )
+
+    assert packed.included == {"context": [0, 2, 4]}
+    assert packed.dropped == {"context": 2}
+    assert packed.messages[-1]["content"] == "Context: " + " | ".join(["a" * 40, "c" * 30, "e" * 10])
+    assert packed.prompt_tokens == tokenizer.count_messages(packed.messages, "tiny") <= packed.budget == 200
+    assert not packed.complete
+
+
+def test_truncating_section_is_cut_to_the_remaining_budget(tokenizer):
+    transcript = "word " * 200
+    packed = packer(tokenizer, 400).pack(
+        SYSTEM, "Transcript: {transcript}", output_tokens=100, sections=[PromptSection("transcript", [transcript], truncate=True)]
+    )
+
+    content = packed.messages[-1]["content"]
+    assert packed.truncated == ["transcript"]
+    assert transcript.startswith(content[len("Transcript: "):])
+    assert packed.prompt_tokens == tokenizer.count_messages(packed.messages, "tiny") == packed.budget
+
+
+def test_history_keeps_the_newest_turns_within_its_share(tokenizer):
+    history = [{"role": "user", "content": f"turn {i} " + "x" * 40} for i in range(10)]
+    packed = packer(tokenizer, 1000).pack(SYSTEM, "Question?", output_tokens=200, history=history, history_share=0.25)
+
+    kept = packed.messages[1:-1]
+    assert kept == history[-len(kept):]
+    assert 0 < len(kept) < 10
+    assert packed.dropped["history"] == 10 - len(kept)
+    assert sum(tokenizer.count(m["content"], "tiny") + 3 for m in kept) <= 0.25 * packed.budget
+
+
+def test_output_budget_is_capped(tokenizer):
+    assert packer(tokenizer, 1000, max_output_tokens=150).pack(SYSTEM, "Hi", output_tokens=4000).output_tokens == 150
+    assert packer(tokenizer, 1000).pack(SYSTEM, "Hi", output_tokens=4000).output_tokens == 500
+
+
+def test_required_parts_that_do_not_fit_raise(tokenizer):
+    with pytest.raises(ValueError, match="Prompt needs"):
+        packer(tokenizer, 100).pack(SYSTEM, "q" * 200, output_tokens=10)
@@ -0,0 +1,183 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.services.providers import provider_manager as provider_manager_module
+from app.services.providers.base_provider import ChatMessage, ChatRequest, ProviderConfig, ProviderType
+from app.services.providers.provider_manager import ProviderManager
+
+
+def claude_response(model):
+    return SimpleNamespace(
+        content=[SimpleNamespace(text="summary")],
+        model=model,
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=10, output_tokens=2),
+    )
+
+
+def openai_response(model):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="summary", function_call=None), finish_reason="stop")],
+        model=model,
+        usage=SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12),
+    )
+
+
+def manager_with(openai_create, anthropic_create, anthropic_config=None, openai_rpm=None):
+    manager = ProviderManager()
+    manager.register_provider(
+        ProviderType.OPENAI,
+        ProviderConfig(ProviderType.OPENAI, api_key="sk-test", priority=50, rate_limit_rpm=openai_rpm),
+    )
+    manager.register_provider(
+        ProviderType.ANTHROPIC,
+        ProviderConfig(ProviderType.ANTHROPIC, api_key="sk-ant-test", priority=60, custom_config=anthropic_config or {}),
+    )
+    manager.providers[ProviderType.OPENAI].async_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=openai_create))
+    )
+    manager.providers[ProviderType.ANTHROPIC].async_client = SimpleNamespace(
+        messages=SimpleNamespace(create=anthropic_create)
+    )
+    return manager
+
+
+def chat_request(model="gpt-4"):
+    return ChatRequest(messages=[ChatMessage(role="user", content="Summarize the meeting")], model=model)
+
+
+def test_fallback_to_anthropic_sends_an_anthropic_model():
+    calls = {"openai": [], "anthropic": []}
+
+    async def openai_create(**kwargs):
+        calls["openai"].append(kwargs["model"])
+        raise ConnectionError("openai down")
+
+    async def anthropic_create(**kwargs):
+        calls["anthropic"].append(kwargs["model"])
+        return claude_response(kwargs["model"])
+
+    manager = manager_with(openai_create, anthropic_create)
+    response = asyncio.run(manager.chat_completion(chat_request()))
+
+    assert calls["openai"] == ["gpt-4"]
+    assert calls["anthropic"] == ["claude-3-5-sonnet-20241022"]
+    assert response.provider == "anthropic"
+
+
+def test_fallback_uses_the_configured_anthropic_model():
+    models = []
+
+    async def openai_create(**kwargs):
+        raise ConnectionError("openai down")
+
+    async def anthropic_create(**kwargs):
+        models.append(kwargs["model"])
+        return claude_response(kwargs["model"])
+
+    manager = manager_with(openai_create, anthropic_create, {"chat_model": "claude-3-haiku-20240307"})
+    asyncio.run(manager.chat_completion(chat_request()))
+    asyncio.run(manager.chat_completion(chat_request("claude-3-opus-20240229")))
+
+    assert models == ["claude-3-haiku-20240307", "claude-3-opus-20240229"]
+
+
+def test_hedge_sends_each_provider_its_own_model():
+    calls = {"openai": [], "anthropic": []}
+
+    async def openai_create(**kwargs):
+        calls["openai"].append(kwargs["model"])
+        await asyncio.sleep(5)
+        return openai_response(kwargs["model"])
+
+    async def anthropic_create(**kwargs):
+        calls["anthropic"].append(kwargs["model"])
+        return claude_response(kwargs["model"])
+
+    manager = manager_with(openai_create, anthropic_create)
+    manager.hedge_default_delay = 0.01
+    response = asyncio.run(manager.chat_completion(chat_request(), hedge=True))
+
+    assert response.provider == "anthropic"
+    assert calls == {"openai": ["gpt-4"], "anthropic": ["claude-3-5-sonnet-20241022"]}
+
+
+OPENAI_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status_code):
+    response = httpx.Response(status_code, request=OPENAI_REQUEST)
+    error_class = openai.InternalServerError if status_code >= 500 else openai.BadRequestError
+    return error_class(f"HTTP {status_code}", response=response, body=None)
+
+
+def flaky_openai(errors, calls):
+    async def create(**kwargs):
+        calls.append(kwargs["model"])
+        if errors:
+            raise errors.pop(0)
+        return openai_response(kwargs["model"])
+    return create
+
+
+async def unused_anthropic(**kwargs):
+    raise AssertionError("fell back instead of retrying")
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(provider_manager_module, "transient_backoff_delay", lambda attempt: 0.0)
+
+
+def test_rate_limited_provider_disables_sdk_retries_but_retries_transient_errors(no_backoff):
+    calls = []
+    errors = [status_error(503), openai.APIConnectionError(request=OPENAI_REQUEST), openai.APITimeoutError(OPENAI_REQUEST)]
+    manager = manager_with(flaky_openai(errors, calls), unused_anthropic, openai_rpm=600)
+
+    assert manager.providers[ProviderType.OPENAI].client_max_retries() == 0
+    response = asyncio.run(manager.chat_completion(chat_request(), provider_type=ProviderType.OPENAI))
+
+    assert response.provider == "openai"
+    assert len(calls) == 4
+
+
+def test_client_errors_are_not_retried(no_backoff):
+    calls = []
+    manager = manager_with(flaky_openai([status_error(400)], calls), unused_anthropic, openai_rpm=600)
+
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        asyncio.run(manager.chat_completion(chat_request(), provider_type=ProviderType.OPENAI))
+    assert len(calls) == 1
+
+
+def test_transient_retries_stop_at_max_retries(no_backoff):
+    calls = []
+    errors = [status_error(500) for _ in range(10)]
+    manager = manager_with(flaky_openai(errors, calls), unused_anthropic, openai_rpm=600)
+
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        asyncio.run(manager.chat_completion(chat_request(), provider_type=ProviderType.OPENAI))
+    assert len(calls) == 1 + manager.providers[ProviderType.OPENAI].config.max_retries
+
+
+def test_anthropic_health_probe_lists_models_instead_of_sending_a_message():
+    async def billed_create(**kwargs):
+        raise AssertionError("health probe sent a billed message")
+
+    manager = manager_with(flaky_openai([], []), billed_create)
+    listed = []
+
+    async def list_models(**kwargs):
+        listed.append(kwargs)
+        return SimpleNamespace(data=[])
+
+    anthropic_client = manager.providers[ProviderType.ANTHROPIC].async_client
+    anthropic_client.models = SimpleNamespace(list=list_models)
+    manager.providers[ProviderType.OPENAI].async_client.models = SimpleNamespace(list=list_models)
+
+    assert asyncio.run(manager.health_check_all()) == {"openai": True, "anthropic": True}
+    assert len(listed) == 2
@@ -0,0 +1,24 @@
+import asyncio
+
+import fakeredis
+from redis.cluster import key_slot
+
+from app.services.providers.rate_limiter import ProviderRateLimiter
+
+
+def test_redis_bucket_keys_share_one_cluster_slot():
+    limiter = ProviderRateLimiter("openai", rpm=60, tpm=1000, redis_client=fakeredis.aioredis.FakeRedis())
+    keys = [*limiter._buckets.keys, limiter._buckets.block_key]
+
+    assert keys == ["ratelimit:{openai}:rpm", "ratelimit:{openai}:tpm", "ratelimit:{openai}:blocked"]
+    assert len({key_slot(key.encode()) for key in keys}) == 1
+
+
+def test_redis_buckets_admit_within_the_limit():
+    async def scenario():
+        limiter = ProviderRateLimiter("openai", rpm=60, tpm=1000, redis_client=fakeredis.aioredis.FakeRedis())
+        for _ in range(3):
+            await limiter.acquire(tokens=100)
+        return limiter.admitted
+
+    assert asyncio.run(scenario()) == 3
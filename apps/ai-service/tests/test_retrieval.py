@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.retrieval import RetrievalService, VectorIndex
+
+
+async def bag_of_letters(texts):
+    """Deterministic embedder: letter counts"""
+    vectors = []
+    for text in texts:
+        vector = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if char.isalpha() and char.isascii():
+                vector[ord(char) - ord("a")] += 1
+        vectors.append(vector.tolist())
+    return vectors
+
+
+def test_retrieve_waits_for_the_org_lock(monkeypatch, tmp_path):
+    monkeypatch.setenv("RETRIEVAL_INDEX_BACKEND", "numpy")
+    service = RetrievalService(embedder=bag_of_letters, index_dir=str(tmp_path))
+
+    async def scenario():
+        await service.index_meeting("org", "m1", text="Budget review for the quarter")
+        await service.index_meeting("org", "m2", text="Hiring plan and onboarding")
+
+        async with service._lock("org"):
+            search = asyncio.create_task(service.retrieve("org", "budget quarter", top_k=1))
+            await asyncio.sleep(0.05)
+            assert not search.done()
+            # A reindex that lands while the search waits is what it sees
+            service._indexes["org"].remove_meeting("m1")
+
+        return await search
+
+    results = asyncio.run(scenario())
+
+    assert [chunk.meeting_id for chunk in results] == ["m2"]
+
+
+@pytest.mark.parametrize("backend", ["faiss", "hnswlib"])
+def test_reindexed_meeting_is_found_after_reload(tmp_path, backend):
+    pytest.importorskip(backend)
+    basis = np.eye(8, dtype=np.float32)
+    index = VectorIndex(str(tmp_path), backend, ann_min_vectors=1)
+    index.add(basis[:2], [{"meeting_id": "A", "text": f"alpha {i}"} for i in range(2)])
+    index.add(basis[2:4], [{"meeting_id": "B", "text": f"beta {i}"} for i in range(2)])
+    index.search(basis[0], top_k=1)  # builds the ANN graph
+    index.save()
+
+    # Same chunk count, different row order
+    index.remove_meeting("A")
+    index.add(basis[:2], [{"meeting_id": "A", "text": f"alpha {i}"} for i in range(2)])
+    index.save()
+
+    reloaded = VectorIndex(str(tmp_path), backend, ann_min_vectors=1)
+    reloaded.load()
+    (row, score), = reloaded.search(basis[0], top_k=1)
+
+    assert reloaded.chunks[row]["text"] == "alpha 0"
+    assert score == pytest.approx(1.0)
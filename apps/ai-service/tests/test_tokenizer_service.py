@@ -0,0 +1,59 @@
+import asyncio
+import subprocess
+import sys
+import threading
+
+import transformers
+
+from app.services.tokenizer_service import TokenizerService
+
+from conftest import SERVICE_DIR
+
+
+class FakeHFTokenizer:
+    name_or_path = "org/model"
+    chat_template = None
+
+    def encode(self, text, add_special_tokens=False):
+        return list(range(len(text.split())))
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join("w" for _ in ids)
+
+
+def record_from_pretrained(monkeypatch):
+    calls = []
+
+    def from_pretrained(model, **kwargs):
+        calls.append({"model": model, "thread": threading.current_thread(), **kwargs})
+        return FakeHFTokenizer()
+
+    monkeypatch.setattr(transformers.AutoTokenizer, "from_pretrained", from_pretrained)
+    return calls
+
+
+def test_importing_the_service_does_not_import_transformers():
+    code = "import sys, app.services.tokenizer_service; print('transformers' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_request_path_lookups_only_read_the_local_cache(monkeypatch):
+    monkeypatch.delenv("TOKENIZER_ALLOW_DOWNLOAD", raising=False)
+    calls = record_from_pretrained(monkeypatch)
+
+    tokenizer = TokenizerService().get("org/model")
+
+    assert tokenizer.exact
+    assert calls[0]["local_files_only"] is True
+
+
+def test_preload_downloads_on_the_executor(monkeypatch):
+    calls = record_from_pretrained(monkeypatch)
+    service = TokenizerService(allow_download=False)
+
+    asyncio.run(service.preload(["org/model"]))
+
+    assert calls[0]["local_files_only"] is False
+    assert calls[0]["thread"] is not threading.main_thread()
+    assert service.count("three word prompt", "org/model") == 3
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+from app.services.warmup import WarmupManager
+
+
+def slow_loader(calls, release: threading.Event):
+    def load():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return object()
+    return load
+
+
+def test_load_async_waits_for_warmup_off_the_event_loop():
+    calls = []
+    release = threading.Event()
+    manager = WarmupManager(models=["entities"], loaders={"entities": slow_loader(calls, release)})
+
+    async def scenario():
+        manager.start()
+        await asyncio.sleep(0.05)  # warm-up is now holding the load
+        request = asyncio.create_task(manager.load_async("entities"))
+
+        # The loop keeps running while the model loads
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks >= 10
+        assert not request.done()
+        assert manager.status()["ready"] is False
+
+        release.set()
+        service = await request
+        await manager._task
+        return service
+
+    service = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert manager.load("entities") is service
+    assert manager.ready
+    assert manager.status()["models"]["entities"]["status"] == "loaded"
+
+
+def test_failed_load_is_reported_and_not_ready():
+    def broken():
+        raise RuntimeError("model missing")
+
+    manager = WarmupManager(models=["keywords"], loaders={"keywords": broken})
+    asyncio.run(manager.warm_up())
+
+    status = manager.status()
+    assert status["ready"] is False
+    assert status["models"]["keywords"] == {
+        "status": "error",
+        "load_seconds": status["models"]["keywords"]["load_seconds"],
+        "error": "model missing",
+    }